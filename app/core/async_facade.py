@@ -0,0 +1,376 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
+
+from app.core.executors import run_blocking
+from app.core.facade import POSCore
+from app.core.metrics import REGISTRY
+from app.core.models.page import DEFAULT_PAGE_SIZE
+from app.core.models.product import DEFAULT_SEARCH_LIMIT
+from app.core.models.product_import import (
+    DEFAULT_IMPORT_CHUNK_SIZE,
+    ProductImportRow,
+)
+from app.core.schemas.campaign_schema import (
+    AddProductInComboRequest,
+    AddProductInComboResponse,
+    AddProductInDiscountResponse,
+    CreateBuyNGetNProductRequest,
+    CreateBuyNGetNProductResponse,
+    CreateComboRequest,
+    CreateComboResponse,
+    CreateDiscountRequest,
+    CreateDiscountResponse,
+    CreateReceiptDiscountRequest,
+    CreateReceiptDiscountResponse,
+    GetAllCampaignsResponse,
+    GetOneCampaignResponse,
+)
+from app.core.schemas.payment_schema import (
+    BatchPaymentRequest,
+    BatchPaymentResponse,
+)
+from app.core.schemas.products_schema import (
+    CreateProductRequest,
+    CreateProductResponse,
+    GetAllProductResponse,
+    GetOneProductResponse,
+    ImportProductsResponse,
+    SearchProductsResponse,
+    UpdatePricesRequest,
+    UpdatePricesResponse,
+    UpdateProductPriceRequest,
+)
+from app.core.schemas.receipt_schema import (
+    AddComboInReceiptRequest,
+    AddGiftInReceiptRequest,
+    AddItemInReceiptResponse,
+    AddItemsInReceiptRequest,
+    AddProductInReceiptRequest,
+    CreateReceiptRequest,
+    CreateReceiptResponse,
+    GetAllReceiptResponse,
+    GetOneReceiptResponse,
+    ScanProductInReceiptRequest,
+)
+from app.core.schemas.report_schema import ReportResponse
+from app.core.schemas.shift_schema import (
+    CreateShiftResponse,
+    GetOneShiftResponse,
+    UpdateShiftStateRequest,
+)
+from app.core.schemas.sync_schema import GetChangesResponse
+from app.core.services.catalog_version import CatalogVersion
+
+T = TypeVar("T")
+
+# route classes, each with a pool of its own so that one kind of work
+# cannot take every thread from another
+CHECKOUT = "checkout"
+CATALOG = "catalog"
+ANALYTICS = "analytics"
+POOLS = (CHECKOUT, CATALOG, ANALYTICS)
+
+CORE_CALLS_QUEUED = REGISTRY.gauge(
+    "core_calls_queued",
+    "Use cases waiting for a thread of their pool, by pool.")
+CORE_CALLS_RUNNING = REGISTRY.gauge(
+    "core_calls_running",
+    "Use cases running on a thread of their pool, by pool.")
+CORE_QUEUE_WAIT_SECONDS = REGISTRY.counter(
+    "core_queue_wait_seconds_total",
+    "Time use cases spent waiting for a thread of their pool, by pool.")
+
+
+class _Waiting:
+    # use cases no thread has picked up yet, oldest first, by pool
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict["_PoolJob", None]] = {}
+
+    def add(self, job: "_PoolJob") -> None:
+        with self._lock:
+            self._jobs.setdefault(job.pool, {})[job] = None
+
+    def discard(self, job: "_PoolJob") -> None:
+        with self._lock:
+            self._jobs.get(job.pool, {}).pop(job, None)
+
+    def oldest(self, pool: str) -> Optional[float]:
+        with self._lock:
+            jobs = self._jobs.get(pool)
+            return next(iter(jobs)).queued_at if jobs else None
+
+
+class _PoolJob:
+    # one use case on its way through a pool; keeps the queue gauge right
+    # when the caller gives up before a thread has picked the job up
+    def __init__(self, pool: str, function: Callable[[], Any],
+                 waiting: _Waiting) -> None:
+        self.pool = pool
+        self.function = function
+        self.waiting = waiting
+        self.queued_at = time.perf_counter()
+        self.started = False
+        self.abandoned = False
+        self._lock = threading.Lock()
+        CORE_CALLS_QUEUED.inc(pool=pool)
+        waiting.add(self)
+
+    def __call__(self) -> Any:
+        with self._lock:
+            if self.abandoned:
+                return None
+            self.started = True
+        self.waiting.discard(self)
+        CORE_CALLS_QUEUED.dec(pool=self.pool)
+        CORE_QUEUE_WAIT_SECONDS.inc(time.perf_counter() - self.queued_at,
+                                    pool=self.pool)
+        CORE_CALLS_RUNNING.inc(pool=self.pool)
+        try:
+            return self.function()
+        finally:
+            CORE_CALLS_RUNNING.dec(pool=self.pool)
+
+    def abandon(self) -> None:
+        with self._lock:
+            if self.started:
+                return
+            self.abandoned = True
+        self.waiting.discard(self)
+        CORE_CALLS_QUEUED.dec(pool=self.pool)
+
+
+@dataclass
+class AsyncPOSCore:
+    # The API's way into POSCore. Each use case runs the synchronous core
+    # as one job on the pool of its route class (receipt changes, catalog
+    # reads and writes, reports), so that a burst of one kind of work
+    # cannot take every thread from another. POSCore itself stays
+    # synchronous.
+    core: POSCore
+    pools: Dict[str, Executor]
+    _waiting: _Waiting = field(default_factory=_Waiting)
+
+    @property
+    def catalog_version(self) -> CatalogVersion:
+        return self.core.catalog_version
+
+    def queue_wait(self, pool: str) -> float:
+        # how long the oldest use case still queued for the pool has
+        # waited; 0 once the pool keeps up
+        queued_at = self._waiting.oldest(pool)
+        return 0.0 if queued_at is None else time.perf_counter() - queued_at
+
+    async def _run(self, pool: str, function: Callable[..., T],
+                   *args: Any, **kwargs: Any) -> T:
+        job = _PoolJob(pool, functools.partial(function, *args, **kwargs),
+                       self._waiting)
+        try:
+            result: T = await run_blocking(self.pools[pool], job)
+        except asyncio.CancelledError:
+            job.abandon()
+            raise
+        return result
+
+    # Products
+    async def create_product(self, request: CreateProductRequest
+                            ) -> CreateProductResponse:
+        return await self._run(CATALOG, self.core.create_product, request=request)
+
+    async def import_products(self, rows: Iterable[ProductImportRow],
+                              chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE
+                             ) -> ImportProductsResponse:
+        return await self._run(
+            ANALYTICS, self.core.import_products, rows=rows, chunk_size=chunk_size)
+
+    async def get_all_products(self, after: Optional[str] = None,
+                               limit: int = DEFAULT_PAGE_SIZE
+                              ) -> GetAllProductResponse:
+        return await self._run(
+            CATALOG, self.core.get_all_products, after=after, limit=limit)
+
+    async def get_one_product(self, product_id: str) -> GetOneProductResponse:
+        return await self._run(
+            CATALOG, self.core.get_one_product, product_id=product_id)
+
+    async def get_product_by_barcode(self, barcode: str
+                                    ) -> GetOneProductResponse:
+        return await self._run(
+            CATALOG, self.core.get_product_by_barcode, barcode=barcode)
+
+    async def search_products(self, query: str,
+                              limit: int = DEFAULT_SEARCH_LIMIT
+                             ) -> SearchProductsResponse:
+        return await self._run(
+            CATALOG, self.core.search_products, query=query, limit=limit)
+
+    async def update_product_price(self, product_id: str,
+                                   request: UpdateProductPriceRequest) -> None:
+        await self._run(CATALOG, self.core.update_product_price,
+                        product_id=product_id,
+                        request=request)
+
+    async def update_product_prices(self, request: UpdatePricesRequest
+                                   ) -> UpdatePricesResponse:
+        return await self._run(
+            ANALYTICS, self.core.update_product_prices, request=request)
+
+    # Receipts
+    async def create_receipt(self, request: CreateReceiptRequest
+                            ) -> CreateReceiptResponse:
+        return await self._run(CHECKOUT, self.core.create_receipt, request=request)
+
+    async def add_product_in_receipt(self, receipt_id: str,
+                                     request: AddProductInReceiptRequest
+                                    ) -> AddItemInReceiptResponse:
+        return await self._run(CHECKOUT, self.core.add_product_in_receipt,
+                               receipt_id=receipt_id,
+                               request=request)
+
+    async def scan_product_in_receipt(self, receipt_id: str,
+                                      request: ScanProductInReceiptRequest
+                                     ) -> AddItemInReceiptResponse:
+        return await self._run(CHECKOUT, self.core.scan_product_in_receipt,
+                               receipt_id=receipt_id,
+                               request=request)
+
+    async def add_items_in_receipt(self, receipt_id: str,
+                                   request: AddItemsInReceiptRequest
+                                  ) -> AddItemInReceiptResponse:
+        return await self._run(CHECKOUT, self.core.add_items_in_receipt,
+                               receipt_id=receipt_id,
+                               request=request)
+
+    async def add_combo_in_receipt(self, receipt_id: str,
+                                   request: AddComboInReceiptRequest
+                                  ) -> AddItemInReceiptResponse:
+        return await self._run(CHECKOUT, self.core.add_combo_in_receipt,
+                               receipt_id=receipt_id,
+                               request=request)
+
+    async def add_gift_in_receipt(self, receipt_id: str,
+                                  request: AddGiftInReceiptRequest
+                                 ) -> AddItemInReceiptResponse:
+        return await self._run(CHECKOUT, self.core.add_gift_in_receipt,
+                               receipt_id=receipt_id,
+                               request=request)
+
+    async def delete_item_from_receipt(self, receipt_id: str,
+                                       item_id: str) -> None:
+        await self._run(CHECKOUT, self.core.delete_item_from_receipt,
+                        receipt_id=receipt_id,
+                        item_id=item_id)
+
+    async def get_one_receipt(self, receipt_id: str) -> GetOneReceiptResponse:
+        return await self._run(
+            CHECKOUT, self.core.get_one_receipt, receipt_id=receipt_id)
+
+    async def get_receipts(self, after: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE,
+                           shift_id: Optional[str] = None,
+                           status: Optional[bool] = None
+                          ) -> GetAllReceiptResponse:
+        return await self._run(ANALYTICS, self.core.get_receipts,
+                               after=after,
+                               limit=limit,
+                               shift_id=shift_id,
+                               status=status)
+
+    async def delete_receipt(self, receipt_id: str) -> None:
+        await self._run(CHECKOUT, self.core.delete_receipt, receipt_id=receipt_id)
+
+    async def pay_receipt(self, receipt_id: str, to_currency: str) -> float:
+        return await self.core.pay_receipt(receipt_id=receipt_id,
+                                           to_currency=to_currency)
+
+    async def pay_receipts(self, request: BatchPaymentRequest
+                          ) -> BatchPaymentResponse:
+        return await self.core.pay_receipts(request=request)
+
+    # Shifts
+    async def create_shift(self) -> CreateShiftResponse:
+        return await self._run(CHECKOUT, self.core.create_shift)
+
+    async def get_one_shift(self, shift_id: str) -> GetOneShiftResponse:
+        return await self._run(ANALYTICS, self.core.get_one_shift, shift_id=shift_id)
+
+    async def update_shift_status(self, shift_id: str,
+                                  request: UpdateShiftStateRequest) -> None:
+        await self._run(
+            CHECKOUT, self.core.update_shift_status, shift_id=shift_id, request=request)
+
+    # Campaigns
+    async def get_one_campaign(self, campaign_id: str
+                              ) -> GetOneCampaignResponse:
+        return await self._run(
+            CATALOG, self.core.get_one_campaign, campaign_id=campaign_id)
+
+    async def get_all_campaigns(self, after: Optional[str] = None,
+                                limit: int = DEFAULT_PAGE_SIZE
+                               ) -> GetAllCampaignsResponse:
+        return await self._run(
+            CATALOG, self.core.get_all_campaigns, after=after, limit=limit)
+
+    async def delete_campaigns(self, campaign_id: str) -> None:
+        await self._run(
+            CATALOG, self.core.delete_campaigns, campaign_id=campaign_id)
+
+    async def create_discount_campaign(self, request: CreateDiscountRequest
+                                      ) -> CreateDiscountResponse:
+        return await self._run(
+            CATALOG, self.core.create_discount_campaign, request=request)
+
+    async def create_combo_campaign(self, request: CreateComboRequest
+                                   ) -> CreateComboResponse:
+        return await self._run(
+            CATALOG, self.core.create_combo_campaign, request=request)
+
+    async def create_receipt_discount_campaign(
+            self, request: CreateReceiptDiscountRequest
+    ) -> CreateReceiptDiscountResponse:
+        return await self._run(
+            CATALOG, self.core.create_receipt_discount_campaign, request=request)
+
+    async def create_buy_n_get_n_campaign(self,
+                                          request: CreateBuyNGetNProductRequest
+                                         ) -> CreateBuyNGetNProductResponse:
+        return await self._run(
+            CATALOG, self.core.create_buy_n_get_n_campaign, request=request)
+
+    async def add_product_to_combo(self, campaign_id: str,
+                                   request: AddProductInComboRequest
+                                  ) -> AddProductInComboResponse:
+        return await self._run(CATALOG, self.core.add_product_to_combo,
+                               campaign_id=campaign_id,
+                               request=request)
+
+    async def add_product_to_discount(self, campaign_id: str, product_id: str
+                                     ) -> AddProductInDiscountResponse:
+        return await self._run(CATALOG, self.core.add_product_to_discount,
+                               campaign_id=campaign_id,
+                               product_id=product_id)
+
+    async def delete_product_from_discount(self, campaign_id: str,
+                                           product_id: str) -> None:
+        await self._run(CATALOG, self.core.delete_product_from_discount,
+                        campaign_id=campaign_id,
+                        product_id=product_id)
+
+    # Reports
+    async def get_xreport(self) -> ReportResponse:
+        return await self._run(ANALYTICS, self.core.get_xreport)
+
+    async def get_zreport(self, shift_id: str) -> ReportResponse:
+        return await self._run(ANALYTICS, self.core.get_zreport, shift_id=shift_id)
+
+    # Sync
+    async def get_catalog_changes(self, since: int,
+                                  limit: int = DEFAULT_PAGE_SIZE
+                                 ) -> GetChangesResponse:
+        return await self._run(
+            CATALOG, self.core.get_catalog_changes, since=since, limit=limit)
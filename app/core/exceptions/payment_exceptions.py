@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CircuitOpenErrorMessage(Exception):
+    breaker_name: str
+    message: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.message = f"Circuit {self.breaker_name} is open."
+
+
+
+@dataclass
+class ExchangeRateErrorMessage(Exception):
+    reason: str
+    message: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.message = f"Exchange rate is unavailable: {self.reason}"
+
+
+@dataclass
+class DuplicatePaymentOrderError(Exception):
+    receipt_id: str
+    message: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.message = (f"Receipt with id: {self.receipt_id} is already"
+                        f" paid for earlier in this batch.")
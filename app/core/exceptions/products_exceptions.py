@@ -17,3 +17,12 @@ class GetProductError(Exception):
 
     def __post_init__(self) -> None:
         self.message = f"Product with id: {self.product_id} does not exist."
+
+
+@dataclass
+class GetProductByBarcodeError(Exception):
+    barcode: str
+    message: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.message = f"Product with barcode: {self.barcode} does not exist."
@@ -26,4 +26,14 @@ class ReceiptClosedErrorMessage(Exception):
     message: str = field(init=False)
 
     def __post_init__(self) -> None:
-        self.message = f"Receipt with id: {self.receipt_id} is closed."
\ No newline at end of file
+        self.message = f"Receipt with id: {self.receipt_id} is closed."
+
+
+@dataclass
+class ReceiptConflictError(Exception):
+    receipt_id: str
+    message: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.message = (f"Receipt with id: {self.receipt_id} was changed by"
+                        f" another request.")
@@ -0,0 +1,19 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+async def run_blocking(executor: Optional[Executor],
+                       function: Callable[..., T],
+                       *args: Any, **kwargs: Any) -> T:
+    # keeps blocking (SQLite) work off the event loop; contextvars are
+    # carried over so the worker thread sees the caller's context
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor,
+        functools.partial(context.run, function, *args, **kwargs))
@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
 
 from app.core.factories.repo_factory import RepoFactory
 from app.core.interactors.campaign_interactor import CampaignInteractor
@@ -6,7 +8,20 @@ from app.core.interactors.payment_interactor import PaymentInteractor
 from app.core.interactors.product_interactor import ProductInteractor
 from app.core.interactors.receipt_interactor import ReceiptInteractor
 from app.core.interactors.shift_interactor import ShiftInteractor
-from app.core.models.product import DiscountedProduct
+from app.core.interactors.sync_interactor import SyncInteractor
+from app.core.locks import LockManager
+from app.core.models.page import DEFAULT_PAGE_SIZE
+from app.core.models.payment import PaymentOrder
+from app.core.models.product import (
+    DEFAULT_SEARCH_LIMIT,
+    DiscountedProduct,
+    ProductDecorator,
+)
+from app.core.models.product_import import (
+    DEFAULT_IMPORT_CHUNK_SIZE,
+    ProductImportRow,
+)
+from app.core.models.receipt import ReceiptItemOrder
 from app.core.models.report import XReport, ZReport
 from app.core.schemas.campaign_schema import (
     AddProductInComboRequest,
@@ -23,21 +38,33 @@ from app.core.schemas.campaign_schema import (
     GetAllCampaignsResponse,
     GetOneCampaignResponse,
 )
+from app.core.schemas.payment_schema import (
+    BatchPaymentRequest,
+    BatchPaymentResponse,
+    BatchPaymentResult,
+)
 from app.core.schemas.products_schema import (
     CreateProductRequest,
     CreateProductResponse,
     GetAllProductResponse,
     GetOneProductResponse,
+    ImportProductsResponse,
+    SearchProductsResponse,
+    UpdatePricesRequest,
+    UpdatePricesResponse,
     UpdateProductPriceRequest,
 )
 from app.core.schemas.receipt_schema import (
     AddComboInReceiptRequest,
     AddGiftInReceiptRequest,
     AddItemInReceiptResponse,
+    AddItemsInReceiptRequest,
     AddProductInReceiptRequest,
     CreateReceiptRequest,
     CreateReceiptResponse,
+    GetAllReceiptResponse,
     GetOneReceiptResponse,
+    ScanProductInReceiptRequest,
 )
 from app.core.schemas.report_schema import ReportResponse
 from app.core.schemas.shift_schema import (
@@ -45,14 +72,23 @@ from app.core.schemas.shift_schema import (
     GetOneShiftResponse,
     UpdateShiftStateRequest,
 )
+from app.core.schemas.sync_schema import (
+    CatalogChangeResponse,
+    CatalogSnapshotResponse,
+    GetChangesResponse,
+)
 from app.core.services.campaign_service import CampaignService
+from app.core.services.catalog_version import CatalogVersion
 from app.core.services.payment_service import PaymentService
 from app.core.services.product_service import ProductService
 from app.core.services.receipt_service import ReceiptService
 from app.core.services.shift_service import ShiftService
+from app.core.services.sync_service import SyncService
 from app.core.state.shift_state import OpenShiftState
+from app.core.timing import FACADE, timed_layer
 
 
+@timed_layer(FACADE)
 @dataclass
 class POSCore:
     product_interactor: ProductInteractor
@@ -60,11 +96,24 @@ class POSCore:
     shift_interactor: ShiftInteractor
     campaign_interactor: CampaignInteractor
     payment_interactor: PaymentInteractor
+    sync_interactor: SyncInteractor
+    catalog_version: CatalogVersion = field(default_factory=CatalogVersion)
 
 
     @classmethod
-    def create(cls, database: RepoFactory) -> 'POSCore':
-        product_service = ProductService(database.products())
+    def create(cls, database: RepoFactory,
+               payment_service: Optional[PaymentService] = None,
+               executor: Optional[Executor] = None,
+               sync_service: Optional[SyncService] = None) -> 'POSCore':
+        if sync_service is None:
+            sync_service = SyncService(database.catalog_changes())
+        # read from the change log, and only once a change has committed
+        catalog_version = CatalogVersion(
+            change_repository=sync_service.change_repository,
+            after_commit=database.after_commit)
+        product_service = ProductService(database.products(),
+                                         catalog_version=catalog_version,
+                                         sync_service=sync_service)
         receipt_service = ReceiptService(database.receipts())
         shift_service = ShiftService(database.shifts())
         campaign_service = CampaignService(
@@ -72,25 +121,42 @@ class POSCore:
             receipt_discount_repo=database.receipt_discount_campaign(),
             combo_campaign_repo=database.combo_campaign(),
             buy_get_gift_repo=database.buy_n_get_n_campaign(),
+            catalog_version=catalog_version,
+            sync_service=sync_service,
         )
-        payment_service = PaymentService()
+        if payment_service is None:
+            payment_service = PaymentService(
+                rate_repository=database.exchange_rates())
+        # shared, so a payment and a scan on one receipt exclude each other
+        locks = LockManager()
         return cls(
             product_interactor=ProductInteractor(
                 product_service=product_service,
-                campaign_service=campaign_service),
+                campaign_service=campaign_service,
+                unit_of_work=database.unit_of_work),
             receipt_interactor=ReceiptInteractor(
                 receipt_service=receipt_service,
                 product_service=product_service,
                 shift_service=shift_service,
-                campaign_service=campaign_service),
+                campaign_service=campaign_service,
+                locks=locks),
             shift_interactor=ShiftInteractor(shift_service=shift_service),
             campaign_interactor=CampaignInteractor(
                 campaign_service=campaign_service,
-                product_service=product_service),
+                product_service=product_service,
+                unit_of_work=database.unit_of_work),
             payment_interactor=PaymentInteractor(
                 payment_service=payment_service,
                 receipt_service=receipt_service,
-                shift_service=shift_service),
+                shift_service=shift_service,
+                executor=executor,
+                unit_of_work=database.unit_of_work,
+                locks=locks),
+            sync_interactor=SyncInteractor(
+                sync_service=sync_service,
+                product_service=product_service,
+                campaign_service=campaign_service),
+            catalog_version=catalog_version,
         )
 
 
@@ -104,15 +170,23 @@ class POSCore:
         return CreateProductResponse(product=product)
 
 
-    def get_all_products(self) -> GetAllProductResponse:
-        products = self.product_interactor.execute_get_all()
-        return GetAllProductResponse(products=products)
+    def import_products(self, rows: Iterable[ProductImportRow],
+                        chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE
+                        ) -> ImportProductsResponse:
+        report = self.product_interactor.execute_import(
+            rows=rows, chunk_size=chunk_size)
+        return ImportProductsResponse(created=report.created,
+                                      failed=report.failed)
 
-    def get_one_product(self, product_id: str) -> GetOneProductResponse:
-        product_decorator = self.product_interactor.execute_get_one(
-            product_id=product_id)
-        inner_product = product_decorator.inner_product
-        product = inner_product
+    def get_all_products(self, after: Optional[str] = None,
+                         limit: int = DEFAULT_PAGE_SIZE) -> GetAllProductResponse:
+        page = self.product_interactor.execute_get_page(after=after, limit=limit)
+        return GetAllProductResponse(products=page.items,
+                                     next_cursor=page.next_cursor)
+
+    def _product_response(self, product_decorator: ProductDecorator
+                          ) -> GetOneProductResponse:
+        product = product_decorator.inner_product
 
         response = GetOneProductResponse(
             id=product.id,
@@ -124,11 +198,37 @@ class POSCore:
 
         return response
 
+    def get_one_product(self, product_id: str) -> GetOneProductResponse:
+        product_decorator = self.product_interactor.execute_get_one(
+            product_id=product_id)
+        return self._product_response(product_decorator)
+
+    def get_product_by_barcode(self, barcode: str) -> GetOneProductResponse:
+        product_decorator = self.product_interactor.execute_get_by_barcode(
+            barcode=barcode)
+        return self._product_response(product_decorator)
+
+    def search_products(self, query: str,
+                        limit: int = DEFAULT_SEARCH_LIMIT
+                        ) -> SearchProductsResponse:
+        found = self.product_interactor.execute_search(query=query,
+                                                       limit=limit)
+        return SearchProductsResponse(
+            products=[self._product_response(product) for product in found])
+
     def update_product_price(self, product_id: str,
                     request: UpdateProductPriceRequest) -> None:
         self.product_interactor.execute_update(
             product_id=product_id,
             price=request.price)
+
+    def update_product_prices(self,
+                    request: UpdatePricesRequest) -> UpdatePricesResponse:
+        # a product listed twice gets the last price
+        prices = {item.product_id: item.price for item in request.prices}
+        updated, missing = self.product_interactor.execute_update_prices(
+            prices=prices)
+        return UpdatePricesResponse(updated=updated, missing=missing)
     
     
     
@@ -156,6 +256,34 @@ class POSCore:
             total=receipt.get_price(),
             discounted_total=receipt.get_discounted_price())
 
+    def scan_product_in_receipt(self, receipt_id: str,
+            request: ScanProductInReceiptRequest) -> AddItemInReceiptResponse:
+        receipt = self.receipt_interactor.execute_scan(
+            receipt_id=receipt_id,
+            barcode=request.barcode,
+            quantity=request.quantity)
+        return AddItemInReceiptResponse(
+            id=receipt.id,
+            items=receipt.items,
+            status="open" if receipt.status else "closed",
+            total=receipt.get_price(),
+            discounted_total=receipt.get_discounted_price())
+
+    def add_items_in_receipt(self, receipt_id: str,
+            request: AddItemsInReceiptRequest) -> AddItemInReceiptResponse:
+        receipt = self.receipt_interactor.execute_add_items(
+            receipt_id=receipt_id,
+            orders=[ReceiptItemOrder(item_type=item.type,
+                                     item_id=item.id,
+                                     quantity=item.quantity)
+                    for item in request.items])
+        return AddItemInReceiptResponse(
+            id=receipt.id,
+            items=receipt.items,
+            status="open" if receipt.status else "closed",
+            total=receipt.get_price(),
+            discounted_total=receipt.get_discounted_price())
+
     def add_combo_in_receipt(self, receipt_id: str,
             request: AddComboInReceiptRequest) -> AddItemInReceiptResponse:
         receipt = self.receipt_interactor.execute_addition_combo(
@@ -197,6 +325,22 @@ class POSCore:
             total=receipt.total,
             discounted_total=receipt.discount_total)
 
+    def get_receipts(self, after: Optional[str] = None,
+                     limit: int = DEFAULT_PAGE_SIZE,
+                     shift_id: Optional[str] = None,
+                     status: Optional[bool] = None) -> GetAllReceiptResponse:
+        page = self.receipt_interactor.execute_get_page(
+            after=after, limit=limit, shift_id=shift_id, status=status)
+        return GetAllReceiptResponse(
+            receipts=[GetOneReceiptResponse(
+                id=receipt.id,
+                items=receipt.items,
+                status="open" if receipt.status else "closed",
+                total=receipt.total,
+                discounted_total=receipt.discount_total)
+                for receipt in page.items],
+            next_cursor=page.next_cursor)
+
     def delete_receipt(self, receipt_id: str) -> None:
         self.receipt_interactor.execute_delete(receipt_id=receipt_id)
 
@@ -206,6 +350,19 @@ class POSCore:
             receipt_id=receipt_id, to_currency=to_currency)
         return converted_amount
 
+    async def pay_receipts(self,
+                           request: BatchPaymentRequest) -> BatchPaymentResponse:
+        results = await self.payment_interactor.execute_pay_batch(
+            orders=[PaymentOrder(receipt_id=item.receipt_id,
+                                 currency=item.currency.upper())
+                    for item in request.payments])
+        return BatchPaymentResponse(
+            results=[BatchPaymentResult(receipt_id=result.receipt_id,
+                                        currency=result.currency,
+                                        paid=result.paid,
+                                        amount=result.amount,
+                                        error=result.error)
+                     for result in results])
 
     # Shifts
     def create_shift(self) -> CreateShiftResponse:
@@ -235,9 +392,11 @@ class POSCore:
             campaign_id=campaign_id)
         return GetOneCampaignResponse(campaign=campaign)
 
-    def get_all_campaigns(self) -> GetAllCampaignsResponse:
-        campaigns = self.campaign_interactor.execute_get_all()
-        return GetAllCampaignsResponse(campaigns=campaigns)
+    def get_all_campaigns(self, after: Optional[str] = None,
+                limit: int = DEFAULT_PAGE_SIZE) -> GetAllCampaignsResponse:
+        page = self.campaign_interactor.execute_get_page(after=after, limit=limit)
+        return GetAllCampaignsResponse(campaigns=page.items,
+                                       next_cursor=page.next_cursor)
 
     def delete_campaigns(self, campaign_id: str) -> None:
         return self.campaign_interactor.execute_delete(
@@ -322,3 +481,24 @@ class POSCore:
 
 
 
+
+    # Sync
+    def get_catalog_changes(self, since: int,
+                            limit: int = DEFAULT_PAGE_SIZE) -> GetChangesResponse:
+        sync = self.sync_interactor.execute_get_changes(since=since,
+                                                        limit=limit)
+        snapshot = None
+        if sync.snapshot:
+            snapshot = CatalogSnapshotResponse(products=sync.products,
+                                               campaigns=sync.campaigns)
+        return GetChangesResponse(
+            next_since=sync.next_since,
+            has_more=sync.has_more,
+            changes=[CatalogChangeResponse(seq=delta.change.seq,
+                                           entity=delta.change.entity,
+                                           id=delta.change.entity_id,
+                                           op=delta.change.op,
+                                           product=delta.product,
+                                           campaign=delta.campaign)
+                     for delta in sync.deltas],
+            snapshot=snapshot)
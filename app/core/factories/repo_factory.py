@@ -1,4 +1,4 @@
-from typing import Protocol
+from typing import Callable, ContextManager, Protocol
 
 from app.core.repositories.campaign_repository import (
     IBuyNGetNCampaignRepository,
@@ -6,12 +6,30 @@ from app.core.repositories.campaign_repository import (
     IProductDiscountCampaignRepository,
     IReceiptDiscountCampaignRepository,
 )
+from app.core.repositories.catalog_change_repository import (
+    ICatalogChangeRepository,
+)
+from app.core.repositories.exchange_rate_repository import (
+    IExchangeRateRepository,
+)
 from app.core.repositories.product_repository import IProductRepository
 from app.core.repositories.receipt_repesitory import IReceiptRepository
 from app.core.repositories.shift_repository import IShiftRepository
 
+# opens one transaction around a use case: the writes of every repository
+# inside it commit together at the outermost exit, or none of them do
+UnitOfWork = Callable[[], ContextManager[None]]
+
 
 class RepoFactory(Protocol):
+    def unit_of_work(self) -> ContextManager[None]:
+        pass
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        # callback runs once the open unit of work commits (at once
+        # outside one), and never for one that rolls back
+        pass
+
     def products(self) -> IProductRepository:
         pass
 
@@ -31,4 +49,10 @@ class RepoFactory(Protocol):
         pass
 
     def buy_n_get_n_campaign(self) -> IBuyNGetNCampaignRepository:
-        pass
\ No newline at end of file
+        pass
+
+    def exchange_rates(self) -> IExchangeRateRepository:
+        pass
+
+    def catalog_changes(self) -> ICatalogChangeRepository:
+        pass
@@ -1,6 +1,8 @@
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
+from app.core.factories.repo_factory import UnitOfWork
 from app.core.models import NO_ID
 from app.core.models.campaign import (
     BuyNGetNCampaign,
@@ -10,16 +12,20 @@ from app.core.models.campaign import (
     DiscountCampaign,
     ReceiptCampaign,
 )
+from app.core.models.page import Page
 from app.core.models.product import NumProduct
 from app.core.models.receipt import ProductForReceipt
 from app.core.services.campaign_service import CampaignService
 from app.core.services.product_service import ProductService
+from app.core.timing import INTERACTOR, timed_layer
 
 
+@timed_layer(INTERACTOR)
 @dataclass
 class CampaignInteractor:
     campaign_service: CampaignService
     product_service: ProductService
+    unit_of_work: UnitOfWork = nullcontext
 
     def execute_get_one(self, campaign_id: str) -> Campaign:
         return self.campaign_service.get_one_campaign(campaign_id=campaign_id)
@@ -27,8 +33,13 @@ class CampaignInteractor:
     def execute_get_all(self) -> List[Campaign]:
         return self.campaign_service.get_all_campaigns()
 
+    def execute_get_page(self, after: Optional[str],
+                         limit: int) -> Page[Campaign]:
+        return self.campaign_service.get_campaigns_page(after=after, limit=limit)
+
     def execute_delete(self, campaign_id: str) -> None:
-        self.campaign_service.delete_campaign(campaign_id=campaign_id)
+        with self.unit_of_work():
+            self.campaign_service.delete_campaign(campaign_id=campaign_id)
 
     def execute_create_discount(self, discount: int) -> DiscountCampaign:
         discount_campaign = DiscountCampaign(
@@ -36,8 +47,9 @@ class CampaignInteractor:
             campaign_type=CampaignType.DISCOUNT,
             discount=discount,
             products=[])
-        return self.campaign_service.create_discount(
-            discount_campaign=discount_campaign)
+        with self.unit_of_work():
+            return self.campaign_service.create_discount(
+                discount_campaign=discount_campaign)
 
     def execute_create_combo(self, discount: float) -> ComboCampaign:
         combo_campaign = ComboCampaign(
@@ -45,8 +57,9 @@ class CampaignInteractor:
             campaign_type=CampaignType.COMBO,
             discount=discount,
             products=[])
-        return self.campaign_service.create_combo(
-            combo_campaign=combo_campaign)
+        with self.unit_of_work():
+            return self.campaign_service.create_combo(
+                combo_campaign=combo_campaign)
 
     def execute_create_receipt_discount(self,
                                         discount: int,
@@ -56,8 +69,9 @@ class CampaignInteractor:
             campaign_type=CampaignType.RECEIPT_DISCOUNT,
             total=amount,
             discount=discount)
-        return self.campaign_service.create_receipt_discount(
-            receipt_campaign=receipt_campaign)
+        with self.unit_of_work():
+            return self.campaign_service.create_receipt_discount(
+                receipt_campaign=receipt_campaign)
 
     def execute_create_buy_n_get_n(self,
                 buy_product: NumProduct,
@@ -82,37 +96,41 @@ class CampaignInteractor:
             campaign_type=CampaignType.BUY_N_GET_N,
             buy_product=curr_buy_product,
             gift_product=curr_gift_product)
-        return self.campaign_service.create_buy_n_get_n(
-            buy_n_get_n_campaign=buy_n_get_n_campaign)
+        with self.unit_of_work():
+            return self.campaign_service.create_buy_n_get_n(
+                buy_n_get_n_campaign=buy_n_get_n_campaign)
 
     def execute_adding_in_combo(self,
                                 campaign_id: str,
                                 product_id: str,
                                 quantity: int) -> ComboCampaign:
-        campaign = self.campaign_service.get_one_campaign(
-            campaign_id=campaign_id)
-        product = self.product_service.get_one_product(
-            product_id=product_id)
-        return self.campaign_service.add_product_in_combo(
-            product=product,
-            quantity=quantity,
-            campaign_id=campaign.id)
+        with self.unit_of_work():
+            campaign = self.campaign_service.get_one_campaign(
+                campaign_id=campaign_id)
+            product = self.product_service.get_one_product(
+                product_id=product_id)
+            return self.campaign_service.add_product_in_combo(
+                product=product,
+                quantity=quantity,
+                campaign_id=campaign.id)
 
     def execute_adding_in_discount(self,
                                    campaign_id: str,
                                    product_id: str) -> DiscountCampaign:
-        campaign = self.campaign_service.get_one_campaign(
-            campaign_id=campaign_id)
-        return self.campaign_service.add_product_in_discount(
-            product_id=product_id,
-            campaign_id=campaign.id)
+        with self.unit_of_work():
+            campaign = self.campaign_service.get_one_campaign(
+                campaign_id=campaign_id)
+            return self.campaign_service.add_product_in_discount(
+                product_id=product_id,
+                campaign_id=campaign.id)
 
     def execute_delete_from_discount(self,
                                      campaign_id: str,
                                      product_id: str) -> None:
-        campaign = self.campaign_service.get_one_campaign(
-            campaign_id=campaign_id)
-        self.campaign_service.execute_delete_from_discount(
-            campaign_id=campaign.id,
-            product_id=product_id)
+        with self.unit_of_work():
+            campaign = self.campaign_service.get_one_campaign(
+                campaign_id=campaign_id)
+            self.campaign_service.execute_delete_from_discount(
+                campaign_id=campaign.id,
+                product_id=product_id)
 
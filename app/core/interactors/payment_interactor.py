@@ -1,36 +1,221 @@
-from dataclasses import dataclass
+import asyncio
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Union
 
+from app.core.exceptions.payment_exceptions import (
+    DuplicatePaymentOrderError,
+    ExchangeRateErrorMessage,
+)
+from app.core.exceptions.receipt_exceptions import (
+    GetReceiptErrorMessage,
+    ReceiptClosedErrorMessage,
+    ReceiptConflictError,
+)
+from app.core.exceptions.shift_exceptions import (
+    GetShiftErrorMessage,
+    ShiftClosedErrorMessage,
+)
+from app.core.executors import run_blocking
+from app.core.factories.repo_factory import UnitOfWork
+from app.core.locks import LockManager
+from app.core.models.payment import PaymentOrder, PaymentResult
+from app.core.models.receipt import Receipt
+from app.core.models.shift import Shift
 from app.core.services.payment_service import PaymentService
 from app.core.services.receipt_service import ReceiptService
 from app.core.services.shift_service import ShiftService
+from app.core.state.shift_state import ClosedShiftState
+from app.core.timing import INTERACTOR, timed_layer
 
+BASE_CURRENCY = "GEL"
 
+
+@timed_layer(INTERACTOR)
 @dataclass
 class PaymentInteractor:
     payment_service: PaymentService
     receipt_service: ReceiptService
     shift_service: ShiftService
+    executor: Optional[Executor] = None
+    unit_of_work: UnitOfWork = nullcontext
+    # a payment is never retried: the receipt stays locked from reading
+    # the amount to closing it, and the shift while the receipt is added
+    locks: LockManager = field(default_factory=LockManager)
 
     async def execute_pay(self,
                           receipt_id: str,
                           to_currency: str) -> float:
-        receipt = self.receipt_service.get_one_receipt(
-            receipt_id=receipt_id)
-        amount = receipt.get_price()
-        if receipt.get_discounted_price() is not None:
-            amount = receipt.get_discounted_price()
-
-        if to_currency == "GEL":
-            converted_amount = amount
-        else:
-            converted_amount = await self.payment_service.pay(
-                from_currency="GEL",
-                to_currency= to_currency,
-                amount=amount)
-        self.receipt_service.update_status(receipt=receipt, status=False)
-        shift = self.shift_service.get_one_shift(shift_id=receipt.shift_id)
-        self.shift_service.add_receipt(receipt=receipt, shift=shift)
+        async with self.locks.hold_async(receipt_ids=[receipt_id]):
+            receipt = await run_blocking(self.executor,
+                                         self.receipt_service.get_one_receipt,
+                                         receipt_id=receipt_id)
+            amount = receipt.get_price()
+            if receipt.get_discounted_price() is not None:
+                amount = receipt.get_discounted_price()
+
+            if to_currency == "GEL":
+                converted_amount = amount
+            else:
+                converted_amount = await self.payment_service.pay(
+                    from_currency="GEL",
+                    to_currency= to_currency,
+                    amount=amount)
+            await run_blocking(self.executor, self._close_receipt, receipt)
         return converted_amount
 
+    async def execute_pay_batch(self,
+                                orders: List[PaymentOrder]) -> List[PaymentResult]:
+        async with self.locks.hold_async(
+                receipt_ids=[order.receipt_id for order in orders]):
+            return await self._pay_batch(orders)
+
+    async def _pay_batch(self,
+                         orders: List[PaymentOrder]) -> List[PaymentResult]:
+        results: Dict[int, PaymentResult] = {}
+        receipts = await run_blocking(
+            self.executor, self._load_batch, orders, results)
+        rates = await self._resolve_rates(
+            {orders[index].currency for index in receipts})
+
+        payable: Dict[str, int] = {}
+        for index, receipt in receipts.items():
+            order = orders[index]
+            rate = rates[order.currency]
+            if isinstance(rate, str):
+                results[index] = PaymentResult(receipt_id=order.receipt_id,
+                                               currency=order.currency,
+                                               paid=False, error=rate)
+                continue
+
+            payable[receipt.id] = index
+            results[index] = PaymentResult(
+                receipt_id=order.receipt_id,
+                currency=order.currency,
+                paid=True,
+                amount=round(self._amount(receipt) * rate, 2))
+
+        while payable:
+            try:
+                await run_blocking(
+                    self.executor, self._settle_batch,
+                    [receipts[index] for index in payable.values()])
+                break
+            except ReceiptConflictError as exc:
+                # changed elsewhere since its amount was worked out; the
+                # rest are settled without it
+                index = payable.pop(exc.receipt_id)
+                results[index] = PaymentResult(
+                    receipt_id=exc.receipt_id,
+                    currency=orders[index].currency,
+                    paid=False, error=exc.message)
+            except (GetShiftErrorMessage, ShiftClosedErrorMessage) as exc:
+                # the shift went away while the rates were looked up; its
+                # receipts stay open, the rest are settled without them
+                for receipt_id, index in list(payable.items()):
+                    if receipts[index].shift_id == exc.shift_id:
+                        del payable[receipt_id]
+                        results[index] = PaymentResult(
+                            receipt_id=receipt_id,
+                            currency=orders[index].currency,
+                            paid=False, error=exc.message)
+        return [results[index] for index in range(len(orders))]
+
+    def _close_receipt(self, receipt: Receipt) -> None:
+        # lines still queued for a write go in on their own first, so a
+        # payment that fails cannot roll them back
+        self.receipt_service.flush_receipts(receipts=[receipt])
+        with self.locks.hold(shift_ids=[receipt.shift_id]), \
+                self.unit_of_work():
+            self.receipt_service.update_status(receipt=receipt, status=False)
+            shift = self.shift_service.get_one_shift(shift_id=receipt.shift_id)
+            self.shift_service.add_receipt(receipt=receipt, shift=shift)
+
+    def _amount(self, receipt: Receipt) -> float:
+        discounted = receipt.get_discounted_price()
+        return discounted if discounted is not None else receipt.get_price()
+
+    def _load_batch(self, orders: List[PaymentOrder],
+                    results: Dict[int, PaymentResult]
+                    ) -> Dict[int, Receipt]:
+        receipts: Dict[int, Receipt] = {}
+        shifts: Dict[str, Shift] = {}
+        seen: Set[str] = set()
+        for index, order in enumerate(orders):
+            try:
+                if order.receipt_id in seen:
+                    raise DuplicatePaymentOrderError(
+                        receipt_id=order.receipt_id)
+                seen.add(order.receipt_id)
+
+                receipt = self.receipt_service.get_one_receipt(
+                    receipt_id=order.receipt_id)
+                if not receipt.status:
+                    raise ReceiptClosedErrorMessage(receipt_id=receipt.id)
+
+                if receipt.shift_id not in shifts:
+                    shifts[receipt.shift_id] = self.shift_service.get_one_shift(
+                        shift_id=receipt.shift_id)
+                if isinstance(shifts[receipt.shift_id].state, ClosedShiftState):
+                    raise ShiftClosedErrorMessage(shift_id=receipt.shift_id)
+            except (DuplicatePaymentOrderError,
+                    GetReceiptErrorMessage,
+                    ReceiptClosedErrorMessage,
+                    GetShiftErrorMessage,
+                    ShiftClosedErrorMessage) as exc:
+                results[index] = PaymentResult(receipt_id=order.receipt_id,
+                                               currency=order.currency,
+                                               paid=False, error=exc.message)
+                continue
+
+            receipts[index] = receipt
+
+        return receipts
+
+    async def _resolve_rates(self,
+                currencies: Set[str]) -> Dict[str, Union[float, str]]:
+        # one lookup per currency pair, however many receipts use it
+        to_resolve = sorted(currencies - {BASE_CURRENCY})
+        resolved = await asyncio.gather(
+            *(self.payment_service.get_rate(from_currency=BASE_CURRENCY,
+                                            to_currency=currency)
+              for currency in to_resolve),
+            return_exceptions=True)
+
+        rates: Dict[str, Union[float, str]] = {BASE_CURRENCY: 1.0}
+        for currency, rate in zip(to_resolve, resolved):
+            if isinstance(rate, ExchangeRateErrorMessage):
+                rates[currency] = rate.message
+            elif isinstance(rate, BaseException):
+                raise rate
+            else:
+                rates[currency] = rate
+        return rates
+
+    def _settle_batch(self, receipts: List[Receipt]) -> None:
+        self.receipt_service.flush_receipts(receipts=receipts)
+        by_shift: Dict[str, List[Receipt]] = {}
+        for receipt in receipts:
+            by_shift.setdefault(receipt.shift_id, []).append(receipt)
+        with self.locks.hold(shift_ids=list(by_shift)), self.unit_of_work():
+            # read again under the lock: the shifts loaded with the batch
+            # may have been closed while the rates were looked up
+            shifts: Dict[str, Shift] = {}
+            for shift_id in by_shift:
+                shifts[shift_id] = self.shift_service.get_one_shift(
+                    shift_id=shift_id)
+                if isinstance(shifts[shift_id].state, ClosedShiftState):
+                    raise ShiftClosedErrorMessage(shift_id=shift_id)
 
+            try:
+                self.receipt_service.close_receipts(receipts=receipts)
+            except ReceiptConflictError:
+                # nothing was closed; all of them were open when loaded
+                for receipt in receipts:
+                    receipt.status = True
+                raise
 
+            for shift_id, shift_receipts in by_shift.items():
+                self.shift_service.add_receipts(shift=shifts[shift_id],
+                                                receipts=shift_receipts)
@@ -1,16 +1,41 @@
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import List
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+from app.core.factories.repo_factory import UnitOfWork
 from app.core.models import NO_ID
-from app.core.models.product import Product, ProductDecorator
+from app.core.models.page import Page
+from app.core.models.product import (
+    DiscountedProduct,
+    Product,
+    ProductDecorator,
+    ProductPrice,
+    discounted_price,
+)
+from app.core.models.product_import import (
+    DEFAULT_IMPORT_CHUNK_SIZE,
+    ProductImportReport,
+    ProductImportRow,
+)
 from app.core.services.campaign_service import CampaignService
 from app.core.services.product_service import ProductService
+from app.core.timing import INTERACTOR, timed_layer
 
 
+def _chunks(rows: Iterable[ProductImportRow],
+            size: int) -> Iterator[List[ProductImportRow]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@timed_layer(INTERACTOR)
 @dataclass
 class ProductInteractor:
     product_service: ProductService
     campaign_service: CampaignService
+    unit_of_work: UnitOfWork = nullcontext
 
     def execute_create(self, name: str,
                        barcode: str,
@@ -20,15 +45,49 @@ class ProductInteractor:
             name=name,
             barcode=barcode,
             price=price)
-        return self.product_service.create_product(product=product)
+        with self.unit_of_work():
+            return self.product_service.create_product(product=product)
+
+    def execute_import(self, rows: Iterable[ProductImportRow],
+                       chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE
+                       ) -> ProductImportReport:
+        # rows are consumed a chunk at a time, so a large file is never
+        # held in memory; every chunk is one transaction
+        report = ProductImportReport()
+        for chunk in _chunks(rows, chunk_size):
+            with self.unit_of_work():
+                report.merge(self.product_service.create_products(rows=chunk))
+        return report
 
     def execute_update(self,
                        product_id: str,
                        price: float) -> None:
-        product = self.product_service.get_one_product(
-            product_id=product_id)
-        self.product_service.update_product(
-            product=product, price=price)
+        with self.unit_of_work():
+            product = self.product_service.get_one_product(
+                product_id=product_id)
+            self.product_service.update_product(
+                product=product, price=price)
+
+    def execute_update_prices(self, prices: Dict[str, float]
+                              ) -> Tuple[List[ProductPrice], List[str]]:
+        with self.unit_of_work():
+            updated = self.product_service.update_prices(prices=prices)
+        # one discount lookup for the whole batch, then a single pass
+        # over it, instead of walking the campaign chain per product
+        discounts = self.campaign_service.get_discounts(product_ids=updated)
+        result = []
+        for product_id in updated:
+            price = prices[product_id]
+            discount = discounts.get(product_id)
+            result.append(ProductPrice(
+                product_id=product_id, price=price,
+                discounted_price=None if discount is None
+                else discounted_price(price, discount)))
+
+        found = set(updated)
+        missing = [product_id for product_id in prices
+                   if product_id not in found]
+        return result, missing
 
     def execute_get_one(self, product_id: str) -> ProductDecorator:
         product = self.product_service.get_one_product(
@@ -37,5 +96,25 @@ class ProductInteractor:
             product=product)
         return product_decorator
 
+    def execute_get_by_barcode(self, barcode: str) -> ProductDecorator:
+        product = self.product_service.get_product_by_barcode(barcode=barcode)
+        return self.campaign_service.get_campaign_product(product=product)
+
+    def execute_search(self, query: str,
+                       limit: int) -> List[ProductDecorator]:
+        products = self.product_service.search_products(query=query,
+                                                        limit=limit)
+        discounts = self.campaign_service.get_discounts(
+            product_ids=[product.id for product in products])
+        return [ProductDecorator(inner_product=product)
+                if product.id not in discounts
+                else DiscountedProduct(inner_product=product,
+                                       discount=discounts[product.id])
+                for product in products]
+
     def execute_get_all(self) -> List[Product]:
-        return self.product_service.get_all_products()
\ No newline at end of file
+        return self.product_service.get_all_products()
+
+    def execute_get_page(self, after: Optional[str],
+                         limit: int) -> Page[Product]:
+        return self.product_service.get_products_page(after=after, limit=limit)
\ No newline at end of file
@@ -1,24 +1,62 @@
-from dataclasses import dataclass
-from typing import cast
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, cast
 
+from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
+from app.core.exceptions.receipt_exceptions import (
+    ReceiptClosedErrorMessage,
+    ReceiptConflictError,
+)
 from app.core.exceptions.shift_exceptions import ShiftClosedErrorMessage
+from app.core.locks import LockManager
+from app.core.metrics import REGISTRY
 from app.core.models import NO_ID
-from app.core.models.campaign import BuyNGetNCampaign, ComboCampaign
-from app.core.models.product import DiscountedProduct
-from app.core.models.receipt import Receipt
+from app.core.models.campaign import BuyNGetNCampaign, Campaign, ComboCampaign
+from app.core.models.page import Page
+from app.core.models.product import DiscountedProduct, Product
+from app.core.models.receipt import Receipt, ReceiptItemOrder, ReceiptItemType
 from app.core.services.campaign_service import CampaignService
 from app.core.services.product_service import ProductService
-from app.core.services.receipt_service import ReceiptService
+from app.core.services.receipt_service import ReceiptService, ReceiptSource
 from app.core.services.shift_service import ShiftService
 from app.core.state.shift_state import ClosedShiftState
+from app.core.timing import INTERACTOR, timed_layer
 
+T = TypeVar("T")
 
+RECEIPT_CONFLICTS = REGISTRY.counter(
+    "receipt_conflicts_total",
+    "Receipt changes that lost a race with another change, by outcome.")
+
+
+@timed_layer(INTERACTOR)
 @dataclass
 class ReceiptInteractor:
     receipt_service: ReceiptService
     product_service: ProductService
     shift_service: ShiftService
     campaign_service: CampaignService
+    # changes to one receipt run one at a time in this process
+    locks: LockManager = field(default_factory=LockManager)
+    # tries of a receipt change before a conflict reaches the caller
+    max_attempts: int = 3
+
+    def _retrying(self, receipt: Receipt,
+                  change: Callable[[Receipt], T]) -> T:
+        # optimistic concurrency: a change built on a receipt someone
+        # else has written since is rejected by the repository, so it is
+        # applied again on a fresh read instead of overwriting theirs
+        attempt = 1
+        while True:
+            try:
+                return change(receipt)
+            except ReceiptConflictError:
+                if attempt >= self.max_attempts:
+                    RECEIPT_CONFLICTS.inc(outcome="failed")
+                    raise
+                RECEIPT_CONFLICTS.inc(outcome="retried")
+                attempt += 1
+                receipt = self.receipt_service.get_one_receipt(
+                    receipt_id=receipt.id)
 
     def execute_create(self, shift_id: str) -> Receipt:
         receipt = Receipt(id=NO_ID, shift_id=shift_id, items=[], total=0.0)
@@ -32,42 +70,125 @@ class ReceiptInteractor:
         receipt = self.receipt_service.get_one_receipt(receipt_id=receipt_id)
         return self.campaign_service.get_campaign_receipt(receipt=receipt)
 
+    def execute_get_page(self, after: Optional[str], limit: int,
+                         shift_id: Optional[str] = None,
+                         status: Optional[bool] = None) -> Page[Receipt]:
+        page = self.receipt_service.get_receipts_page(
+            after=after, limit=limit, shift_id=shift_id, status=status)
+        page.items = [self.campaign_service.get_campaign_receipt(receipt=receipt)
+                      for receipt in page.items]
+        return page
+
     def execute_delete(self, receipt_id: str) -> None:
-        receipt = self.receipt_service.get_one_receipt(receipt_id=receipt_id)
-        self.receipt_service.delete_receipt(receipt=receipt)
+        with self.locks.hold(receipt_ids=[receipt_id]):
+            receipt = self.receipt_service.get_one_receipt(
+                receipt_id=receipt_id)
+            self.receipt_service.delete_receipt(receipt=receipt)
 
     def execute_addition_product(self, receipt_id: str,
                                  product_id: str,
                                  quantity: int) -> Receipt:
         product = self.product_service.get_one_product(
             product_id=product_id)
+        return self._add_product(receipt_id=receipt_id,
+                                 product=product,
+                                 quantity=quantity)
+
+    def execute_scan(self, receipt_id: str,
+                     barcode: str,
+                     quantity: int) -> Receipt:
+        product = self.product_service.get_product_by_barcode(
+            barcode=barcode)
+        return self._add_product(receipt_id=receipt_id,
+                                 product=product,
+                                 quantity=quantity)
+
+    def _add_product(self, receipt_id: str,
+                     product: Product,
+                     quantity: int) -> Receipt:
         product_decorator = self.campaign_service.get_campaign_product(
             product=product)
-        receipt = self.receipt_service.get_one_receipt(
-            receipt_id=receipt_id)
         inner_product = product_decorator.inner_product
         product = inner_product
 
         if isinstance(product_decorator, DiscountedProduct):
             product.discount = product_decorator.get_price()
 
-        receipt = self.receipt_service.add_product(
-            receipt=receipt,
-            product=product,
-            quantity=quantity)
+        with self.locks.hold(receipt_ids=[receipt_id]):
+            receipt = self.receipt_service.get_one_receipt(
+                receipt_id=receipt_id)
+            receipt = self._retrying(
+                receipt, lambda current: self.receipt_service.add_product(
+                    receipt=current,
+                    product=product,
+                    quantity=quantity))
         return self.campaign_service.get_campaign_receipt(receipt=receipt)
 
+    def execute_add_items(self, receipt_id: str,
+                          orders: List[ReceiptItemOrder]) -> Receipt:
+        with self.locks.hold(receipt_ids=[receipt_id]):
+            receipt = self._add_items(receipt_id=receipt_id, orders=orders)
+        return self.campaign_service.get_campaign_receipt(receipt=receipt)
+
+    def _add_items(self, receipt_id: str,
+                   orders: List[ReceiptItemOrder]) -> Receipt:
+        receipt = self.receipt_service.get_one_receipt(receipt_id=receipt_id)
+        if not receipt.status:
+            raise ReceiptClosedErrorMessage(receipt_id=receipt.id)
+
+        products: Dict[str, Product] = {}
+        campaigns: Dict[str, Campaign] = {}
+        for order in orders:
+            if order.item_type == ReceiptItemType.PRODUCT:
+                if order.item_id not in products:
+                    products[order.item_id] = \
+                        self.product_service.get_one_product(
+                            product_id=order.item_id)
+                continue
+
+            if order.item_id not in campaigns:
+                campaigns[order.item_id] = \
+                    self.campaign_service.get_one_campaign(
+                        campaign_id=order.item_id)
+            expected = (ComboCampaign
+                        if order.item_type == ReceiptItemType.COMBO
+                        else BuyNGetNCampaign)
+            if not isinstance(campaigns[order.item_id], expected):
+                raise GetCampaignErrorMessage(campaign_id=order.item_id)
+
+        decorators = self.campaign_service.get_campaign_products(
+            products=list(products.values()))
+        for product_id, product_decorator in decorators.items():
+            if isinstance(product_decorator, DiscountedProduct):
+                products[product_id].discount = product_decorator.get_price()
+
+        items: List[Tuple[ReceiptSource, int]] = []
+        for order in orders:
+            source: ReceiptSource = (
+                products[order.item_id]
+                if order.item_type == ReceiptItemType.PRODUCT
+                else cast(ReceiptSource, campaigns[order.item_id]))
+            items.append((source, order.quantity))
+
+        return self._retrying(
+            receipt, lambda current: self.receipt_service.add_items(
+                receipt=current, items=items))
+
     def execute_addition_combo(self,
                                receipt_id: str,
                                combo_id: str,
                                quantity: int) -> Receipt:
         combo = cast(ComboCampaign, self.campaign_service.get_one_campaign(
             campaign_id=combo_id))
-        receipt = self.receipt_service.get_one_receipt(receipt_id=receipt_id)
-        receipt = self.receipt_service.add_combo_product(
-            receipt=receipt,
-            combo=combo,
-            quantity=quantity)
+        with self.locks.hold(receipt_ids=[receipt_id]):
+            receipt = self.receipt_service.get_one_receipt(
+                receipt_id=receipt_id)
+            receipt = self._retrying(
+                receipt,
+                lambda current: self.receipt_service.add_combo_product(
+                    receipt=current,
+                    combo=combo,
+                    quantity=quantity))
         return self.campaign_service.get_campaign_receipt(receipt=receipt)
 
     def execute_addition_gift(self,
@@ -76,14 +197,22 @@ class ReceiptInteractor:
                               quantity: int) -> Receipt:
         gift = cast(BuyNGetNCampaign, self.campaign_service.get_one_campaign(
             campaign_id=gift_id))
-        receipt = self.receipt_service.get_one_receipt(receipt_id=receipt_id)
-        receipt = self.receipt_service.add_gift_product(
-            receipt=receipt,
-            gift=gift,
-            quantity=quantity)
+        with self.locks.hold(receipt_ids=[receipt_id]):
+            receipt = self.receipt_service.get_one_receipt(
+                receipt_id=receipt_id)
+            receipt = self._retrying(
+                receipt,
+                lambda current: self.receipt_service.add_gift_product(
+                    receipt=current,
+                    gift=gift,
+                    quantity=quantity))
         return self.campaign_service.get_campaign_receipt(receipt=receipt)
 
     def execute_delete_item(self, receipt_id: str, item_id: str) -> None:
-        receipt = self.receipt_service.get_one_receipt(receipt_id=receipt_id)
-        self.receipt_service.delete_item(receipt=receipt, item_id=item_id)
+        with self.locks.hold(receipt_ids=[receipt_id]):
+            receipt = self.receipt_service.get_one_receipt(
+                receipt_id=receipt_id)
+            self._retrying(
+                receipt, lambda current: self.receipt_service.delete_item(
+                    receipt=current, item_id=item_id))
 
@@ -3,8 +3,10 @@ from dataclasses import dataclass
 from app.core.models import NO_ID
 from app.core.models.shift import Shift
 from app.core.services.shift_service import ShiftService
+from app.core.timing import INTERACTOR, timed_layer
 
 
+@timed_layer(INTERACTOR)
 @dataclass
 class ShiftInteractor:
     shift_service: ShiftService
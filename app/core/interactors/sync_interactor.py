@@ -0,0 +1,74 @@
+from dataclasses import dataclass, replace
+from typing import Dict, Tuple
+
+from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
+from app.core.exceptions.products_exceptions import GetProductError
+from app.core.models.catalog_change import (
+    CatalogChange,
+    CatalogDelta,
+    CatalogSync,
+    ChangeEntity,
+    ChangeOp,
+)
+from app.core.services.campaign_service import CampaignService
+from app.core.services.product_service import ProductService
+from app.core.services.sync_service import SyncService
+from app.core.timing import INTERACTOR, timed_layer
+
+
+@timed_layer(INTERACTOR)
+@dataclass
+class SyncInteractor:
+    sync_service: SyncService
+    product_service: ProductService
+    campaign_service: CampaignService
+
+    def execute_get_changes(self, since: int, limit: int) -> CatalogSync:
+        if self.sync_service.needs_snapshot(since=since):
+            return self._snapshot()
+
+        changes, has_more = self.sync_service.get_changes(since=since,
+                                                          limit=limit)
+        if not changes:
+            return CatalogSync(next_since=since)
+
+        # a terminal only needs the current state of every entity it is
+        # told about, so repeated changes collapse into the newest one
+        latest: Dict[Tuple[ChangeEntity, str], CatalogChange] = {}
+        for change in changes:
+            latest[(change.entity, change.entity_id)] = change
+        deltas = [self._delta(change)
+                  for change in sorted(latest.values(),
+                                       key=lambda change: change.seq)]
+        return CatalogSync(next_since=changes[-1].seq,
+                           deltas=deltas,
+                           has_more=has_more)
+
+    def _snapshot(self) -> CatalogSync:
+        # read the position before the catalog: anything written while
+        # the snapshot is taken is replayed on the next call
+        next_since = self.sync_service.latest_seq()
+        return CatalogSync(
+            next_since=next_since,
+            snapshot=True,
+            products=self.product_service.get_all_products(),
+            campaigns=self.campaign_service.get_all_campaigns())
+
+    def _delta(self, change: CatalogChange) -> CatalogDelta:
+        if change.op == ChangeOp.DELETE:
+            return CatalogDelta(change=change)
+
+        # the payload is the current state, which may be newer than the
+        # change itself; a campaign deleted since is reported as deleted
+        try:
+            if change.entity == ChangeEntity.PRODUCT:
+                return CatalogDelta(
+                    change=change,
+                    product=self.product_service.get_one_product(
+                        product_id=change.entity_id))
+            return CatalogDelta(
+                change=change,
+                campaign=self.campaign_service.get_one_campaign(
+                    campaign_id=change.entity_id))
+        except (GetProductError, GetCampaignErrorMessage):
+            return CatalogDelta(change=replace(change, op=ChangeOp.DELETE))
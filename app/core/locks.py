@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    AsyncIterator,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+)
+
+from app.core.metrics import REGISTRY
+
+LOCK_WAIT_SECONDS = REGISTRY.counter(
+    "lock_wait_seconds_total",
+    "Time spent waiting for receipt and shift locks, by scope.")
+LOCK_ACQUISITIONS = REGISTRY.counter(
+    "lock_acquisitions_total",
+    "Receipt and shift locks taken, by scope.")
+LOCK_CONTENDED = REGISTRY.counter(
+    "lock_contended_total",
+    "Receipt and shift locks that were held by someone else when asked for,"
+    " by scope.")
+
+RECEIPT = "receipt"
+SHIFT = "shift"
+
+# a thread blocks on an event; a coroutine awaits a future of its loop
+_Waiter = Union[threading.Event,
+                Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]]
+
+
+class _KeyLock:
+    # Not a threading.Lock: a coroutine waiting for one must not park a
+    # worker thread, since the holder may need that very pool to finish.
+    # A release hands the lock straight to the first waiter, thread or
+    # coroutine, so it is never free while someone is queued for it.
+    __slots__ = ("scope", "held", "waiters", "__weakref__")
+
+    def __init__(self, scope: str) -> None:
+        self.scope = scope
+        self.held = False
+        self.waiters: Deque[_Waiter] = deque()
+
+
+@dataclass
+class LockManager:
+    # Pessimistic locks for the changes that must not be retried, one per
+    # receipt and shift id. A lock only lives while someone holds or waits
+    # for it (the table keeps weak references), so ids that are not being
+    # changed cost nothing and unrelated ones never contend. Locks are
+    # per process; other workers are kept out by the receipt versions.
+    #
+    # Several locks are always taken in one order, receipts before shifts
+    # and by id within each, and a holder of a shift lock never asks for a
+    # receipt one, so two holders cannot wait on each other.
+    _locks: "weakref.WeakValueDictionary[str, _KeyLock]" = field(
+        default_factory=weakref.WeakValueDictionary)
+    _mutex: threading.Lock = field(default_factory=threading.Lock)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def _ordered(self, receipt_ids: Iterable[str],
+                 shift_ids: Iterable[str]) -> List[_KeyLock]:
+        keys = ([(RECEIPT, receipt_id) for receipt_id in sorted(set(receipt_ids))]
+                + [(SHIFT, shift_id) for shift_id in sorted(set(shift_ids))])
+        ordered = []
+        with self._mutex:
+            for scope, key in keys:
+                name = f"{scope}:{key}"
+                key_lock = self._locks.get(name)
+                if key_lock is None:
+                    key_lock = self._locks[name] = _KeyLock(scope)
+                ordered.append(key_lock)
+        return ordered
+
+    def _take_or_queue(self, key_lock: _KeyLock, waiter: _Waiter) -> bool:
+        with self._mutex:
+            if not key_lock.held:
+                key_lock.held = True
+                return True
+            key_lock.waiters.append(waiter)
+        LOCK_CONTENDED.inc(scope=key_lock.scope)
+        return False
+
+    def _release(self, key_lock: _KeyLock) -> None:
+        with self._mutex:
+            if not key_lock.waiters:
+                key_lock.held = False
+                return
+            waiter = key_lock.waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(self._hand_over, key_lock, future)
+        except RuntimeError:
+            # its loop is gone, and so is the waiter
+            self._release(key_lock)
+
+    def _hand_over(self, key_lock: _KeyLock,
+                   future: "asyncio.Future[None]") -> None:
+        if future.done():
+            # cancelled after it was picked; pass the lock on
+            self._release(key_lock)
+        else:
+            future.set_result(None)
+
+    def _give_up(self, key_lock: _KeyLock,
+                 future: "asyncio.Future[None]") -> None:
+        with self._mutex:
+            for index, waiter in enumerate(key_lock.waiters):
+                if isinstance(waiter, tuple) and waiter[1] is future:
+                    del key_lock.waiters[index]
+                    return
+        if future.done() and not future.cancelled():
+            # handed over just before the cancellation got through
+            self._release(key_lock)
+        # otherwise a hand-over is on its way and passes the lock on
+
+    @contextmanager
+    def hold(self, receipt_ids: Iterable[str] = (),
+             shift_ids: Iterable[str] = ()) -> Iterator[None]:
+        held: List[_KeyLock] = []
+        try:
+            for key_lock in self._ordered(receipt_ids, shift_ids):
+                started = time.perf_counter()
+                handed = threading.Event()
+                if not self._take_or_queue(key_lock, handed):
+                    handed.wait()
+                held.append(key_lock)
+                self._acquired(key_lock, started)
+            yield
+        finally:
+            for key_lock in reversed(held):
+                self._release(key_lock)
+
+    @asynccontextmanager
+    async def hold_async(self, receipt_ids: Iterable[str] = (),
+                         shift_ids: Iterable[str] = ()) -> AsyncIterator[None]:
+        # a busy lock is waited for on the event loop, never on a thread
+        loop = asyncio.get_running_loop()
+        held: List[_KeyLock] = []
+        try:
+            for key_lock in self._ordered(receipt_ids, shift_ids):
+                started = time.perf_counter()
+                handed: "asyncio.Future[None]" = loop.create_future()
+                if not self._take_or_queue(key_lock, (loop, handed)):
+                    try:
+                        await handed
+                    except asyncio.CancelledError:
+                        self._give_up(key_lock, handed)
+                        raise
+                held.append(key_lock)
+                self._acquired(key_lock, started)
+            yield
+        finally:
+            for key_lock in reversed(held):
+                self._release(key_lock)
+
+    def _acquired(self, key_lock: _KeyLock, started: float) -> None:
+        LOCK_ACQUISITIONS.inc(scope=key_lock.scope)
+        LOCK_WAIT_SECONDS.inc(time.perf_counter() - started,
+                              scope=key_lock.scope)
@@ -0,0 +1,217 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, Iterator, List, Tuple, Union
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+# upper bounds, in seconds, from a cached lookup to a slow report
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels: Dict[str, str]) -> LabelValues:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: LabelValues) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+@dataclass
+class Counter:
+    name: str
+    help: str
+    _values: Dict[LabelValues, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def series(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+@dataclass
+class Gauge:
+    name: str
+    help: str
+    _values: Dict[LabelValues, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+@dataclass
+class _Buckets:
+    counts: List[int]
+    sum: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class HistogramSeries:
+    # one label set of a histogram, resolved once by callers on a hot path
+    histogram: "Histogram"
+    key: LabelValues
+
+    def observe(self, value: float) -> None:
+        self.histogram._observe(self.key, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+@dataclass
+class Histogram:
+    # per-bucket counts only; they are summed into the cumulative
+    # Prometheus buckets when rendered, so an observation is one bisect
+    # and three additions
+    name: str
+    help: str
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    _values: Dict[LabelValues, _Buckets] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def labels(self, **labels: str) -> HistogramSeries:
+        return HistogramSeries(self, _labels(labels))
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(_labels(labels), value)
+
+    def time(self, **labels: str) -> ContextManager[None]:
+        return self.labels(**labels).time()
+
+    def _observe(self, key: LabelValues, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            buckets = self._values.get(key)
+            if buckets is None:
+                buckets = self._values[key] = _Buckets(
+                    counts=[0] * (len(self.buckets) + 1))
+            buckets.counts[index] += 1
+            buckets.sum += value
+            buckets.count += 1
+
+    def count(self, **labels: str) -> int:
+        buckets = self._values.get(_labels(labels))
+        return 0 if buckets is None else buckets.count
+
+    def sum(self, **labels: str) -> float:
+        buckets = self._values.get(_labels(labels))
+        return 0.0 if buckets is None else buckets.sum
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((key, _Buckets(list(buckets.counts), buckets.sum,
+                                           buckets.count))
+                            for key, buckets in self._values.items())
+        bounds = [*map(repr, self.buckets), "+Inf"]
+        for key, buckets in values:
+            cumulative = 0
+            for bound, count in zip(bounds, buckets.counts):
+                cumulative += count
+                labels = _format_labels((*key, ("le", bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {buckets.sum}")
+            lines.append(
+                f"{self.name}_count{_format_labels(key)} {buckets.count}")
+        return lines
+
+
+@dataclass
+class MetricsRegistry:
+    _counters: Dict[str, Counter] = field(default_factory=dict)
+    _gauges: Dict[str, Gauge] = field(default_factory=dict)
+    _histograms: Dict[str, Histogram] = field(default_factory=dict)
+    _collectors: List[Callable[[], None]] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def counter(self, name: str, help: str) -> Counter:
+        with self._lock:
+            if name not in self._counters:
+                self._counters[name] = Counter(name=name, help=help)
+            return self._counters[name]
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        with self._lock:
+            if name not in self._gauges:
+                self._gauges[name] = Gauge(name=name, help=help)
+            return self._gauges[name]
+
+    def histogram(self, name: str, help: str,
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name=name, help=help,
+                                                   buckets=buckets)
+            return self._histograms[name]
+
+    def collector(self, collect: Callable[[], None]) -> None:
+        # called before every render, for gauges that are cheaper to
+        # derive when scraped than to keep up to date
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self) -> str:
+        for collect in list(self._collectors):
+            collect()
+        metrics: List[Union[Counter, Gauge, Histogram]] = [
+            *self._counters.values(), *self._gauges.values(),
+            *self._histograms.values()]
+        lines: List[str] = []
+        for metric in sorted(metrics, key=lambda m: m.name):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import List, Optional
+
+from app.core.models.campaign import Campaign
+from app.core.models.product import Product
+
+
+class ChangeEntity(str, Enum):
+    PRODUCT = "product"
+    CAMPAIGN = "campaign"
+
+
+class ChangeOp(str, Enum):
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+
+@dataclass
+class CatalogChange:
+    seq: int
+    entity: ChangeEntity
+    entity_id: str
+    op: ChangeOp
+    changed_at: float
+
+
+@dataclass
+class CatalogDelta:
+    change: CatalogChange
+    product: Optional[Product] = None
+    campaign: Optional[Campaign] = None
+
+
+@dataclass
+class CatalogSync:
+    # next_since is the seq the terminal sends on its next call; when
+    # snapshot is set the terminal replaces its catalog instead of
+    # applying deltas
+    next_since: int
+    deltas: List[CatalogDelta] = field(default_factory=list)
+    has_more: bool = False
+    snapshot: bool = False
+    products: List[Product] = field(default_factory=list)
+    campaigns: List[Campaign] = field(default_factory=list)
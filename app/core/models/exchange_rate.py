@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ExchangeRate:
+    from_currency: str
+    to_currency: str
+    rate: float
+    fetched_at: float
+
+    def is_fresh(self, now: float, max_age: float) -> bool:
+        return now - self.fetched_at <= max_age
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+    @classmethod
+    def from_rows(cls, rows: List[T], limit: int,
+                  key: Callable[[T], str]) -> 'Page[T]':
+        # rows were fetched with limit + 1: the extra row only tells
+        # whether another page exists
+        if len(rows) <= limit:
+            return cls(items=rows)
+        items = rows[:limit]
+        return cls(items=items, next_cursor=key(items[-1]))
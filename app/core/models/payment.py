@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class PaymentOrder:
+    receipt_id: str
+    currency: str
+
+
+@dataclass
+class PaymentResult:
+    receipt_id: str
+    currency: str
+    paid: bool
+    amount: Optional[float] = None
+    error: Optional[str] = None
@@ -1,10 +1,14 @@
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
 from app.core.models.models import ICalculatePrice
 
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
 
 @dataclass
 class Product(ICalculatePrice):
@@ -22,6 +26,15 @@ class Product(ICalculatePrice):
             return self.discount
         return None
 
+def discounted_price(price: float, discount: int) -> float:
+    return price - (discount/100 * price)
+
+
+def search_terms(text: str) -> List[str]:
+    # lowercased words, the same split the search index uses for names
+    return re.findall(r"\w+", text.lower())
+
+
 @dataclass
 class ProductDecorator:
     inner_product: Product
@@ -36,11 +49,17 @@ class DiscountedProduct(ProductDecorator):
     discount: int
 
     def get_price(self) -> float:
-        return (self.inner_product.get_price() -
-                (self.discount/100 * self.inner_product.get_price()))
+        return discounted_price(self.inner_product.get_price(), self.discount)
 
 
 
+@dataclass
+class ProductPrice:
+    product_id: str
+    price: float
+    discounted_price: Optional[float] = None
+
+
 class NumProduct(BaseModel):
     product_id: str
     num: int
\ No newline at end of file
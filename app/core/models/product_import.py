@@ -0,0 +1,32 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.core.models.product import Product
+
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class ProductImportRow:
+    # line in the source file, for reporting; a row that could not be
+    # parsed carries the error instead of a product
+    line: int
+    product: Optional[Product] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ProductImportFailure:
+    line: int
+    error: str
+    barcode: Optional[str] = None
+
+
+@dataclass
+class ProductImportReport:
+    created: int = 0
+    failed: List[ProductImportFailure] = field(default_factory=list)
+
+    def merge(self, other: 'ProductImportReport') -> None:
+        self.created += other.created
+        self.failed.extend(other.failed)
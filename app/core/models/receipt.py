@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from enum import Enum
 from typing import List, Optional
 
 from app.core.models.models import ICalculatePrice
@@ -67,6 +68,19 @@ class GiftForReceipt(ICalculatePrice):
         return (self.buy_product.get_price()) * self.quantity
 
 
+class ReceiptItemType(str, Enum):
+    PRODUCT = "product"
+    COMBO = "combo"
+    GIFT = "gift"
+
+
+@dataclass
+class ReceiptItemOrder:
+    item_type: ReceiptItemType
+    item_id: str
+    quantity: int
+
+
 @dataclass
 class Receipt(ICalculatePrice):
     id: str
@@ -75,6 +89,9 @@ class Receipt(ICalculatePrice):
     total: float
     discount_total: Optional[float] = None
     status: bool = True
+    # bumped on every stored change; a write based on an older version
+    # is rejected instead of overwriting the newer one
+    version: int = 0
 
     def get_price(self) -> float:
         return sum(item.get_price() for item in self.items)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol
 
 from app.core.models.campaign import (
     BuyNGetNCampaign,
@@ -19,6 +19,10 @@ class IProductDiscountCampaignRepository(Protocol):
     def get_all(self) -> List[DiscountCampaign]:
         pass
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[DiscountCampaign]:
+        pass
+
     def get_one_campaign(self,
                 campaign_id: str) -> Optional[DiscountCampaign]:
         pass
@@ -34,6 +38,10 @@ class IProductDiscountCampaignRepository(Protocol):
                     product_id: str) -> Optional[DiscountCampaign]:
         pass
 
+    def get_campaigns_with_products(self,
+                    product_ids: List[str]) -> Dict[str, DiscountCampaign]:
+        pass
+
     def delete_product(self, product_id: str,
                        campaign_id: str) -> None:
         pass
@@ -48,6 +56,10 @@ class IComboCampaignRepository(Protocol):
     def get_all(self) -> List[ComboCampaign]:
         pass
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[ComboCampaign]:
+        pass
+
     def get_one_campaign(self, campaign_id: str) -> Optional[ComboCampaign]:
         pass
 
@@ -68,6 +80,10 @@ class IBuyNGetNCampaignRepository(Protocol):
     def get_all(self) -> List[BuyNGetNCampaign]:
         pass
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[BuyNGetNCampaign]:
+        pass
+
     def get_one_campaign(self, campaign_id: str) -> Optional[BuyNGetNCampaign]:
         pass
 
@@ -84,6 +100,10 @@ class IReceiptDiscountCampaignRepository(Protocol):
     def get_all(self) -> List[ReceiptCampaign]:
         pass
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[ReceiptCampaign]:
+        pass
+
     def get_one_campaign(self, campaign_id: str) -> Optional[ReceiptCampaign]:
         pass
 
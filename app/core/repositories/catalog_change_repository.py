@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+from typing import List, Protocol, Tuple
+
+from app.core.models.catalog_change import CatalogChange, ChangeEntity, ChangeOp
+
+
+@dataclass
+class ICatalogChangeRepository(Protocol):
+    def append(self, entity: ChangeEntity, entity_id: str,
+               op: ChangeOp, changed_at: float) -> CatalogChange:
+        pass
+
+    def append_many(self, entity: ChangeEntity, entity_ids: List[str],
+                    op: ChangeOp, changed_at: float) -> None:
+        pass
+
+    def get_since(self, seq: int, limit: int) -> List[CatalogChange]:
+        pass
+
+    def bounds(self) -> Tuple[int, int]:
+        pass
+
+    def latest(self) -> Tuple[int, float]:
+        # seq and time of the newest change ever logged; (0, 0.0) if none
+        pass
+
+    def delete_through(self, seq: int) -> int:
+        pass
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from app.core.models.exchange_rate import ExchangeRate
+
+
+@dataclass
+class IExchangeRateRepository(Protocol):
+    def get_rate(self, from_currency: str,
+                 to_currency: str) -> Optional[ExchangeRate]:
+        pass
+
+    def save_rate(self, exchange_rate: ExchangeRate) -> None:
+        pass
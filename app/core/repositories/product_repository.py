@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol
 
 from app.core.models.product import Product
 
@@ -12,11 +12,26 @@ class IProductRepository(Protocol):
     def get_one(self, product_id: str) -> Optional[Product]:
         pass
 
+    def create_many(self, products: List[Product]) -> List[Product]:
+        pass
+
     def get_all(self) -> List[Product]:
         pass
 
+    def get_page(self, after: Optional[str], limit: int) -> List[Product]:
+        pass
+
     def update(self, product_id: str, price: float) -> None:
         pass
 
+    def update_prices(self, prices: Dict[str, float]) -> List[str]:
+        pass
+
     def has_barcode(self, barcode: str) -> bool:
-        pass
\ No newline at end of file
+        pass
+
+    def get_by_barcode(self, barcode: str) -> Optional[Product]:
+        pass
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        pass
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol
 
 from app.core.models.receipt import Receipt
 
@@ -15,15 +15,36 @@ class IReceiptRepository(Protocol):
     def get_all(self) -> List[Receipt]:
         pass
 
+    def get_page(self, after: Optional[str], limit: int,
+                 shift_id: Optional[str] = None,
+                 status: Optional[bool] = None) -> List[Receipt]:
+        pass
+
     def delete(self, receipt_id: str) -> None:
         pass
 
-    def update(self, receipt_id: str, status: bool) -> None:
+    # With an expected version, the status is only changed if the stored
+    # receipt is still at it; raises ReceiptConflictError otherwise.
+    def update(self, receipt_id: str, status: bool,
+               expected_version: Optional[int] = None) -> None:
+        pass
+
+    # All or none: a receipt no longer at its expected version raises
+    # ReceiptConflictError, and the unit of work around it rolls back.
+    def close_many(self, receipt_ids: List[str],
+                   expected_versions: Optional[Dict[str, int]] = None) -> None:
         pass
 
-    def add_product(self, receipt: Receipt) -> Receipt:
+    # Rewrites the receipt only if the stored version is still
+    # expected_version (receipt.version by default) and stores it as
+    # receipt.version + 1; raises ReceiptConflictError otherwise.
+    def add_product(self, receipt: Receipt,
+                    expected_version: Optional[int] = None) -> Receipt:
         pass
 
     def delete_item(self, receipt: Receipt) -> None:
         pass
 
+    def flush(self, receipt_ids: List[str]) -> None:
+        pass
+
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -80,6 +80,7 @@ class GetOneCampaignResponse(BaseModel):
 
 class GetAllCampaignsResponse(BaseModel):
     campaigns: List[Campaign]
+    next_cursor: Optional[str] = None
 
 
 
@@ -1,6 +1,29 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
 class PaymentRequest(BaseModel):
     to_currency: str
     amount: float
+
+
+class BatchPaymentItem(BaseModel):
+    receipt_id: str
+    currency: str
+
+
+class BatchPaymentRequest(BaseModel):
+    payments: List[BatchPaymentItem]
+
+
+class BatchPaymentResult(BaseModel):
+    receipt_id: str
+    currency: str
+    paid: bool
+    amount: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BatchPaymentResponse(BaseModel):
+    results: List[BatchPaymentResult]
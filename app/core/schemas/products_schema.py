@@ -2,7 +2,8 @@ from typing import List, Optional
 
 from pydantic import BaseModel
 
-from app.core.models.product import Product
+from app.core.models.product import Product, ProductPrice
+from app.core.models.product_import import ProductImportFailure
 
 
 class CreateProductRequest(BaseModel):
@@ -18,6 +19,7 @@ class CreateProductResponse(BaseModel):
 
 class GetAllProductResponse(BaseModel):
     products: List[Product]
+    next_cursor: Optional[str] = None
 
 
 class GetOneProductResponse(BaseModel):
@@ -28,5 +30,28 @@ class GetOneProductResponse(BaseModel):
     discount: Optional[float] = None
 
 
+class SearchProductsResponse(BaseModel):
+    products: List[GetOneProductResponse]
+
+
 class UpdateProductPriceRequest(BaseModel):
-    price: float
\ No newline at end of file
+    price: float
+
+
+class ImportProductsResponse(BaseModel):
+    created: int
+    failed: List[ProductImportFailure]
+
+
+class ProductPriceItem(BaseModel):
+    product_id: str
+    price: float
+
+
+class UpdatePricesRequest(BaseModel):
+    prices: List[ProductPriceItem]
+
+
+class UpdatePricesResponse(BaseModel):
+    updated: List[ProductPrice]
+    missing: List[str]
@@ -3,7 +3,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 
 from app.core.models import ReceiptItem
-from app.core.models.receipt import Receipt
+from app.core.models.receipt import ReceiptItemType
 
 
 class CreateReceiptRequest(BaseModel):
@@ -23,6 +23,12 @@ class AddProductInReceiptRequest(BaseModel):
 
 
 
+class ScanProductInReceiptRequest(BaseModel):
+    barcode: str
+    quantity: int
+
+
+
 class AddComboInReceiptRequest(BaseModel):
     combo_id: str
     quantity: int
@@ -35,6 +41,18 @@ class AddGiftInReceiptRequest(BaseModel):
 
 
 
+class ReceiptItemRequest(BaseModel):
+    type: ReceiptItemType
+    id: str
+    quantity: int
+
+
+
+class AddItemsInReceiptRequest(BaseModel):
+    items: List[ReceiptItemRequest]
+
+
+
 class AddItemInReceiptResponse(BaseModel):
     id: str
     status: str
@@ -54,6 +72,7 @@ class GetOneReceiptResponse(BaseModel):
 
 
 class GetAllReceiptResponse(BaseModel):
-    receipts: List[Receipt]
+    receipts: List[GetOneReceiptResponse]
+    next_cursor: Optional[str] = None
 
 
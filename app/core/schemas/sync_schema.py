@@ -0,0 +1,29 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, SerializeAsAny
+
+from app.core.models.campaign import Campaign
+from app.core.models.catalog_change import ChangeEntity, ChangeOp
+from app.core.models.product import Product
+
+
+class CatalogChangeResponse(BaseModel):
+    seq: int
+    entity: ChangeEntity
+    id: str
+    op: ChangeOp
+    product: Optional[Product] = None
+    # serialized as the concrete campaign type, with all its fields
+    campaign: Optional[SerializeAsAny[Campaign]] = None
+
+
+class CatalogSnapshotResponse(BaseModel):
+    products: List[Product]
+    campaigns: List[SerializeAsAny[Campaign]]
+
+
+class GetChangesResponse(BaseModel):
+    next_since: int
+    has_more: bool = False
+    changes: List[CatalogChangeResponse] = []
+    snapshot: Optional[CatalogSnapshotResponse] = None
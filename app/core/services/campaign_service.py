@@ -1,5 +1,6 @@
+import heapq
 from dataclasses import dataclass, field
-from typing import List, Protocol
+from typing import Dict, List, Optional, Protocol
 
 from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
 from app.core.models.campaign import (
@@ -9,6 +10,8 @@ from app.core.models.campaign import (
     DiscountCampaign,
     ReceiptCampaign,
 )
+from app.core.models.catalog_change import ChangeEntity, ChangeOp
+from app.core.models.page import Page
 from app.core.models.product import DiscountedProduct, Product, ProductDecorator
 from app.core.models.receipt import ProductForReceipt, Receipt
 from app.core.repositories.campaign_repository import (
@@ -17,6 +20,9 @@ from app.core.repositories.campaign_repository import (
     IProductDiscountCampaignRepository,
     IReceiptDiscountCampaignRepository,
 )
+from app.core.services.catalog_version import CatalogVersion
+from app.core.services.sync_service import SyncService
+from app.core.timing import SERVICE, timed_layer
 
 
 @dataclass
@@ -143,12 +149,22 @@ class BuyNGetNCampaignChain(ICampaignChain):
     def get_campaign_product(self, product: Product) -> ProductDecorator:
         return self.next_campaign.get_campaign_product(product=product)
 
+@timed_layer(SERVICE)
 @dataclass
 class CampaignService:
     product_discount_repo: IProductDiscountCampaignRepository
     receipt_discount_repo: IReceiptDiscountCampaignRepository
     combo_campaign_repo: IComboCampaignRepository
     buy_get_gift_repo: IBuyNGetNCampaignRepository
+    catalog_version: CatalogVersion = field(default_factory=CatalogVersion)
+    sync_service: Optional[SyncService] = None
+
+    def _changed(self, campaign_id: str,
+                 op: ChangeOp = ChangeOp.UPSERT) -> None:
+        if self.sync_service is not None:
+            self.sync_service.record(entity=ChangeEntity.CAMPAIGN,
+                                     entity_id=campaign_id, op=op)
+        self.catalog_version.changed()
 
     def _build_chain(self) -> ICampaignChain:
         return BuyNGetNCampaignChain(
@@ -169,6 +185,30 @@ class CampaignService:
         start_chain = self._build_chain()
         return start_chain.get_campaign_product(product=product)
 
+    def get_campaign_products(self,
+            products: List[Product]) -> Dict[str, ProductDecorator]:
+        # only product discounts decorate products, so one bulk lookup
+        # replaces walking the whole chain once per product
+        campaigns = self.product_discount_repo.get_campaigns_with_products(
+            product_ids=[product.id for product in products])
+
+        decorated: Dict[str, ProductDecorator] = {}
+        for product in products:
+            campaign = campaigns.get(product.id)
+            if campaign is None:
+                decorated[product.id] = ProductDecorator(inner_product=product)
+            else:
+                decorated[product.id] = DiscountedProduct(
+                    inner_product=product, discount=campaign.discount)
+
+        return decorated
+
+    def get_discounts(self, product_ids: List[str]) -> Dict[str, int]:
+        campaigns = self.product_discount_repo.get_campaigns_with_products(
+            product_ids=product_ids)
+        return {product_id: campaign.discount
+                for product_id, campaign in campaigns.items()}
+
     def get_campaign_receipt(self, receipt: Receipt) -> Receipt:
         total = receipt.total
         if receipt.discount_total is not None:
@@ -192,29 +232,51 @@ class CampaignService:
                 self.combo_campaign_repo.get_all() +
                 self.buy_get_gift_repo.get_all())
 
+    def get_campaigns_page(self, after: Optional[str],
+                           limit: int) -> Page[Campaign]:
+        # campaign ids are unique across the four tables, so one cursor
+        # pages through all of them: take the next limit + 1 ids of each
+        # table and keep the smallest
+        rows: List[Campaign] = [
+            *self.product_discount_repo.get_page(after=after, limit=limit + 1),
+            *self.receipt_discount_repo.get_page(after=after, limit=limit + 1),
+            *self.combo_campaign_repo.get_page(after=after, limit=limit + 1),
+            *self.buy_get_gift_repo.get_page(after=after, limit=limit + 1)]
+        rows = heapq.nsmallest(limit + 1, rows, key=lambda campaign: campaign.id)
+        return Page.from_rows(rows, limit, key=lambda campaign: campaign.id)
+
     def delete_campaign(self, campaign_id: str) -> None:
         start_chain = self._build_chain()
-        return start_chain.delete_campaign(campaign_id=campaign_id)
+        start_chain.delete_campaign(campaign_id=campaign_id)
+        self._changed(campaign_id, ChangeOp.DELETE)
 
     def create_discount(self,
                 discount_campaign: DiscountCampaign) -> DiscountCampaign:
-        return self.product_discount_repo.create(
+        campaign = self.product_discount_repo.create(
             discount_campaign=discount_campaign)
+        self._changed(campaign.id)
+        return campaign
 
     def create_combo(self,
             combo_campaign: ComboCampaign) -> ComboCampaign:
-        return self.combo_campaign_repo.create(
+        campaign = self.combo_campaign_repo.create(
             combo_campaign=combo_campaign)
+        self._changed(campaign.id)
+        return campaign
 
     def create_receipt_discount(self,
             receipt_campaign: ReceiptCampaign) -> ReceiptCampaign:
-        return self.receipt_discount_repo.create(
+        campaign = self.receipt_discount_repo.create(
             receipt_campaign=receipt_campaign)
+        self._changed(campaign.id)
+        return campaign
 
     def create_buy_n_get_n(self,
             buy_n_get_n_campaign: BuyNGetNCampaign) -> BuyNGetNCampaign:
-        return self.buy_get_gift_repo.create(
+        campaign = self.buy_get_gift_repo.create(
             buy_n_get_n_campaign=buy_n_get_n_campaign)
+        self._changed(campaign.id)
+        return campaign
 
     def add_product_in_combo(self,
                         product: Product,
@@ -225,15 +287,19 @@ class CampaignService:
             quantity=quantity,
             price=product.price)
         product_for_combo.total = product.price * quantity
-        return self.combo_campaign_repo.add_product(
+        campaign = self.combo_campaign_repo.add_product(
             product=product_for_combo,
             campaign_id=campaign_id)
+        self._changed(campaign_id)
+        return campaign
 
     def add_product_in_discount(self, product_id: str,
                 campaign_id: str) -> DiscountCampaign:
-        return self.product_discount_repo.add_product(
+        campaign = self.product_discount_repo.add_product(
             product_id=product_id,
             campaign_id=campaign_id)
+        self._changed(campaign_id)
+        return campaign
 
     def execute_delete_from_discount(self,
                     campaign_id: str,
@@ -241,3 +307,4 @@ class CampaignService:
         self.product_discount_repo.delete_product(
             product_id=product_id,
             campaign_id=campaign_id)
+        self._changed(campaign_id)
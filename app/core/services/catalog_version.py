@@ -0,0 +1,53 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
+
+from app.core.repositories.catalog_change_repository import (
+    ICatalogChangeRepository,
+)
+
+# registers a callback to run once the open transaction has committed
+AfterCommit = Callable[[Callable[[], None]], None]
+
+
+def _at_once(callback: Callable[[], None]) -> None:
+    callback()
+
+
+@dataclass
+class CatalogVersion:
+    # The version is the seq of the newest logged catalog change, so every
+    # worker, and one that restarted, tags the same catalog alike. It is
+    # read again only after the change has committed: a reader never gets
+    # a new tag while the rows behind it could still roll back.
+    change_repository: Optional[ICatalogChangeRepository] = None
+    after_commit: AfterCommit = _at_once
+    version: int = 0
+    modified_at: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        if self.change_repository is not None:
+            self.refresh()
+
+    def changed(self) -> None:
+        self.after_commit(self.refresh)
+
+    def refresh(self) -> None:
+        if self.change_repository is None:
+            # nothing persisted to go by; count this process's changes
+            with self._lock:
+                self.version += 1
+                self.modified_at = time.time()
+            return
+
+        seq, changed_at = self.change_repository.latest()
+        with self._lock:
+            # refreshes of two commits may finish out of order
+            if seq > self.version:
+                self.version, self.modified_at = seq, changed_at
+
+    def current(self) -> Tuple[str, float]:
+        with self._lock:
+            return str(self.version), self.modified_at
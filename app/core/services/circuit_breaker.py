@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+
+from app.core.exceptions.payment_exceptions import CircuitOpenErrorMessage
+from app.core.metrics import REGISTRY
+from app.core.state.breaker_state import (
+    BreakerState,
+    ClosedBreakerState,
+    OpenBreakerState,
+)
+
+T = TypeVar("T")
+
+BREAKER_STATE = REGISTRY.gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half open, 2 open).")
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state transitions.")
+BREAKER_REJECTED = REGISTRY.counter(
+    "circuit_breaker_rejected_total",
+    "Calls rejected while the circuit breaker was open.")
+BREAKER_FAILURES = REGISTRY.counter(
+    "circuit_breaker_failures_total",
+    "Calls that failed or exceeded the slow call threshold.")
+
+
+@dataclass
+class LatencyWindow:
+    size: int = 100
+    _samples: Deque[float] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._samples = deque(maxlen=self.size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+@dataclass
+class CircuitBreaker:
+    name: str
+    failure_threshold: int = 5
+    slow_call_threshold: float = 2.0
+    reset_timeout: float = 30.0
+    clock: Callable[[], float] = time.monotonic
+    state: BreakerState = field(default_factory=ClosedBreakerState)
+    failures: int = 0
+    opened_at: float = 0.0
+
+    def __post_init__(self) -> None:
+        BREAKER_STATE.set(self.state.code, breaker=self.name)
+
+    def transition(self, state: BreakerState) -> None:
+        self.state = state
+        BREAKER_STATE.set(state.code, breaker=self.name)
+        BREAKER_TRANSITIONS.inc(breaker=self.name, state=state.name)
+
+    def trip(self, now: float) -> None:
+        self.opened_at = now
+        self.transition(OpenBreakerState())
+
+    async def call(self, action: Callable[[], Awaitable[T]]) -> T:
+        started = self.clock()
+        try:
+            self.state.before_call(self, now=started)
+        except CircuitOpenErrorMessage:
+            BREAKER_REJECTED.inc(breaker=self.name)
+            raise
+
+        try:
+            result = await action()
+        except asyncio.CancelledError:
+            # the caller gave up (or a hedge won); says nothing of upstream
+            self.state.on_cancel(self)
+            raise
+        except Exception:
+            self._failure()
+            raise
+
+        if self.clock() - started > self.slow_call_threshold:
+            self._failure()
+        else:
+            self.state.on_success(self)
+        return result
+
+    def _failure(self) -> None:
+        BREAKER_FAILURES.inc(breaker=self.name)
+        self.state.on_failure(self, now=self.clock())
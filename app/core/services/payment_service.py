@@ -1,38 +1,193 @@
-from dataclasses import dataclass
-from typing import Any
+import asyncio
+import random
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
 import httpx
 
+from app.core.exceptions.payment_exceptions import (
+    CircuitOpenErrorMessage,
+    ExchangeRateErrorMessage,
+)
+from app.core.executors import run_blocking
+from app.core.metrics import REGISTRY
+from app.core.models.exchange_rate import ExchangeRate
+from app.core.repositories.exchange_rate_repository import (
+    IExchangeRateRepository,
+)
+from app.core.services.circuit_breaker import CircuitBreaker, LatencyWindow
+from app.core.timing import SERVICE, timed_layer
+
 BASE_URL = "https://economia.awesomeapi.com.br"
 
+HEDGED_REQUESTS = REGISTRY.counter(
+    "fx_hedged_requests_total",
+    "Second FX requests fired because the first exceeded the p95 latency.")
+FX_REQUEST_SECONDS = REGISTRY.histogram(
+    "fx_request_seconds",
+    "Time FX rate requests took, retries included, by outcome.")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 1.0
+
+    def delay(self, attempt: int) -> float:
+        # "full jitter" exponential backoff
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(0, ceiling)
 
+
+@timed_layer(SERVICE)
 @dataclass
 class PaymentService:
-    _client = httpx.AsyncClient()
+    client: Optional[httpx.AsyncClient] = None
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    rate_repository: Optional[IExchangeRateRepository] = None
+    max_rate_age: float = 3600.0
+    base_url: str = BASE_URL
+    breaker: CircuitBreaker = field(
+        default_factory=lambda: CircuitBreaker(name="fx"))
+    hedge_requests: bool = False
+    hedge_min_samples: int = 20
+    latencies: LatencyWindow = field(default_factory=LatencyWindow)
+    executor: Optional[Executor] = None
+
+
+    async def _get(self, url: str) -> httpx.Response:
+        assert self.client is not None
+        attempt = 0
+        while True:
+            last_attempt = attempt + 1 >= self.retry_policy.attempts
+            try:
+                response = await self.client.get(url)
+                if response.status_code < 500 or last_attempt:
+                    return response
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+
+            await asyncio.sleep(self.retry_policy.delay(attempt))
+            attempt += 1
+
+
+    async def _timed_get(self, url: str) -> httpx.Response:
+        started = time.monotonic()
+        try:
+            response = await self._get(url)
+        except BaseException as exc:
+            # a hedged request that lost the race is cancelled, not failed
+            cancelled = isinstance(exc, asyncio.CancelledError)
+            FX_REQUEST_SECONDS.observe(
+                time.monotonic() - started,
+                outcome="cancelled" if cancelled else "error")
+            raise
+        elapsed = time.monotonic() - started
+        self.latencies.record(elapsed)
+        FX_REQUEST_SECONDS.observe(
+            elapsed, outcome="ok" if response.status_code < 500 else "error")
+        return response
+
+
+    def _hedge_delay(self) -> Optional[float]:
+        if (not self.hedge_requests
+                or len(self.latencies) < self.hedge_min_samples):
+            return None
+        return self.latencies.percentile(0.95)
+
+
+    async def _hedged_get(self, url: str) -> httpx.Response:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._timed_get(url)
+
+        first = asyncio.ensure_future(self._timed_get(url))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        # the first request is slower than p95: race a second one against it
+        HEDGED_REQUESTS.inc()
+        second = asyncio.ensure_future(self._timed_get(url))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+    async def _fetch(self, url: str) -> httpx.Response:
+        response = await self._hedged_get(url)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
 
 
     async def _calculate_exchange_rate(self,
                                 from_currency: str,
                                 to_currency: str) -> Any:
-        url = f"{BASE_URL}/json/last/{from_currency}-{to_currency}"
+        if self.client is None:
+            return {"error": "Payment client is not running"}
+
+        url = f"{self.base_url}/json/last/{from_currency}-{to_currency}"
         try:
-            response = await self._client.get(url)
+            response = await self.breaker.call(lambda: self._fetch(url))
             response.raise_for_status()
             data = response.json()
             return data.get(f"{from_currency}{to_currency}",
                             {"error": "Invalid currency"})
+        except CircuitOpenErrorMessage:
+            return {"error": "API is unavailable"}
         except httpx.HTTPStatusError:
             return {"error": "API is down"}
         except Exception:
             return {"error": "Unexpected error"}
 
 
-    async def pay(self, from_currency: str, to_currency: str, amount: float) -> float:
+    async def refresh_rate(self, from_currency: str,
+                           to_currency: str) -> ExchangeRate:
         rate_data = await self._calculate_exchange_rate(from_currency, to_currency)
         if "error" in rate_data:
-            raise Exception(rate_data["error"])
+            raise ExchangeRateErrorMessage(reason=rate_data["error"])
 
-        rate = float(rate_data["ask"])
+        exchange_rate = ExchangeRate(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            rate=float(rate_data["ask"]),
+            fetched_at=time.time())
+        if self.rate_repository is not None:
+            await run_blocking(self.executor, self.rate_repository.save_rate,
+                               exchange_rate=exchange_rate)
+
+        return exchange_rate
+
+
+    async def get_rate(self, from_currency: str, to_currency: str) -> float:
+        if self.rate_repository is not None:
+            stored = await run_blocking(
+                self.executor, self.rate_repository.get_rate,
+                from_currency=from_currency, to_currency=to_currency)
+            if stored is not None and stored.is_fresh(
+                    now=time.time(), max_age=self.max_rate_age):
+                return stored.rate
+
+        exchange_rate = await self.refresh_rate(from_currency, to_currency)
+        return exchange_rate.rate
+
+
+    async def pay(self, from_currency: str, to_currency: str, amount: float) -> float:
+        rate = await self.get_rate(from_currency, to_currency)
         converted = round(amount * rate, 2)
 
-        return converted
\ No newline at end of file
+        return converted
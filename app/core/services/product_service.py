@@ -1,25 +1,84 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
 
 from app.core.exceptions.products_exceptions import (
+    GetProductByBarcodeError,
     GetProductError,
     ProductCreationError,
 )
+from app.core.models.catalog_change import ChangeEntity
+from app.core.models.page import Page
 from app.core.models.product import Product
+from app.core.models.product_import import (
+    ProductImportFailure,
+    ProductImportReport,
+    ProductImportRow,
+)
 from app.core.repositories.product_repository import IProductRepository
+from app.core.services.catalog_version import CatalogVersion
+from app.core.services.sync_service import SyncService
+from app.core.timing import SERVICE, timed_layer
 
 
+@timed_layer(SERVICE)
 @dataclass
 class ProductService:
     product_repository: IProductRepository
+    catalog_version: CatalogVersion = field(default_factory=CatalogVersion)
+    sync_service: Optional[SyncService] = None
+
+    def _changed(self, product_id: str) -> None:
+        if self.sync_service is not None:
+            self.sync_service.record(entity=ChangeEntity.PRODUCT,
+                                     entity_id=product_id)
+        self.catalog_version.changed()
 
     def create_product(self, product: Product) -> Product:
         if self.product_repository.has_barcode(product.barcode):
             raise ProductCreationError(barcode=product.barcode)
 
         product = self.product_repository.create(product)
+        self._changed(product.id)
         return product
 
+    def create_products(self,
+                        rows: List[ProductImportRow]) -> ProductImportReport:
+        report = ProductImportReport()
+        batch: List[Tuple[int, Product]] = []
+        barcodes: Set[str] = set()
+        for row in rows:
+            if row.product is None:
+                report.failed.append(ProductImportFailure(
+                    line=row.line, error=row.error or "Invalid row"))
+            elif row.product.barcode in barcodes:
+                report.failed.append(self._duplicate(row.line, row.product))
+            else:
+                barcodes.add(row.product.barcode)
+                batch.append((row.line, row.product))
+
+        # barcodes already in the database are skipped by the repository
+        created = self.product_repository.create_many(
+            products=[product for _, product in batch])
+        created_ids = {product.id for product in created}
+        report.failed.extend(self._duplicate(line, product)
+                             for line, product in batch
+                             if product.id not in created_ids)
+        report.failed.sort(key=lambda failure: failure.line)
+        report.created = len(created)
+
+        if created:
+            if self.sync_service is not None:
+                self.sync_service.record_many(
+                    entity=ChangeEntity.PRODUCT,
+                    entity_ids=[product.id for product in created])
+            self.catalog_version.changed()
+        return report
+
+    def _duplicate(self, line: int, product: Product) -> ProductImportFailure:
+        return ProductImportFailure(
+            line=line, barcode=product.barcode,
+            error=ProductCreationError(barcode=product.barcode).message)
+
     def get_one_product(self, product_id: str) -> Product:
         product = self.product_repository.get_one(product_id=product_id)
         if not product:
@@ -27,8 +86,33 @@ class ProductService:
 
         return product
 
+    def get_product_by_barcode(self, barcode: str) -> Product:
+        product = self.product_repository.get_by_barcode(barcode=barcode)
+        if not product:
+            raise GetProductByBarcodeError(barcode=barcode)
+
+        return product
+
     def get_all_products(self) -> List[Product]:
         return self.product_repository.get_all()
 
+    def search_products(self, query: str, limit: int) -> List[Product]:
+        return self.product_repository.search(query=query, limit=limit)
+
+    def get_products_page(self, after: Optional[str],
+                          limit: int) -> Page[Product]:
+        rows = self.product_repository.get_page(after=after, limit=limit + 1)
+        return Page.from_rows(rows, limit, key=lambda product: product.id)
+
+    def update_prices(self, prices: Dict[str, float]) -> List[str]:
+        updated = self.product_repository.update_prices(prices=prices)
+        if updated:
+            if self.sync_service is not None:
+                self.sync_service.record_many(entity=ChangeEntity.PRODUCT,
+                                              entity_ids=updated)
+            self.catalog_version.changed()
+        return updated
+
     def update_product(self, product: Product, price: float) -> None:
-        self.product_repository.update(product_id=product.id, price=price)
\ No newline at end of file
+        self.product_repository.update(product_id=product.id, price=price)
+        self._changed(product.id)
\ No newline at end of file
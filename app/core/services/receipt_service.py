@@ -1,11 +1,13 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Tuple, Union
 
 from app.core.exceptions.receipt_exceptions import (
     GetReceiptErrorMessage,
     ReceiptClosedErrorMessage,
 )
 from app.core.models.campaign import BuyNGetNCampaign, ComboCampaign
+from app.core.models.models import ICalculatePrice
+from app.core.models.page import Page
 from app.core.models.product import Product
 from app.core.models.receipt import (
     ComboForReceipt,
@@ -14,8 +16,12 @@ from app.core.models.receipt import (
     Receipt,
 )
 from app.core.repositories.receipt_repesitory import IReceiptRepository
+from app.core.timing import SERVICE, timed_layer
 
+ReceiptSource = Union[Product, ComboCampaign, BuyNGetNCampaign]
 
+
+@timed_layer(SERVICE)
 @dataclass
 class ReceiptService:
     receipt_repository: IReceiptRepository
@@ -33,17 +39,77 @@ class ReceiptService:
     def get_all_receipts(self) -> List[Receipt]:
         return self.receipt_repository.get_all()
 
+    def get_receipts_page(self, after: Optional[str], limit: int,
+                          shift_id: Optional[str] = None,
+                          status: Optional[bool] = None) -> Page[Receipt]:
+        rows = self.receipt_repository.get_page(
+            after=after, limit=limit + 1, shift_id=shift_id, status=status)
+        return Page.from_rows(rows, limit, key=lambda receipt: receipt.id)
+
     def delete_receipt(self, receipt: Receipt) -> None:
         if not receipt.status:
             raise ReceiptClosedErrorMessage(receipt_id=receipt.id)
         self.receipt_repository.delete(receipt_id=receipt.id)
 
+    # Closing goes through only if nobody has changed the receipt since
+    # it was read, so what gets paid is what its version had on it.
     def update_status(self, receipt: Receipt, status: bool) -> None:
         receipt.get_state().close_receipt(receipt=receipt)
-        self.receipt_repository.update(receipt_id=receipt.id, status=status)
+        self.receipt_repository.update(receipt_id=receipt.id, status=status,
+                                       expected_version=receipt.version)
+
+    def close_receipts(self, receipts: List[Receipt]) -> None:
+        for receipt in receipts:
+            receipt.get_state().close_receipt(receipt=receipt)
+        self.receipt_repository.close_many(
+            receipt_ids=[receipt.id for receipt in receipts],
+            expected_versions={receipt.id: receipt.version
+                               for receipt in receipts})
+
+    def flush_receipts(self, receipts: List[Receipt]) -> None:
+        self.receipt_repository.flush(
+            receipt_ids=[receipt.id for receipt in receipts])
 
     def add_product(self, receipt: Receipt, product: Product,
                     quantity: int) -> Receipt:
+        receipt = receipt.get_state().add_item(
+            receipt=receipt,
+            item_for_receipt=self._product_line(product, quantity))
+        return self.receipt_repository.add_product(receipt=receipt)
+
+    def add_combo_product(self, receipt: Receipt,
+                          combo: ComboCampaign,
+                          quantity: int) -> Receipt:
+        receipt = receipt.get_state().add_item(
+            receipt=receipt,
+            item_for_receipt=self._combo_line(combo, quantity))
+        return self.receipt_repository.add_product(receipt=receipt)
+
+    def add_gift_product(self, receipt: Receipt,
+                         gift: BuyNGetNCampaign,
+                         quantity: int) -> Receipt:
+        receipt = receipt.get_state().add_item(
+            receipt=receipt,
+            item_for_receipt=self._gift_line(gift, quantity))
+        return self.receipt_repository.add_product(receipt=receipt)
+
+    def add_items(self, receipt: Receipt,
+                  items: List[Tuple[ReceiptSource, int]]) -> Receipt:
+        for item, quantity in items:
+            if isinstance(item, ComboCampaign):
+                line: ICalculatePrice = self._combo_line(item, quantity)
+            elif isinstance(item, BuyNGetNCampaign):
+                line = self._gift_line(item, quantity)
+            else:
+                line = self._product_line(item, quantity)
+            receipt = receipt.get_state().add_item(
+                receipt=receipt, item_for_receipt=line)
+
+        # every line is rewritten once, in a single commit
+        return self.receipt_repository.add_product(receipt=receipt)
+
+    def _product_line(self, product: Product,
+                      quantity: int) -> ProductForReceipt:
         product_for_receipt = ProductForReceipt(
             id=product.id,
             quantity=quantity,
@@ -51,14 +117,10 @@ class ReceiptService:
             discount_price=product.discount)
         product_for_receipt.total = product_for_receipt.get_price()
         product_for_receipt.discount_total = product_for_receipt.get_discounted_price()
+        return product_for_receipt
 
-        receipt = receipt.get_state().add_item(
-            receipt=receipt, item_for_receipt=product_for_receipt)
-        return self.receipt_repository.add_product(receipt=receipt)
-
-    def add_combo_product(self, receipt: Receipt,
-                          combo: ComboCampaign,
-                          quantity: int) -> Receipt:
+    def _combo_line(self, combo: ComboCampaign,
+                    quantity: int) -> ComboForReceipt:
         combo_for_receipt = ComboForReceipt(
             id=combo.id,
             products=combo.products,
@@ -67,14 +129,10 @@ class ReceiptService:
             discount_price=combo.real_price())
         combo_for_receipt.total = combo_for_receipt.get_price()
         combo_for_receipt.discount_total = combo_for_receipt.get_discounted_price()
-        receipt = receipt.get_state().add_item(
-            receipt=receipt,
-            item_for_receipt=combo_for_receipt)
-        return self.receipt_repository.add_product(receipt=receipt)
+        return combo_for_receipt
 
-    def add_gift_product(self, receipt: Receipt,
-                         gift: BuyNGetNCampaign,
-                         quantity: int) -> Receipt:
+    def _gift_line(self, gift: BuyNGetNCampaign,
+                   quantity: int) -> GiftForReceipt:
         gift_for_receipt = GiftForReceipt(
             id=gift.id,
             buy_product=gift.buy_product,
@@ -84,10 +142,7 @@ class ReceiptService:
             discount_price=gift.real_price())
         gift_for_receipt.total = gift_for_receipt.get_price()
         gift_for_receipt.discount_total = gift_for_receipt.get_discounted_price()
-        receipt = receipt.get_state().add_item(
-            receipt=receipt,
-            item_for_receipt=gift_for_receipt)
-        return self.receipt_repository.add_product(receipt=receipt)
+        return gift_for_receipt
 
     def delete_item(self, receipt: Receipt, item_id: str) -> None:
         receipt.get_state().delete_item(receipt=receipt, item_id=item_id)
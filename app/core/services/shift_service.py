@@ -5,8 +5,10 @@ from app.core.exceptions.shift_exceptions import GetShiftErrorMessage
 from app.core.models.receipt import Receipt
 from app.core.models.shift import Shift
 from app.core.repositories.shift_repository import IShiftRepository
+from app.core.timing import SERVICE, timed_layer
 
 
+@timed_layer(SERVICE)
 @dataclass
 class ShiftService:
     shift_repository: IShiftRepository
@@ -30,4 +32,9 @@ class ShiftService:
 
     def add_receipt(self, shift: Shift, receipt: Receipt) -> Shift:
         shift.state.add_item(shift=shift, receipt=receipt)
-        return self.shift_repository.add_receipt(shift=shift)
\ No newline at end of file
+        return self.shift_repository.add_receipt(shift=shift)
+
+    def add_receipts(self, shift: Shift, receipts: List[Receipt]) -> Shift:
+        for receipt in receipts:
+            shift.state.add_item(shift=shift, receipt=receipt)
+        return self.shift_repository.add_receipt(shift=shift)
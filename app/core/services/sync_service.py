@@ -0,0 +1,71 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from app.core.models.catalog_change import CatalogChange, ChangeEntity, ChangeOp
+from app.core.repositories.catalog_change_repository import (
+    ICatalogChangeRepository,
+)
+from app.core.timing import SERVICE, timed_layer
+
+
+@timed_layer(SERVICE)
+@dataclass
+class SyncService:
+    change_repository: ICatalogChangeRepository
+    # how many of the newest changes survive compaction; a terminal that
+    # fell further behind than this gets a snapshot instead of deltas
+    retention: int = 10_000
+    compact_every: int = 500
+    _appended: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, entity: ChangeEntity, entity_id: str,
+               op: ChangeOp = ChangeOp.UPSERT) -> CatalogChange:
+        change = self.change_repository.append(
+            entity=entity, entity_id=entity_id, op=op, changed_at=time.time())
+        self._appended_changes(1)
+        return change
+
+    def record_many(self, entity: ChangeEntity, entity_ids: List[str],
+                    op: ChangeOp = ChangeOp.UPSERT) -> None:
+        if not entity_ids:
+            return
+        self.change_repository.append_many(
+            entity=entity, entity_ids=entity_ids, op=op,
+            changed_at=time.time())
+        self._appended_changes(len(entity_ids))
+
+    def _appended_changes(self, count: int) -> None:
+        with self._lock:
+            self._appended += count
+            due = self._appended >= self.compact_every
+            if due:
+                self._appended = 0
+        if due:
+            self.compact()
+
+    def compact(self) -> int:
+        _, latest = self.change_repository.bounds()
+        return self.change_repository.delete_through(
+            seq=latest - max(self.retention, 1))
+
+    def latest_seq(self) -> int:
+        return self.change_repository.bounds()[1]
+
+    def needs_snapshot(self, since: int) -> bool:
+        if since == 0:
+            # a new terminal; the catalog may hold rows that were never
+            # logged (seeded, or written before the log existed)
+            return True
+        oldest, latest = self.change_repository.bounds()
+        if since > latest:
+            # the log was reset underneath the terminal (new database)
+            return True
+        return oldest > 0 and since < oldest - 1
+
+    def get_changes(self, since: int,
+                    limit: int) -> Tuple[List[CatalogChange], bool]:
+        rows = self.change_repository.get_since(seq=since, limit=limit + 1)
+        return rows[:limit], len(rows) > limit
@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.core.services.circuit_breaker import CircuitBreaker
+
+from app.core.exceptions.payment_exceptions import CircuitOpenErrorMessage
+
+
+class BreakerState(ABC):
+    name: str
+    code: int
+
+    @abstractmethod
+    def before_call(self, breaker: 'CircuitBreaker', now: float) -> None:
+        pass
+
+    @abstractmethod
+    def on_success(self, breaker: 'CircuitBreaker') -> None:
+        pass
+
+    @abstractmethod
+    def on_failure(self, breaker: 'CircuitBreaker', now: float) -> None:
+        pass
+
+    @abstractmethod
+    def on_cancel(self, breaker: 'CircuitBreaker') -> None:
+        pass
+
+
+class ClosedBreakerState(BreakerState):
+    name = "closed"
+    code = 0
+
+    def before_call(self, breaker: 'CircuitBreaker', now: float) -> None:
+        pass
+
+    def on_success(self, breaker: 'CircuitBreaker') -> None:
+        breaker.failures = 0
+
+    def on_failure(self, breaker: 'CircuitBreaker', now: float) -> None:
+        breaker.failures += 1
+        if breaker.failures >= breaker.failure_threshold:
+            breaker.trip(now=now)
+
+    def on_cancel(self, breaker: 'CircuitBreaker') -> None:
+        pass
+
+
+class OpenBreakerState(BreakerState):
+    name = "open"
+    code = 2
+
+    def before_call(self, breaker: 'CircuitBreaker', now: float) -> None:
+        if now - breaker.opened_at < breaker.reset_timeout:
+            raise CircuitOpenErrorMessage(breaker_name=breaker.name)
+
+        breaker.transition(HalfOpenBreakerState())
+        breaker.state.before_call(breaker, now=now)
+
+    def on_success(self, breaker: 'CircuitBreaker') -> None:
+        pass
+
+    def on_failure(self, breaker: 'CircuitBreaker', now: float) -> None:
+        pass
+
+    def on_cancel(self, breaker: 'CircuitBreaker') -> None:
+        pass
+
+
+class HalfOpenBreakerState(BreakerState):
+    name = "half_open"
+    code = 1
+
+    def __init__(self) -> None:
+        self.trial_in_flight = False
+
+    def before_call(self, breaker: 'CircuitBreaker', now: float) -> None:
+        # only one trial call is let through to probe the upstream
+        if self.trial_in_flight:
+            raise CircuitOpenErrorMessage(breaker_name=breaker.name)
+        self.trial_in_flight = True
+
+    def on_success(self, breaker: 'CircuitBreaker') -> None:
+        breaker.failures = 0
+        breaker.transition(ClosedBreakerState())
+
+    def on_failure(self, breaker: 'CircuitBreaker', now: float) -> None:
+        breaker.trip(now=now)
+
+    def on_cancel(self, breaker: 'CircuitBreaker') -> None:
+        # the trial told nothing about the upstream; the next call probes
+        self.trial_in_flight = False
@@ -0,0 +1,74 @@
+import contextvars
+import functools
+import inspect
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.metrics import REGISTRY, HistogramSeries
+
+C = TypeVar("C", bound=type)
+
+FACADE = "facade"
+INTERACTOR = "interactor"
+SERVICE = "service"
+REPOSITORY = "repository"
+
+LAYER_SECONDS = REGISTRY.histogram(
+    "layer_call_seconds",
+    "Time spent in facade, interactor, service and repository calls, by"
+    " layer and call.")
+
+# the repository call running on this thread or task, so whatever it
+# sends to the database can be put down to it
+_current_call: contextvars.ContextVar[Optional[str]] = \
+    contextvars.ContextVar("current_call", default=None)
+
+
+def current_call() -> Optional[str]:
+    return _current_call.get()
+
+
+def _timed_function(function: Callable[..., Any], call: str,
+                    series: HistogramSeries, track: bool) -> Callable[..., Any]:
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - started)
+        return timed_async
+
+    @functools.wraps(function)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        token = _current_call.set(call) if track else None
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if token is not None:
+                _current_call.reset(token)
+            series.observe(time.perf_counter() - started)
+    return timed
+
+
+def timed_layer(layer: str) -> Callable[[C], C]:
+    # Times every public method a class defines itself into
+    # layer_call_seconds, labelled "Class.method". Meant for the handful
+    # of classes a request passes through once or a few times; the label
+    # set is resolved here, so a call costs two clock reads and one
+    # histogram update. Generators are left alone, since only their
+    # creation could be timed.
+    def decorate(cls: C) -> C:
+        for name, member in list(vars(cls).items()):
+            if (name.startswith("_") or not inspect.isfunction(member)
+                    or inspect.isgeneratorfunction(member)
+                    or inspect.isasyncgenfunction(member)):
+                continue
+            call = f"{cls.__name__}.{name}"
+            series = LAYER_SECONDS.labels(layer=layer, call=call)
+            setattr(cls, name, _timed_function(
+                member, call, series, track=layer == REPOSITORY))
+        return cls
+    return decorate
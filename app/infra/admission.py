@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from app.core.async_facade import ANALYTICS, CATALOG, CHECKOUT
+from app.core.metrics import REGISTRY
+from app.infra.env import env_float, env_int
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "admission_in_flight",
+    "Requests being served, by route class.")
+ADMISSION_SHED = REGISTRY.counter(
+    "admission_shed_total",
+    "Requests turned away with a 503, by route class and reason.")
+
+# routes a lane cannot do without; they may use the reserved capacity
+# and are only turned away at the hard limit
+PRIORITY_CLASSES = (CHECKOUT,)
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    # None for routes that are not admission controlled (metrics)
+    if path.startswith("/reports"):
+        return ANALYTICS
+    if path.startswith("/shifts"):
+        return ANALYTICS if method == "GET" else CHECKOUT
+    if path.startswith("/receipts"):
+        # the bare path is the (paged) listing
+        listing = method == "GET" and path.rstrip("/") == "/receipts"
+        return ANALYTICS if listing else CHECKOUT
+    if path.startswith("/pay"):
+        return CHECKOUT
+    if path in ("/products/bulk", "/products/prices"):
+        return ANALYTICS
+    if path.startswith(("/products", "/campaign", "/sync")):
+        return CATALOG
+    return None
+
+
+@dataclass
+class AdmissionSettings:
+    # in-flight requests across all route classes; the last
+    # checkout_reserve of them are kept for checkout
+    max_in_flight: int = 64
+    checkout_reserve: int = 16
+    # other classes are turned away while their pool's oldest queued use
+    # case has waited longer than this
+    max_queue_wait: float = 0.5
+    retry_after: int = 1
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionSettings':
+        default = cls()
+        return cls(
+            max_in_flight=env_int("MAX_IN_FLIGHT", default.max_in_flight),
+            checkout_reserve=env_int("CHECKOUT_RESERVE",
+                                     default.checkout_reserve),
+            max_queue_wait=env_float("MAX_QUEUE_WAIT_MS",
+                                     default.max_queue_wait * 1000) / 1000,
+            retry_after=env_int("SHED_RETRY_AFTER", default.retry_after),
+        )
+
+
+@dataclass
+class AdmissionControl:
+    # Turns requests away with a fast 503 before they queue up behind a
+    # saturated database, so latency stays bounded. Reports and listings
+    # go first; checkout keeps checkout_reserve slots of its own. Runs on
+    # the event loop only, so the counts need no lock.
+    settings: AdmissionSettings
+    queue_wait: Callable[[str], float] = lambda route: 0.0
+    _in_flight: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def shed_reason(self, route: str) -> Optional[str]:
+        limit = self.settings.max_in_flight
+        if route not in PRIORITY_CLASSES:
+            limit -= self.settings.checkout_reserve
+            if self.queue_wait(route) > self.settings.max_queue_wait:
+                return "queue_wait"
+        if self.in_flight >= limit:
+            return "in_flight"
+        return None
+
+    async def __call__(
+            self, request: Request,
+            call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        route = route_class(request.method, request.url.path)
+        if route is None:
+            return await call_next(request)
+        reason = self.shed_reason(route)
+        if reason is not None:
+            ADMISSION_SHED.inc(route_class=route, reason=reason)
+            return Response(
+                status_code=503,
+                headers={"Retry-After": str(self.settings.retry_after)})
+
+        self._in_flight[route] = self._in_flight.get(route, 0) + 1
+        ADMISSION_IN_FLIGHT.inc(route_class=route)
+        try:
+            return await call_next(request)
+        finally:
+            self._in_flight[route] -= 1
+            ADMISSION_IN_FLIGHT.dec(route_class=route)
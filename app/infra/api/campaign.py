@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from app.core.async_facade import AsyncPOSCore
 from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
 from app.core.exceptions.products_exceptions import GetProductError
-from app.core.facade import POSCore
+from app.core.models.page import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.core.models.product import NumProduct
 from app.core.schemas.campaign_schema import (
     AddProductInComboRequest,
@@ -20,6 +23,7 @@ from app.core.schemas.campaign_schema import (
     GetAllCampaignsResponse,
     GetOneCampaignResponse,
 )
+from app.infra.api.conditional import catalog_response_async
 from app.infra.dependables import get_core
 
 campaign_api = APIRouter()
@@ -32,9 +36,11 @@ class ComboBase(BaseModel):
 
 @campaign_api.post('/combo', status_code=201,
                    response_model=CreateComboResponse)
-def create_combo_campaign(request: ComboBase,
-                          core: POSCore = Depends(get_core)) -> CreateComboResponse:
-    return core.create_combo_campaign(request=CreateComboRequest(**request.dict()))
+async def create_combo_campaign(request: ComboBase,
+                                core: AsyncPOSCore = Depends(get_core)
+                                ) -> CreateComboResponse:
+    return await core.create_combo_campaign(
+        request=CreateComboRequest(**request.dict()))
 
 
 
@@ -46,11 +52,11 @@ class ProductForComboBase(BaseModel):
 @campaign_api.post('/combo/{campaign_id}/{product}',
                    status_code=201,
                    response_model=AddProductInComboResponse)
-def add_product_to_combo(campaign_id: str,
-                         request: ProductForComboBase,
-            core: POSCore = Depends(get_core)) -> AddProductInComboResponse:
+async def add_product_to_combo(campaign_id: str,
+                               request: ProductForComboBase,
+            core: AsyncPOSCore = Depends(get_core)) -> AddProductInComboResponse:
     try:
-        return core.add_product_to_combo(campaign_id=campaign_id,
+        return await core.add_product_to_combo(campaign_id=campaign_id,
                     request=AddProductInComboRequest(**request.dict()))
     except GetCampaignErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
@@ -67,9 +73,9 @@ class ReceiptDiscountBase(BaseModel):
 @campaign_api.post('/receipt_discount',
                    status_code=201,
                    response_model=CreateReceiptDiscountResponse)
-def create_receipt_discount_campaign(request: ReceiptDiscountBase,
-            core: POSCore = Depends(get_core)) -> CreateReceiptDiscountResponse:
-    return core.create_receipt_discount_campaign(
+async def create_receipt_discount_campaign(request: ReceiptDiscountBase,
+            core: AsyncPOSCore = Depends(get_core)) -> CreateReceiptDiscountResponse:
+    return await core.create_receipt_discount_campaign(
         request=CreateReceiptDiscountRequest(**request.dict()))
 
 
@@ -82,9 +88,9 @@ class DiscountBase(BaseModel):
 @campaign_api.post('/discount',
                    status_code=201,
                    response_model=CreateDiscountResponse)
-def create_discount_campaign(request: DiscountBase,
-        core: POSCore = Depends(get_core)) -> CreateDiscountResponse:
-    return core.create_discount_campaign(
+async def create_discount_campaign(request: DiscountBase,
+        core: AsyncPOSCore = Depends(get_core)) -> CreateDiscountResponse:
+    return await core.create_discount_campaign(
         request=CreateDiscountRequest(**request.dict()))
 
 
@@ -92,12 +98,12 @@ def create_discount_campaign(request: DiscountBase,
 @campaign_api.post('/discount/{campaign_id}/{product_id}',
                    status_code=201,
                    response_model=AddProductInDiscountResponse)
-def add_product_to_discount(campaign_id: str,
-                            product_id: str,
-            core: POSCore = Depends(get_core)) -> AddProductInDiscountResponse:
+async def add_product_to_discount(campaign_id: str,
+                                  product_id: str,
+            core: AsyncPOSCore = Depends(get_core)) -> AddProductInDiscountResponse:
     try:
-        return core.add_product_to_discount(campaign_id=campaign_id,
-                                            product_id=product_id)
+        return await core.add_product_to_discount(campaign_id=campaign_id,
+                                                  product_id=product_id)
     except GetCampaignErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
     except GetProductError as exc:
@@ -106,11 +112,11 @@ def add_product_to_discount(campaign_id: str,
 
 @campaign_api.delete('/discount/{campaign_id}/{product_id}',
                      status_code=200)
-def delete_product_from_discount(campaign_id: str,
-                                 product_id: str,
-                                 core: POSCore = Depends(get_core)) -> None:
+async def delete_product_from_discount(campaign_id: str,
+                                       product_id: str,
+                                       core: AsyncPOSCore = Depends(get_core)) -> None:
     try:
-        return core.delete_product_from_discount(
+        return await core.delete_product_from_discount(
             campaign_id=campaign_id,
             product_id=product_id)
     except GetCampaignErrorMessage as exc:
@@ -127,9 +133,9 @@ class BuyNGetNProductBase(BaseModel):
 
 @campaign_api.post('/buy_n_get_n', status_code=201,
                    response_model=CreateBuyNGetNProductResponse)
-def create_buy_n_get_n_campaign(request: BuyNGetNProductBase,
-             core: POSCore = Depends(get_core)) -> CreateBuyNGetNProductResponse:
-    return core.create_buy_n_get_n_campaign(
+async def create_buy_n_get_n_campaign(request: BuyNGetNProductBase,
+             core: AsyncPOSCore = Depends(get_core)) -> CreateBuyNGetNProductResponse:
+    return await core.create_buy_n_get_n_campaign(
         request=CreateBuyNGetNProductRequest(
             product=request.product, gift=request.gift))
 
@@ -137,10 +143,11 @@ def create_buy_n_get_n_campaign(request: BuyNGetNProductBase,
 @campaign_api.get('/{campaign_id}',
                   status_code=200,
                   response_model=GetOneCampaignResponse)
-def get_one_campaign(campaign_id: str,
-                     core: POSCore = Depends(get_core)) -> GetOneCampaignResponse:
+async def get_one_campaign(campaign_id: str,
+                           core: AsyncPOSCore = Depends(get_core)
+                           ) -> GetOneCampaignResponse:
     try:
-        return core.get_one_campaign(campaign_id=campaign_id)
+        return await core.get_one_campaign(campaign_id=campaign_id)
     except GetCampaignErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
@@ -148,15 +155,22 @@ def get_one_campaign(campaign_id: str,
 
 @campaign_api.get('', status_code=200,
                   response_model=GetAllCampaignsResponse)
-def get_all_campaigns(core: POSCore = Depends(get_core)) -> GetAllCampaignsResponse:
-    return core.get_all_campaigns()
+async def get_all_campaigns(request: Request,
+                            after: Optional[str] = None,
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1,
+                                               le=MAX_PAGE_SIZE),
+                            core: AsyncPOSCore = Depends(get_core)) -> Response:
+    return await catalog_response_async(
+        request, core.catalog_version,
+        resource=f"campaigns?after={after}&limit={limit}",
+        build=lambda: core.get_all_campaigns(after=after, limit=limit))
 
 
 @campaign_api.delete('/{campaign_id}', status_code=200)
-def delete_campaign(campaign_id: str,
-                    core: POSCore = Depends(get_core)) -> None:
+async def delete_campaign(campaign_id: str,
+                          core: AsyncPOSCore = Depends(get_core)) -> None:
     try:
-        core.delete_campaigns(campaign_id=campaign_id)
+        await core.delete_campaigns(campaign_id=campaign_id)
     except GetCampaignErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
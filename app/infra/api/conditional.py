@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.core.services.catalog_version import CatalogVersion
+from app.infra.cache import LRUCache
+
+# pre-serialized bodies keyed by (resource, catalog version); entries of
+# older versions are never asked for again and age out of the LRU
+BODIES: LRUCache[bytes] = LRUCache(name="catalog_bodies", max_size=256)
+
+
+def _not_modified(request: Request, etag: str, modified_at: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return modified_at.replace(microsecond=0) <= since
+    return False
+
+
+def _validators(version: CatalogVersion) -> Tuple[str, datetime]:
+    tag, modified_at = version.current()
+    return f'"{tag}"', datetime.fromtimestamp(modified_at, tz=timezone.utc)
+
+
+def _headers(version: CatalogVersion) -> Tuple[str, datetime, Dict[str, str]]:
+    etag, modified_at = _validators(version)
+    return etag, modified_at, {
+        "ETag": etag,
+        "Last-Modified": format_datetime(modified_at, usegmt=True),
+        "Cache-Control": "no-cache"}
+
+
+def catalog_response(request: Request,
+                     version: CatalogVersion,
+                     resource: str,
+                     build: Callable[[], BaseModel],
+                     cache: Optional[LRUCache[bytes]] = None) -> Response:
+    cache = BODIES if cache is None else cache
+    etag, modified_at, headers = _headers(version)
+    if _not_modified(request, etag, modified_at):
+        return Response(status_code=304, headers=headers)
+
+    key = (resource, etag)
+    body = cache.get(key)
+    if body is None:
+        body = build().model_dump_json().encode()
+        # a body built while a change committed may be newer than its
+        # tag; it is sent, but not kept under that tag
+        if _validators(version)[0] == etag:
+            cache.put(key, body)
+    return Response(content=body, media_type="application/json",
+                    headers=headers)
+
+
+async def catalog_response_async(request: Request,
+                                 version: CatalogVersion,
+                                 resource: str,
+                                 build: Callable[[], Awaitable[BaseModel]],
+                                 cache: Optional[LRUCache[bytes]] = None
+                                 ) -> Response:
+    # same as catalog_response, for a body built on a pool; a 304 or a
+    # cached body never leaves the event loop
+    cache = BODIES if cache is None else cache
+    etag, modified_at, headers = _headers(version)
+    if _not_modified(request, etag, modified_at):
+        return Response(status_code=304, headers=headers)
+
+    key = (resource, etag)
+    body = cache.get(key)
+    if body is None:
+        body = (await build()).model_dump_json().encode()
+        if _validators(version)[0] == etag:
+            cache.put(key, body)
+    return Response(content=body, media_type="application/json",
+                    headers=headers)
@@ -0,0 +1,34 @@
+import time
+from typing import Awaitable, Callable
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import REGISTRY
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time from a request arriving to its response, by method, route and"
+    " status.")
+
+metrics_api = APIRouter()
+
+
+@metrics_api.get("", status_code=200, response_class=PlainTextResponse)
+def get_metrics() -> str:
+    return REGISTRY.render()
+
+
+async def time_requests(
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    # labelled by the route template ("/receipts/{receipt_id}"), not the
+    # path, so the number of series stays fixed
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started, method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code))
+    return response
@@ -2,36 +2,58 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.core.exceptions.receipt_exceptions import ReceiptClosedErrorMessage
-from app.core.facade import POSCore
+from app.core.async_facade import AsyncPOSCore
+from app.core.exceptions.payment_exceptions import ExchangeRateErrorMessage
+from app.core.exceptions.receipt_exceptions import (
+    ReceiptClosedErrorMessage,
+    ReceiptConflictError,
+)
+from app.core.schemas.payment_schema import (
+    BatchPaymentRequest,
+    BatchPaymentResponse,
+)
 from app.infra.dependables import get_core
 
 payment_api = APIRouter()
 
+@payment_api.post('/batch', response_model=BatchPaymentResponse)
+async def pay_batch(request: BatchPaymentRequest,
+                    core: AsyncPOSCore = Depends(get_core)) -> BatchPaymentResponse:
+    return await core.pay_receipts(request=request)
+
 @payment_api.post('/usd/{receipt_id}')
 async def pay_usd(receipt_id: str,
-                  core: POSCore = Depends(get_core)) -> Any:
+                  core: AsyncPOSCore = Depends(get_core)) -> Any:
     try:
         return await core.pay_receipt(receipt_id=receipt_id,
                                       to_currency="USD")
     except ReceiptClosedErrorMessage as exc:
         return HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
+    except ExchangeRateErrorMessage as exc:
+        raise HTTPException(status_code=503, detail=exc.message)
 
 @payment_api.post('/eur/{receipt_id}')
 async def pay_eur(receipt_id: str,
-                  core: POSCore = Depends(get_core)) -> Any:
+                  core: AsyncPOSCore = Depends(get_core)) -> Any:
     try:
         return await core.pay_receipt(receipt_id=receipt_id,
                                       to_currency="EUR")
     except ReceiptClosedErrorMessage as exc:
         return HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
+    except ExchangeRateErrorMessage as exc:
+        raise HTTPException(status_code=503, detail=exc.message)
 
 @payment_api.post('/gel/{receipt_id}')
 async def pay_gel(receipt_id: str,
-                  core: POSCore = Depends(get_core)) -> Any:
+                  core: AsyncPOSCore = Depends(get_core)) -> Any:
     try:
         return await core.pay_receipt(receipt_id=receipt_id,
                                       to_currency="GEL")
     except ReceiptClosedErrorMessage as exc:
         return HTTPException(status_code=403, detail=exc.message)
-
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
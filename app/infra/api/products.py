@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from app.core.async_facade import AsyncPOSCore
 from app.core.exceptions.products_exceptions import (
+    GetProductByBarcodeError,
     GetProductError,
     ProductCreationError,
 )
-from app.core.facade import POSCore
+from app.core.models.page import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.models.product import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from app.core.models.product_import import DEFAULT_IMPORT_CHUNK_SIZE
 from app.core.schemas.products_schema import (
     CreateProductRequest,
     CreateProductResponse,
     GetAllProductResponse,
     GetOneProductResponse,
+    ImportProductsResponse,
+    SearchProductsResponse,
+    UpdatePricesRequest,
+    UpdatePricesResponse,
     UpdateProductPriceRequest,
 )
+from app.infra.api.conditional import catalog_response_async
 from app.infra.dependables import get_core
+from app.infra.product_import import ImportFormat, ProductRowParser, read_lines
 
 products_api = APIRouter()
 
@@ -26,42 +38,113 @@ class ProductBase(BaseModel):
 
 @products_api.post('/', status_code=201,
                    response_model=CreateProductResponse)
-def create_product(request: ProductBase,
-                   core: POSCore = Depends(get_core)) -> CreateProductResponse:
+async def create_product(request: ProductBase,
+                         core: AsyncPOSCore = Depends(get_core)
+                         ) -> CreateProductResponse:
     try:
-        return core.create_product(request=CreateProductRequest(**request.dict()))
+        return await core.create_product(request=CreateProductRequest(**request.dict()))
     except ProductCreationError as exc:
         raise HTTPException(status_code=409, detail=exc.message)
 
 
+@products_api.post('/bulk', status_code=200,
+                   response_model=ImportProductsResponse)
+async def import_products(request: Request,
+                          format: ImportFormat = ImportFormat.CSV,
+                          core: AsyncPOSCore = Depends(get_core)
+                          ) -> ImportProductsResponse:
+    # the body (CSV with a name,barcode,price header, or one JSON object
+    # per line) is read and imported a chunk at a time as it arrives
+    parser = ProductRowParser(format=format)
+    result = ImportProductsResponse(created=0, failed=[])
+    async for lines in read_lines(request.stream(),
+                                  batch_size=DEFAULT_IMPORT_CHUNK_SIZE):
+        rows = list(parser.parse(lines))
+        chunk = await core.import_products(rows)
+        result.created += chunk.created
+        result.failed.extend(chunk.failed)
+    return result
+
+
 @products_api.get('/', status_code=200,
                   response_model=GetAllProductResponse)
-def get_products(core: POSCore = Depends(get_core)) -> GetAllProductResponse:
-    return core.get_all_products()
+async def get_products(request: Request,
+                       after: Optional[str] = None,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       core: AsyncPOSCore = Depends(get_core)) -> Response:
+    return await catalog_response_async(
+        request, core.catalog_version,
+        resource=f"products?after={after}&limit={limit}",
+        build=lambda: core.get_all_products(after=after, limit=limit))
+
+
+# registered before /{product_id}, which would otherwise match "search"
+@products_api.get('/search', status_code=200,
+                  response_model=SearchProductsResponse)
+async def search_products(q: str = Query(..., min_length=1),
+                          limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1,
+                                             le=MAX_SEARCH_LIMIT),
+                          core: AsyncPOSCore = Depends(get_core)
+                          ) -> SearchProductsResponse:
+    # every word is matched as a prefix ("mil cho" finds "Milk Chocolate")
+    return await core.search_products(query=q, limit=limit)
+
+
+@products_api.get("/barcode/{barcode}",
+                  status_code=200,
+                  response_model=GetOneProductResponse)
+async def get_product_by_barcode(barcode: str,
+                    core: AsyncPOSCore = Depends(get_core)) -> GetOneProductResponse:
+    try:
+        return await core.get_product_by_barcode(barcode)
+    except GetProductByBarcodeError as exc:
+        raise HTTPException(status_code=404, detail=exc.message)
 
 
 @products_api.get("/{product_id}",
                   status_code=200,
                   response_model=GetOneProductResponse)
-def get_one_product(product_id: str,
-                    core: POSCore = Depends(get_core)) -> GetOneProductResponse:
+async def get_one_product(product_id: str,
+                          core: AsyncPOSCore = Depends(get_core)
+                          ) -> GetOneProductResponse:
     try:
-        return core.get_one_product(product_id)
+        return await core.get_one_product(product_id)
     except GetProductError as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
 
 
+class ProductPriceItemBase(BaseModel):
+    product_id: str
+    price: float
+
+
 class ProductPriceBase(BaseModel):
     price: float
 
 
+class ProductPricesBase(BaseModel):
+    prices: List[ProductPriceItemBase]
+
+
+# registered before /{product_id}, which would otherwise match "prices"
+@products_api.patch('/prices', status_code=200,
+                    response_model=UpdatePricesResponse)
+async def update_product_prices(request: ProductPricesBase,
+                                core: AsyncPOSCore = Depends(get_core)
+                                ) -> UpdatePricesResponse:
+    if not request.prices:
+        raise HTTPException(status_code=400, detail="No prices given.")
+    return await core.update_product_prices(
+        UpdatePricesRequest(**request.dict()))
+
+
 @products_api.patch('/{product_id}', status_code=200)
-def update_product_price(product_id: str,
-                         request: ProductPriceBase,
-                         core: POSCore = Depends(get_core)) -> None:
+async def update_product_price(product_id: str,
+                               request: ProductPriceBase,
+                               core: AsyncPOSCore = Depends(get_core)) -> None:
     try:
-        core.update_product_price(product_id,
+        await core.update_product_price(product_id,
                     UpdateProductPriceRequest(**request.dict()))
     except GetProductError as exc:
         raise HTTPException(status_code=404, detail=exc.message)
\ No newline at end of file
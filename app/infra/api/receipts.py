@@ -1,22 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
+from app.core.async_facade import AsyncPOSCore
 from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
-from app.core.exceptions.products_exceptions import GetProductError
+from app.core.exceptions.products_exceptions import (
+    GetProductByBarcodeError,
+    GetProductError,
+)
 from app.core.exceptions.receipt_exceptions import (
     GetReceiptErrorMessage,
     ItemNotFoundInReceiptError,
     ReceiptClosedErrorMessage,
+    ReceiptConflictError,
 )
-from app.core.facade import POSCore
+from app.core.models.page import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.core.schemas.receipt_schema import (
     AddComboInReceiptRequest,
     AddGiftInReceiptRequest,
     AddItemInReceiptResponse,
+    AddItemsInReceiptRequest,
     AddProductInReceiptRequest,
     CreateReceiptRequest,
     CreateReceiptResponse,
+    GetAllReceiptResponse,
     GetOneReceiptResponse,
+    ReceiptItemRequest,
+    ScanProductInReceiptRequest,
 )
 from app.infra.dependables import get_core
 
@@ -24,15 +35,28 @@ receipts_api = APIRouter()
 
 
 
+@receipts_api.get("", status_code=200,
+                  response_model=GetAllReceiptResponse)
+async def get_receipts(after: Optional[str] = None,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       shift_id: Optional[str] = None,
+                       status: Optional[bool] = None,
+                       core: AsyncPOSCore = Depends(get_core)) -> GetAllReceiptResponse:
+    return await core.get_receipts(after=after, limit=limit,
+                                   shift_id=shift_id, status=status)
+
+
+
 class ReceiptBase(BaseModel):
     shift_id: str
 
 
 @receipts_api.post("", status_code=201,
                    response_model=CreateReceiptResponse)
-def create_receipt(request: ReceiptBase,
-                   core: POSCore = Depends(get_core)) -> CreateReceiptResponse:
-    return core.create_receipt(request=CreateReceiptRequest(**request.dict()))
+async def create_receipt(request: ReceiptBase,
+                         core: AsyncPOSCore = Depends(get_core)
+                         ) -> CreateReceiptResponse:
+    return await core.create_receipt(request=CreateReceiptRequest(**request.dict()))
 
 
 
@@ -44,22 +68,81 @@ class ProductForReceiptBase(BaseModel):
 @receipts_api.post("/{receipt_id}/product",
                    status_code=201,
                    response_model=AddItemInReceiptResponse)
-def add_product_in_receipt(receipt_id: str,
+async def add_product_in_receipt(receipt_id: str,
                    request: ProductForReceiptBase,
-                   core: POSCore = Depends(get_core)) -> AddItemInReceiptResponse:
+                   core: AsyncPOSCore = Depends(get_core)) -> AddItemInReceiptResponse:
     if request.quantity < 1:
         raise HTTPException(status_code=400, detail="Invalid quantity")
 
 
     try:
-        return core.add_product_in_receipt(receipt_id=receipt_id,
+        return await core.add_product_in_receipt(receipt_id=receipt_id,
                 request=AddProductInReceiptRequest(**request.dict()))
     except GetReceiptErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
     except ReceiptClosedErrorMessage as exc:
         raise HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
+    except GetProductError as exc:
+        raise HTTPException(status_code=404, detail=exc.message)
+
+
+
+class ItemsForReceiptBase(BaseModel):
+    items: List[ReceiptItemRequest]
+
+
+@receipts_api.post("/{receipt_id}/items",
+                   status_code=201,
+                   response_model=AddItemInReceiptResponse)
+async def add_items_in_receipt(receipt_id: str,
+                   request: ItemsForReceiptBase,
+                   core: AsyncPOSCore = Depends(get_core)) -> AddItemInReceiptResponse:
+    if not request.items or any(item.quantity < 1 for item in request.items):
+        raise HTTPException(status_code=400, detail="Invalid quantity")
+
+    try:
+        return await core.add_items_in_receipt(receipt_id=receipt_id,
+                request=AddItemsInReceiptRequest(items=request.items))
+    except GetReceiptErrorMessage as exc:
+        raise HTTPException(status_code=404, detail=exc.message)
+    except ReceiptClosedErrorMessage as exc:
+        raise HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
     except GetProductError as exc:
         raise HTTPException(status_code=404, detail=exc.message)
+    except GetCampaignErrorMessage as exc:
+        raise HTTPException(status_code=404, detail=exc.message)
+
+
+
+class ScanForReceiptBase(BaseModel):
+    barcode: str
+    quantity: int
+
+
+@receipts_api.post("/{receipt_id}/scan",
+                   status_code=201,
+                   response_model=AddItemInReceiptResponse)
+async def scan_product_in_receipt(receipt_id: str,
+                   request: ScanForReceiptBase,
+                   core: AsyncPOSCore = Depends(get_core)) -> AddItemInReceiptResponse:
+    if request.quantity < 1:
+        raise HTTPException(status_code=400, detail="Invalid quantity")
+
+    try:
+        return await core.scan_product_in_receipt(receipt_id=receipt_id,
+                request=ScanProductInReceiptRequest(**request.dict()))
+    except GetReceiptErrorMessage as exc:
+        raise HTTPException(status_code=404, detail=exc.message)
+    except ReceiptClosedErrorMessage as exc:
+        raise HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
+    except GetProductByBarcodeError as exc:
+        raise HTTPException(status_code=404, detail=exc.message)
 
 
 
@@ -72,19 +155,21 @@ class ComboForReceiptBase(BaseModel):
 @receipts_api.post("/{receipt_id}/combo",
                    status_code=201,
                    response_model=AddItemInReceiptResponse)
-def add_combo_in_receipt(receipt_id: str,
+async def add_combo_in_receipt(receipt_id: str,
                    request: ComboForReceiptBase,
-                   core: POSCore = Depends(get_core)) -> AddItemInReceiptResponse:
+                   core: AsyncPOSCore = Depends(get_core)) -> AddItemInReceiptResponse:
     if request.quantity < 1:
         raise HTTPException(status_code=400, detail="Invalid quantity")
 
     try:
-        return core.add_combo_in_receipt(receipt_id=receipt_id,
+        return await core.add_combo_in_receipt(receipt_id=receipt_id,
                     request=AddComboInReceiptRequest(**request.dict()))
     except GetReceiptErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
     except ReceiptClosedErrorMessage as exc:
         raise HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
     except GetCampaignErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
@@ -98,34 +183,38 @@ class GiftForReceiptBase(BaseModel):
 @receipts_api.post("/{receipt_id}/buy_n_get_n",
                    status_code=201,
                    response_model=AddItemInReceiptResponse)
-def add_gift_in_receipt(receipt_id: str,
+async def add_gift_in_receipt(receipt_id: str,
                    request: GiftForReceiptBase,
-                   core: POSCore = Depends(get_core)) -> AddItemInReceiptResponse:
+                   core: AsyncPOSCore = Depends(get_core)) -> AddItemInReceiptResponse:
     if request.quantity < 1:
         raise HTTPException(status_code=400, detail="Invalid quantity")
 
     try:
-        return core.add_gift_in_receipt(receipt_id=receipt_id,
+        return await core.add_gift_in_receipt(receipt_id=receipt_id,
             request=AddGiftInReceiptRequest(**request.dict()))
     except GetReceiptErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
     except ReceiptClosedErrorMessage as exc:
         raise HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
     except GetCampaignErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
 
 
 @receipts_api.delete("/{receipt_id}/{item_id}", status_code=200)
-def delete_item_from_receipt(receipt_id: str,
-                             item_id: str,
-                             core: POSCore = Depends(get_core)) -> None:
+async def delete_item_from_receipt(receipt_id: str,
+                                   item_id: str,
+                                   core: AsyncPOSCore = Depends(get_core)) -> None:
     try:
-        core.delete_item_from_receipt(receipt_id=receipt_id, item_id=item_id)
+        await core.delete_item_from_receipt(receipt_id=receipt_id, item_id=item_id)
     except GetReceiptErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
     except ReceiptClosedErrorMessage as exc:
         raise HTTPException(status_code=403, detail=exc.message)
+    except ReceiptConflictError as exc:
+        raise HTTPException(status_code=409, detail=exc.message)
     except ItemNotFoundInReceiptError as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
@@ -133,10 +222,11 @@ def delete_item_from_receipt(receipt_id: str,
 
 @receipts_api.get("/{receipt_id}", status_code=200,
                   response_model=GetOneReceiptResponse)
-def get_one_receipt(receipt_id: str,
-                    core: POSCore = Depends(get_core)) -> GetOneReceiptResponse:
+async def get_one_receipt(receipt_id: str,
+                          core: AsyncPOSCore = Depends(get_core)
+                          ) -> GetOneReceiptResponse:
     try:
-        return core.get_one_receipt(receipt_id=receipt_id)
+        return await core.get_one_receipt(receipt_id=receipt_id)
     except GetReceiptErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
@@ -145,10 +235,10 @@ def get_one_receipt(receipt_id: str,
 
 
 @receipts_api.delete("/{receipt_id}", status_code=200)
-def delete_receipt(receipt_id: str,
-                   core: POSCore = Depends(get_core)) -> None:
+async def delete_receipt(receipt_id: str,
+                         core: AsyncPOSCore = Depends(get_core)) -> None:
     try:
-        core.delete_receipt(receipt_id=receipt_id)
+        await core.delete_receipt(receipt_id=receipt_id)
     except GetReceiptErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
     except ReceiptClosedErrorMessage as exc:
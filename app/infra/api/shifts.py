@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 
+from app.core.async_facade import AsyncPOSCore
 from app.core.exceptions.shift_exceptions import (
     GetShiftErrorMessage,
     ShiftClosedErrorMessage,
 )
-from app.core.facade import POSCore
 from app.core.schemas.shift_schema import (
     CreateShiftResponse,
     GetOneShiftResponse,
@@ -17,17 +17,18 @@ shifts_api = APIRouter()
 
 @shifts_api.post("", status_code=201,
                  response_model=CreateShiftResponse)
-def create_shift(core: POSCore = Depends(get_core)) -> CreateShiftResponse:
-    return core.create_shift()
+async def create_shift(core: AsyncPOSCore = Depends(get_core)) -> CreateShiftResponse:
+    return await core.create_shift()
 
 
 
 @shifts_api.get("/{shift_id}", status_code=200,
                 response_model=GetOneShiftResponse)
-def get_one_shift(shift_id: str,
-                    core: POSCore = Depends(get_core)) -> GetOneShiftResponse:
+async def get_one_shift(shift_id: str,
+                          core: AsyncPOSCore = Depends(get_core)
+                          ) -> GetOneShiftResponse:
     try:
-        return core.get_one_shift(shift_id=shift_id)
+        return await core.get_one_shift(shift_id=shift_id)
     except GetShiftErrorMessage as exc:
         raise HTTPException(status_code=404, detail=exc.message)
 
@@ -35,10 +36,10 @@ def get_one_shift(shift_id: str,
 
 
 @shifts_api.patch("/{shift_id}", status_code=200)
-def close_shift(shift_id: str,
-                  core: POSCore = Depends(get_core)) -> None:
+async def close_shift(shift_id: str,
+                        core: AsyncPOSCore = Depends(get_core)) -> None:
     try:
-        return core.update_shift_status(shift_id=shift_id,
+        return await core.update_shift_status(shift_id=shift_id,
                               request=UpdateShiftStateRequest(
                                   status=False
                                   )
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.core.async_facade import AsyncPOSCore
+from app.core.models.page import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.schemas.sync_schema import GetChangesResponse
+from app.infra.dependables import get_core
+
+sync_api = APIRouter()
+
+
+@sync_api.get('/changes', status_code=200, response_model=GetChangesResponse)
+async def get_changes(since: int = Query(0, ge=0),
+                      limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                      core: AsyncPOSCore = Depends(get_core)) -> GetChangesResponse:
+    return await core.get_catalog_changes(since=since, limit=limit)
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Generic, Hashable, Optional, TypeVar
+
+from app.core.metrics import REGISTRY
+
+V = TypeVar("V")
+
+CACHE_HITS = REGISTRY.counter(
+    "cache_hits_total", "Lookups answered from an in-process cache.")
+CACHE_MISSES = REGISTRY.counter(
+    "cache_misses_total", "Lookups that fell through to the repository.")
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "cache_hit_ratio", "Share of lookups answered from the cache so far.")
+
+
+def _hit_ratios() -> None:
+    # derived when scraped, so lookups pay nothing for it
+    hits = {labels["cache"]: value for labels, value in CACHE_HITS.series()}
+    misses = {labels["cache"]: value
+              for labels, value in CACHE_MISSES.series()}
+    for name in hits.keys() | misses.keys():
+        found = hits.get(name, 0.0)
+        CACHE_HIT_RATIO.set(found / (found + misses.get(name, 0.0)),
+                            cache=name)
+
+
+REGISTRY.collector(_hit_ratios)
+
+
+@dataclass
+class LRUCache(Generic[V]):
+    name: str
+    max_size: int = 1024
+    _entries: "OrderedDict[Hashable, V]" = field(default_factory=OrderedDict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            if key not in self._entries:
+                CACHE_MISSES.inc(cache=self.name)
+                return None
+            self._entries.move_to_end(key)
+            CACHE_HITS.inc(cache=self.name)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: V) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
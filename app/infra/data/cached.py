@@ -0,0 +1,423 @@
+import copy
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
+from app.core.factories.repo_factory import RepoFactory
+from app.core.models.campaign import CampaignType, DiscountCampaign
+from app.core.models.product import Product
+from app.core.models.receipt import Receipt
+from app.core.repositories.campaign_repository import (
+    IBuyNGetNCampaignRepository,
+    IComboCampaignRepository,
+    IProductDiscountCampaignRepository,
+    IReceiptDiscountCampaignRepository,
+)
+from app.core.repositories.catalog_change_repository import (
+    ICatalogChangeRepository,
+)
+from app.core.repositories.exchange_rate_repository import (
+    IExchangeRateRepository,
+)
+from app.core.repositories.product_repository import IProductRepository
+from app.core.repositories.receipt_repesitory import IReceiptRepository
+from app.core.repositories.shift_repository import IShiftRepository
+from app.infra.cache import LRUCache
+from app.infra.data.invalidation import CacheInvalidator
+from app.infra.data.write_behind import (
+    WriteBehindReceiptRepository,
+    WriteBehindSettings,
+)
+from app.infra.snapshot import CatalogSnapshot
+
+
+@dataclass
+class CachedProductRepository(IProductRepository):
+    inner: IProductRepository
+    cache_size: int = 1024
+    _products: LRUCache[Product] = field(init=False)
+    _barcodes: LRUCache[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._products = LRUCache(name="catalog", max_size=self.cache_size)
+        # barcodes never change once a product exists, so barcode -> id
+        # entries only go away through eviction
+        self._barcodes = LRUCache(name="barcodes", max_size=self.cache_size)
+
+    def _remember(self, product: Product) -> Product:
+        # callers are free to mutate what they get back, so the cache
+        # keeps its own copy and hands out copies
+        self._products.put(product.id, copy.copy(product))
+        self._barcodes.put(product.barcode, product.id)
+        return product
+
+    def create(self, product: Product) -> Product:
+        return self._remember(self.inner.create(product=product))
+
+    def create_many(self, products: List[Product]) -> List[Product]:
+        # bulk imports would only flush the cache
+        return self.inner.create_many(products=products)
+
+    def get_one(self, product_id: str) -> Optional[Product]:
+        cached = self._products.get(product_id)
+        if cached is not None:
+            return copy.copy(cached)
+
+        product = self.inner.get_one(product_id=product_id)
+        if product is None:
+            return None
+        return copy.copy(self._remember(product))
+
+    def get_all(self) -> List[Product]:
+        return self.inner.get_all()
+
+    def get_page(self, after: Optional[str], limit: int) -> List[Product]:
+        return self.inner.get_page(after=after, limit=limit)
+
+    def update(self, product_id: str, price: float) -> None:
+        self.inner.update(product_id=product_id, price=price)
+        self._products.pop(product_id)
+
+    def update_prices(self, prices: Dict[str, float]) -> List[str]:
+        updated = self.inner.update_prices(prices=prices)
+        for product_id in updated:
+            self._products.pop(product_id)
+        return updated
+
+    def clear(self) -> None:
+        self._products.clear()
+        self._barcodes.clear()
+
+    def has_barcode(self, barcode: str) -> bool:
+        if self._barcodes.get(barcode) is not None:
+            return True
+        return self.inner.has_barcode(barcode=barcode)
+
+    def get_by_barcode(self, barcode: str) -> Optional[Product]:
+        product_id = self._barcodes.get(barcode)
+        if product_id is not None:
+            cached = self._products.get(product_id)
+            if cached is not None:
+                return copy.copy(cached)
+
+        product = self.inner.get_by_barcode(barcode=barcode)
+        if product is None:
+            return None
+        return copy.copy(self._remember(product))
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        return self.inner.search(query=query, limit=limit)
+
+
+@dataclass
+class SnapshotProductRepository(IProductRepository):
+    inner: IProductRepository
+    snapshot: CatalogSnapshot
+
+    def create(self, product: Product) -> Product:
+        product = self.inner.create(product=product)
+        self.snapshot.note_write()
+        return product
+
+    def create_many(self, products: List[Product]) -> List[Product]:
+        created = self.inner.create_many(products=products)
+        self.snapshot.note_write()
+        return created
+
+    def get_one(self, product_id: str) -> Optional[Product]:
+        mapped = self.snapshot.current()
+        entry = mapped.get(product_id) if mapped is not None else None
+        if entry is not None:
+            return entry.product
+        return self.inner.get_one(product_id=product_id)
+
+    def get_all(self) -> List[Product]:
+        return self.inner.get_all()
+
+    def get_page(self, after: Optional[str], limit: int) -> List[Product]:
+        return self.inner.get_page(after=after, limit=limit)
+
+    def update(self, product_id: str, price: float) -> None:
+        self.inner.update(product_id=product_id, price=price)
+        self.snapshot.note_write()
+
+    def update_prices(self, prices: Dict[str, float]) -> List[str]:
+        updated = self.inner.update_prices(prices=prices)
+        self.snapshot.note_write()
+        return updated
+
+    def has_barcode(self, barcode: str) -> bool:
+        return self.inner.has_barcode(barcode=barcode)
+
+    def get_by_barcode(self, barcode: str) -> Optional[Product]:
+        mapped = self.snapshot.current()
+        entry = mapped.get_by_barcode(barcode) if mapped is not None else None
+        if entry is not None:
+            return entry.product
+        return self.inner.get_by_barcode(barcode=barcode)
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        return self.inner.search(query=query, limit=limit)
+
+
+@dataclass
+class SnapshotDiscountCampaignRepository(IProductDiscountCampaignRepository):
+    inner: IProductDiscountCampaignRepository
+    snapshot: CatalogSnapshot
+
+    def create(self,
+               discount_campaign: DiscountCampaign) -> DiscountCampaign:
+        campaign = self.inner.create(discount_campaign=discount_campaign)
+        self.snapshot.note_write()
+        return campaign
+
+    def get_all(self) -> List[DiscountCampaign]:
+        return self.inner.get_all()
+
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[DiscountCampaign]:
+        return self.inner.get_page(after=after, limit=limit)
+
+    def get_one_campaign(self,
+                campaign_id: str) -> Optional[DiscountCampaign]:
+        return self.inner.get_one_campaign(campaign_id=campaign_id)
+
+    def add_product(self, product_id: str,
+                    campaign_id: str) -> Optional[DiscountCampaign]:
+        campaign = self.inner.add_product(product_id=product_id,
+                                          campaign_id=campaign_id)
+        self.snapshot.note_write()
+        return campaign
+
+    def delete_campaign(self, campaign_id: str) -> None:
+        self.inner.delete_campaign(campaign_id=campaign_id)
+        self.snapshot.note_write()
+
+    def _from_snapshot(self, product_ids: List[str]
+                       ) -> Optional[Dict[str, DiscountCampaign]]:
+        mapped = self.snapshot.current()
+        if mapped is None:
+            return None
+
+        # pricing only reads the discount, so the campaign is rebuilt
+        # with just the products that were asked about
+        campaigns: Dict[str, DiscountCampaign] = {}
+        for product_id in product_ids:
+            entry = mapped.get(product_id)
+            if entry is None:
+                return None
+            if entry.campaign_id is not None and entry.discount is not None:
+                campaigns[product_id] = DiscountCampaign(
+                    id=entry.campaign_id,
+                    campaign_type=CampaignType.DISCOUNT,
+                    discount=entry.discount,
+                    products=[product_id])
+        return campaigns
+
+    def get_campaign_with_product(self,
+                    product_id: str) -> Optional[DiscountCampaign]:
+        campaigns = self._from_snapshot([product_id])
+        if campaigns is None:
+            return self.inner.get_campaign_with_product(product_id=product_id)
+        return campaigns.get(product_id)
+
+    def get_campaigns_with_products(self,
+                    product_ids: List[str]) -> Dict[str, DiscountCampaign]:
+        campaigns = self._from_snapshot(product_ids)
+        if campaigns is None:
+            return self.inner.get_campaigns_with_products(
+                product_ids=product_ids)
+        return campaigns
+
+    def delete_product(self, product_id: str,
+                       campaign_id: str) -> None:
+        self.inner.delete_product(product_id=product_id,
+                                  campaign_id=campaign_id)
+        self.snapshot.note_write()
+
+
+@dataclass
+class CachedReceiptRepository(IReceiptRepository):
+    inner: IReceiptRepository
+    cache_size: int = 256
+    _open: LRUCache[Receipt] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._open = LRUCache(name="open_receipts", max_size=self.cache_size)
+
+    def _remember(self, receipt: Receipt) -> None:
+        # receipts are mutated in place while being rung up (and the
+        # receipt campaign is applied to the returned object), so only
+        # detached copies go in and come out of the cache
+        if receipt.status:
+            self._open.put(receipt.id, copy.deepcopy(receipt))
+        else:
+            self._open.pop(receipt.id)
+
+    def clear(self) -> None:
+        self._open.clear()
+
+    def forget(self, receipt_ids: List[str]) -> None:
+        for receipt_id in receipt_ids:
+            self._open.pop(receipt_id)
+
+    def create(self, receipt: Receipt) -> Receipt:
+        receipt = self.inner.create(receipt=receipt)
+        self._remember(receipt)
+        return receipt
+
+    def get_one(self, receipt_id: str) -> Optional[Receipt]:
+        cached = self._open.get(receipt_id)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        receipt = self.inner.get_one(receipt_id=receipt_id)
+        if receipt is not None:
+            self._remember(receipt)
+        return receipt
+
+    def get_all(self) -> List[Receipt]:
+        return self.inner.get_all()
+
+    def get_page(self, after: Optional[str], limit: int,
+                 shift_id: Optional[str] = None,
+                 status: Optional[bool] = None) -> List[Receipt]:
+        return self.inner.get_page(after=after, limit=limit,
+                                   shift_id=shift_id, status=status)
+
+    def delete(self, receipt_id: str) -> None:
+        self.inner.delete(receipt_id=receipt_id)
+        self._open.pop(receipt_id)
+
+    def update(self, receipt_id: str, status: bool,
+               expected_version: Optional[int] = None) -> None:
+        try:
+            self.inner.update(receipt_id=receipt_id, status=status,
+                              expected_version=expected_version)
+        finally:
+            # closed, or the cached copy lost a race; either way it goes
+            self._open.pop(receipt_id)
+
+    def close_many(self, receipt_ids: List[str],
+                   expected_versions: Optional[Dict[str, int]] = None) -> None:
+        try:
+            self.inner.close_many(receipt_ids=receipt_ids,
+                                  expected_versions=expected_versions)
+        finally:
+            for receipt_id in receipt_ids:
+                self._open.pop(receipt_id)
+
+    def add_product(self, receipt: Receipt,
+                    expected_version: Optional[int] = None) -> Receipt:
+        try:
+            receipt = self.inner.add_product(
+                receipt=receipt, expected_version=expected_version)
+        except ReceiptConflictError:
+            # the cached copy lost a race; a retry reads the winner
+            self._open.pop(receipt.id)
+            raise
+        self._remember(receipt)
+        return receipt
+
+    def delete_item(self, receipt: Receipt) -> None:
+        try:
+            self.inner.delete_item(receipt=receipt)
+        except ReceiptConflictError:
+            self._open.pop(receipt.id)
+            raise
+        self._remember(receipt)
+
+    def flush(self, receipt_ids: List[str]) -> None:
+        self.inner.flush(receipt_ids=receipt_ids)
+
+
+@dataclass
+class CachedRepoFactory(RepoFactory):
+    inner: RepoFactory
+    catalog_cache_size: int = 1024
+    open_receipt_cache_size: int = 256
+    # shared catalog snapshot; lookups go through it before the caches
+    snapshot: Optional[CatalogSnapshot] = None
+    # drops the caches when another process writes to the database
+    invalidator: Optional[CacheInvalidator] = None
+    # queue receipt line changes and write them in groups
+    write_behind: Optional[WriteBehindSettings] = None
+    receipt_writer: Optional[WriteBehindReceiptRepository] = field(
+        init=False, default=None)
+    _products: IProductRepository = field(init=False)
+    _cached_products: CachedProductRepository = field(init=False)
+    _discount_campaign: IProductDiscountCampaignRepository = field(init=False)
+    _receipts: CachedReceiptRepository = field(init=False)
+
+    def __post_init__(self) -> None:
+        products = CachedProductRepository(
+            inner=self.inner.products(),
+            cache_size=self.catalog_cache_size)
+        self._products = self._cached_products = products
+        self._discount_campaign = self.inner.discount_campaign()
+        if self.snapshot is not None:
+            self._products = SnapshotProductRepository(
+                inner=self._products, snapshot=self.snapshot)
+            self._discount_campaign = SnapshotDiscountCampaignRepository(
+                inner=self._discount_campaign, snapshot=self.snapshot)
+        receipts = self.inner.receipts()
+        if self.write_behind is not None and self.write_behind.enabled:
+            receipts = self.receipt_writer = WriteBehindReceiptRepository(
+                inner=receipts,
+                unit_of_work=self.inner.unit_of_work,
+                flush_interval=self.write_behind.flush_interval,
+                max_pending_ops=self.write_behind.max_pending_ops)
+        self._receipts = CachedReceiptRepository(
+            inner=receipts,
+            cache_size=self.open_receipt_cache_size)
+        if self.invalidator is not None:
+            self.invalidator.subscribe("products", products.clear)
+            self.invalidator.subscribe_receipts(self._receipts.forget)
+            if self.snapshot is not None:
+                # the mapped snapshot may predate another worker's write;
+                # it is passed over until a newer generation is published
+                self.invalidator.subscribe("products", self.snapshot.note_write)
+                self.invalidator.subscribe("campaigns",
+                                           self.snapshot.note_write)
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[None]:
+        try:
+            with self.inner.unit_of_work():
+                yield
+        except BaseException:
+            # the caches may hold writes that were just rolled back
+            self._cached_products.clear()
+            self._receipts.clear()
+            raise
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        self.inner.after_commit(callback)
+
+    def products(self) -> IProductRepository:
+        return self._products
+
+    def receipts(self) -> IReceiptRepository:
+        return self._receipts
+
+    def shifts(self) -> IShiftRepository:
+        return self.inner.shifts()
+
+    def discount_campaign(self) -> IProductDiscountCampaignRepository:
+        return self._discount_campaign
+
+    def combo_campaign(self) -> IComboCampaignRepository:
+        return self.inner.combo_campaign()
+
+    def receipt_discount_campaign(self) -> IReceiptDiscountCampaignRepository:
+        return self.inner.receipt_discount_campaign()
+
+    def buy_n_get_n_campaign(self) -> IBuyNGetNCampaignRepository:
+        return self.inner.buy_n_get_n_campaign()
+
+    def exchange_rates(self) -> IExchangeRateRepository:
+        return self.inner.exchange_rates()
+
+    def catalog_changes(self) -> ICatalogChangeRepository:
+        return self.inner.catalog_changes()
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+IdGenerator = Callable[[], str]
+
+
+def uuid4_id() -> str:
+    return str(uuid.uuid4())
+
+
+@dataclass
+class Uuid7Generator:
+    # RFC 9562 version 7: 48 bits of unix milliseconds, then a 12 bit
+    # counter and 62 random bits. Ids made later sort later, so inserts
+    # append to the right edge of the primary key index instead of
+    # splitting pages all over it, and id order is creation order.
+    _last_ms: int = 0
+    _counter: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __call__(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                # start low in the counter range so a burst within one
+                # millisecond has room to count up
+                self._last_ms = now_ms
+                self._counter = int.from_bytes(os.urandom(2), "big") & 0x3FF
+            else:
+                self._counter += 1
+                if self._counter > 0xFFF:
+                    # more than 4096 ids in a millisecond (or the clock
+                    # went back): borrow the next millisecond
+                    self._last_ms += 1
+                    self._counter = 0
+            timestamp, counter = self._last_ms, self._counter
+
+        random = int.from_bytes(os.urandom(8), "big") & (2 ** 62 - 1)
+        value = ((timestamp & (2 ** 48 - 1)) << 80
+                 | 0x7 << 76
+                 | counter << 64
+                 | 0b10 << 62
+                 | random)
+        return str(uuid.UUID(int=value))
+
+
+_uuid7 = Uuid7Generator()
+
+
+def uuid7_id() -> str:
+    return _uuid7()
+
+
+ID_GENERATORS: Dict[str, IdGenerator] = {
+    "uuid4": uuid4_id,
+    "uuid7": uuid7_id,
+}
+
+
+def id_generator(name: str) -> IdGenerator:
+    try:
+        return ID_GENERATORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown id generator {name!r}, expected one of"
+                         f" {', '.join(ID_GENERATORS)}") from None
+
+
+def id_timestamp(entity_id: str) -> Optional[float]:
+    # creation time of a version 7 id; ids made before the switch (uuid4)
+    # carry none and stay valid as they are
+    try:
+        parsed = uuid.UUID(entity_id)
+    except ValueError:
+        return None
+    if parsed.version != 7:
+        return None
+    return (parsed.int >> 80) / 1000
@@ -1,7 +1,18 @@
-import uuid
+import bisect
+from contextlib import nullcontext
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import (
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
 from app.core.factories.repo_factory import RepoFactory
 from app.core.models.campaign import (
     BuyNGetNCampaign,
@@ -9,7 +20,9 @@ from app.core.models.campaign import (
     DiscountCampaign,
     ReceiptCampaign,
 )
-from app.core.models.product import Product
+from app.core.models.catalog_change import CatalogChange, ChangeEntity, ChangeOp
+from app.core.models.exchange_rate import ExchangeRate
+from app.core.models.product import Product, search_terms
 from app.core.models.receipt import ProductForReceipt, Receipt
 from app.core.models.shift import Shift
 from app.core.repositories.campaign_repository import (
@@ -18,49 +31,135 @@ from app.core.repositories.campaign_repository import (
     IProductDiscountCampaignRepository,
     IReceiptDiscountCampaignRepository,
 )
+from app.core.repositories.catalog_change_repository import (
+    ICatalogChangeRepository,
+)
+from app.core.repositories.exchange_rate_repository import (
+    IExchangeRateRepository,
+)
 from app.core.repositories.product_repository import IProductRepository
 from app.core.repositories.receipt_repesitory import IReceiptRepository
 from app.core.repositories.shift_repository import IShiftRepository
 from app.core.state.shift_state import ClosedShiftState, OpenShiftState
+from app.infra.data.ids import IdGenerator, uuid7_id
+
+T = TypeVar("T")
+
+
+def _page(store: Dict[str, T], after: Optional[str], limit: int) -> List[T]:
+    # same ordering as the SQLite keyset queries: by id, strictly after
+    # the cursor
+    ids = sorted(key for key in store if after is None or key > after)
+    return [store[key] for key in ids[:limit]]
 
 
 @dataclass
 class ProductInMemoryRepository(IProductRepository):
     _store: Dict[str, Product] = field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
+    _barcodes: Dict[str, str] = field(default_factory=dict)
+    # inverted index over name and barcode words; the sorted token list
+    # turns a prefix lookup into a bisect plus a short scan
+    _index: Dict[str, Set[str]] = field(default_factory=dict)
+    _tokens: List[str] = field(default_factory=list)
 
     def create(self, product: Product) -> Product:
-        product_id = str(uuid.uuid4())
+        product_id = self.new_id()
         setattr(product, "id", product_id)
         self._store[product_id] = product
+        self._barcodes[product.barcode] = product_id
+        self._add_to_index(product)
         return product
 
+    def _add_to_index(self, product: Product) -> None:
+        for token in search_terms(f"{product.name} {product.barcode}"):
+            if token not in self._index:
+                self._index[token] = set()
+                bisect.insort(self._tokens, token)
+            self._index[token].add(product.id)
+
+    def _prefixed(self, prefix: str) -> Set[str]:
+        found: Set[str] = set()
+        start = bisect.bisect_left(self._tokens, prefix)
+        for token in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            found |= self._index[token]
+        return found
+
+    def create_many(self, products: List[Product]) -> List[Product]:
+        return [self.create(product) for product in products
+                if product.barcode not in self._barcodes]
+
     def get_one(self, product_id: str) -> Optional[Product]:
         return self._store.get(product_id)
 
     def get_all(self) -> List[Product]:
         return list(self._store.values())
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[Product]:
+        return _page(self._store, after, limit)
+
     def update(self, product_id: str, price: float) -> None:
         product = self._store[product_id]
         product.price = price
 
+    def update_prices(self, prices: Dict[str, float]) -> List[str]:
+        updated = [product_id for product_id in prices
+                   if product_id in self._store]
+        for product_id in updated:
+            self._store[product_id].price = prices[product_id]
+        return updated
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+
+        matches = self._prefixed(terms[0])
+        for term in terms[1:]:
+            matches &= self._prefixed(term)
+
+        # products where more terms are whole words rank first
+        def rank(product_id: str) -> Tuple[int, str]:
+            exact = sum(product_id in self._index.get(term, ())
+                        for term in terms)
+            return -exact, self._store[product_id].name
+
+        return [self._store[product_id]
+                for product_id in sorted(matches, key=rank)[:limit]]
 
     def has_barcode(self, barcode: str) -> bool:
-        return any(product.barcode == barcode for product in self._store.values())
+        return barcode in self._barcodes
+
+    def get_by_barcode(self, barcode: str) -> Optional[Product]:
+        product_id = self._barcodes.get(barcode)
+        if product_id is None:
+            return None
+        return self._store.get(product_id)
 
 
 
 @dataclass
 class ReceiptInMemoryRepository(IReceiptRepository):
     _store: Dict[str, Receipt] = field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
 
     def create(self, receipt: Receipt) -> Receipt:
-        receipt_id = str(uuid.uuid4())
+        receipt_id = self.new_id()
         setattr(receipt, "id", receipt_id)
         self._store[receipt_id] = receipt
         return receipt
 
-    def add_product(self, receipt: Receipt) -> Receipt:
+    def add_product(self, receipt: Receipt,
+                    expected_version: Optional[int] = None) -> Receipt:
+        if expected_version is None:
+            expected_version = receipt.version
+        stored = self._store.get(receipt.id)
+        if stored is None or stored.version != expected_version:
+            raise ReceiptConflictError(receipt_id=receipt.id)
+        receipt.version += 1
         self._store[receipt.id] = receipt
         return receipt
 
@@ -70,24 +169,52 @@ class ReceiptInMemoryRepository(IReceiptRepository):
     def get_all(self) -> List[Receipt]:
         return list(self._store.values())
 
-    def update(self, receipt_id: str, status: bool) -> None:
+    def get_page(self, after: Optional[str], limit: int,
+                 shift_id: Optional[str] = None,
+                 status: Optional[bool] = None) -> List[Receipt]:
+        matching = {
+            receipt_id: receipt for receipt_id, receipt in self._store.items()
+            if (shift_id is None or receipt.shift_id == shift_id)
+            and (status is None or receipt.status == status)}
+        return _page(matching, after, limit)
+
+    def update(self, receipt_id: str, status: bool,
+               expected_version: Optional[int] = None) -> None:
         receipt = self._store[receipt_id]
+        if expected_version is not None and receipt.version != expected_version:
+            raise ReceiptConflictError(receipt_id=receipt_id)
         receipt.status = status
+        receipt.version += 1
+
+    def close_many(self, receipt_ids: List[str],
+                   expected_versions: Optional[Dict[str, int]] = None) -> None:
+        if expected_versions is not None:
+            for receipt_id in receipt_ids:
+                if (self._store[receipt_id].version
+                        != expected_versions[receipt_id]):
+                    raise ReceiptConflictError(receipt_id=receipt_id)
+        for receipt_id in receipt_ids:
+            self._store[receipt_id].status = False
+            self._store[receipt_id].version += 1
 
     def delete(self, receipt_id: str) -> None:
         self._store.pop(receipt_id)
 
     def delete_item(self, receipt: Receipt) -> None:
-        self._store[receipt.id] = receipt
+        self.add_product(receipt)
+
+    def flush(self, receipt_ids: List[str]) -> None:
+        pass
 
 
 
 @dataclass
 class ShiftInMemoryRepository(IShiftRepository):
     _store: Dict[str, Shift] = field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
 
     def create(self, shift: Shift) -> Shift:
-        shift_id = str(uuid.uuid4())
+        shift_id = self.new_id()
         setattr(shift, "id", shift_id)
         self._store[shift_id] = shift
         return shift
@@ -115,10 +242,11 @@ class ShiftInMemoryRepository(IShiftRepository):
 class ProductDiscountCampaignInMemoryRepository(
     IProductDiscountCampaignRepository):
     _store: Dict[str, DiscountCampaign] = field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
 
     def create(self,
                discount_campaign: DiscountCampaign) -> DiscountCampaign:
-        campaign_id = str(uuid.uuid4())
+        campaign_id = self.new_id()
         setattr(discount_campaign, "id", campaign_id)
         self._store[campaign_id] = discount_campaign
         return discount_campaign
@@ -130,6 +258,10 @@ class ProductDiscountCampaignInMemoryRepository(
     def get_all(self) -> List[DiscountCampaign]:
         return list(self._store.values())
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[DiscountCampaign]:
+        return _page(self._store, after, limit)
+
     def add_product(self,
                     product_id: str,
                     campaign_id: str) -> Optional[DiscountCampaign]:
@@ -162,13 +294,28 @@ class ProductDiscountCampaignInMemoryRepository(
 
         return ret_campaign
 
+    def get_campaigns_with_products(self,
+                    product_ids: List[str]) -> Dict[str, DiscountCampaign]:
+        wanted = set(product_ids)
+        best: Dict[str, DiscountCampaign] = {}
+        for campaign in self._store.values():
+            for product_id in campaign.products:
+                if product_id not in wanted:
+                    continue
+                if (product_id not in best
+                        or best[product_id].discount < campaign.discount):
+                    best[product_id] = campaign
+
+        return best
+
 
 @dataclass
 class ComboCampaignInMemoryRepository(IComboCampaignRepository):
     _store: Dict[str, ComboCampaign]= field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
 
     def create(self, combo_campaign: ComboCampaign) -> ComboCampaign:
-        campaign_id = str(uuid.uuid4())
+        campaign_id = self.new_id()
         setattr(combo_campaign, "id", campaign_id)
         self._store[campaign_id] = combo_campaign
         return combo_campaign
@@ -176,6 +323,10 @@ class ComboCampaignInMemoryRepository(IComboCampaignRepository):
     def get_all(self) -> List[ComboCampaign]:
         return list(self._store.values())
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[ComboCampaign]:
+        return _page(self._store, after, limit)
+
     def get_one_campaign(self, campaign_id: str) -> Optional[ComboCampaign]:
         return self._store.get(campaign_id)
 
@@ -193,10 +344,11 @@ class ComboCampaignInMemoryRepository(IComboCampaignRepository):
 @dataclass
 class BuyNGetNCampaignInMemoryRepository(IBuyNGetNCampaignRepository):
     _store: Dict[str, BuyNGetNCampaign] = field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
 
     def create(self,
                buy_n_get_n_campaign: BuyNGetNCampaign) -> BuyNGetNCampaign:
-        campaign_id = str(uuid.uuid4())
+        campaign_id = self.new_id()
         setattr(buy_n_get_n_campaign, "id", campaign_id)
         self._store[campaign_id] = buy_n_get_n_campaign
         return buy_n_get_n_campaign
@@ -205,6 +357,10 @@ class BuyNGetNCampaignInMemoryRepository(IBuyNGetNCampaignRepository):
     def get_all(self) -> List[BuyNGetNCampaign]:
         return list(self._store.values())
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[BuyNGetNCampaign]:
+        return _page(self._store, after, limit)
+
     def get_one_campaign(self, campaign_id: str) -> Optional[BuyNGetNCampaign]:
         return self._store.get(campaign_id)
 
@@ -216,10 +372,11 @@ class BuyNGetNCampaignInMemoryRepository(IBuyNGetNCampaignRepository):
 class ReceiptDiscountCampaignInMemoryRepository(
     IReceiptDiscountCampaignRepository):
     _store: Dict[str, ReceiptCampaign] = field(default_factory=dict)
+    new_id: IdGenerator = uuid7_id
 
     def create(self,
             receipt_campaign: ReceiptCampaign) -> ReceiptCampaign:
-        campaign_id = str(uuid.uuid4())
+        campaign_id = self.new_id()
         setattr(receipt_campaign, "id", campaign_id)
         self._store[campaign_id] = receipt_campaign
         return receipt_campaign
@@ -230,6 +387,10 @@ class ReceiptDiscountCampaignInMemoryRepository(
     def get_all(self) -> List[ReceiptCampaign]:
         return list(self._store.values())
 
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[ReceiptCampaign]:
+        return _page(self._store, after, limit)
+
     def delete_campaign(self, campaign_id: str) -> None:
         self._store.pop(campaign_id)
 
@@ -245,6 +406,61 @@ class ReceiptDiscountCampaignInMemoryRepository(
         return ret_campaign
 
 
+@dataclass
+class ExchangeRateInMemoryRepository(IExchangeRateRepository):
+    _store: Dict[Tuple[str, str], ExchangeRate] = field(default_factory=dict)
+
+    def get_rate(self, from_currency: str,
+                 to_currency: str) -> Optional[ExchangeRate]:
+        return self._store.get((from_currency, to_currency))
+
+    def save_rate(self, exchange_rate: ExchangeRate) -> None:
+        key = (exchange_rate.from_currency, exchange_rate.to_currency)
+        self._store[key] = exchange_rate
+
+
+@dataclass
+class CatalogChangeInMemoryRepository(ICatalogChangeRepository):
+    changes: List[CatalogChange] = field(default_factory=list)
+    last_seq: int = 0
+
+    def append(self, entity: ChangeEntity, entity_id: str,
+               op: ChangeOp, changed_at: float) -> CatalogChange:
+        self.last_seq += 1
+        change = CatalogChange(seq=self.last_seq, entity=entity,
+                               entity_id=entity_id, op=op,
+                               changed_at=changed_at)
+        self.changes.append(change)
+        return change
+
+    def append_many(self, entity: ChangeEntity, entity_ids: List[str],
+                    op: ChangeOp, changed_at: float) -> None:
+        for entity_id in entity_ids:
+            self.append(entity=entity, entity_id=entity_id, op=op,
+                        changed_at=changed_at)
+
+    def get_since(self, seq: int, limit: int) -> List[CatalogChange]:
+        # changes are appended in seq order
+        start = bisect.bisect_right(self.changes, seq,
+                                    key=lambda change: change.seq)
+        return self.changes[start:start + limit]
+
+    def bounds(self) -> Tuple[int, int]:
+        if not self.changes:
+            return 0, self.last_seq
+        return self.changes[0].seq, self.last_seq
+
+    def latest(self) -> Tuple[int, float]:
+        if not self.changes:
+            return self.last_seq, 0.0
+        return self.last_seq, self.changes[-1].changed_at
+
+    def delete_through(self, seq: int) -> int:
+        kept = [change for change in self.changes if change.seq > seq]
+        deleted = len(self.changes) - len(kept)
+        self.changes = kept
+        return deleted
+
 
 @dataclass
 class InMemoryRepoFactory(RepoFactory):
@@ -283,6 +499,23 @@ class InMemoryRepoFactory(RepoFactory):
         default_factory=BuyNGetNCampaignInMemoryRepository,
     )
 
+    _exchange_rates: ExchangeRateInMemoryRepository = field(
+        init=False,
+        default_factory=ExchangeRateInMemoryRepository,
+    )
+
+    _catalog_changes: CatalogChangeInMemoryRepository = field(
+        init=False,
+        default_factory=CatalogChangeInMemoryRepository,
+    )
+
+    def unit_of_work(self) -> ContextManager[None]:
+        # writes go straight to the dicts; nothing to commit or roll back
+        return nullcontext()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        callback()
+
     def products(self) -> IProductRepository:
         return self._products
 
@@ -304,3 +537,8 @@ class InMemoryRepoFactory(RepoFactory):
     def buy_n_get_n_campaign(self) -> IBuyNGetNCampaignRepository:
         return self._buy_n_get_n_campaign
 
+    def exchange_rates(self) -> IExchangeRateRepository:
+        return self._exchange_rates
+
+    def catalog_changes(self) -> ICatalogChangeRepository:
+        return self._catalog_changes
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from app.core.executors import run_blocking
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "cache_invalidations_total",
+    "In-process caches dropped because another process wrote the entity.")
+RECEIPT_INVALIDATIONS = REGISTRY.counter(
+    "receipt_invalidations_total",
+    "Cached receipts dropped because another process wrote them.")
+
+
+@dataclass
+class CacheInvalidator:
+    connection: sqlite3.Connection
+    # how often run() looks; PRAGMA data_version is a few microseconds
+    poll_interval: float = 0.05
+    # run() polls here, so a busy connection never holds up the loop
+    executor: Optional[Executor] = None
+    _listeners: Dict[str, List[Callable[[], None]]] = field(
+        default_factory=dict)
+    _receipt_listeners: List[Callable[[List[str]], None]] = field(
+        default_factory=list)
+    _generations: Dict[str, int] = field(default_factory=dict)
+    _receipt_seq: int = 0
+    _data_version: Optional[int] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self._data_version = self._read_data_version()
+        self._generations = self._read_generations()
+        self._receipt_seq = self._read_receipt_seq()
+
+    def subscribe(self, entity: str, callback: Callable[[], None]) -> None:
+        self._listeners.setdefault(entity, []).append(callback)
+
+    def subscribe_receipts(self,
+                           callback: Callable[[List[str]], None]) -> None:
+        # called with the ids of the receipts written elsewhere
+        self._receipt_listeners.append(callback)
+
+    def _read_data_version(self) -> int:
+        # changes only when another connection commits to the file, so
+        # this process's own writes never trigger a generation read
+        row = self.connection.execute("PRAGMA data_version").fetchone()
+        return int(row[0])
+
+    def _read_generations(self) -> Dict[str, int]:
+        cursor = self.connection.execute(
+            "SELECT entity, generation FROM cache_generations")
+        return {entity: generation for entity, generation in cursor}
+
+    def _read_receipt_seq(self) -> int:
+        row = self.connection.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM receipt_changes").fetchone()
+        return int(row[0])
+
+    def poll(self) -> List[str]:
+        with self._lock:
+            data_version = self._read_data_version()
+            if data_version == self._data_version:
+                return []
+            self._data_version = data_version
+
+            # this also picks up our own writes since the last read, which
+            # at worst drops a cache entry that was still valid
+            generations = self._read_generations()
+            changed = [entity for entity, generation in generations.items()
+                       if self._generations.get(entity) != generation]
+            self._generations = generations
+
+            rows = self.connection.execute(
+                "SELECT receipt_id, seq FROM receipt_changes WHERE seq > ?",
+                (self._receipt_seq,)).fetchall()
+            receipt_ids = [receipt_id for receipt_id, _ in rows]
+            if rows:
+                self._receipt_seq = max(seq for _, seq in rows)
+
+        for entity in changed:
+            CACHE_INVALIDATIONS.inc(entity=entity)
+            for callback in self._listeners.get(entity, []):
+                callback()
+        if receipt_ids:
+            RECEIPT_INVALIDATIONS.inc(len(receipt_ids))
+            for receipt_callback in self._receipt_listeners:
+                receipt_callback(receipt_ids)
+            changed.append("receipts")
+        return changed
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await run_blocking(self.executor, self.poll)
+            except Exception as exc:
+                logger.warning("Could not check for cache invalidations: %s",
+                               exc)
+            await asyncio.sleep(self.poll_interval)
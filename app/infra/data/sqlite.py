@@ -1,10 +1,20 @@
 import json
 import sqlite3
-import uuid
 from dataclasses import dataclass
-from typing import Any, List, Optional
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
 from app.core.factories.repo_factory import RepoFactory
+from app.core.metrics import REGISTRY
 from app.core.models import ReceiptItem
 from app.core.models.campaign import (
     BuyNGetNCampaign,
@@ -13,7 +23,9 @@ from app.core.models.campaign import (
     DiscountCampaign,
     ReceiptCampaign,
 )
-from app.core.models.product import Product
+from app.core.models.catalog_change import CatalogChange, ChangeEntity, ChangeOp
+from app.core.models.exchange_rate import ExchangeRate
+from app.core.models.product import Product, search_terms
 from app.core.models.receipt import (
     ComboForReceipt,
     GiftForReceipt,
@@ -27,29 +39,104 @@ from app.core.repositories.campaign_repository import (
     IProductDiscountCampaignRepository,
     IReceiptDiscountCampaignRepository,
 )
+from app.core.repositories.catalog_change_repository import (
+    ICatalogChangeRepository,
+)
+from app.core.repositories.exchange_rate_repository import (
+    IExchangeRateRepository,
+)
 from app.core.repositories.product_repository import IProductRepository
 from app.core.repositories.receipt_repesitory import IReceiptRepository
 from app.core.repositories.shift_repository import IShiftRepository
 from app.core.state.shift_state import ClosedShiftState, OpenShiftState
+from app.core.timing import REPOSITORY, current_call, timed_layer
+from app.infra.data.ids import IdGenerator, uuid7_id
+from app.infra.data.unit_of_work import SqliteUnitOfWork
+
+# table -> the cache entity its writes invalidate
+CACHE_ENTITIES = {
+    "products": "products",
+    "discount_campaigns": "campaigns",
+    "discount_campaign_products": "campaigns",
+    "combo_campaigns": "campaigns",
+    "buy_n_get_n_campaigns": "campaigns",
+    "receipt_discount_campaigns": "campaigns",
+}
+
+DB_STATEMENTS = REGISTRY.counter(
+    "db_statements_total",
+    "SQL statements run, by the repository call that ran them.")
+
+
+def _count_statement() -> None:
+    DB_STATEMENTS.inc(call=current_call() or "other")
+
+
+class CountingCursor(sqlite3.Cursor):
+    def execute(self, sql: str, parameters: Any = (), /) -> "CountingCursor":
+        _count_statement()
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Any, /) -> "CountingCursor":
+        _count_statement()
+        return super().executemany(sql, parameters)
+
+
+class CountingConnection(sqlite3.Connection):
+    # Counts statements into db_statements_total, put down to the
+    # repository call running them; pass it as the factory of
+    # sqlite3.connect. Counted here rather than with a trace callback,
+    # which calls back into Python with the connection's mutex held and
+    # can deadlock threads sharing the connection.
+    def cursor(self, factory: Any = CountingCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> Any:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Any, /) -> Any:
+        return self.cursor().executemany(sql, parameters)
+
+
+def _has_full_text_search(cursor: sqlite3.Cursor) -> bool:
+    # the products_fts table, and an sqlite build that can read it
+    try:
+        cursor.execute("SELECT rowid FROM products_fts LIMIT 0").fetchall()
+    except sqlite3.OperationalError:
+        return False
+    return True
 
 
 @dataclass
 class SqliteRepoFactory(RepoFactory):
     connection: sqlite3.Connection
+    id_generator: IdGenerator = uuid7_id
 
     def __post_init__(self) -> None:
+        self._full_text_search = False
         self._initialize_db()
-        self._products = ProductSqliteRepository(self.connection)
-        self._receipts = ReceiptSqliteRepository(self.connection)
-        self._shifts = ShiftSqliteRepository(self.connection)
-        self._discount_campaign = (
-            ProductDiscountCampaignSqliteRepository(self.connection))
-        self._combo_campaign = (
-            ComboCampaignSqliteRepository(self.connection))
+        # every repository shares the one transaction of the connection
+        self._unit_of_work = SqliteUnitOfWork(self.connection)
+        new_id, work = self.id_generator, self._unit_of_work
+        self._products = ProductSqliteRepository(
+            self.connection, new_id, work,
+            full_text_search=self._full_text_search)
+        self._receipts = ReceiptSqliteRepository(self.connection, new_id,
+                                                 work)
+        self._shifts = ShiftSqliteRepository(self.connection, new_id, work)
+        self._discount_campaign = ProductDiscountCampaignSqliteRepository(
+            self.connection, new_id, work)
+        self._combo_campaign = ComboCampaignSqliteRepository(
+            self.connection, new_id, work)
         self._receipt_discount_campaign = (
-            ReceiptDiscountCampaignSqliteRepository(self.connection))
-        self._buy_n_get_n_campaign =\
-            BuyNGetNCampaignSqliteRepository(self.connection)
+            ReceiptDiscountCampaignSqliteRepository(self.connection, new_id,
+                                                    work))
+        self._buy_n_get_n_campaign = BuyNGetNCampaignSqliteRepository(
+            self.connection, new_id, work)
+        self._exchange_rates = ExchangeRateSqliteRepository(self.connection,
+                                                            work)
+        self._catalog_changes = CatalogChangeSqliteRepository(
+            self.connection, work)
 
     def _initialize_db(self) -> None:
         cursor = self.connection.cursor()
@@ -64,6 +151,7 @@ class SqliteRepoFactory(RepoFactory):
             discount REAL
         )
         ''')
+        self._full_text_search = self._initialize_search(cursor)
 
         # Create receipts table
         cursor.execute('''
@@ -72,9 +160,16 @@ class SqliteRepoFactory(RepoFactory):
             shift_id TEXT NOT NULL,
             total REAL NOT NULL,
             discount_total REAL,
-            status INTEGER NOT NULL
+            status INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
         )
         ''')
+        receipt_columns = {row[1] for row in
+                           cursor.execute("PRAGMA table_info(receipts)")}
+        if "version" not in receipt_columns:
+            # databases created before receipts were versioned
+            cursor.execute("ALTER TABLE receipts ADD COLUMN"
+                           " version INTEGER NOT NULL DEFAULT 0")
 
         # Create receipt_items table for all types of receipt items
         cursor.execute('''
@@ -93,6 +188,17 @@ class SqliteRepoFactory(RepoFactory):
         )
         ''')
 
+        # Listing receipts filters on shift and status and pages by id;
+        # items are always looked up by their receipt
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_receipts_shift_status
+        ON receipts (shift_id, status, id)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_receipt_items_receipt
+        ON receipt_items (receipt_id)
+        ''')
+
         # Create shifts table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS shifts (
@@ -152,51 +258,231 @@ class SqliteRepoFactory(RepoFactory):
         )
         ''')
 
+        # Create exchange_rates table (offline FX rate table)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exchange_rates (
+            from_currency TEXT NOT NULL,
+            to_currency TEXT NOT NULL,
+            rate REAL NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (from_currency, to_currency)
+        )
+        ''')
+
+        # Create catalog_changes table (change feed for terminal sync);
+        # AUTOINCREMENT keeps seq monotonic across compaction
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at REAL NOT NULL
+        )
+        ''')
+
+        # Create cache_generations table; the triggers bump an entity's
+        # generation in the same transaction as the write, whichever
+        # process (or tool) makes it
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            entity TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        for table, entity in CACHE_ENTITIES.items():
+            cursor.execute("INSERT OR IGNORE INTO cache_generations (entity)"
+                           " VALUES (?)", (entity,))
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS
+                    {table}_{event.lower()}_generation
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE cache_generations
+                    SET generation = generation + 1
+                    WHERE entity = '{entity}';
+                END
+                ''')
+
+        # Create receipt_changes table; one row per receipt written since,
+        # so other processes drop just that receipt from their cache. A
+        # receipt's lines are only ever written with its row (its version
+        # goes up), so the receipts triggers see every change.
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS receipt_changes (
+            receipt_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS receipt_changes_seq"
+                       " ON receipt_changes (seq)")
+        for event, row in (("UPDATE", "new"), ("DELETE", "old")):
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS receipts_{event.lower()}_change
+            AFTER {event} ON receipts
+            BEGIN
+                INSERT OR REPLACE INTO receipt_changes (receipt_id, seq)
+                VALUES ({row}.id, (SELECT COALESCE(MAX(seq), 0) + 1
+                                   FROM receipt_changes));
+            END
+            ''')
+        # receipts used to share one generation, dropped on any write
+        for table in ("receipts", "receipt_items"):
+            for event in ("insert", "update", "delete"):
+                cursor.execute(
+                    f"DROP TRIGGER IF EXISTS {table}_{event}_generation")
+
         self.connection.commit()
 
+    def _initialize_search(self, cursor: sqlite3.Cursor) -> bool:
+        # products_fts indexes name and barcode of products (external
+        # content, so nothing is stored twice) and the triggers keep it in
+        # step; without FTS5 in the sqlite build, search falls back to LIKE
+        existed = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'products_fts'"
+        ).fetchone()
+        try:
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                name, barcode,
+                content='products', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            ''')
+        except sqlite3.OperationalError:
+            return False
+        if not _has_full_text_search(cursor):
+            # made by a build with FTS5; this one cannot keep it in step
+            return False
+
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO products_fts (rowid, name, barcode)
+            VALUES (new.rowid, new.name, new.barcode);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete
+        AFTER DELETE ON products
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, barcode)
+            VALUES ('delete', old.rowid, old.name, old.barcode);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_update
+        AFTER UPDATE OF name, barcode ON products
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, barcode)
+            VALUES ('delete', old.rowid, old.name, old.barcode);
+            INSERT INTO products_fts (rowid, name, barcode)
+            VALUES (new.rowid, new.name, new.barcode);
+        END
+        ''')
+        if not existed:
+            # index products that were there before the search table
+            cursor.execute(
+                "INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+        return True
+
+    def unit_of_work(self) -> ContextManager[None]:
+        return self._unit_of_work()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        self._unit_of_work.after_commit(callback)
+
     def products(self) -> IProductRepository:
-        return ProductSqliteRepository(self.connection)
+        return self._products
 
     def receipts(self) -> IReceiptRepository:
-        return ReceiptSqliteRepository(self.connection)
+        return self._receipts
 
     def shifts(self) -> IShiftRepository:
-        return ShiftSqliteRepository(self.connection)
+        return self._shifts
 
     def discount_campaign(self) -> IProductDiscountCampaignRepository:
-        return ProductDiscountCampaignSqliteRepository(self.connection)
+        return self._discount_campaign
 
     def combo_campaign(self) -> IComboCampaignRepository:
-        return ComboCampaignSqliteRepository(self.connection)
+        return self._combo_campaign
 
     def receipt_discount_campaign(self) -> IReceiptDiscountCampaignRepository:
-        return ReceiptDiscountCampaignSqliteRepository(self.connection)
+        return self._receipt_discount_campaign
 
     def buy_n_get_n_campaign(self) -> IBuyNGetNCampaignRepository:
-        return BuyNGetNCampaignSqliteRepository(self.connection)
+        return self._buy_n_get_n_campaign
+
+    def exchange_rates(self) -> IExchangeRateRepository:
+        return self._exchange_rates
 
+    def catalog_changes(self) -> ICatalogChangeRepository:
+        return self._catalog_changes
 
+
+@timed_layer(REPOSITORY)
 @dataclass
 class ProductSqliteRepository(IProductRepository):
     connection: sqlite3.Connection
+    new_id: IdGenerator = uuid7_id
+    unit_of_work: Optional[SqliteUnitOfWork] = None
+    # known to the factory that made the schema; looked up otherwise
+    full_text_search: Optional[bool] = None
+
+    def __post_init__(self) -> None:
+        self._work = (self.unit_of_work
+                      or SqliteUnitOfWork(self.connection))
+        if self.full_text_search is None:
+            self.full_text_search = _has_full_text_search(
+                self.connection.cursor())
 
     def create(self, product: Product) -> Product:
-        product_id = str(uuid.uuid4())
-        setattr(product, "id", product_id)
+        with self._work():
+            product_id = self.new_id()
+            setattr(product, "id", product_id)
 
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "INSERT INTO products (id, name, barcode, price, discount) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (product.id,
-             product.name,
-             product.barcode,
-             product.price,
-             product.discount)
-        )
-        self.connection.commit()
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "INSERT INTO products (id, name, barcode, price, discount) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (product.id,
+                 product.name,
+                 product.barcode,
+                 product.price,
+                 product.discount)
+            )
 
-        return product
+            return product
+
+    def create_many(self, products: List[Product]) -> List[Product]:
+        with self._work():
+            for product in products:
+                setattr(product, "id", self.new_id())
+
+            # one statement and one commit for the whole batch; a barcode
+            # that already exists is skipped rather than failing the batch
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                "INSERT OR IGNORE INTO products (id, name, barcode, price, discount) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(product.id, product.name, product.barcode,
+                  product.price, product.discount) for product in products]
+            )
+            if cursor.rowcount == len(products):
+                return products
+
+            inserted: Set[str] = set()
+            for chunk_start in range(0, len(products), 500):
+                chunk = [product.id
+                         for product in products[chunk_start:chunk_start + 500]]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT id FROM products WHERE id IN ({placeholders})",
+                    chunk)
+                inserted.update(row[0] for row in cursor.fetchall())
+            return [product for product in products if product.id in inserted]
 
     def get_one(self, product_id: str) -> Optional[Product]:
         cursor = self.connection.cursor()
@@ -222,9 +508,18 @@ class ProductSqliteRepository(IProductRepository):
         cursor = self.connection.cursor()
         cursor.execute("SELECT id, name, barcode, price, discount "
                        "FROM products")
+        return self._from_rows(cursor.fetchall())
 
+    def get_page(self, after: Optional[str], limit: int) -> List[Product]:
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT id, name, barcode, price, discount "
+                       "FROM products WHERE id > ? ORDER BY id LIMIT ?",
+                       (after or "", limit))
+        return self._from_rows(cursor.fetchall())
+
+    def _from_rows(self, rows: List[Any]) -> List[Product]:
         products = []
-        for row in cursor.fetchall():
+        for row in rows:
             products.append(
                 Product(
                     id=row[0],
@@ -237,10 +532,64 @@ class ProductSqliteRepository(IProductRepository):
         return products
 
     def update(self, product_id: str, price: float) -> None:
+        with self._work():
+            cursor = self.connection.cursor()
+            cursor.execute("UPDATE products SET price = ? WHERE id = ?",
+                           (price, product_id))
+
+    def update_prices(self, prices: Dict[str, float]) -> List[str]:
+        with self._work():
+            product_ids = list(prices)
+            cursor = self.connection.cursor()
+            cursor.executemany("UPDATE products SET price = ? WHERE id = ?",
+                               [(price, product_id)
+                                for product_id, price in prices.items()])
+            if cursor.rowcount == len(product_ids):
+                return product_ids
+
+            found: Set[str] = set()
+            for chunk_start in range(0, len(product_ids), 500):
+                chunk = product_ids[chunk_start:chunk_start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT id FROM products WHERE id IN ({placeholders})",
+                    chunk)
+                found.update(row[0] for row in cursor.fetchall())
+            return [product_id for product_id in product_ids
+                    if product_id in found]
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+
         cursor = self.connection.cursor()
-        cursor.execute("UPDATE products SET price = ? WHERE id = ?",
-                       (price, product_id))
-        self.connection.commit()
+        if self.full_text_search:
+            # every term is a quoted prefix, so user input is never read
+            # as FTS syntax; terms are ANDed and the best bm25 matches
+            # come first
+            match = " ".join(f'"{term}"*' for term in terms)
+            cursor.execute(
+                "SELECT p.id, p.name, p.barcode, p.price, p.discount"
+                " FROM products_fts"
+                " JOIN products p ON p.rowid = products_fts.rowid"
+                " WHERE products_fts MATCH ?"
+                " ORDER BY bm25(products_fts), p.name LIMIT ?",
+                (match, limit))
+        else:
+            conditions = " AND ".join(
+                "(name LIKE ? ESCAPE '\\' OR barcode LIKE ? ESCAPE '\\')"
+                for _ in terms)
+            patterns: List[str] = []
+            for term in terms:
+                escaped = (term.replace("\\", "\\\\")
+                           .replace("%", "\\%").replace("_", "\\_"))
+                patterns += [f"%{escaped}%", f"{escaped}%"]
+            cursor.execute(
+                "SELECT id, name, barcode, price, discount FROM products"
+                f" WHERE {conditions} ORDER BY name LIMIT ?",
+                (*patterns, limit))
+        return self._from_rows(cursor.fetchall())
 
     def has_barcode(self, barcode: str) -> bool:
         cursor = self.connection.cursor()
@@ -249,56 +598,94 @@ class ProductSqliteRepository(IProductRepository):
         count = cursor.fetchone()[0]
         return bool(count > 0)
 
+    def get_by_barcode(self, barcode: str) -> Optional[Product]:
+        # served by the index behind the UNIQUE constraint on barcode
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT id, "
+                       "name, "
+                       "barcode, "
+                       "price, "
+                       "discount FROM products WHERE barcode = ?",
+                       (barcode,))
+
+        row = cursor.fetchone()
+        if row:
+            return Product(
+                id=row[0],
+                name=row[1],
+                barcode=row[2],
+                price=row[3],
+                discount=row[4]
+            )
+        return None
+
 
+@timed_layer(REPOSITORY)
 @dataclass
 class ReceiptSqliteRepository(IReceiptRepository):
     connection: sqlite3.Connection
+    new_id: IdGenerator = uuid7_id
+    unit_of_work: Optional[SqliteUnitOfWork] = None
+
+    def __post_init__(self) -> None:
+        self._work = (self.unit_of_work
+                      or SqliteUnitOfWork(self.connection))
 
     def create(self, receipt: Receipt) -> Receipt:
-        receipt_id = str(uuid.uuid4())
-        setattr(receipt, "id", receipt_id)
+        with self._work():
+            receipt_id = self.new_id()
+            setattr(receipt, "id", receipt_id)
 
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "INSERT INTO receipts (id,"
-            " shift_id,"
-            " total, "
-            "discount_total,"
-            " status) VALUES (?, ?, ?, ?, ?)",
-            (receipt.id,
-             receipt.shift_id,
-             receipt.total,
-             receipt.discount_total,
-             receipt.status)
-        )
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "INSERT INTO receipts (id,"
+                " shift_id,"
+                " total, "
+                "discount_total,"
+                " status,"
+                " version) VALUES (?, ?, ?, ?, ?, ?)",
+                (receipt.id,
+                 receipt.shift_id,
+                 receipt.total,
+                 receipt.discount_total,
+                 receipt.status,
+                 receipt.version)
+            )
 
-        # Save all items in the receipt
-        for item in receipt.items:
-            self._save_receipt_item(cursor, receipt.id, item)
+            # Save all items in the receipt
+            for item in receipt.items:
+                self._save_receipt_item(cursor, receipt.id, item)
 
-        self.connection.commit()
-        return receipt
+            return receipt
 
-    def add_product(self, receipt: Receipt) -> Receipt:
-        cursor = self.connection.cursor()
+    def add_product(self, receipt: Receipt,
+                    expected_version: Optional[int] = None) -> Receipt:
+        if expected_version is None:
+            expected_version = receipt.version
+        with self._work():
+            cursor = self.connection.cursor()
 
-        # Update the receipt record
-        cursor.execute(
-            "UPDATE receipts SET total = ?, "
-            "discount_total = ? WHERE id = ?",
-            (receipt.total, receipt.discount_total, receipt.id)
-        )
+            # Update the receipt record, only if nobody else has since
+            cursor.execute(
+                "UPDATE receipts SET total = ?, "
+                "discount_total = ?, version = ? "
+                "WHERE id = ? AND version = ?",
+                (receipt.total, receipt.discount_total, receipt.version + 1,
+                 receipt.id, expected_version)
+            )
+            if cursor.rowcount == 0:
+                raise ReceiptConflictError(receipt_id=receipt.id)
 
-        # Delete all existing items for this receipt
-        cursor.execute("DELETE FROM receipt_items WHERE receipt_id = ?",
-                       (receipt.id,))
+            # Delete all existing items for this receipt
+            cursor.execute("DELETE FROM receipt_items WHERE receipt_id = ?",
+                           (receipt.id,))
 
-        # Save all items in the receipt (including the new one)
-        for item in receipt.items:
-            self._save_receipt_item(cursor, receipt.id, item)
+            # Save all items in the receipt (including the new one)
+            for item in receipt.items:
+                self._save_receipt_item(cursor, receipt.id, item)
 
-        self.connection.commit()
-        return receipt
+            receipt.version += 1
+            return receipt
 
     def _save_receipt_item(self, cursor: sqlite3.Cursor,
                            receipt_id: str,
@@ -466,7 +853,7 @@ class ReceiptSqliteRepository(IReceiptRepository):
     def get_one(self, receipt_id: str) -> Optional[Receipt]:
         cursor = self.connection.cursor()
         cursor.execute(
-            "SELECT id, shift_id, total, discount_total, status "
+            "SELECT id, shift_id, total, discount_total, status, version "
             "FROM receipts WHERE id = ?",
             (receipt_id,)
         )
@@ -503,109 +890,181 @@ class ReceiptSqliteRepository(IReceiptRepository):
             items=items,
             total=receipt_row[2],
             discount_total=receipt_row[3],
-            status=bool(receipt_row[4])
+            status=bool(receipt_row[4]),
+            version=receipt_row[5]
         )
 
     def get_all(self) -> List[Receipt]:
         cursor = self.connection.cursor()
-        cursor.execute("SELECT id, shift_id, total, discount_total, status"
-                       " FROM receipts")
+        cursor.execute("SELECT id, shift_id, total, discount_total, status,"
+                       " version FROM receipts")
+        return self._from_rows(cursor, cursor.fetchall())
+
+    def get_page(self, after: Optional[str], limit: int,
+                 shift_id: Optional[str] = None,
+                 status: Optional[bool] = None) -> List[Receipt]:
+        conditions = ["id > ?"]
+        params: List[Any] = [after or ""]
+        if shift_id is not None:
+            conditions.append("shift_id = ?")
+            params.append(shift_id)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(int(status))
+        params.append(limit)
 
-        receipts = []
-        for receipt_row in cursor.fetchall():
-            receipt_id = receipt_row[0]
-
-            # Get all items for this receipt
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT id, shift_id, total, discount_total, status,"
+                       " version FROM receipts"
+                       " WHERE " + " AND ".join(conditions) +
+                       " ORDER BY id LIMIT ?",
+                       params)
+        return self._from_rows(cursor, cursor.fetchall())
+
+    def _from_rows(self, cursor: sqlite3.Cursor,
+                   receipt_rows: List[Any]) -> List[Receipt]:
+        if not receipt_rows:
+            return []
+
+        # one query for the items of every receipt on the page
+        items: Dict[str, List[ReceiptItem]] = {row[0]: [] for row in receipt_rows}
+        receipt_ids = list(items)
+        for chunk_start in range(0, len(receipt_ids), 500):
+            chunk = receipt_ids[chunk_start:chunk_start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
             cursor.execute(
                 """
-                SELECT item_id, 
+                SELECT item_id,
                 receipt_id,
                  item_type,
-                  quantity, 
+                  quantity,
                   price,
                    total,
                    discount_price,
                     discount_total,
-                     item_data 
-                FROM receipt_items 
-                WHERE receipt_id = ?
-                """,
-                (receipt_id,)
+                     item_data
+                FROM receipt_items
+                WHERE receipt_id IN (""" + placeholders + ")",
+                chunk
             )
-
-            items = []
             for item_row in cursor.fetchall():
-                items.append(self._deserialize_receipt_item(item_row))
-
-            receipts.append(
-                Receipt(
-                    id=receipt_id,
-                    shift_id=receipt_row[1],
-                    items=items,
-                    total=receipt_row[2],
-                    discount_total=receipt_row[3],
-                    status=bool(receipt_row[4])
-                )
+                items[item_row[1]].append(
+                    self._deserialize_receipt_item(item_row))
+
+        return [
+            Receipt(
+                id=receipt_row[0],
+                shift_id=receipt_row[1],
+                items=items[receipt_row[0]],
+                total=receipt_row[2],
+                discount_total=receipt_row[3],
+                status=bool(receipt_row[4]),
+                version=receipt_row[5]
             )
+            for receipt_row in receipt_rows
+        ]
+
+    def update(self, receipt_id: str, status: bool,
+               expected_version: Optional[int] = None) -> None:
+        with self._work():
+            cursor = self.connection.cursor()
+            if expected_version is None:
+                cursor.execute(
+                    "UPDATE receipts SET status = ?, version = version + 1"
+                    " WHERE id = ?",
+                    (status, receipt_id)
+                )
+                return
 
-        return receipts
+            cursor.execute(
+                "UPDATE receipts SET status = ?, version = version + 1"
+                " WHERE id = ? AND version = ?",
+                (status, receipt_id, expected_version)
+            )
+            if cursor.rowcount == 0:
+                raise ReceiptConflictError(receipt_id=receipt_id)
+
+    def close_many(self, receipt_ids: List[str],
+                   expected_versions: Optional[Dict[str, int]] = None) -> None:
+        with self._work():
+            cursor = self.connection.cursor()
+            if expected_versions is None:
+                cursor.executemany(
+                    "UPDATE receipts SET status = 0, version = version + 1"
+                    " WHERE id = ?",
+                    [(receipt_id,) for receipt_id in receipt_ids]
+                )
+                return
 
-    def update(self, receipt_id: str, status: bool) -> None:
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "UPDATE receipts SET status = ? WHERE id = ?",
-            (status, receipt_id)
-        )
-        self.connection.commit()
+            # one statement per receipt, so the one that changed is known
+            for receipt_id in receipt_ids:
+                cursor.execute(
+                    "UPDATE receipts SET status = 0, version = version + 1"
+                    " WHERE id = ? AND version = ?",
+                    (receipt_id, expected_versions[receipt_id])
+                )
+                if cursor.rowcount == 0:
+                    raise ReceiptConflictError(receipt_id=receipt_id)
 
     def delete(self, receipt_id: str) -> None:
-        cursor = self.connection.cursor()
+        with self._work():
+            cursor = self.connection.cursor()
 
-        # First delete all items related to this receipt
-        cursor.execute("DELETE FROM receipt_items "
-                       "WHERE receipt_id = ?", (receipt_id,))
+            # First delete all items related to this receipt
+            cursor.execute("DELETE FROM receipt_items "
+                           "WHERE receipt_id = ?", (receipt_id,))
 
-        # Then delete the receipt itself
-        cursor.execute("DELETE FROM receipts WHERE id = ?",
-                       (receipt_id,))
+            # Then delete the receipt itself
+            cursor.execute("DELETE FROM receipts WHERE id = ?",
+                           (receipt_id,))
 
-        self.connection.commit()
 
     def delete_item(self, receipt: Receipt) -> None:
         self.add_product(receipt)
 
+    def flush(self, receipt_ids: List[str]) -> None:
+        # every write is already in the database
+        pass
 
+
+@timed_layer(REPOSITORY)
 @dataclass
 class ShiftSqliteRepository(IShiftRepository):
     connection: sqlite3.Connection
+    new_id: IdGenerator = uuid7_id
+    unit_of_work: Optional[SqliteUnitOfWork] = None
 
-    def create(self, shift: Shift) -> Shift:
-        shift_id = str(uuid.uuid4())
-        setattr(shift, "id", shift_id)
-
-        cursor = self.connection.cursor()
+    def __post_init__(self) -> None:
+        self._work = (self.unit_of_work
+                      or SqliteUnitOfWork(self.connection))
 
-        # Convert state to string representation
-        state_str = "open" if isinstance(shift.state, OpenShiftState) else "closed"
+    def create(self, shift: Shift) -> Shift:
+        with self._work():
+            shift_id = self.new_id()
+            setattr(shift, "id", shift_id)
 
-        cursor.execute(
-            "INSERT INTO shifts (id, state) VALUES (?, ?)",
-            (shift.id, state_str)
-        )
+            cursor = self.connection.cursor()
 
-        # Save all receipts in the shift (initially empty for a new shift)
-        for receipt in shift.receipts:
-            # Update the shift_id for the receipt
-            receipt.shift_id = shift.id
+            # Convert state to string representation
+            state_str = "open" if isinstance(shift.state, OpenShiftState) else "closed"
 
-            # Use the receipt repository to save the receipt
             cursor.execute(
-                "UPDATE receipts SET shift_id = ? WHERE id = ?",
-                (shift.id, receipt.id)
+                "INSERT INTO shifts (id, state) VALUES (?, ?)",
+                (shift.id, state_str)
             )
 
-        self.connection.commit()
-        return shift
+            # Save all receipts in the shift (initially empty for a new shift)
+            for receipt in shift.receipts:
+                # Update the shift_id for the receipt
+                receipt.shift_id = shift.id
+
+                # Use the receipt repository to save the receipt
+                cursor.execute(
+                    "UPDATE receipts SET shift_id = ? WHERE id = ?",
+                    (shift.id, receipt.id)
+                )
+
+            return shift
 
     def get_one(self, shift_id: str) -> Optional[Shift]:
         cursor = self.connection.cursor()
@@ -624,7 +1083,8 @@ class ShiftSqliteRepository(IShiftRepository):
         receipts = []
 
         # For each receipt, get the full receipt object
-        receipt_repo = ReceiptSqliteRepository(self.connection)
+        receipt_repo = ReceiptSqliteRepository(self.connection, self.new_id,
+                                               self._work)
         for receipt_id in receipt_ids:
             receipt = receipt_repo.get_one(receipt_id)
             if receipt:
@@ -643,31 +1103,32 @@ class ShiftSqliteRepository(IShiftRepository):
         )
 
     def add_receipt(self, shift: Shift) -> Shift:
-        cursor = self.connection.cursor()
-
-        # Update the state of the shift
-        state_str = "open" if isinstance(shift.state, OpenShiftState) else "closed"
-        cursor.execute(
-            "UPDATE shifts SET state = ? WHERE id = ?",
-            (state_str, shift.id)
-        )
+        with self._work():
+            cursor = self.connection.cursor()
 
-        # For each receipt, ensure it's properly linked to this shift
-        for receipt in shift.receipts:
+            # Update the state of the shift
+            state_str = "open" if isinstance(shift.state, OpenShiftState) else "closed"
             cursor.execute(
-                "UPDATE receipts SET shift_id = ? WHERE id = ?",
-                (shift.id, receipt.id)
+                "UPDATE shifts SET state = ? WHERE id = ?",
+                (state_str, shift.id)
             )
 
-        self.connection.commit()
-        return shift
+            # For each receipt, ensure it's properly linked to this shift
+            for receipt in shift.receipts:
+                cursor.execute(
+                    "UPDATE receipts SET shift_id = ? WHERE id = ?",
+                    (shift.id, receipt.id)
+                )
+
+            return shift
 
     def get_all(self) -> List[Shift]:
         cursor = self.connection.cursor()
         cursor.execute("SELECT id, state FROM shifts")
 
         shifts = []
-        receipt_repo = ReceiptSqliteRepository(self.connection)
+        receipt_repo = ReceiptSqliteRepository(self.connection, self.new_id,
+                                               self._work)
 
         for shift_row in cursor.fetchall():
             shift_id = shift_row[0]
@@ -701,63 +1162,67 @@ class ShiftSqliteRepository(IShiftRepository):
         return shifts
 
     def update(self, shift_id: str, status: bool) -> None:
-        cursor = self.connection.cursor()
-        state_str = "open" if status else "closed"
-        cursor.execute(
-            "UPDATE shifts SET state = ? WHERE id = ?",
-            (state_str, shift_id)
-        )
-        self.connection.commit()
+        with self._work():
+            cursor = self.connection.cursor()
+            state_str = "open" if status else "closed"
+            cursor.execute(
+                "UPDATE shifts SET state = ? WHERE id = ?",
+                (state_str, shift_id)
+            )
 
     def delete(self, shift_id: str) -> None:
-        cursor = self.connection.cursor()
+        with self._work():
+            cursor = self.connection.cursor()
 
-        # First, get all receipts for this shift
-        cursor.execute("SELECT id FROM receipts WHERE shift_id = ?",
-                       (shift_id,))
-        receipt_ids = [row[0] for row in cursor.fetchall()]
+            # First, get all receipts for this shift
+            cursor.execute("SELECT id FROM receipts WHERE shift_id = ?",
+                           (shift_id,))
+            receipt_ids = [row[0] for row in cursor.fetchall()]
 
-        # Delete all receipt_items for these receipts
-        for receipt_id in receipt_ids:
-            cursor.execute("DELETE FROM receipt_items WHERE receipt_id = ?",
-                           (receipt_id,))
+            # Delete all receipt_items for these receipts
+            for receipt_id in receipt_ids:
+                cursor.execute("DELETE FROM receipt_items WHERE receipt_id = ?",
+                               (receipt_id,))
 
-        # Delete all receipts for this shift
-        cursor.execute("DELETE FROM receipts WHERE shift_id = ?",
-                       (shift_id,))
+            # Delete all receipts for this shift
+            cursor.execute("DELETE FROM receipts WHERE shift_id = ?",
+                           (shift_id,))
 
-        # Then delete the shift itself
-        cursor.execute("DELETE FROM shifts WHERE id = ?",
-                       (shift_id,))
+            # Then delete the shift itself
+            cursor.execute("DELETE FROM shifts WHERE id = ?",
+                           (shift_id,))
 
-        self.connection.commit()
 
 
+@timed_layer(REPOSITORY)
 class ProductDiscountCampaignSqliteRepository(
     IProductDiscountCampaignRepository):
-    def __init__(self, connection: sqlite3.Connection):
+    def __init__(self, connection: sqlite3.Connection,
+                 new_id: IdGenerator = uuid7_id,
+                 unit_of_work: Optional[SqliteUnitOfWork] = None):
         self.connection = connection
+        self.new_id = new_id
+        self._work = unit_of_work or SqliteUnitOfWork(connection)
 
     def create(self,
     discount_campaign: DiscountCampaign) -> DiscountCampaign:
-        campaign_id = str(uuid.uuid4())
-        discount_campaign.id = campaign_id
-        self.connection.execute(
-            "INSERT INTO discount_campaigns (id, campaign_type, discount)"
-            " VALUES (?, ?, ?)",
-            (campaign_id, discount_campaign.campaign_type.value,
-             discount_campaign.discount)
-        )
-        self.connection.commit()
-        for product_id in discount_campaign.products:
+        with self._work():
+            campaign_id = self.new_id()
+            discount_campaign.id = campaign_id
             self.connection.execute(
-                "INSERT INTO discount_campaign_products (campaign_id,"
-                " product_id)"
-                " VALUES (?, ?)",
-                (campaign_id, product_id)
+                "INSERT INTO discount_campaigns (id, campaign_type, discount)"
+                " VALUES (?, ?, ?)",
+                (campaign_id, discount_campaign.campaign_type.value,
+                 discount_campaign.discount)
             )
-        self.connection.commit()
-        return discount_campaign
+            for product_id in discount_campaign.products:
+                self.connection.execute(
+                    "INSERT INTO discount_campaign_products (campaign_id,"
+                    " product_id)"
+                    " VALUES (?, ?)",
+                    (campaign_id, product_id)
+                )
+            return discount_campaign
 
     def get_one_campaign(self, campaign_id: str) -> Optional[DiscountCampaign]:
         cursor = self.connection.execute(
@@ -783,8 +1248,19 @@ class ProductDiscountCampaignSqliteRepository(
     def get_all(self) -> List[DiscountCampaign]:
         cursor = self.connection.execute("SELECT id, campaign_type, "
                                          "discount FROM discount_campaigns")
+        return self._from_rows(cursor.fetchall())
+
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[DiscountCampaign]:
+        cursor = self.connection.execute(
+            "SELECT id, campaign_type, discount FROM discount_campaigns "
+            "WHERE id > ? ORDER BY id LIMIT ?",
+            (after or "", limit))
+        return self._from_rows(cursor.fetchall())
+
+    def _from_rows(self, rows: List[Any]) -> List[DiscountCampaign]:
         campaigns = []
-        for row in cursor.fetchall():
+        for row in rows:
             campaign_id = row[0]
             cursor_products = self.connection.execute(
                 "SELECT product_id "
@@ -800,27 +1276,27 @@ class ProductDiscountCampaignSqliteRepository(
 
     def add_product(self, product_id: str,
                     campaign_id: str) -> Optional[DiscountCampaign]:
-        self.connection.execute(
-            "INSERT INTO discount_campaign_products "
-            "(campaign_id, product_id) VALUES (?, ?)",
-            (campaign_id, product_id)
-        )
-        self.connection.commit()
-        return self.get_one_campaign(campaign_id)
+        with self._work():
+            self.connection.execute(
+                "INSERT INTO discount_campaign_products "
+                "(campaign_id, product_id) VALUES (?, ?)",
+                (campaign_id, product_id)
+            )
+            return self.get_one_campaign(campaign_id)
 
     def delete_product(self, product_id: str, campaign_id: str) -> None:
-        self.connection.execute(
-            "DELETE FROM discount_campaign_products"
-            " WHERE campaign_id = ? AND product_id = ?",
-            (campaign_id, product_id)
-        )
-        self.connection.commit()
+        with self._work():
+            self.connection.execute(
+                "DELETE FROM discount_campaign_products"
+                " WHERE campaign_id = ? AND product_id = ?",
+                (campaign_id, product_id)
+            )
 
     def delete_campaign(self, campaign_id: str) -> None:
-        self.connection.execute("DELETE FROM discount_campaigns"
-                                " WHERE id = ?",
-                                (campaign_id,))
-        self.connection.commit()
+        with self._work():
+            self.connection.execute("DELETE FROM discount_campaigns"
+                                    " WHERE id = ?",
+                                    (campaign_id,))
 
     def get_campaign_with_product(self, product_id: str) -> Optional[DiscountCampaign]:
         cursor = self.connection.execute(
@@ -847,43 +1323,106 @@ class ProductDiscountCampaignSqliteRepository(
 
         return None
 
+    def get_campaigns_with_products(self,
+                    product_ids: List[str]) -> Dict[str, DiscountCampaign]:
+        if not product_ids:
+            return {}
+
+        # chunked, like the receipt items, to stay under the variable limit
+        best: Dict[str, Tuple[str, str, int]] = {}
+        for chunk_start in range(0, len(product_ids), 500):
+            chunk = product_ids[chunk_start:chunk_start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor = self.connection.execute(
+                f"""SELECT dcp.product_id, dc.id, dc.campaign_type, dc.discount
+                   FROM discount_campaigns dc
+                   INNER JOIN discount_campaign_products dcp ON dc.id = dcp.campaign_id
+                   WHERE dcp.product_id IN ({placeholders})
+                   ORDER BY dc.discount DESC""",
+                chunk
+            )
+            for product_id, campaign_id, campaign_type, discount in cursor.fetchall():
+                # rows come highest discount first, keep the first per product
+                if product_id not in best:
+                    best[product_id] = (campaign_id, campaign_type, discount)
+        if not best:
+            return {}
+
+        campaign_ids = sorted({row[0] for row in best.values()})
+        products: Dict[str, List[str]] = {}
+        for chunk_start in range(0, len(campaign_ids), 500):
+            chunk = campaign_ids[chunk_start:chunk_start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor_products = self.connection.execute(
+                "SELECT campaign_id, product_id FROM discount_campaign_products "
+                f"WHERE campaign_id IN ({placeholders})",
+                chunk
+            )
+            for campaign_id, product_id in cursor_products.fetchall():
+                products.setdefault(campaign_id, []).append(product_id)
+
+        campaigns = {campaign_id: DiscountCampaign(
+                        id=campaign_id,
+                        campaign_type=CampaignType(campaign_type),
+                        discount=discount,
+                        products=products.get(campaign_id, []))
+                     for campaign_id, campaign_type, discount in best.values()}
+        return {product_id: campaigns[row[0]]
+                for product_id, row in best.items()}
+
+@timed_layer(REPOSITORY)
 class ComboCampaignSqliteRepository(IComboCampaignRepository):
-    def __init__(self, connection: sqlite3.Connection):
+    def __init__(self, connection: sqlite3.Connection,
+                 new_id: IdGenerator = uuid7_id,
+                 unit_of_work: Optional[SqliteUnitOfWork] = None):
         self.connection = connection
+        self.new_id = new_id
+        self._work = unit_of_work or SqliteUnitOfWork(connection)
 
     def create(self, combo_campaign: ComboCampaign) -> ComboCampaign:
-        campaign_id = str(uuid.uuid4())
-        combo_campaign.id = campaign_id
-
-        # Serialize product data to JSON
-        products_data = json.dumps([{
-            "id": p.id,
-            "quantity": p.quantity,
-            "price": p.price,
-            "total": p.total,
-            "discount_price": p.discount_price,
-            "discount_total": p.discount_total
-        } for p in combo_campaign.products])
-
-        self.connection.execute(
-            "INSERT INTO combo_campaigns"
-            " (id, campaign_type, discount, products) "
-            "VALUES (?, ?, ?, ?)",
-            (campaign_id,
-             combo_campaign.campaign_type.value,
-             combo_campaign.discount,
-             products_data)
-        )
-        self.connection.commit()
-        return combo_campaign
+        with self._work():
+            campaign_id = self.new_id()
+            combo_campaign.id = campaign_id
+
+            # Serialize product data to JSON
+            products_data = json.dumps([{
+                "id": p.id,
+                "quantity": p.quantity,
+                "price": p.price,
+                "total": p.total,
+                "discount_price": p.discount_price,
+                "discount_total": p.discount_total
+            } for p in combo_campaign.products])
+
+            self.connection.execute(
+                "INSERT INTO combo_campaigns"
+                " (id, campaign_type, discount, products) "
+                "VALUES (?, ?, ?, ?)",
+                (campaign_id,
+                 combo_campaign.campaign_type.value,
+                 combo_campaign.discount,
+                 products_data)
+            )
+            return combo_campaign
 
     def get_all(self) -> List[ComboCampaign]:
         cursor = self.connection.execute("SELECT id, "
                                          "campaign_type,"
                                          " discount, "
                                          "products FROM combo_campaigns")
+        return self._from_rows(cursor.fetchall())
+
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[ComboCampaign]:
+        cursor = self.connection.execute(
+            "SELECT id, campaign_type, discount, products FROM combo_campaigns "
+            "WHERE id > ? ORDER BY id LIMIT ?",
+            (after or "", limit))
+        return self._from_rows(cursor.fetchall())
+
+    def _from_rows(self, rows: List[Any]) -> List[ComboCampaign]:
         campaigns = []
-        for row in cursor.fetchall():
+        for row in rows:
             campaign_id = row[0]
             campaign_type = CampaignType(row[1])
             discount = row[2]
@@ -942,82 +1481,98 @@ class ComboCampaignSqliteRepository(IComboCampaignRepository):
 
     def add_product(self, product: ProductForReceipt,
                     campaign_id: str) -> Optional[ComboCampaign]:
-        # Get current campaign
-        campaign = self.get_one_campaign(campaign_id)
-        if not campaign:
-            return None
+        with self._work():
+            # Get current campaign
+            campaign = self.get_one_campaign(campaign_id)
+            if not campaign:
+                return None
+
+            # Add product to the list
+            campaign.products.append(product)
+
+            # Update products JSON in database
+            products_data = json.dumps([{
+                "id": p.id,
+                "quantity": p.quantity,
+                "price": p.price,
+                "total": p.total,
+                "discount_price": p.discount_price,
+                "discount_total": p.discount_total
+            } for p in campaign.products])
 
-        # Add product to the list
-        campaign.products.append(product)
-
-        # Update products JSON in database
-        products_data = json.dumps([{
-            "id": p.id,
-            "quantity": p.quantity,
-            "price": p.price,
-            "total": p.total,
-            "discount_price": p.discount_price,
-            "discount_total": p.discount_total
-        } for p in campaign.products])
-
-        self.connection.execute(
-            "UPDATE combo_campaigns SET products = ? WHERE id = ?",
-            (products_data, campaign_id)
-        )
-        self.connection.commit()
-        return campaign
+            self.connection.execute(
+                "UPDATE combo_campaigns SET products = ? WHERE id = ?",
+                (products_data, campaign_id)
+            )
+            return campaign
 
     def delete_campaign(self, campaign_id: str) -> None:
-        self.connection.execute("DELETE FROM combo_campaigns WHERE id = ?",
-                                (campaign_id,))
-        self.connection.commit()
+        with self._work():
+            self.connection.execute("DELETE FROM combo_campaigns WHERE id = ?",
+                                    (campaign_id,))
 
 
+@timed_layer(REPOSITORY)
 class BuyNGetNCampaignSqliteRepository(IBuyNGetNCampaignRepository):
-    def __init__(self, connection: sqlite3.Connection):
+    def __init__(self, connection: sqlite3.Connection,
+                 new_id: IdGenerator = uuid7_id,
+                 unit_of_work: Optional[SqliteUnitOfWork] = None):
         self.connection = connection
+        self.new_id = new_id
+        self._work = unit_of_work or SqliteUnitOfWork(connection)
 
     def create(self, buy_n_get_n_campaign: BuyNGetNCampaign) -> BuyNGetNCampaign:
-        campaign_id = str(uuid.uuid4())
-        buy_n_get_n_campaign.id = campaign_id
-
-        # Serialize buy_product and gift_product to JSON
-        buy_product_data = json.dumps({
-            "id": buy_n_get_n_campaign.buy_product.id,
-            "quantity": buy_n_get_n_campaign.buy_product.quantity,
-            "price": buy_n_get_n_campaign.buy_product.price,
-            "total": buy_n_get_n_campaign.buy_product.total,
-            "discount_price": buy_n_get_n_campaign.buy_product.discount_price,
-            "discount_total": buy_n_get_n_campaign.buy_product.discount_total
-        })
-
-        gift_product_data = json.dumps({
-            "id": buy_n_get_n_campaign.gift_product.id,
-            "quantity": buy_n_get_n_campaign.gift_product.quantity,
-            "price": buy_n_get_n_campaign.gift_product.price,
-            "total": buy_n_get_n_campaign.gift_product.total,
-            "discount_price": buy_n_get_n_campaign.gift_product.discount_price,
-            "discount_total": buy_n_get_n_campaign.gift_product.discount_total
-        })
-
-        self.connection.execute(
-            "INSERT INTO buy_n_get_n_campaigns "
-            "(id, campaign_type, buy_product, gift_product) "
-            "VALUES (?, ?, ?, ?)",
-            (campaign_id,
-             buy_n_get_n_campaign.campaign_type.value,
-             buy_product_data,
-             gift_product_data)
-        )
-        self.connection.commit()
-        return buy_n_get_n_campaign
+        with self._work():
+            campaign_id = self.new_id()
+            buy_n_get_n_campaign.id = campaign_id
+
+            # Serialize buy_product and gift_product to JSON
+            buy_product_data = json.dumps({
+                "id": buy_n_get_n_campaign.buy_product.id,
+                "quantity": buy_n_get_n_campaign.buy_product.quantity,
+                "price": buy_n_get_n_campaign.buy_product.price,
+                "total": buy_n_get_n_campaign.buy_product.total,
+                "discount_price": buy_n_get_n_campaign.buy_product.discount_price,
+                "discount_total": buy_n_get_n_campaign.buy_product.discount_total
+            })
+
+            gift_product_data = json.dumps({
+                "id": buy_n_get_n_campaign.gift_product.id,
+                "quantity": buy_n_get_n_campaign.gift_product.quantity,
+                "price": buy_n_get_n_campaign.gift_product.price,
+                "total": buy_n_get_n_campaign.gift_product.total,
+                "discount_price": buy_n_get_n_campaign.gift_product.discount_price,
+                "discount_total": buy_n_get_n_campaign.gift_product.discount_total
+            })
+
+            self.connection.execute(
+                "INSERT INTO buy_n_get_n_campaigns "
+                "(id, campaign_type, buy_product, gift_product) "
+                "VALUES (?, ?, ?, ?)",
+                (campaign_id,
+                 buy_n_get_n_campaign.campaign_type.value,
+                 buy_product_data,
+                 gift_product_data)
+            )
+            return buy_n_get_n_campaign
 
     def get_all(self) -> List[BuyNGetNCampaign]:
         cursor = self.connection.execute(
             "SELECT id, campaign_type, buy_product, gift_product "
             "FROM buy_n_get_n_campaigns")
+        return self._from_rows(cursor.fetchall())
+
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[BuyNGetNCampaign]:
+        cursor = self.connection.execute(
+            "SELECT id, campaign_type, buy_product, gift_product "
+            "FROM buy_n_get_n_campaigns WHERE id > ? ORDER BY id LIMIT ?",
+            (after or "", limit))
+        return self._from_rows(cursor.fetchall())
+
+    def _from_rows(self, rows: List[Any]) -> List[BuyNGetNCampaign]:
         campaigns = []
-        for row in cursor.fetchall():
+        for row in rows:
             campaign_id = row[0]
             campaign_type = CampaignType(row[1])
 
@@ -1093,30 +1648,35 @@ class BuyNGetNCampaignSqliteRepository(IBuyNGetNCampaignRepository):
         return None
 
     def delete_campaign(self, campaign_id: str) -> None:
-        self.connection.execute("DELETE FROM buy_n_get_n_campaigns "
-                                "WHERE id = ?",
-                                (campaign_id,))
-        self.connection.commit()
+        with self._work():
+            self.connection.execute("DELETE FROM buy_n_get_n_campaigns "
+                                    "WHERE id = ?",
+                                    (campaign_id,))
 
 
+@timed_layer(REPOSITORY)
 class ReceiptDiscountCampaignSqliteRepository(
     IReceiptDiscountCampaignRepository):
-    def __init__(self, connection: sqlite3.Connection):
+    def __init__(self, connection: sqlite3.Connection,
+                 new_id: IdGenerator = uuid7_id,
+                 unit_of_work: Optional[SqliteUnitOfWork] = None):
         self.connection = connection
+        self.new_id = new_id
+        self._work = unit_of_work or SqliteUnitOfWork(connection)
 
     def create(self, receipt_campaign: ReceiptCampaign) -> ReceiptCampaign:
-        campaign_id = str(uuid.uuid4())
-        receipt_campaign.id = campaign_id
-        self.connection.execute(
-            "INSERT INTO receipt_discount_campaigns"
-            " (id, campaign_type, total, discount) VALUES (?, ?, ?, ?)",
-            (campaign_id,
-             receipt_campaign.campaign_type.value,
-             receipt_campaign.total,
-             receipt_campaign.discount)
-        )
-        self.connection.commit()
-        return receipt_campaign
+        with self._work():
+            campaign_id = self.new_id()
+            receipt_campaign.id = campaign_id
+            self.connection.execute(
+                "INSERT INTO receipt_discount_campaigns"
+                " (id, campaign_type, total, discount) VALUES (?, ?, ?, ?)",
+                (campaign_id,
+                 receipt_campaign.campaign_type.value,
+                 receipt_campaign.total,
+                 receipt_campaign.discount)
+            )
+            return receipt_campaign
 
     def get_one_campaign(self, campaign_id: str) -> Optional[ReceiptCampaign]:
         cursor = self.connection.execute(
@@ -1142,8 +1702,19 @@ class ReceiptDiscountCampaignSqliteRepository(
                                          "campaign_type, "
                                          "total, "
                                          "discount FROM receipt_discount_campaigns")
+        return self._from_rows(cursor.fetchall())
+
+    def get_page(self, after: Optional[str],
+                 limit: int) -> List[ReceiptCampaign]:
+        cursor = self.connection.execute(
+            "SELECT id, campaign_type, total, discount "
+            "FROM receipt_discount_campaigns WHERE id > ? ORDER BY id LIMIT ?",
+            (after or "", limit))
+        return self._from_rows(cursor.fetchall())
+
+    def _from_rows(self, rows: List[Any]) -> List[ReceiptCampaign]:
         campaigns = []
-        for row in cursor.fetchall():
+        for row in rows:
             campaigns.append(
                 ReceiptCampaign(id=row[0],
                                 campaign_type=CampaignType(row[1]),
@@ -1152,9 +1723,9 @@ class ReceiptDiscountCampaignSqliteRepository(
         return campaigns
 
     def delete_campaign(self, campaign_id: str) -> None:
-        self.connection.execute("DELETE FROM receipt_discount_campaigns "
-                                "WHERE id = ?", (campaign_id,))
-        self.connection.commit()
+        with self._work():
+            self.connection.execute("DELETE FROM receipt_discount_campaigns "
+                                    "WHERE id = ?", (campaign_id,))
 
     def get_discount_on_amount(self, amount: float) -> Optional[ReceiptCampaign]:
         cursor = self.connection.execute(
@@ -1174,3 +1745,112 @@ class ReceiptDiscountCampaignSqliteRepository(
 
 
         return None
+
+
+@timed_layer(REPOSITORY)
+class ExchangeRateSqliteRepository(IExchangeRateRepository):
+    def __init__(self, connection: sqlite3.Connection,
+                 unit_of_work: Optional[SqliteUnitOfWork] = None):
+        self.connection = connection
+        self._work = unit_of_work or SqliteUnitOfWork(connection)
+
+    def get_rate(self, from_currency: str,
+                 to_currency: str) -> Optional[ExchangeRate]:
+        cursor = self.connection.execute(
+            "SELECT from_currency, to_currency, rate, fetched_at"
+            " FROM exchange_rates"
+            " WHERE from_currency = ? AND to_currency = ?",
+            (from_currency, to_currency)
+        )
+        row = cursor.fetchone()
+        if row:
+            return ExchangeRate(from_currency=row[0],
+                                to_currency=row[1],
+                                rate=row[2],
+                                fetched_at=row[3])
+
+        return None
+
+    def save_rate(self, exchange_rate: ExchangeRate) -> None:
+        with self._work():
+            self.connection.execute(
+                "INSERT INTO exchange_rates"
+                " (from_currency, to_currency, rate, fetched_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (from_currency, to_currency)"
+                " DO UPDATE SET rate = excluded.rate,"
+                " fetched_at = excluded.fetched_at",
+                (exchange_rate.from_currency,
+                 exchange_rate.to_currency,
+                 exchange_rate.rate,
+                 exchange_rate.fetched_at)
+            )
+
+
+@timed_layer(REPOSITORY)
+class CatalogChangeSqliteRepository(ICatalogChangeRepository):
+    def __init__(self, connection: sqlite3.Connection,
+                 unit_of_work: Optional[SqliteUnitOfWork] = None):
+        self.connection = connection
+        self._work = unit_of_work or SqliteUnitOfWork(connection)
+
+    def append(self, entity: ChangeEntity, entity_id: str,
+               op: ChangeOp, changed_at: float) -> CatalogChange:
+        with self._work():
+            cursor = self.connection.execute(
+                "INSERT INTO catalog_changes (entity, entity_id, op, changed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (entity.value, entity_id, op.value, changed_at)
+            )
+            assert cursor.lastrowid is not None
+            return CatalogChange(seq=cursor.lastrowid, entity=entity,
+                                 entity_id=entity_id, op=op,
+                                 changed_at=changed_at)
+
+    def append_many(self, entity: ChangeEntity, entity_ids: List[str],
+                    op: ChangeOp, changed_at: float) -> None:
+        with self._work():
+            self.connection.executemany(
+                "INSERT INTO catalog_changes (entity, entity_id, op, changed_at)"
+                " VALUES (?, ?, ?, ?)",
+                [(entity.value, entity_id, op.value, changed_at)
+                 for entity_id in entity_ids]
+            )
+
+    def get_since(self, seq: int, limit: int) -> List[CatalogChange]:
+        cursor = self.connection.execute(
+            "SELECT seq, entity, entity_id, op, changed_at"
+            " FROM catalog_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (seq, limit)
+        )
+        return [CatalogChange(seq=row[0],
+                              entity=ChangeEntity(row[1]),
+                              entity_id=row[2],
+                              op=ChangeOp(row[3]),
+                              changed_at=row[4])
+                for row in cursor.fetchall()]
+
+    def bounds(self) -> Tuple[int, int]:
+        row = self.connection.execute(
+            "SELECT MIN(seq) FROM catalog_changes").fetchone()
+        oldest = row[0] or 0
+        # the sequence table remembers the last seq even when compaction
+        # emptied the log
+        row = self.connection.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'catalog_changes'"
+        ).fetchone()
+        latest = row[0] if row else 0
+        return oldest, latest
+
+    def latest(self) -> Tuple[int, float]:
+        _, seq = self.bounds()
+        row = self.connection.execute(
+            "SELECT changed_at FROM catalog_changes WHERE seq = ?",
+            (seq,)).fetchone()
+        return seq, row[0] if row else 0.0
+
+    def delete_through(self, seq: int) -> int:
+        with self._work():
+            cursor = self.connection.execute(
+                "DELETE FROM catalog_changes WHERE seq <= ?", (seq,))
+            return cursor.rowcount
@@ -0,0 +1,85 @@
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List
+
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DB_COMMITS = REGISTRY.counter(
+    "db_commits_total", "Transactions committed to the database.")
+DB_ROLLBACKS = REGISTRY.counter(
+    "db_rollbacks_total", "Transactions rolled back after an error.")
+DB_COMMIT_SECONDS = REGISTRY.histogram(
+    "db_commit_seconds", "Time spent committing transactions.")
+
+
+@dataclass
+class SqliteUnitOfWork:
+    # one per connection, shared by all repositories on it. Every write
+    # method runs inside it; an interactor can open it around a whole use
+    # case, and the writes of all repositories then commit once at the
+    # outermost exit or roll back together. The lock keeps other threads
+    # sharing the connection from writing into an open transaction.
+    connection: sqlite3.Connection
+    _lock: threading.RLock = field(default_factory=threading.RLock)
+    _depth: int = 0
+    _after_commit: List[Callable[[], None]] = field(default_factory=list)
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        # runs once the open transaction commits, and not at all if it
+        # rolls back; outside a transaction, at once. Either way under the
+        # lock, so no other thread's transaction is open while it reads.
+        with self._lock:
+            if self._depth > 0:
+                self._after_commit.append(callback)
+            else:
+                self._run([callback])
+
+    def _run(self, callbacks: List[Callable[[], None]]) -> None:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as exc:
+                # the transaction is in; its caller must not see it fail
+                logger.warning("After-commit callback failed: %s", exc)
+
+    @contextmanager
+    def __call__(self) -> Iterator[None]:
+        with self._lock:
+            self._depth += 1
+            savepoint = f"unit_of_work_{self._depth}"
+            callbacks: List[Callable[[], None]] = []
+            try:
+                if self._depth == 1:
+                    if not self.connection.in_transaction:
+                        self.connection.execute("BEGIN")
+                else:
+                    # an inner failure the caller recovers from undoes
+                    # only its own writes
+                    self.connection.execute(f"SAVEPOINT {savepoint}")
+                yield
+            except BaseException:
+                if self._depth == 1:
+                    self.connection.rollback()
+                    self._after_commit.clear()
+                    DB_ROLLBACKS.inc()
+                else:
+                    self.connection.execute(f"ROLLBACK TO {savepoint}")
+                    self.connection.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                if self._depth == 1:
+                    with DB_COMMIT_SECONDS.time():
+                        self.connection.commit()
+                    DB_COMMITS.inc()
+                    callbacks, self._after_commit = self._after_commit, []
+                else:
+                    self.connection.execute(f"RELEASE {savepoint}")
+            finally:
+                self._depth -= 1
+            # still under the lock, so they run in commit order
+            self._run(callbacks)
@@ -0,0 +1,295 @@
+import copy
+import dataclasses
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
+from app.core.factories.repo_factory import UnitOfWork
+from app.core.metrics import REGISTRY
+from app.core.models.receipt import Receipt
+from app.core.repositories.receipt_repesitory import IReceiptRepository
+from app.infra.cache import LRUCache
+from app.infra.env import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_PENDING = REGISTRY.gauge(
+    "receipt_write_behind_pending",
+    "Receipts with acknowledged line changes not yet in the database.")
+WRITE_BEHIND_FLUSHES = REGISTRY.counter(
+    "receipt_write_behind_flushes_total",
+    "Grouped transactions written by the receipt write-behind buffer.")
+WRITE_BEHIND_WRITES = REGISTRY.counter(
+    "receipt_write_behind_writes_total",
+    "Receipts written by the write-behind buffer.")
+WRITE_BEHIND_FAILURES = REGISTRY.counter(
+    "receipt_write_behind_failures_total",
+    "Write-behind flushes that failed and were kept for a retry.")
+WRITE_BEHIND_CONFLICTS = REGISTRY.counter(
+    "receipt_write_behind_conflicts_total",
+    "Queued receipts dropped because the database copy changed under them.")
+
+
+@dataclass(frozen=True)
+class WriteBehindSettings:
+    # off by default: a line is acknowledged before it is durable, so a
+    # crashed worker loses whatever was still queued
+    enabled: bool = False
+    flush_interval: float = 0.005
+    max_pending_ops: int = 64
+
+    @classmethod
+    def from_env(cls) -> 'WriteBehindSettings':
+        default = cls()
+        return cls(
+            enabled=env_bool("RECEIPT_WRITE_BEHIND", default.enabled),
+            flush_interval=env_float("RECEIPT_FLUSH_INTERVAL_MS",
+                                     default.flush_interval * 1000) / 1000,
+            max_pending_ops=env_int("RECEIPT_FLUSH_MAX_OPS",
+                                    default.max_pending_ops),
+        )
+
+
+@dataclass
+class WriteBehindReceiptRepository(IReceiptRepository):
+    # Line changes (add_product, delete_item) rewrite the whole receipt,
+    # so only the latest state of each receipt is kept and a burst of
+    # scans on one lane becomes one write. A background thread writes
+    # everything queued in one transaction every flush_interval, or as
+    # soon as max_pending_ops changes pile up. Reads see queued state;
+    # anything that closes or deletes a receipt flushes it first.
+    # Versions are checked when a change is queued, against the queued
+    # state or the last version known to be stored, and again against
+    # the database when it is written.
+    inner: IReceiptRepository
+    unit_of_work: UnitOfWork
+    flush_interval: float = 0.005
+    max_pending_ops: int = 64
+    known_versions: int = 4096
+    _pending: Dict[str, Receipt] = field(default_factory=dict)
+    # stored version each queued receipt was based on
+    _base_versions: Dict[str, int] = field(default_factory=dict)
+    _stored_versions: LRUCache[int] = field(init=False)
+    _pending_ops: int = 0
+    _condition: threading.Condition = field(
+        default_factory=threading.Condition)
+    # serializes writers where the unit of work does not (in memory)
+    _write_lock: threading.RLock = field(default_factory=threading.RLock)
+    _thread: Optional[threading.Thread] = None
+    _stopping: bool = False
+
+    def __post_init__(self) -> None:
+        self._stored_versions = LRUCache(name="receipt_versions",
+                                         max_size=self.known_versions)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run,
+                                        name="receipt-write-behind",
+                                        daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopping
+                    or self._pending_ops >= self.max_pending_ops,
+                    timeout=self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush_all()
+            except Exception:
+                # kept queued; the next round tries again
+                WRITE_BEHIND_FAILURES.inc()
+                logger.exception("Could not flush queued receipt changes")
+
+    def _queue(self, receipt: Receipt,
+               expected_version: Optional[int] = None) -> None:
+        if expected_version is None:
+            expected_version = receipt.version
+        with self._condition:
+            queued = self._pending.get(receipt.id)
+            current = (queued.version if queued is not None
+                       else self._stored_versions.get(receipt.id))
+            if current is not None and current != expected_version:
+                raise ReceiptConflictError(receipt_id=receipt.id)
+            if queued is None:
+                self._base_versions[receipt.id] = expected_version
+            receipt.version += 1
+            self._pending[receipt.id] = copy.deepcopy(receipt)
+            self._pending_ops += 1
+            WRITE_BEHIND_PENDING.set(len(self._pending))
+            if self._pending_ops >= self.max_pending_ops:
+                self._condition.notify()
+
+    def _queued(self, receipt_id: str) -> Optional[Receipt]:
+        with self._condition:
+            receipt = self._pending.get(receipt_id)
+            return copy.deepcopy(receipt) if receipt is not None else None
+
+    def _wanted(self, receipt_ids: Optional[List[str]]) -> List[str]:
+        if receipt_ids is None:
+            return list(self._pending)
+        return [receipt_id for receipt_id in receipt_ids
+                if receipt_id in self._pending]
+
+    def _write(self, receipt_ids: Optional[List[str]]) -> None:
+        with self._condition:
+            if not self._wanted(receipt_ids):
+                return
+
+        # the unit of work comes first, in the same order a payment takes
+        # the locks, so a flush from a request never waits on the writer
+        # while holding what the writer needs
+        with self.unit_of_work(), self._write_lock:
+            with self._condition:
+                batch = {receipt_id: self._pending[receipt_id]
+                         for receipt_id in self._wanted(receipt_ids)}
+                bases = {receipt_id: self._base_versions[receipt_id]
+                         for receipt_id in batch}
+                if receipt_ids is None:
+                    self._pending_ops = 0
+            if not batch:
+                return
+
+            conflicts = []
+            for receipt_id, receipt in batch.items():
+                # stored as the queued version, if the database is still
+                # at the version the queued changes started from
+                try:
+                    self.inner.add_product(
+                        receipt=dataclasses.replace(
+                            receipt, version=receipt.version - 1),
+                        expected_version=bases[receipt_id])
+                except ReceiptConflictError:
+                    conflicts.append(receipt_id)
+
+        # still queued until the transaction is in; dropped only if no
+        # newer change came in meanwhile, which then builds on this write
+        with self._condition:
+            for receipt_id, receipt in batch.items():
+                if receipt_id in conflicts:
+                    continue
+                self._remember(receipt_id, receipt.version)
+                if self._pending.get(receipt_id) is receipt:
+                    del self._pending[receipt_id]
+                    del self._base_versions[receipt_id]
+                elif receipt_id in self._pending:
+                    self._base_versions[receipt_id] = receipt.version
+            WRITE_BEHIND_PENDING.set(len(self._pending))
+        if conflicts:
+            # another process changed these receipts; their queued lines
+            # are lost rather than written over that change
+            WRITE_BEHIND_CONFLICTS.inc(len(conflicts))
+            logger.warning("Dropped queued changes of receipts changed"
+                           " elsewhere: %s", ", ".join(conflicts))
+            self._forget(conflicts)
+        WRITE_BEHIND_FLUSHES.inc()
+        WRITE_BEHIND_WRITES.inc(len(batch) - len(conflicts))
+
+    def flush_all(self) -> None:
+        self._write(receipt_ids=None)
+
+    def flush(self, receipt_ids: List[str]) -> None:
+        self._write(receipt_ids=receipt_ids)
+
+    def _forget(self, receipt_ids: Iterable[str]) -> None:
+        with self._condition:
+            for receipt_id in receipt_ids:
+                self._pending.pop(receipt_id, None)
+                self._base_versions.pop(receipt_id, None)
+                self._stored_versions.pop(receipt_id)
+            WRITE_BEHIND_PENDING.set(len(self._pending))
+
+    def _remember(self, receipt_id: str, version: int) -> None:
+        # versions only grow; a read that raced a flush must not put
+        # back the older one
+        with self._condition:
+            known = self._stored_versions.get(receipt_id)
+            self._stored_versions.put(receipt_id, max(known or 0, version))
+
+    def _changed(self, receipt_ids: Iterable[str]) -> None:
+        # closing a receipt stores a new version of it
+        with self._condition:
+            for receipt_id in receipt_ids:
+                version = self._stored_versions.get(receipt_id)
+                if version is not None:
+                    self._stored_versions.put(receipt_id, version + 1)
+
+    def create(self, receipt: Receipt) -> Receipt:
+        return self.inner.create(receipt=receipt)
+
+    def get_one(self, receipt_id: str) -> Optional[Receipt]:
+        queued = self._queued(receipt_id)
+        if queued is not None:
+            return queued
+        receipt = self.inner.get_one(receipt_id=receipt_id)
+        if receipt is not None:
+            self._remember(receipt_id, receipt.version)
+        return receipt
+
+    def _overlay(self, receipts: List[Receipt]) -> List[Receipt]:
+        with self._condition:
+            if not self._pending:
+                return receipts
+            return [copy.deepcopy(self._pending[receipt.id])
+                    if receipt.id in self._pending else receipt
+                    for receipt in receipts]
+
+    def get_all(self) -> List[Receipt]:
+        return self._overlay(self.inner.get_all())
+
+    def get_page(self, after: Optional[str], limit: int,
+                 shift_id: Optional[str] = None,
+                 status: Optional[bool] = None) -> List[Receipt]:
+        return self._overlay(self.inner.get_page(
+            after=after, limit=limit, shift_id=shift_id, status=status))
+
+    def delete(self, receipt_id: str) -> None:
+        self._forget([receipt_id])
+        self.inner.delete(receipt_id=receipt_id)
+
+    def update(self, receipt_id: str, status: bool,
+               expected_version: Optional[int] = None) -> None:
+        self.flush([receipt_id])
+        try:
+            self.inner.update(receipt_id=receipt_id, status=status,
+                              expected_version=expected_version)
+        except ReceiptConflictError:
+            self._forget([receipt_id])
+            raise
+        self._changed([receipt_id])
+
+    def close_many(self, receipt_ids: List[str],
+                   expected_versions: Optional[Dict[str, int]] = None) -> None:
+        self.flush(receipt_ids)
+        try:
+            self.inner.close_many(receipt_ids=receipt_ids,
+                                  expected_versions=expected_versions)
+        except ReceiptConflictError as exc:
+            self._forget([exc.receipt_id])
+            raise
+        self._changed(receipt_ids)
+
+    def add_product(self, receipt: Receipt,
+                    expected_version: Optional[int] = None) -> Receipt:
+        self._queue(receipt, expected_version=expected_version)
+        return receipt
+
+    def delete_item(self, receipt: Receipt) -> None:
+        self._queue(receipt)
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Tuple
+
+from app.core.services.payment_service import PaymentService
+from app.infra.env import env_float, env_str
+
+logger = logging.getLogger(__name__)
+
+CurrencyPair = Tuple[str, str]
+
+
+def _parse_pairs(value: str) -> Tuple[CurrencyPair, ...]:
+    # "GEL-USD,GEL-EUR" -> (("GEL", "USD"), ("GEL", "EUR"))
+    pairs = []
+    for pair in value.split(","):
+        if pair.strip():
+            from_currency, to_currency = pair.strip().split("-")
+            pairs.append((from_currency.upper(), to_currency.upper()))
+
+    return tuple(pairs)
+
+
+@dataclass(frozen=True)
+class FxRefreshSettings:
+    pairs: Tuple[CurrencyPair, ...] = (("GEL", "USD"), ("GEL", "EUR"))
+    interval: float = 300.0
+    max_rate_age: float = 3600.0
+
+    @classmethod
+    def from_env(cls) -> 'FxRefreshSettings':
+        default = cls()
+        pairs = _parse_pairs(env_str("FX_PAIRS", ""))
+        return cls(
+            pairs=pairs or default.pairs,
+            interval=env_float("FX_REFRESH_INTERVAL", default.interval),
+            max_rate_age=env_float("FX_MAX_RATE_AGE", default.max_rate_age),
+        )
+
+
+@dataclass
+class FxRateRefresher:
+    payment_service: PaymentService
+    pairs: Tuple[CurrencyPair, ...]
+    interval: float
+
+    async def refresh_once(self) -> None:
+        results = await asyncio.gather(
+            *(self.payment_service.refresh_rate(from_currency, to_currency)
+              for from_currency, to_currency in self.pairs),
+            return_exceptions=True)
+        for (from_currency, to_currency), result in zip(self.pairs, results):
+            if isinstance(result, Exception):
+                logger.warning("Could not refresh %s-%s rate: %s",
+                               from_currency, to_currency, result)
+
+    async def run(self) -> None:
+        while True:
+            await self.refresh_once()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.services.circuit_breaker import CircuitBreaker
+from app.core.services.payment_service import BASE_URL, RetryPolicy
+from app.infra.env import env_bool, env_float, env_int, env_str
+
+
+@dataclass(frozen=True)
+class HttpClientSettings:
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 2.0
+    read_timeout: float = 5.0
+    write_timeout: float = 5.0
+    pool_timeout: float = 2.0
+    http2: bool = False
+    retry_attempts: int = 3
+    retry_base_delay: float = 0.1
+    retry_max_delay: float = 1.0
+    fx_base_url: str = BASE_URL
+    breaker_failure_threshold: int = 5
+    breaker_slow_call_threshold: float = 2.0
+    breaker_reset_timeout: float = 30.0
+    hedge_requests: bool = False
+
+    @classmethod
+    def from_env(cls) -> 'HttpClientSettings':
+        default = cls()
+        return cls(
+            max_connections=env_int(
+                "HTTP_MAX_CONNECTIONS", default.max_connections),
+            max_keepalive_connections=env_int(
+                "HTTP_MAX_KEEPALIVE_CONNECTIONS",
+                default.max_keepalive_connections),
+            keepalive_expiry=env_float(
+                "HTTP_KEEPALIVE_EXPIRY", default.keepalive_expiry),
+            connect_timeout=env_float(
+                "HTTP_CONNECT_TIMEOUT", default.connect_timeout),
+            read_timeout=env_float(
+                "HTTP_READ_TIMEOUT", default.read_timeout),
+            write_timeout=env_float(
+                "HTTP_WRITE_TIMEOUT", default.write_timeout),
+            pool_timeout=env_float(
+                "HTTP_POOL_TIMEOUT", default.pool_timeout),
+            http2=env_bool("HTTP_HTTP2", default.http2),
+            retry_attempts=env_int(
+                "HTTP_RETRY_ATTEMPTS", default.retry_attempts),
+            retry_base_delay=env_float(
+                "HTTP_RETRY_BASE_DELAY", default.retry_base_delay),
+            retry_max_delay=env_float(
+                "HTTP_RETRY_MAX_DELAY", default.retry_max_delay),
+            fx_base_url=env_str("FX_API_BASE_URL", default.fx_base_url),
+            breaker_failure_threshold=env_int(
+                "FX_BREAKER_FAILURE_THRESHOLD",
+                default.breaker_failure_threshold),
+            breaker_slow_call_threshold=env_float(
+                "FX_BREAKER_SLOW_CALL_THRESHOLD",
+                default.breaker_slow_call_threshold),
+            breaker_reset_timeout=env_float(
+                "FX_BREAKER_RESET_TIMEOUT", default.breaker_reset_timeout),
+            hedge_requests=env_bool(
+                "FX_HEDGE_REQUESTS", default.hedge_requests),
+        )
+
+    def retry_policy(self) -> RetryPolicy:
+        return RetryPolicy(
+            attempts=self.retry_attempts,
+            base_delay=self.retry_base_delay,
+            max_delay=self.retry_max_delay)
+
+    def circuit_breaker(self) -> CircuitBreaker:
+        return CircuitBreaker(
+            name="fx",
+            failure_threshold=self.breaker_failure_threshold,
+            slow_call_threshold=self.breaker_slow_call_threshold,
+            reset_timeout=self.breaker_reset_timeout)
+
+
+def create_http_client(settings: HttpClientSettings) -> httpx.AsyncClient:
+    # http2 needs the optional "h2" package (pip install httpx[http2])
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry),
+        timeout=httpx.Timeout(
+            connect=settings.connect_timeout,
+            read=settings.read_timeout,
+            write=settings.write_timeout,
+            pool=settings.pool_timeout),
+        http2=settings.http2)
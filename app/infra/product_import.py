@@ -0,0 +1,93 @@
+import codecs
+import csv
+import json
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from app.core.models import NO_ID
+from app.core.models.product import Product
+from app.core.models.product_import import ProductImportRow
+
+COLUMNS = ("name", "barcode", "price")
+
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+@dataclass
+class ProductRowParser:
+    # stateful so it can be fed a stream a batch of lines at a time:
+    # it remembers the CSV header and the line number it got to
+    format: ImportFormat
+    _line: int = 0
+    _columns: Optional[List[str]] = None
+
+    def parse(self, lines: Iterable[str]) -> Iterator[ProductImportRow]:
+        for text in lines:
+            self._line += 1
+            text = text.strip()
+            if not text:
+                continue
+            if self.format == ImportFormat.CSV and self._columns is None:
+                self._columns = [column.strip().lower()
+                                 for column in next(csv.reader([text]))]
+                continue
+            yield self._row(text)
+
+    def _fields(self, text: str) -> Dict[str, Any]:
+        if self.format == ImportFormat.NDJSON:
+            fields = json.loads(text)
+            if not isinstance(fields, dict):
+                raise ValueError("expected a JSON object")
+            return fields
+
+        assert self._columns is not None
+        values = next(csv.reader([text]))
+        return dict(zip(self._columns, values))
+
+    def _row(self, text: str) -> ProductImportRow:
+        try:
+            fields = self._fields(text)
+            missing = [column for column in COLUMNS if column not in fields]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+            product = Product(id=NO_ID,
+                              name=str(fields["name"]).strip(),
+                              barcode=str(fields["barcode"]).strip(),
+                              price=float(fields["price"]))
+        except (ValueError, TypeError) as exc:
+            return ProductImportRow(line=self._line,
+                                    error=f"Invalid row: {exc}")
+
+        if not product.name or not product.barcode:
+            return ProductImportRow(
+                line=self._line, error="Invalid row: empty name or barcode")
+        if product.price < 0:
+            return ProductImportRow(
+                line=self._line, error="Invalid row: negative price")
+        return ProductImportRow(line=self._line, product=product)
+
+
+async def read_lines(stream: AsyncIterator[bytes],
+                     batch_size: int) -> AsyncIterator[List[str]]:
+    # decodes incrementally, so a multi-byte character split between two
+    # network chunks is put back together
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    batch: List[str] = []
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        batch.extend(lines)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        batch.append(pending)
+    if batch:
+        yield batch
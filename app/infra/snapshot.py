@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import IO, Iterator, List, Optional, Tuple
+
+from app.core.executors import run_blocking
+from app.core.metrics import REGISTRY
+from app.core.models.product import Product
+from app.core.repositories.campaign_repository import (
+    IProductDiscountCampaignRepository,
+)
+from app.core.repositories.product_repository import IProductRepository
+from app.core.services.catalog_version import CatalogVersion
+from app.infra.env import env_float, env_str
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+# File layout (little endian), every section sorted for binary search:
+#   header   magic, generation, built_at, record count
+#   records  product id, barcode, price, best discount, its campaign id
+#            and where the name sits in the name blob; sorted by id
+#   barcodes barcode -> record index; sorted by barcode
+#   names    utf-8 product names
+MAGIC = b"POSCAT01"
+ID_SIZE = 36
+BARCODE_SIZE = 32
+HEADER = struct.Struct("<8sQdI")
+RECORD = struct.Struct(f"<{ID_SIZE}s{BARCODE_SIZE}sdi{ID_SIZE}sII")
+BARCODE = struct.Struct(f"<{BARCODE_SIZE}sI")
+NO_DISCOUNT = -1
+
+SNAPSHOT_PUBLISHES = REGISTRY.counter(
+    "catalog_snapshot_publishes_total",
+    "Catalog snapshots written by this process.")
+SNAPSHOT_GENERATION = REGISTRY.gauge(
+    "catalog_snapshot_generation",
+    "Generation of the catalog snapshot this process has mapped.")
+
+
+@dataclass(frozen=True)
+class SnapshotEntry:
+    product: Product
+    discount: Optional[int] = None
+    campaign_id: Optional[str] = None
+
+
+@contextmanager
+def _exclusive(lock: IO[str]) -> Iterator[None]:
+    # one holder across processes; flock goes when the file is closed
+    if sys.platform == "win32":
+        lock.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                # LK_LOCK gives up after about ten seconds
+                continue
+        try:
+            yield
+        finally:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _key(value: str, size: int) -> Optional[bytes]:
+    encoded = value.encode()
+    if len(encoded) > size:
+        return None
+    return encoded.ljust(size, b"\0")
+
+
+def _text(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode()
+
+
+def encode_snapshot(generation: int, built_at: float,
+                    entries: List[SnapshotEntry]) -> bytes:
+    # ids and barcodes that do not fit a slot are left out; lookups of
+    # those simply miss and go to the database
+    keyed = []
+    for entry in entries:
+        product_key = _key(entry.product.id, ID_SIZE)
+        barcode_key = _key(entry.product.barcode, BARCODE_SIZE)
+        campaign_key = _key(entry.campaign_id or "", ID_SIZE)
+        if product_key and barcode_key and campaign_key is not None:
+            keyed.append((product_key, barcode_key, campaign_key, entry))
+    keyed.sort(key=lambda row: row[0])
+
+    records = bytearray()
+    names = bytearray()
+    barcodes: List[Tuple[bytes, int]] = []
+    for index, (product_key, barcode_key, campaign_key, entry) in \
+            enumerate(keyed):
+        name = entry.product.name.encode()
+        discount = (NO_DISCOUNT if entry.discount is None
+                    else int(entry.discount))
+        records += RECORD.pack(product_key, barcode_key, entry.product.price,
+                               discount, campaign_key, len(names), len(name))
+        names += name
+        barcodes.append((barcode_key, index))
+    barcodes.sort()
+
+    return b"".join([
+        HEADER.pack(MAGIC, generation, built_at, len(keyed)),
+        bytes(records),
+        b"".join(BARCODE.pack(barcode, index) for barcode, index in barcodes),
+        bytes(names)])
+
+
+@dataclass
+class MappedSnapshot:
+    # one immutable generation; readers that still hold it keep the old
+    # mapping alive after a newer file replaced it
+    buffer: mmap.mmap
+    generation: int
+    built_at: float
+    count: int
+
+    @classmethod
+    def open(cls, path: str) -> 'MappedSnapshot':
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, generation, built_at, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            buffer.close()
+            raise ValueError(f"{path} is not a catalog snapshot")
+        return cls(buffer=buffer, generation=generation,
+                   built_at=built_at, count=count)
+
+    def _barcodes_at(self) -> int:
+        return HEADER.size + self.count * RECORD.size
+
+    def _search(self, start: int, size: int, key: bytes) -> Optional[int]:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = start + middle * size
+            probe = self.buffer[offset:offset + len(key)]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _entry(self, index: int) -> SnapshotEntry:
+        (product_id, barcode, price, discount, campaign_id,
+         name_at, name_size) = RECORD.unpack_from(
+            self.buffer, HEADER.size + index * RECORD.size)
+        names_at = self._barcodes_at() + self.count * BARCODE.size
+        name = self.buffer[names_at + name_at:names_at + name_at + name_size]
+        return SnapshotEntry(
+            product=Product(id=_text(product_id), name=name.decode(),
+                            barcode=_text(barcode), price=price),
+            discount=None if discount == NO_DISCOUNT else discount,
+            campaign_id=_text(campaign_id) or None)
+
+    def get(self, product_id: str) -> Optional[SnapshotEntry]:
+        key = _key(product_id, ID_SIZE)
+        if key is None:
+            return None
+        index = self._search(HEADER.size, RECORD.size, key)
+        return None if index is None else self._entry(index)
+
+    def get_by_barcode(self, barcode: str) -> Optional[SnapshotEntry]:
+        key = _key(barcode, BARCODE_SIZE)
+        if key is None:
+            return None
+        position = self._search(self._barcodes_at(), BARCODE.size, key)
+        if position is None:
+            return None
+        _, index = BARCODE.unpack_from(
+            self.buffer, self._barcodes_at() + position * BARCODE.size)
+        return self._entry(index)
+
+
+@dataclass
+class CatalogSnapshot:
+    path: str
+    # how often readers stat the file for a newer generation
+    check_interval: float = 1.0
+    _mapped: Optional[MappedSnapshot] = None
+    _identity: Optional[Tuple[int, int]] = None
+    _checked_at: float = 0.0
+    _written_at: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _reload(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._mapped, self._identity = None, None
+            return
+        # os.replace gives every generation a new inode
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return
+        try:
+            self._mapped = MappedSnapshot.open(self.path)
+        except (OSError, ValueError, struct.error) as exc:
+            logger.warning("Could not map catalog snapshot: %s", exc)
+            self._mapped = None
+        self._identity = identity
+        if self._mapped is not None:
+            SNAPSHOT_GENERATION.set(self._mapped.generation)
+
+    def current(self) -> Optional[MappedSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                self._reload()
+            mapped = self._mapped
+            written_at = self._written_at
+        # a snapshot built before the last catalog write this process
+        # knows of, its own or another worker's, does not have that write
+        # yet; go to the database until a newer generation shows up
+        if mapped is None or mapped.built_at <= written_at:
+            return None
+        return mapped
+
+    def note_write(self) -> None:
+        with self._lock:
+            self._written_at = time.time()
+            self._checked_at = 0.0
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._mapped.generation if self._mapped else 0
+
+
+@dataclass
+class SnapshotPublisher:
+    snapshot: CatalogSnapshot
+    products: IProductRepository
+    discounts: IProductDiscountCampaignRepository
+    catalog_version: CatalogVersion
+    interval: float = 0.5
+    executor: Optional[Executor] = None
+    _published: Optional[str] = None
+
+    def publish(self, changed_at: Optional[float] = None) -> int:
+        # one publisher at a time across workers, so the generation that
+        # lands last was also read from the database last
+        with open(f"{self.snapshot.path}.lock", "a") as lock, \
+                _exclusive(lock):
+            generation, built_at = self._previous()
+            if changed_at is not None and built_at > changed_at:
+                # another worker already published everything up to the
+                # change this one is publishing for
+                return generation
+
+            built_at = time.time()
+            products = self.products.get_all()
+            campaigns = self.discounts.get_campaigns_with_products(
+                product_ids=[product.id for product in products])
+            entries = []
+            for product in products:
+                campaign = campaigns.get(product.id)
+                entries.append(SnapshotEntry(
+                    product=product,
+                    discount=campaign.discount if campaign else None,
+                    campaign_id=campaign.id if campaign else None))
+            generation += 1
+            self._write(encode_snapshot(generation, built_at, entries))
+        SNAPSHOT_PUBLISHES.inc()
+        return generation
+
+    def _previous(self) -> Tuple[int, float]:
+        try:
+            with open(self.snapshot.path, "rb") as file:
+                magic, generation, built_at, _ = HEADER.unpack(
+                    file.read(HEADER.size))
+        except (OSError, struct.error):
+            return 0, 0.0
+        return (generation, built_at) if magic == MAGIC else (0, 0.0)
+
+    def _write(self, data: bytes) -> None:
+        directory = os.path.dirname(os.path.abspath(self.snapshot.path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory,
+                                                 suffix=".snapshot")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.snapshot.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    async def run(self) -> None:
+        while True:
+            version, changed_at = self.catalog_version.current()
+            if version != self._published:
+                try:
+                    await run_blocking(self.executor, self.publish,
+                                       changed_at)
+                    self._published = version
+                except Exception as exc:
+                    logger.warning("Could not publish catalog snapshot: %s",
+                                   exc)
+            await asyncio.sleep(self.interval)
+
+
+@dataclass(frozen=True)
+class SnapshotSettings:
+    # an empty path turns the snapshot off
+    path: str = "catalog.snapshot"
+    publish_interval: float = 0.5
+    check_interval: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> 'SnapshotSettings':
+        default = cls()
+        return cls(
+            path=env_str("CATALOG_SNAPSHOT_PATH", default.path),
+            publish_interval=env_float("CATALOG_SNAPSHOT_INTERVAL",
+                                       default.publish_interval),
+            check_interval=env_float("CATALOG_SNAPSHOT_CHECK_INTERVAL",
+                                     default.check_interval),
+        )
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from app.core.models.product import Product
+from app.infra.data.ids import ID_GENERATORS, id_generator
+from app.infra.data.sqlite import SqliteRepoFactory
+
+
+def _run(name: str, rows: int, batch_size: int,
+         directory: str) -> Tuple[float, int]:
+    path = os.path.join(directory, f"{name}.db")
+    connection = sqlite3.connect(path)
+    try:
+        products = SqliteRepoFactory(connection=connection,
+                                     id_generator=id_generator(name)
+                                     ).products()
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            products.create_many([
+                Product(id="", name=f"Product {number}",
+                        barcode=f"{number:013d}", price=1.0)
+                for number in range(start, min(start + batch_size, rows))])
+        elapsed = time.perf_counter() - started
+    finally:
+        connection.close()
+    return elapsed, os.path.getsize(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = argparse.ArgumentParser(
+        description="Compare insert throughput and database size"
+                    " of the id generators.")
+    arguments.add_argument("--rows", type=int, default=200_000)
+    arguments.add_argument("--batch-size", type=int, default=1000)
+    arguments.add_argument("--generator", action="append",
+                           choices=list(ID_GENERATORS))
+    args = arguments.parse_args(argv)
+
+    print(f"{'generator':<10} {'rows/s':>10} {'size (KiB)':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.generator or list(ID_GENERATORS):
+            elapsed, size = _run(name, args.rows, args.batch_size, directory)
+            print(f"{name:<10} {args.rows / elapsed:>10.0f}"
+                  f" {size // 1024:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from app.core.facade import POSCore
+from app.core.schemas.products_schema import CreateProductRequest
+from app.core.schemas.receipt_schema import (
+    AddProductInReceiptRequest,
+    CreateReceiptRequest,
+)
+from app.infra.data.cached import CachedRepoFactory
+from app.infra.data.sqlite import SqliteRepoFactory
+from app.infra.data.unit_of_work import DB_COMMITS
+from app.infra.data.write_behind import WriteBehindSettings
+
+
+def _run(write_behind: bool, lanes: int, scans: int,
+         settings: WriteBehindSettings,
+         directory: str) -> Tuple[float, List[float], float]:
+    path = os.path.join(directory, f"write_behind_{write_behind}.db")
+    connection = sqlite3.connect(path, check_same_thread=False)
+    database = CachedRepoFactory(
+        inner=SqliteRepoFactory(connection=connection),
+        write_behind=WriteBehindSettings(
+            enabled=write_behind,
+            flush_interval=settings.flush_interval,
+            max_pending_ops=settings.max_pending_ops))
+    core = POSCore.create(database)
+    shift_id = core.create_shift().id
+    product_id = core.create_product(CreateProductRequest(
+        name="Milk", barcode="4860001", price=2.5)).product.id
+    receipt_ids = [core.create_receipt(
+        CreateReceiptRequest(shift_id=shift_id)).id for _ in range(lanes)]
+    scan = AddProductInReceiptRequest(product_id=product_id, quantity=1)
+
+    latencies: List[List[float]] = [[] for _ in range(lanes)]
+
+    def lane(index: int) -> None:
+        for _ in range(scans):
+            started = time.perf_counter()
+            core.add_product_in_receipt(receipt_ids[index], scan)
+            latencies[index].append(time.perf_counter() - started)
+
+    writer = database.receipt_writer
+    if writer is not None:
+        writer.start()
+    commits = DB_COMMITS.value()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=lane, args=(index,))
+               for index in range(lanes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    committed = DB_COMMITS.value() - commits
+    connection.close()
+    return elapsed, [value for lane in latencies for value in lane], committed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = argparse.ArgumentParser(
+        description="Compare scan latency and throughput with and without"
+                    " the receipt write-behind buffer.")
+    arguments.add_argument("--lanes", type=int, default=16)
+    arguments.add_argument("--scans", type=int, default=200)
+    arguments.add_argument("--flush-interval-ms", type=float, default=5.0)
+    arguments.add_argument("--max-pending-ops", type=int, default=64)
+    args = arguments.parse_args(argv)
+    settings = WriteBehindSettings(
+        flush_interval=args.flush_interval_ms / 1000,
+        max_pending_ops=args.max_pending_ops)
+
+    print(f"{'mode':<13} {'scans/s':>9} {'p50 ms':>8} {'p99 ms':>8}"
+          f" {'commits':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for write_behind in (False, True):
+            elapsed, latencies, commits = _run(
+                write_behind, args.lanes, args.scans, settings, directory)
+            percentiles = statistics.quantiles(latencies, n=100)
+            mode = "write-behind" if write_behind else "synchronous"
+            print(f"{mode:<13} {len(latencies) / elapsed:>9.0f}"
+                  f" {percentiles[49] * 1000:>8.2f}"
+                  f" {percentiles[98] * 1000:>8.2f} {commits:>8.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
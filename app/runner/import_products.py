@@ -0,0 +1,48 @@
+import argparse
+import sqlite3
+import sys
+from typing import List, Optional
+
+from app.core.facade import POSCore
+from app.core.models.product_import import DEFAULT_IMPORT_CHUNK_SIZE
+from app.infra.data.sqlite import SqliteRepoFactory
+from app.infra.product_import import ImportFormat, ProductRowParser
+
+
+def _format(path: str, given: Optional[str]) -> ImportFormat:
+    if given:
+        return ImportFormat(given)
+    if path.endswith((".ndjson", ".jsonl")):
+        return ImportFormat.NDJSON
+    return ImportFormat.CSV
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = argparse.ArgumentParser(
+        description="Import products from a CSV or NDJSON file.")
+    arguments.add_argument("path")
+    arguments.add_argument("--format", choices=[item.value
+                                                for item in ImportFormat])
+    arguments.add_argument("--database", default="oop.db")
+    arguments.add_argument("--chunk-size", type=int,
+                           default=DEFAULT_IMPORT_CHUNK_SIZE)
+    args = arguments.parse_args(argv)
+
+    connection = sqlite3.connect(args.database)
+    try:
+        core = POSCore.create(SqliteRepoFactory(connection=connection))
+        parser = ProductRowParser(format=_format(args.path, args.format))
+        with open(args.path, encoding="utf-8-sig", newline="") as file:
+            result = core.import_products(parser.parse(file),
+                                          chunk_size=args.chunk_size)
+    finally:
+        connection.close()
+
+    for failure in result.failed:
+        print(f"line {failure.line}: {failure.error}", file=sys.stderr)
+    print(f"created {result.created}, failed {len(result.failed)}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,165 @@
+import asyncio
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
 
 from fastapi import FastAPI
 
+from app.core.async_facade import AsyncPOSCore
 from app.core.facade import POSCore
+from app.core.services.payment_service import PaymentService
+from app.core.services.sync_service import SyncService
+from app.infra.admission import AdmissionControl, AdmissionSettings
 from app.infra.api.campaign import campaign_api
+from app.infra.api.metrics import metrics_api, time_requests
 from app.infra.api.payments import payment_api
 from app.infra.api.products import products_api
 from app.infra.api.receipts import receipts_api
 from app.infra.api.reports import reports_api
 from app.infra.api.shifts import shifts_api
-from app.infra.data.sqlite import SqliteRepoFactory
+from app.infra.api.sync import sync_api
+from app.infra.data.cached import CachedRepoFactory
+from app.infra.data.ids import id_generator
+from app.infra.data.invalidation import CacheInvalidator
+from app.infra.data.sqlite import CountingConnection, SqliteRepoFactory
+from app.infra.data.write_behind import WriteBehindSettings
+from app.infra.env import env_float, env_int, env_str
+from app.infra.fx_refresher import FxRateRefresher, FxRefreshSettings
+from app.infra.http_client import HttpClientSettings, create_http_client
+from app.infra.pools import PoolSettings
+from app.infra.snapshot import CatalogSnapshot, SnapshotPublisher, SnapshotSettings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    payment_service: PaymentService = app.state.payment_service
+    fx_refresher: FxRateRefresher = app.state.fx_refresher
+    receipt_writer = app.state.infra.receipt_writer
+    if receipt_writer is not None:
+        receipt_writer.start()
+    async with create_http_client(app.state.http_settings) as client:
+        payment_service.client = client
+        tasks = [asyncio.create_task(fx_refresher.run()),
+                 asyncio.create_task(app.state.invalidator.run())]
+        if app.state.snapshot_publisher is not None:
+            tasks.append(
+                asyncio.create_task(app.state.snapshot_publisher.run()))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with suppress(asyncio.CancelledError):
+                    await task
+            payment_service.client = None
+            if receipt_writer is not None:
+                # whatever is still queued goes in before shutdown
+                receipt_writer.close()
+            for pool in app.state.core.pools.values():
+                pool.shutdown(wait=True)
+            app.state.db_executor.shutdown(wait=True)
+            app.state.invalidator.executor.shutdown(wait=True)
+            if app.state.snapshot_publisher is not None:
+                app.state.snapshot_publisher.executor.shutdown(wait=True)
 
 
 def setup() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.include_router(products_api, prefix="/products", tags=["Product"])
     app.include_router(campaign_api, prefix="/campaign", tags=["Campaign"])
     app.include_router(receipts_api, prefix="/receipts", tags=["Receipt"])
     app.include_router(shifts_api, prefix="/shifts", tags=["Shift"])
     app.include_router(payment_api, prefix="/pay", tags=["Payment"])
     app.include_router(reports_api, prefix="/reports", tags=["Report"])
+    app.include_router(sync_api, prefix="/sync", tags=["Sync"])
+    app.include_router(metrics_api, prefix="/metrics", tags=["Metrics"])
 
-    connection = sqlite3.connect("oop.db", check_same_thread=False)
-    database = SqliteRepoFactory(connection=connection)
+    connection = sqlite3.connect("oop.db", check_same_thread=False,
+                                 factory=CountingConnection)
+    snapshot_settings = SnapshotSettings.from_env()
+    snapshot = None
+    if snapshot_settings.path:
+        snapshot = CatalogSnapshot(
+            path=snapshot_settings.path,
+            check_interval=snapshot_settings.check_interval)
+    # uuid7 (the default) or uuid4; existing ids stay valid either way
+    sqlite_database = SqliteRepoFactory(
+        connection=connection,
+        id_generator=id_generator(env_str("ID_GENERATOR", "uuid7")))
+    # what other workers wrote is picked up in the background, on a
+    # thread of its own
+    invalidator = CacheInvalidator(
+        connection=connection,
+        poll_interval=env_float("CACHE_POLL_INTERVAL", 0.05),
+        executor=ThreadPoolExecutor(max_workers=1,
+                                    thread_name_prefix="pos-invalidation"))
+    database = CachedRepoFactory(
+        inner=sqlite_database,
+        catalog_cache_size=env_int("CATALOG_CACHE_SIZE", 1024),
+        open_receipt_cache_size=env_int("OPEN_RECEIPT_CACHE_SIZE", 256),
+        snapshot=snapshot,
+        invalidator=invalidator,
+        write_behind=WriteBehindSettings.from_env())
     # database = InMemoryRepoFactory()
+    http_settings = HttpClientSettings.from_env()
+    fx_settings = FxRefreshSettings.from_env()
+    # blocking repository work of the async (payment) path runs here
+    db_executor = ThreadPoolExecutor(
+        max_workers=env_int("DB_EXECUTOR_WORKERS", 4),
+        thread_name_prefix="pos-db")
+    payment_service = PaymentService(
+        retry_policy=http_settings.retry_policy(),
+        base_url=http_settings.fx_base_url,
+        breaker=http_settings.circuit_breaker(),
+        hedge_requests=http_settings.hedge_requests,
+        executor=db_executor,
+        rate_repository=database.exchange_rates(),
+        max_rate_age=fx_settings.max_rate_age)
     app.state.infra = database
-    app.state.core = POSCore.create(database)
+    app.state.http_settings = http_settings
+    app.state.payment_service = payment_service
+    app.state.db_executor = db_executor
+    app.state.fx_refresher = FxRateRefresher(
+        payment_service=payment_service,
+        pairs=fx_settings.pairs,
+        interval=fx_settings.interval)
+    sync_service = SyncService(
+        change_repository=database.catalog_changes(),
+        retention=env_int("CATALOG_CHANGE_RETENTION", 10_000))
+    # use cases run on pools of their own, one per route class;
+    # never on db_executor, which payments wait on while holding receipt
+    # locks
+    app.state.core = AsyncPOSCore(
+        core=POSCore.create(database,
+                            payment_service=payment_service,
+                            executor=db_executor,
+                            sync_service=sync_service),
+        pools=PoolSettings.from_env().create())
+    # ETags must change when another worker edits the catalog too; read
+    # once no transaction of ours is open, as for our own changes
+    invalidator.subscribe("products", app.state.core.catalog_version.changed)
+    invalidator.subscribe("campaigns", app.state.core.catalog_version.changed)
+    app.state.invalidator = invalidator
+    app.middleware("http")(time_requests)
+    # added last, so it runs first: a request turned away costs nothing
+    app.state.admission = AdmissionControl(
+        settings=AdmissionSettings.from_env(),
+        queue_wait=app.state.core.queue_wait)
+    app.middleware("http")(app.state.admission)
+    app.state.snapshot_publisher = None
+    if snapshot is not None:
+        # built from the database itself, never from the snapshot
+        app.state.snapshot_publisher = SnapshotPublisher(
+            snapshot=snapshot,
+            products=sqlite_database.products(),
+            discounts=sqlite_database.discount_campaign(),
+            catalog_version=app.state.core.catalog_version,
+            interval=snapshot_settings.publish_interval,
+            # a rebuild reads the whole catalog; payments must not queue
+            # behind it on db_executor
+            executor=ThreadPoolExecutor(max_workers=1,
+                                        thread_name_prefix="pos-snapshot"))
 
-    return app
\ No newline at end of file
+    return app
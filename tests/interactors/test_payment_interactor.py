@@ -1,11 +1,31 @@
+import threading
 import unittest
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from app.core.exceptions.payment_exceptions import (
+    DuplicatePaymentOrderError,
+    ExchangeRateErrorMessage,
+)
+from app.core.exceptions.receipt_exceptions import (
+    GetReceiptErrorMessage,
+    ReceiptConflictError,
+)
+from app.core.exceptions.shift_exceptions import ShiftClosedErrorMessage
 from app.core.interactors.payment_interactor import PaymentInteractor
+from app.core.locks import LockManager
+from app.core.models.payment import PaymentOrder
+from app.core.models.receipt import ProductForReceipt, Receipt
+from app.core.models.shift import Shift
 from app.core.schemas.payment_schema import PaymentRequest
+from app.core.state.shift_state import (
+    ClosedShiftState,
+    OpenShiftState,
+    ShiftState,
+)
 
 
 class DummyReceipt:
@@ -89,6 +109,238 @@ class TestPaymentInteractor:
         shift_service.add_receipt.assert_called_once_with(receipt=dummy_receipt,
                                                           shift=dummy_shift)
 
+    @pytest.mark.asyncio
+    async def test_execute_pay_runs_repository_work_in_executor(self) -> None:
+        dummy_receipt = DummyReceipt(price=100.0, discounted_price=None,
+                                     shift_id="shift_3")
+        threads: List[str] = []
+
+        def record_thread(*args: object, **kwargs: object) -> DummyReceipt:
+            threads.append(threading.current_thread().name)
+            return dummy_receipt
+
+        receipt_service = MagicMock()
+        receipt_service.get_one_receipt.side_effect = record_thread
+        receipt_service.update_status.side_effect = record_thread
+        shift_service = MagicMock()
+        shift_service.get_one_shift.side_effect = record_thread
+        shift_service.add_receipt.side_effect = record_thread
+
+        with ThreadPoolExecutor(thread_name_prefix="pos-db") as executor:
+            interactor = PaymentInteractor(
+                payment_service=AsyncMock(),
+                receipt_service=receipt_service,
+                shift_service=shift_service,
+                executor=executor
+            )
+            result = await interactor.execute_pay(receipt_id="dummy_receipt_id",
+                                                  to_currency="GEL")
+
+        assert result == 100.0
+        assert len(threads) == 4
+        assert all(name.startswith("pos-db") for name in threads)
+
+    @pytest.mark.asyncio
+    async def test_execute_pay_batch(self) -> None:
+        def receipt(receipt_id: str, shift_id: str, status: bool = True) -> Receipt:
+            item = ProductForReceipt(id="p", quantity=1, price=10.0)
+            return Receipt(id=receipt_id, shift_id=shift_id, items=[item],
+                           total=10.0, status=status)
+
+        receipts = {
+            "r1": receipt("r1", "s1"),
+            "r2": receipt("r2", "s1"),
+            "r3": receipt("r3", "s2"),
+            "r4": receipt("r4", "s2", status=False),
+            "r5": receipt("r5", "s2"),
+        }
+        shifts = {"s1": Shift(id="s1", receipts=[]),
+                  "s2": Shift(id="s2", receipts=[])}
+
+        def get_receipt(receipt_id: str) -> Receipt:
+            if receipt_id not in receipts:
+                raise GetReceiptErrorMessage(receipt_id=receipt_id)
+            return receipts[receipt_id]
+
+        async def get_rate(from_currency: str, to_currency: str) -> float:
+            if to_currency == "EUR":
+                raise ExchangeRateErrorMessage(reason="API is down")
+            return 0.5
+
+        payment_service = AsyncMock()
+        payment_service.get_rate.side_effect = get_rate
+        receipt_service = MagicMock()
+        receipt_service.get_one_receipt.side_effect = get_receipt
+        shift_service = MagicMock()
+        shift_service.get_one_shift.side_effect = lambda shift_id: shifts[shift_id]
+
+        interactor = PaymentInteractor(
+            payment_service=payment_service,
+            receipt_service=receipt_service,
+            shift_service=shift_service
+        )
+        results = await interactor.execute_pay_batch(orders=[
+            PaymentOrder(receipt_id="r1", currency="USD"),
+            PaymentOrder(receipt_id="r2", currency="USD"),
+            PaymentOrder(receipt_id="r3", currency="GEL"),
+            PaymentOrder(receipt_id="r4", currency="GEL"),
+            PaymentOrder(receipt_id="r5", currency="EUR"),
+            PaymentOrder(receipt_id="missing", currency="GEL"),
+            PaymentOrder(receipt_id="r1", currency="USD"),
+        ])
+
+        assert [result.paid for result in results] == [
+            True, True, True, False, False, False, False]
+        assert [result.amount for result in results[:3]] == [5.0, 5.0, 10.0]
+        assert results[4].error is not None and "API is down" in results[4].error
+        assert results[6].error == DuplicatePaymentOrderError("r1").message
+        assert payment_service.get_rate.await_count == 2
+        # once to check the batch, once more under the shift lock
+        assert shift_service.get_one_shift.call_count == 4
+
+        receipt_service.close_receipts.assert_called_once_with(
+            receipts=[receipts["r1"], receipts["r2"], receipts["r3"]])
+        shift_service.add_receipts.assert_any_call(
+            shift=shifts["s1"], receipts=[receipts["r1"], receipts["r2"]])
+        shift_service.add_receipts.assert_any_call(
+            shift=shifts["s2"], receipts=[receipts["r3"]])
+
+    @pytest.mark.asyncio
+    async def test_execute_pay_batch_leaves_out_receipts_changed_meanwhile(
+            self) -> None:
+        receipts = {receipt_id: Receipt(
+            id=receipt_id, shift_id="s1", total=10.0,
+            items=[ProductForReceipt(id="p", quantity=1, price=10.0)])
+            for receipt_id in ("r1", "r2", "r3")}
+        closed: List[List[str]] = []
+
+        def close_receipts(receipts: List[Receipt]) -> None:
+            for receipt in receipts:
+                receipt.status = False
+            if "r2" in [receipt.id for receipt in receipts]:
+                raise ReceiptConflictError(receipt_id="r2")
+            closed.append([receipt.id for receipt in receipts])
+
+        receipt_service = MagicMock()
+        receipt_service.get_one_receipt.side_effect = \
+            lambda receipt_id: receipts[receipt_id]
+        receipt_service.close_receipts.side_effect = close_receipts
+        shift_service = MagicMock()
+        shift_service.get_one_shift.return_value = Shift(id="s1", receipts=[])
+
+        interactor = PaymentInteractor(
+            payment_service=AsyncMock(),
+            receipt_service=receipt_service,
+            shift_service=shift_service)
+        results = await interactor.execute_pay_batch(orders=[
+            PaymentOrder(receipt_id=receipt_id, currency="GEL")
+            for receipt_id in ("r1", "r2", "r3")])
+
+        assert [result.paid for result in results] == [True, False, True]
+        assert results[1].error == ReceiptConflictError("r2").message
+        assert closed == [["r1", "r3"]]
+        assert receipts["r2"].status
+        shift_service.add_receipts.assert_called_once_with(
+            shift=shift_service.get_one_shift.return_value,
+            receipts=[receipts["r1"], receipts["r3"]])
+
+    @pytest.mark.asyncio
+    async def test_execute_pay_batch_leaves_out_shift_closed_meanwhile(
+            self) -> None:
+        receipts = {receipt_id: Receipt(
+            id=receipt_id, shift_id=shift_id, total=10.0,
+            items=[ProductForReceipt(id="p", quantity=1, price=10.0)])
+            for receipt_id, shift_id in (("r1", "s1"), ("r2", "s2"))}
+        states: Dict[str, ShiftState] = {"s1": OpenShiftState(),
+                                         "s2": OpenShiftState()}
+
+        async def get_rate(from_currency: str, to_currency: str) -> float:
+            # the shift is closed while the rate is being looked up
+            states["s1"] = ClosedShiftState()
+            return 0.5
+
+        payment_service = AsyncMock()
+        payment_service.get_rate.side_effect = get_rate
+        receipt_service = MagicMock()
+        receipt_service.get_one_receipt.side_effect = \
+            lambda receipt_id: receipts[receipt_id]
+        shift_service = MagicMock()
+        shift_service.get_one_shift.side_effect = lambda shift_id: Shift(
+            id=shift_id, receipts=[], state=states[shift_id])
+
+        interactor = PaymentInteractor(
+            payment_service=payment_service,
+            receipt_service=receipt_service,
+            shift_service=shift_service)
+        results = await interactor.execute_pay_batch(orders=[
+            PaymentOrder(receipt_id="r1", currency="USD"),
+            PaymentOrder(receipt_id="r2", currency="USD")])
+
+        assert [result.paid for result in results] == [False, True]
+        assert results[0].error == ShiftClosedErrorMessage("s1").message
+        receipt_service.close_receipts.assert_called_once_with(
+            receipts=[receipts["r2"]])
+        shift_service.add_receipts.assert_called_once()
+        assert shift_service.add_receipts.call_args.kwargs["shift"].id == "s2"
+
+    @pytest.mark.asyncio
+    async def test_execute_pay_closes_receipt_in_one_unit_of_work(self) -> None:
+        events: List[str] = []
+        unit_of_work = MagicMock()
+        unit_of_work.return_value.__enter__.side_effect = \
+            lambda: events.append("begin")
+        unit_of_work.return_value.__exit__.side_effect = \
+            lambda *exc: events.append("end")
+        receipt_service = MagicMock()
+        receipt_service.get_one_receipt.return_value = DummyReceipt(
+            price=10.0, discounted_price=None, shift_id="shift_1")
+        receipt_service.flush_receipts.side_effect = \
+            lambda **kwargs: events.append("flush queued lines")
+        receipt_service.update_status.side_effect = \
+            lambda **kwargs: events.append("close receipt")
+        shift_service = MagicMock()
+        shift_service.add_receipt.side_effect = \
+            lambda **kwargs: events.append("add to shift")
+
+        interactor = PaymentInteractor(
+            payment_service=AsyncMock(),
+            receipt_service=receipt_service,
+            shift_service=shift_service,
+            unit_of_work=unit_of_work)
+        await interactor.execute_pay(receipt_id="r1", to_currency="GEL")
+
+        assert events == ["flush queued lines", "begin", "close receipt",
+                          "add to shift", "end"]
+
+    @pytest.mark.asyncio
+    async def test_execute_pay_holds_receipt_lock_while_converting(self) -> None:
+        locks = LockManager()
+        held: List[int] = []
+
+        async def pay(**kwargs: object) -> float:
+            # receipt lock only; the shift is locked later, to close
+            held.append(len(locks))
+            return 3.5
+
+        payment_service = AsyncMock()
+        payment_service.pay.side_effect = pay
+        receipt_service = MagicMock()
+        receipt_service.get_one_receipt.return_value = DummyReceipt(
+            price=10.0, discounted_price=None, shift_id="shift_1")
+        shift_service = MagicMock()
+        shift_service.add_receipt.side_effect = \
+            lambda **kwargs: held.append(len(locks))
+
+        interactor = PaymentInteractor(
+            payment_service=payment_service,
+            receipt_service=receipt_service,
+            shift_service=shift_service,
+            locks=locks)
+        await interactor.execute_pay(receipt_id="r1", to_currency="USD")
+
+        assert held == [1, 2]
+        assert len(locks) == 0
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
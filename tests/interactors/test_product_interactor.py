@@ -4,6 +4,11 @@ from unittest.mock import MagicMock
 from app.core.interactors.product_interactor import ProductInteractor
 from app.core.models import NO_ID
 from app.core.models.product import Product, ProductDecorator
+from app.core.models.product_import import (
+    ProductImportFailure,
+    ProductImportReport,
+    ProductImportRow,
+)
 
 
 class TestProductInteractor(unittest.TestCase):
@@ -66,6 +71,35 @@ class TestProductInteractor(unittest.TestCase):
         self.mock_product_service.get_all_products.assert_called_once()
         self.assertEqual(result, product_list)
 
+    def test_execute_import_in_chunks(self) -> None:
+        rows = (ProductImportRow(line=line, error="bad") for line in range(5))
+        self.mock_product_service.create_products.side_effect = (
+            lambda rows: ProductImportReport(
+                created=1,
+                failed=[ProductImportFailure(line=rows[0].line, error="bad")]))
+
+        report = self.interactor.execute_import(rows, chunk_size=2)
+
+        chunks = [call.kwargs["rows"] for call in
+                  self.mock_product_service.create_products.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(report.created, 3)
+        self.assertEqual([failure.line for failure in report.failed],
+                         [0, 2, 4])
+
+    def test_execute_update_prices(self) -> None:
+        self.mock_product_service.update_prices.return_value = ["1", "2"]
+        self.mock_campaign_service.get_discounts.return_value = {"1": 10}
+
+        updated, missing = self.interactor.execute_update_prices(
+            {"1": 20.0, "2": 5.0, "3": 1.0})
+
+        self.mock_campaign_service.get_discounts.assert_called_once_with(
+            product_ids=["1", "2"])
+        self.assertEqual([(price.product_id, price.discounted_price)
+                          for price in updated], [("1", 18.0), ("2", None)])
+        self.assertEqual(missing, ["3"])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
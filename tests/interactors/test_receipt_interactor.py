@@ -1,10 +1,17 @@
 import unittest
 from unittest.mock import MagicMock
 
+from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
 from app.core.interactors.receipt_interactor import ReceiptInteractor
 from app.core.models.campaign import BuyNGetNCampaign, CampaignType, ComboCampaign
 from app.core.models.product import DiscountedProduct, Product
-from app.core.models.receipt import ProductForReceipt, Receipt
+from app.core.models.receipt import (
+    ProductForReceipt,
+    Receipt,
+    ReceiptItemOrder,
+    ReceiptItemType,
+)
 from app.core.services.campaign_service import CampaignService
 from app.core.services.product_service import ProductService
 from app.core.services.receipt_service import ReceiptService
@@ -100,6 +107,78 @@ class TestReceiptInteractor(unittest.TestCase):
 
         self.assertEqual(result, mock_receipt)
 
+    def test_execute_scan(self) -> None:
+        mock_product = Product(id="prod-1", name="Test Product",
+                               barcode="4860001", price=10.0)
+        mock_receipt = Receipt(id="receipt-1", shift_id="shift-1", items=[], total=0.0)
+
+        self.mock_product_service.get_product_by_barcode.return_value = mock_product
+        self.mock_campaign_service.get_campaign_product.return_value = \
+            DiscountedProduct(inner_product=mock_product, discount=10)
+        self.mock_receipt_service.get_one_receipt.return_value = mock_receipt
+        self.mock_receipt_service.add_product.return_value = mock_receipt
+        self.mock_campaign_service.get_campaign_receipt.return_value = mock_receipt
+
+        result = self.receipt_interactor.execute_scan("receipt-1", "4860001", 3)
+
+        self.mock_product_service.get_product_by_barcode.assert_called_once_with(
+            barcode="4860001")
+        self.mock_product_service.get_one_product.assert_not_called()
+        self.mock_receipt_service.add_product.assert_called_once_with(
+            receipt=mock_receipt, product=mock_product, quantity=3)
+        self.assertEqual(mock_product.discount, 9.0)
+        self.assertEqual(result, mock_receipt)
+
+    def test_execute_add_items(self) -> None:
+        product = Product(id="prod-1", name="Test Product",
+                          barcode="N/A", price=10.0)
+        combo = ComboCampaign(id="combo-1", campaign_type=CampaignType.COMBO,
+                              products=[], discount=5.0)
+        receipt = Receipt(id="receipt-1", shift_id="shift-1", items=[], total=0.0)
+
+        self.mock_receipt_service.get_one_receipt.return_value = receipt
+        self.mock_product_service.get_one_product.return_value = product
+        self.mock_campaign_service.get_one_campaign.return_value = combo
+        self.mock_campaign_service.get_campaign_products.return_value = {
+            "prod-1": DiscountedProduct(inner_product=product, discount=10)}
+        self.mock_receipt_service.add_items.return_value = receipt
+        self.mock_campaign_service.get_campaign_receipt.return_value = receipt
+
+        result = self.receipt_interactor.execute_add_items("receipt-1", [
+            ReceiptItemOrder(item_type=ReceiptItemType.PRODUCT,
+                             item_id="prod-1", quantity=2),
+            ReceiptItemOrder(item_type=ReceiptItemType.COMBO,
+                             item_id="combo-1", quantity=1),
+            ReceiptItemOrder(item_type=ReceiptItemType.PRODUCT,
+                             item_id="prod-1", quantity=1),
+        ])
+
+        self.mock_receipt_service.get_one_receipt.assert_called_once_with(
+            receipt_id="receipt-1")
+        self.mock_product_service.get_one_product.assert_called_once_with(
+            product_id="prod-1")
+        self.mock_campaign_service.get_campaign_products.assert_called_once_with(
+            products=[product])
+        self.mock_receipt_service.add_items.assert_called_once_with(
+            receipt=receipt, items=[(product, 2), (combo, 1), (product, 1)])
+        self.mock_campaign_service.get_campaign_receipt.assert_called_once_with(
+            receipt=receipt)
+        self.assertEqual(product.discount, 9.0)
+        self.assertEqual(result, receipt)
+
+    def test_execute_add_items_wrong_campaign_type(self) -> None:
+        combo = ComboCampaign(id="combo-1", campaign_type=CampaignType.COMBO,
+                              products=[], discount=5.0)
+        self.mock_receipt_service.get_one_receipt.return_value = Receipt(
+            id="receipt-1", shift_id="shift-1", items=[], total=0.0)
+        self.mock_campaign_service.get_one_campaign.return_value = combo
+
+        with self.assertRaises(GetCampaignErrorMessage):
+            self.receipt_interactor.execute_add_items("receipt-1", [
+                ReceiptItemOrder(item_type=ReceiptItemType.GIFT,
+                                 item_id="combo-1", quantity=1)])
+        self.mock_receipt_service.add_items.assert_not_called()
+
     def test_execute_delete(self) -> None:
         mock_receipt = Receipt(id="receipt-1", shift_id="shift-1", items=[], total=0.0)
         self.mock_receipt_service.get_one_receipt.return_value = mock_receipt
@@ -129,6 +208,41 @@ class TestReceiptInteractor(unittest.TestCase):
 
         self.assertEqual(result, mock_receipt)
 
+    def test_execute_addition_combo_retries_on_conflict(self) -> None:
+        mock_combo = ComboCampaign(id="combo-1",
+                                   campaign_type=CampaignType.DISCOUNT,
+                                   products=[], discount=5.0)
+        stale = Receipt(id="receipt-1", shift_id="shift-1", items=[], total=0.0)
+        fresh = Receipt(id="receipt-1", shift_id="shift-1", items=[],
+                        total=0.0, version=1)
+
+        self.mock_campaign_service.get_one_campaign.return_value = mock_combo
+        self.mock_receipt_service.get_one_receipt.side_effect = [stale, fresh]
+        self.mock_receipt_service.add_combo_product.side_effect = [
+            ReceiptConflictError(receipt_id="receipt-1"), fresh]
+        self.mock_campaign_service.get_campaign_receipt.return_value = fresh
+
+        result = self.receipt_interactor.execute_addition_combo(
+            "receipt-1", "combo-1", 2)
+
+        self.assertEqual(result, fresh)
+        self.assertEqual(self.mock_receipt_service.get_one_receipt.call_count, 2)
+        self.mock_receipt_service.add_combo_product.assert_called_with(
+            receipt=fresh, combo=mock_combo, quantity=2)
+
+    def test_execute_delete_item_gives_up_after_max_attempts(self) -> None:
+        receipt = Receipt(id="receipt_1", shift_id="shift_1", items=[],
+                          total=0.0)
+        self.mock_receipt_service.get_one_receipt.return_value = receipt
+        self.mock_receipt_service.delete_item.side_effect = \
+            ReceiptConflictError(receipt_id="receipt_1")
+
+        with self.assertRaises(ReceiptConflictError):
+            self.receipt_interactor.execute_delete_item("receipt_1", "item_1")
+
+        self.assertEqual(self.mock_receipt_service.delete_item.call_count,
+                         self.receipt_interactor.max_attempts)
+
     def test_execute_addition_gift(self) -> None:
         # Create proper ProductForReceipt objects for buy_product and gift_product
         buy_product = ProductForReceipt(id="prod-1", quantity=2,
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.core.exceptions.campaign_exceptions import GetCampaignErrorMessage
+from app.core.interactors.sync_interactor import SyncInteractor
+from app.core.models.catalog_change import CatalogChange, ChangeEntity, ChangeOp
+from app.core.models.product import Product
+
+
+def change(seq: int, entity: ChangeEntity, entity_id: str,
+           op: ChangeOp = ChangeOp.UPSERT) -> CatalogChange:
+    return CatalogChange(seq=seq, entity=entity, entity_id=entity_id,
+                         op=op, changed_at=0.0)
+
+
+class TestSyncInteractor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sync_service = MagicMock()
+        self.product_service = MagicMock()
+        self.campaign_service = MagicMock()
+        self.sync_service.needs_snapshot.return_value = False
+        self.interactor = SyncInteractor(
+            sync_service=self.sync_service,
+            product_service=self.product_service,
+            campaign_service=self.campaign_service)
+
+    def test_repeated_changes_collapse(self) -> None:
+        product = Product(id="p1", name="P", barcode="1", price=2.0)
+        self.product_service.get_one_product.return_value = product
+        self.sync_service.get_changes.return_value = (
+            [change(4, ChangeEntity.PRODUCT, "p1"),
+             change(5, ChangeEntity.CAMPAIGN, "c1", ChangeOp.DELETE),
+             change(6, ChangeEntity.PRODUCT, "p1")], True)
+
+        result = self.interactor.execute_get_changes(since=3, limit=3)
+
+        self.assertEqual(result.next_since, 6)
+        self.assertTrue(result.has_more)
+        self.assertEqual([delta.change.seq for delta in result.deltas], [5, 6])
+        self.assertEqual(result.deltas[1].product, product)
+        self.product_service.get_one_product.assert_called_once_with(
+            product_id="p1")
+        self.campaign_service.get_one_campaign.assert_not_called()
+
+    def test_campaign_deleted_since_change_is_reported_deleted(self) -> None:
+        self.campaign_service.get_one_campaign.side_effect = (
+            GetCampaignErrorMessage(campaign_id="c1"))
+        self.sync_service.get_changes.return_value = (
+            [change(1, ChangeEntity.CAMPAIGN, "c1")], False)
+
+        result = self.interactor.execute_get_changes(since=0, limit=10)
+
+        self.assertEqual(result.deltas[0].change.op, ChangeOp.DELETE)
+        self.assertIsNone(result.deltas[0].campaign)
+
+    def test_no_changes_keeps_position(self) -> None:
+        self.sync_service.get_changes.return_value = ([], False)
+
+        result = self.interactor.execute_get_changes(since=9, limit=10)
+
+        self.assertEqual(result.next_since, 9)
+        self.assertEqual(result.deltas, [])
+
+    def test_snapshot_when_too_far_behind(self) -> None:
+        self.sync_service.needs_snapshot.return_value = True
+        self.sync_service.latest_seq.return_value = 42
+        self.product_service.get_all_products.return_value = ["p"]
+        self.campaign_service.get_all_campaigns.return_value = ["c"]
+
+        result = self.interactor.execute_get_changes(since=0, limit=10)
+
+        self.assertTrue(result.snapshot)
+        self.assertEqual(result.next_since, 42)
+        self.assertEqual(result.products, ["p"])
+        self.assertEqual(result.campaigns, ["c"])
+        self.sync_service.get_changes.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+from typing import Dict
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from app.core.async_facade import ANALYTICS, CATALOG, CHECKOUT
+from app.infra.admission import (
+    ADMISSION_SHED,
+    AdmissionControl,
+    AdmissionSettings,
+    route_class,
+)
+
+
+def admission(in_flight: int, waits: Dict[str, float]) -> AdmissionControl:
+    control = AdmissionControl(
+        settings=AdmissionSettings(max_in_flight=4, checkout_reserve=2,
+                                   max_queue_wait=0.5, retry_after=3),
+        queue_wait=lambda route: waits.get(route, 0.0))
+    control._in_flight[CHECKOUT] = in_flight
+    return control
+
+
+def test_routes_are_classified() -> None:
+    assert route_class("GET", "/reports/Xreport") == ANALYTICS
+    assert route_class("GET", "/receipts") == ANALYTICS
+    assert route_class("GET", "/shifts/s1") == ANALYTICS
+    assert route_class("POST", "/receipts/r1/scan") == CHECKOUT
+    assert route_class("GET", "/receipts/r1") == CHECKOUT
+    assert route_class("POST", "/pay/r1/GEL") == CHECKOUT
+    assert route_class("PATCH", "/shifts/s1") == CHECKOUT
+    assert route_class("GET", "/products/barcode/111") == CATALOG
+    assert route_class("POST", "/products/bulk") == ANALYTICS
+    assert route_class("GET", "/metrics") is None
+
+
+def test_reserve_is_kept_for_checkout() -> None:
+    control = admission(in_flight=2, waits={})
+
+    assert control.shed_reason(ANALYTICS) == "in_flight"
+    assert control.shed_reason(CATALOG) == "in_flight"
+    assert control.shed_reason(CHECKOUT) is None
+
+    control._in_flight[CHECKOUT] = 4
+    assert control.shed_reason(CHECKOUT) == "in_flight"
+
+
+def test_slow_pool_is_shed_but_checkout_is_not() -> None:
+    control = admission(in_flight=0, waits={ANALYTICS: 1.0, CHECKOUT: 1.0})
+
+    assert control.shed_reason(ANALYTICS) == "queue_wait"
+    assert control.shed_reason(CATALOG) is None
+    assert control.shed_reason(CHECKOUT) is None
+
+
+def test_shed_request_gets_a_fast_503() -> None:
+    app = FastAPI()
+
+    @app.get("/reports/Xreport")
+    async def report() -> Dict[str, int]:
+        return {"receipts": 0}
+
+    control = admission(in_flight=0, waits={ANALYTICS: 1.0})
+    app.middleware("http")(control)
+    shed = ADMISSION_SHED.value(route_class=ANALYTICS, reason="queue_wait")
+
+    response = TestClient(app).get("/reports/Xreport")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert ADMISSION_SHED.value(route_class=ANALYTICS,
+                                reason="queue_wait") - shed == 1
+
+    control.queue_wait = lambda route: 0.0
+    assert TestClient(app).get("/reports/Xreport").status_code == 200
+    assert control.in_flight == 0
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator
+
+import pytest
+
+from app.core.async_facade import (
+    ANALYTICS,
+    CATALOG,
+    CHECKOUT,
+    CORE_CALLS_QUEUED,
+    CORE_CALLS_RUNNING,
+    AsyncPOSCore,
+)
+from app.core.exceptions.shift_exceptions import GetShiftErrorMessage
+from app.core.facade import POSCore
+from app.infra.data.in_memory import InMemoryRepoFactory
+
+
+@pytest.fixture
+def pools() -> Iterator[Dict[str, ThreadPoolExecutor]]:
+    pools = {pool: ThreadPoolExecutor(max_workers=1, thread_name_prefix=pool)
+             for pool in (CHECKOUT, CATALOG, ANALYTICS)}
+    yield pools
+    for pool in pools.values():
+        pool.shutdown(wait=True)
+
+
+@pytest.fixture
+def core(pools: Dict[str, ThreadPoolExecutor]) -> AsyncPOSCore:
+    return AsyncPOSCore(core=POSCore.create(InMemoryRepoFactory()),
+                        pools=dict(pools))
+
+
+def block(pool: ThreadPoolExecutor) -> threading.Event:
+    release, taken = threading.Event(), threading.Event()
+
+    def hold() -> None:
+        taken.set()
+        release.wait(5)
+
+    pool.submit(hold)
+    assert taken.wait(5)
+    return release
+
+
+@pytest.mark.asyncio
+async def test_use_cases_run_on_their_route_class_pool(
+        core: AsyncPOSCore, monkeypatch: pytest.MonkeyPatch) -> None:
+    threads = []
+    get_one_shift = core.core.get_one_shift
+
+    def recording(shift_id: str) -> object:
+        threads.append(threading.current_thread().name)
+        return get_one_shift(shift_id=shift_id)
+
+    monkeypatch.setattr(core.core, "get_one_shift", recording)
+    shift = await core.create_shift()
+
+    found = await core.get_one_shift(shift_id=shift.id)
+
+    assert found.id == shift.id
+    assert threads[0].startswith(ANALYTICS)
+    assert CORE_CALLS_RUNNING.value(pool=ANALYTICS) == 0
+
+
+@pytest.mark.asyncio
+async def test_busy_analytics_pool_does_not_hold_up_checkout(
+        core: AsyncPOSCore, pools: Dict[str, ThreadPoolExecutor]) -> None:
+    release = block(pools[ANALYTICS])
+    queued = CORE_CALLS_QUEUED.value(pool=ANALYTICS)
+    report = asyncio.ensure_future(core.get_xreport())
+    await asyncio.sleep(0.01)
+
+    shift = await asyncio.wait_for(core.create_shift(), timeout=1)
+
+    assert shift.id
+    assert not report.done()
+    assert CORE_CALLS_QUEUED.value(pool=ANALYTICS) - queued == 1
+    assert core.queue_wait(ANALYTICS) >= 0.01
+    assert core.queue_wait(CHECKOUT) == 0
+    release.set()
+    await report
+    assert CORE_CALLS_QUEUED.value(pool=ANALYTICS) == queued
+    assert core.queue_wait(ANALYTICS) == 0
+
+
+@pytest.mark.asyncio
+async def test_abandoned_call_leaves_the_queue(
+        core: AsyncPOSCore, pools: Dict[str, ThreadPoolExecutor]) -> None:
+    release = block(pools[ANALYTICS])
+    queued = CORE_CALLS_QUEUED.value(pool=ANALYTICS)
+    report = asyncio.ensure_future(core.get_xreport())
+    await asyncio.sleep(0.01)
+
+    report.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await report
+    release.set()
+
+    assert CORE_CALLS_QUEUED.value(pool=ANALYTICS) == queued
+    assert core.queue_wait(ANALYTICS) == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_the_caller(core: AsyncPOSCore) -> None:
+    with pytest.raises(GetShiftErrorMessage):
+        await core.get_one_shift(shift_id="missing")
+
+    assert CORE_CALLS_RUNNING.value(pool=ANALYTICS) == 0
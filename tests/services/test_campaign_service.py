@@ -203,6 +203,54 @@ class TestCampaignService(unittest.TestCase):
         self.assertEqual(result.discount, 10)
         self.assertEqual(result.inner_product, product)
 
+    def test_get_campaign_products(self) -> None:
+        discounted = Product(id="p1", name="Product 1", barcode="123", price=100.0)
+        plain = Product(id="p2", name="Product 2", barcode="456", price=50.0)
+        mock_repo = MagicMock()
+        mock_repo.get_campaigns_with_products.return_value = {
+            "p1": DiscountCampaign(id="c1", campaign_type=CampaignType.DISCOUNT,
+                                   discount=10, products=["p1"])
+        }
+        self.campaign_service.product_discount_repo = mock_repo
+
+        result = self.campaign_service.get_campaign_products(
+            products=[discounted, plain])
+
+        mock_repo.get_campaigns_with_products.assert_called_once_with(
+            product_ids=["p1", "p2"])
+        self.assertIsInstance(result["p1"], DiscountedProduct)
+        self.assertEqual(result["p1"].get_price(), 90.0)
+        self.assertNotIsInstance(result["p2"], DiscountedProduct)
+        self.assertEqual(result["p2"].inner_product, plain)
+
+    def test_get_campaigns_page(self) -> None:
+        discounts = MagicMock()
+        discounts.get_page.return_value = [
+            DiscountCampaign(id="a", campaign_type=CampaignType.DISCOUNT,
+                             discount=10, products=[]),
+            DiscountCampaign(id="d", campaign_type=CampaignType.DISCOUNT,
+                             discount=10, products=[])]
+        receipt_discounts = MagicMock()
+        receipt_discounts.get_page.return_value = [
+            ReceiptCampaign(id="b", campaign_type=CampaignType.RECEIPT_DISCOUNT,
+                            total=100, discount=5)]
+        combos = MagicMock()
+        combos.get_page.return_value = [
+            ComboCampaign(id="c", campaign_type=CampaignType.COMBO,
+                          discount=5.0, products=[])]
+        gifts = MagicMock()
+        gifts.get_page.return_value = []
+        service = CampaignService(product_discount_repo=discounts,
+                                  receipt_discount_repo=receipt_discounts,
+                                  combo_campaign_repo=combos,
+                                  buy_get_gift_repo=gifts)
+
+        page = service.get_campaigns_page(after="0", limit=3)
+
+        self.assertEqual([campaign.id for campaign in page.items], ["a", "b", "c"])
+        self.assertEqual(page.next_cursor, "c")
+        discounts.get_page.assert_called_once_with(after="0", limit=4)
+
     def test_get_campaign_receipt_no_discount(self) -> None:
         receipt = Receipt(id="123", shift_id="1", items=[], total=0.0)
         result = self.campaign_service.get_campaign_receipt(receipt=receipt)
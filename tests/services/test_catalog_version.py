@@ -0,0 +1,119 @@
+import unittest
+from typing import Callable, Dict, List, Optional
+from unittest.mock import MagicMock
+
+from starlette.requests import Request
+
+from app.core.models.catalog_change import ChangeEntity, ChangeOp
+from app.core.schemas.products_schema import GetAllProductResponse
+from app.core.services.catalog_version import CatalogVersion
+from app.infra.api.conditional import catalog_response
+from app.infra.cache import LRUCache
+from app.infra.data.in_memory import CatalogChangeInMemoryRepository
+
+
+def make_request(headers: Optional[Dict[str, str]] = None) -> Request:
+    raw = [(key.lower().encode(), value.encode())
+           for key, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/products",
+                    "query_string": b"", "headers": raw})
+
+
+class TestCatalogVersion(unittest.TestCase):
+
+    def test_version_comes_from_the_change_log(self) -> None:
+        changes = CatalogChangeInMemoryRepository()
+        changes.append(entity=ChangeEntity.PRODUCT, entity_id="p",
+                       op=ChangeOp.UPSERT, changed_at=1_700_000_000.0)
+
+        first = CatalogVersion(change_repository=changes)
+        second = CatalogVersion(change_repository=changes)
+
+        self.assertEqual(first.current(), ("1", 1_700_000_000.0))
+        self.assertEqual(first.current(), second.current())
+
+    def test_changed_waits_for_commit(self) -> None:
+        changes = CatalogChangeInMemoryRepository()
+        pending: List[Callable[[], None]] = []
+        version = CatalogVersion(change_repository=changes,
+                                 after_commit=pending.append)
+
+        changes.append(entity=ChangeEntity.PRODUCT, entity_id="p",
+                       op=ChangeOp.UPSERT, changed_at=1.0)
+        version.changed()
+        self.assertEqual(version.current()[0], "0")
+
+        pending.pop()()
+        self.assertEqual(version.current()[0], "1")
+
+    def test_refresh_never_goes_back(self) -> None:
+        changes = CatalogChangeInMemoryRepository()
+        version = CatalogVersion(change_repository=changes, version=5)
+
+        version.refresh()
+
+        self.assertEqual(version.current()[0], "5")
+
+    def test_without_a_log_changes_are_counted(self) -> None:
+        version = CatalogVersion()
+
+        version.changed()
+
+        self.assertEqual(version.current()[0], "1")
+
+
+class TestCatalogResponse(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.version = CatalogVersion()
+        self.cache: LRUCache[bytes] = LRUCache(name="test_bodies", max_size=8)
+        self.build = MagicMock(
+            return_value=GetAllProductResponse(products=[]))
+
+    def test_sets_validators_and_caches_body(self) -> None:
+        first = catalog_response(make_request(), self.version, "products",
+                                 self.build, cache=self.cache)
+        second = catalog_response(make_request(), self.version, "products",
+                                  self.build, cache=self.cache)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["etag"],
+                         f'"{self.version.current()[0]}"')
+        self.assertIn("last-modified", first.headers)
+        self.assertEqual(first.body, second.body)
+        self.build.assert_called_once()
+
+    def test_if_none_match_returns_304_without_building(self) -> None:
+        etag = f'"{self.version.current()[0]}"'
+
+        response = catalog_response(make_request({"If-None-Match": etag}),
+                                    self.version, "products", self.build,
+                                    cache=self.cache)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.body, b"")
+        self.build.assert_not_called()
+
+    def test_body_built_across_a_change_is_not_cached(self) -> None:
+        def build() -> GetAllProductResponse:
+            self.version.changed()
+            return GetAllProductResponse(products=[])
+
+        response = catalog_response(make_request(), self.version, "products",
+                                    build, cache=self.cache)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_stale_etag_rebuilds_after_bump(self) -> None:
+        etag = f'"{self.version.current()[0]}"'
+        catalog_response(make_request(), self.version, "products",
+                         self.build, cache=self.cache)
+        self.version.changed()
+
+        response = catalog_response(make_request({"If-None-Match": etag}),
+                                    self.version, "products", self.build,
+                                    cache=self.cache)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.build.call_count, 2)
@@ -0,0 +1,168 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.core.exceptions.payment_exceptions import CircuitOpenErrorMessage
+from app.core.services.circuit_breaker import CircuitBreaker, LatencyWindow
+from app.core.state.breaker_state import (
+    ClosedBreakerState,
+    HalfOpenBreakerState,
+    OpenBreakerState,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def succeed() -> str:
+    return "ok"
+
+
+async def fail() -> str:
+    raise RuntimeError("upstream error")
+
+
+def breaker_with(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(name="test", failure_threshold=2,
+                          slow_call_threshold=1.0, reset_timeout=10.0,
+                          clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures() -> None:
+    breaker = breaker_with(FakeClock())
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+
+    assert isinstance(breaker.state, OpenBreakerState)
+    with pytest.raises(CircuitOpenErrorMessage):
+        await breaker.call(succeed)
+
+
+@pytest.mark.asyncio
+async def test_success_resets_failure_count() -> None:
+    breaker = breaker_with(FakeClock())
+
+    with pytest.raises(RuntimeError):
+        await breaker.call(fail)
+    await breaker.call(succeed)
+    with pytest.raises(RuntimeError):
+        await breaker.call(fail)
+
+    assert isinstance(breaker.state, ClosedBreakerState)
+
+
+@pytest.mark.asyncio
+async def test_slow_calls_count_as_failures() -> None:
+    clock = FakeClock()
+    breaker = breaker_with(clock)
+
+    async def slow() -> str:
+        clock.now += 5.0
+        return "late"
+
+    assert await breaker.call(slow) == "late"
+    assert await breaker.call(slow) == "late"
+
+    assert isinstance(breaker.state, OpenBreakerState)
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_closes_breaker() -> None:
+    clock = FakeClock()
+    breaker = breaker_with(clock)
+    breaker.trip(now=clock.now)
+
+    clock.now += 10.0
+    assert await breaker.call(succeed) == "ok"
+
+    assert isinstance(breaker.state, ClosedBreakerState)
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_failure_reopens_breaker() -> None:
+    clock = FakeClock()
+    breaker = breaker_with(clock)
+    breaker.trip(now=clock.now)
+
+    clock.now += 10.0
+    with pytest.raises(RuntimeError):
+        await breaker.call(fail)
+
+    assert isinstance(breaker.state, OpenBreakerState)
+    assert breaker.opened_at == clock.now
+
+
+@pytest.mark.asyncio
+async def test_half_open_lets_one_trial_through() -> None:
+    breaker = breaker_with(FakeClock())
+    breaker.transition(HalfOpenBreakerState())
+    calls: List[str] = []
+
+    async def trial() -> str:
+        calls.append("trial")
+        with pytest.raises(CircuitOpenErrorMessage):
+            await breaker.call(succeed)
+        return "ok"
+
+    await breaker.call(trial)
+
+    assert calls == ["trial"]
+    assert isinstance(breaker.state, ClosedBreakerState)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_are_not_failures() -> None:
+    breaker = breaker_with(FakeClock())
+
+    async def hang() -> str:
+        await asyncio.Event().wait()
+        return "never"
+
+    for _ in range(breaker.failure_threshold):
+        call = asyncio.ensure_future(breaker.call(hang))
+        await asyncio.sleep(0)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+
+    assert breaker.failures == 0
+    assert isinstance(breaker.state, ClosedBreakerState)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_lets_the_next_call_probe() -> None:
+    breaker = breaker_with(FakeClock())
+    breaker.transition(HalfOpenBreakerState())
+
+    async def hang() -> str:
+        await asyncio.Event().wait()
+        return "never"
+
+    trial = asyncio.ensure_future(breaker.call(hang))
+    await asyncio.sleep(0)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert await breaker.call(succeed) == "ok"
+    assert isinstance(breaker.state, ClosedBreakerState)
+
+
+def test_latency_window_percentile() -> None:
+    window = LatencyWindow(size=100)
+    assert window.percentile(0.95) is None
+
+    for sample in range(1, 101):
+        window.record(sample / 100)
+
+    assert window.percentile(0.95) == 0.96
+    assert len(window) == 100
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from app.core.executors import run_blocking
+from app.core.locks import LOCK_CONTENDED, LOCK_WAIT_SECONDS, LockManager
+
+
+def hold_in_thread(locks: LockManager, receipt_id: str,
+                   release: threading.Event) -> threading.Event:
+    taken = threading.Event()
+
+    def run() -> None:
+        with locks.hold(receipt_ids=[receipt_id]):
+            taken.set()
+            release.wait(5)
+
+    threading.Thread(target=run, daemon=True).start()
+    assert taken.wait(5)
+    return taken
+
+
+def test_locks_are_dropped_once_released() -> None:
+    locks = LockManager()
+
+    with locks.hold(receipt_ids=["r1", "r2"], shift_ids=["s1"]):
+        assert len(locks) == 3
+
+    assert len(locks) == 0
+
+
+def test_same_receipt_waits_and_records_the_wait() -> None:
+    locks = LockManager()
+    release = threading.Event()
+    hold_in_thread(locks, "r1", release)
+    contended = LOCK_CONTENDED.value(scope="receipt")
+    waited = LOCK_WAIT_SECONDS.value(scope="receipt")
+
+    threading.Timer(0.05, release.set).start()
+    started = time.monotonic()
+    with locks.hold(receipt_ids=["r1"]):
+        assert time.monotonic() - started >= 0.04
+
+    assert LOCK_CONTENDED.value(scope="receipt") - contended == 1
+    assert LOCK_WAIT_SECONDS.value(scope="receipt") - waited >= 0.04
+
+
+def test_other_receipts_do_not_wait() -> None:
+    locks = LockManager()
+    release = threading.Event()
+    hold_in_thread(locks, "r1", release)
+    contended = LOCK_CONTENDED.value(scope="receipt")
+
+    with locks.hold(receipt_ids=["r2"]):
+        pass
+
+    assert LOCK_CONTENDED.value(scope="receipt") == contended
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_async_holder_waits_without_blocking_the_loop() -> None:
+    locks = LockManager()
+    release = threading.Event()
+    hold_in_thread(locks, "r1", release)
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while not release.is_set():
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    async def pay() -> None:
+        async with locks.hold_async(receipt_ids=["r1"]):
+            assert release.is_set()
+
+    threading.Timer(0.05, release.set).start()
+    await asyncio.gather(tick(), pay())
+
+    assert ticks > 1
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_wait_gives_the_lock_back() -> None:
+    locks = LockManager()
+    release = threading.Event()
+    hold_in_thread(locks, "r1", release)
+
+    async def pay() -> None:
+        async with locks.hold_async(receipt_ids=["r1"]):
+            pass
+
+    waiting = asyncio.ensure_future(pay())
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    release.set()
+
+    await asyncio.sleep(0.05)
+    async with locks.hold_async(receipt_ids=["r1"]):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_waiting_payments_leave_the_pool_to_the_holder() -> None:
+    # more payments than workers queue on one receipt; each holder still
+    # needs a worker of the same pool to finish
+    locks = LockManager()
+    executor = ThreadPoolExecutor(max_workers=2)
+    paid: List[int] = []
+
+    async def pay(number: int) -> None:
+        async with locks.hold_async(receipt_ids=["r1"]):
+            await run_blocking(executor, time.sleep, 0.005)
+            paid.append(number)
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(pay(number) for number in range(6))), timeout=5)
+    finally:
+        executor.shutdown(wait=False)
+
+    assert sorted(paid) == list(range(6))
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_thread_and_coroutine_holders_take_turns() -> None:
+    locks = LockManager()
+    release = threading.Event()
+    hold_in_thread(locks, "r1", release)
+    order: List[str] = []
+
+    async def pay() -> None:
+        async with locks.hold_async(receipt_ids=["r1"]):
+            order.append("pay")
+
+    paying = asyncio.ensure_future(pay())
+    await asyncio.sleep(0.01)
+    assert order == []
+    release.set()
+    await asyncio.wait_for(paying, timeout=5)
+
+    assert order == ["pay"]
+    with locks.hold(receipt_ids=["r1"]):
+        pass
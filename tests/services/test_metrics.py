@@ -0,0 +1,92 @@
+import threading
+from dataclasses import dataclass
+from typing import List
+
+import pytest
+
+from app.core.metrics import MetricsRegistry
+from app.core.timing import LAYER_SECONDS, SERVICE, current_call, timed_layer
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("checkout_seconds", "Checkout time.",
+                                   buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, route="/pay")
+
+    lines = registry.render().splitlines()
+    assert 'checkout_seconds_bucket{route="/pay",le="0.1"} 1' in lines
+    assert 'checkout_seconds_bucket{route="/pay",le="1.0"} 3' in lines
+    assert 'checkout_seconds_bucket{route="/pay",le="+Inf"} 4' in lines
+    assert 'checkout_seconds_count{route="/pay"} 4' in lines
+    assert histogram.sum(route="/pay") == pytest.approx(4.25)
+
+
+def test_collectors_run_before_each_render() -> None:
+    registry = MetricsRegistry()
+    gauge = registry.gauge("scrapes", "Times rendered.")
+    registry.collector(lambda: gauge.inc())
+
+    registry.render()
+
+    assert "scrapes 2.0" in registry.render()
+
+
+
+def test_render_waits_for_writers() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("scans", "Scans.")
+    gauge = registry.gauge("open_receipts", "Open receipts.")
+    rendered: List[str] = []
+
+    for metric in (counter, gauge):
+        with metric._lock:
+            reader = threading.Thread(
+                target=lambda metric=metric: rendered.extend(metric.render()))
+            reader.start()
+            reader.join(0.05)
+            # a writer holds the lock, so render must not read the values
+            assert reader.is_alive()
+        reader.join(5)
+
+    assert len(rendered) == 4
+
+@timed_layer(SERVICE)
+@dataclass
+class Lookups:
+    seen: List[object]
+
+    def find(self, key: str) -> str:
+        self.seen.append(current_call())
+        return key
+
+    async def find_later(self, key: str) -> str:
+        return key
+
+    def _helper(self) -> None:
+        pass
+
+
+def test_timed_layer_times_public_methods() -> None:
+    lookups = Lookups(seen=[])
+    calls = LAYER_SECONDS.count(layer=SERVICE, call="Lookups.find")
+
+    assert lookups.find("milk") == "milk"
+
+    assert LAYER_SECONDS.count(layer=SERVICE,
+                               call="Lookups.find") - calls == 1
+    # only repository calls are put down as the current call
+    assert lookups.seen == [None]
+    assert not hasattr(Lookups._helper, "__wrapped__")
+
+
+@pytest.mark.asyncio
+async def test_timed_layer_awaits_async_methods() -> None:
+    calls = LAYER_SECONDS.count(layer=SERVICE, call="Lookups.find_later")
+
+    assert await Lookups(seen=[]).find_later("milk") == "milk"
+
+    assert LAYER_SECONDS.count(layer=SERVICE,
+                               call="Lookups.find_later") - calls == 1
@@ -1,50 +1,146 @@
-# import unittest
-#
-# import pytest
-# import httpx
-# from unittest.mock import AsyncMock
-#
-# from app.core.services.payment_service import PaymentService
-#
-#
-# @pytest.mark.asyncio
-# async def test_calculate_exchange_rate_success():
-#     service = PaymentService()
-#     mock_response = AsyncMock(spec=httpx.Response)
-#     mock_response.json.return_value = {"ask": "5.25"}
-#     service._client.get = AsyncMock(return_value=mock_response)
-#
-#     result = await service._calculate_exchange_rate("USD", "BRL")
-#     assert result == {"ask": "5.25"}
-#
-#
-# @pytest.mark.asyncio
-# async def test_calculate_exchange_rate_error():
-#     service = PaymentService()
-#     mock_request = AsyncMock(spec=httpx.Request)
-#     mock_response = AsyncMock(spec=httpx.Response)
-#     service._client.get = AsyncMock(side_effect=httpx.HTTPStatusError("API is down", request=mock_request, response=mock_response))
-#
-#     result = await service._calculate_exchange_rate("USD", "BRL")
-#     assert result == {"error": "API is down"}
-#
-#
-# @pytest.mark.asyncio
-# async def test_pay_success():
-#     service = PaymentService()
-#     service._calculate_exchange_rate = AsyncMock(return_value={"ask": "5.25"})
-#
-#     result = await service.pay("USD", "BRL", 100)
-#     assert result == 525.0
-#
-#
-# @pytest.mark.asyncio
-# async def test_pay_error():
-#     service = PaymentService()
-#     service._calculate_exchange_rate = AsyncMock(return_value={"error": "Invalid currency"})
-#
-#     with pytest.raises(Exception, match="Invalid currency"):
-#         await service.pay("USD", "BRL", 100)
-#
-# if __name__ == "__main__":
-#     unittest.main()
\ No newline at end of file
+import time
+from typing import List
+
+import httpx
+import pytest
+
+from app.core.exceptions.payment_exceptions import ExchangeRateErrorMessage
+from app.core.models.exchange_rate import ExchangeRate
+from app.core.services.payment_service import PaymentService, RetryPolicy
+from app.infra.data.in_memory import ExchangeRateInMemoryRepository
+
+NO_RETRY = RetryPolicy(attempts=1)
+FAST_RETRY = RetryPolicy(attempts=3, base_delay=0.0, max_delay=0.0)
+
+
+def client_with(responses: List[httpx.Response]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def rate_response(ask: str) -> httpx.Response:
+    return httpx.Response(200, json={"GELUSD": {"ask": ask}})
+
+
+@pytest.mark.asyncio
+async def test_calculate_exchange_rate_success() -> None:
+    service = PaymentService(client=client_with([rate_response("0.37")]),
+                             retry_policy=NO_RETRY)
+
+    result = await service._calculate_exchange_rate("GEL", "USD")
+    assert result == {"ask": "0.37"}
+
+
+@pytest.mark.asyncio
+async def test_calculate_exchange_rate_error() -> None:
+    service = PaymentService(client=client_with([httpx.Response(503)]),
+                             retry_policy=NO_RETRY)
+
+    result = await service._calculate_exchange_rate("GEL", "USD")
+    assert result == {"error": "API is down"}
+
+
+@pytest.mark.asyncio
+async def test_calculate_exchange_rate_without_client() -> None:
+    service = PaymentService()
+
+    result = await service._calculate_exchange_rate("GEL", "USD")
+    assert result == {"error": "Payment client is not running"}
+
+
+@pytest.mark.asyncio
+async def test_calculate_exchange_rate_retries_server_errors() -> None:
+    responses = [httpx.Response(502), httpx.Response(503), rate_response("0.37")]
+    service = PaymentService(client=client_with(responses),
+                             retry_policy=FAST_RETRY)
+
+    result = await service._calculate_exchange_rate("GEL", "USD")
+    assert result == {"ask": "0.37"}
+    assert responses == []
+
+
+@pytest.mark.asyncio
+async def test_calculate_exchange_rate_retries_transport_errors() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectTimeout("timeout", request=request)
+        return rate_response("0.37")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service = PaymentService(client=client, retry_policy=FAST_RETRY)
+
+    result = await service._calculate_exchange_rate("GEL", "USD")
+    assert result == {"ask": "0.37"}
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_pay_success() -> None:
+    service = PaymentService(client=client_with([rate_response("0.5")]),
+                             retry_policy=NO_RETRY)
+
+    result = await service.pay("GEL", "USD", 100)
+    assert result == 50.0
+
+
+@pytest.mark.asyncio
+async def test_pay_error() -> None:
+    service = PaymentService(client=client_with([httpx.Response(200, json={})]),
+                             retry_policy=NO_RETRY)
+
+    with pytest.raises(ExchangeRateErrorMessage) as exc_info:
+        await service.pay("GEL", "USD", 100)
+    assert exc_info.value.reason == "Invalid currency"
+
+
+@pytest.mark.asyncio
+async def test_pay_uses_fresh_stored_rate_without_network() -> None:
+    repository = ExchangeRateInMemoryRepository()
+    repository.save_rate(ExchangeRate(from_currency="GEL", to_currency="USD",
+                                      rate=0.4, fetched_at=time.time()))
+    service = PaymentService(rate_repository=repository, max_rate_age=60)
+
+    result = await service.pay("GEL", "USD", 100)
+    assert result == 40.0
+
+
+@pytest.mark.asyncio
+async def test_pay_refreshes_stale_stored_rate() -> None:
+    repository = ExchangeRateInMemoryRepository()
+    repository.save_rate(ExchangeRate(from_currency="GEL", to_currency="USD",
+                                      rate=0.4, fetched_at=time.time() - 120))
+    service = PaymentService(client=client_with([rate_response("0.5")]),
+                             retry_policy=NO_RETRY,
+                             rate_repository=repository,
+                             max_rate_age=60)
+
+    result = await service.pay("GEL", "USD", 100)
+    assert result == 50.0
+    stored = repository.get_rate(from_currency="GEL", to_currency="USD")
+    assert stored is not None
+    assert stored.rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_refresh_rate_saves_rate() -> None:
+    repository = ExchangeRateInMemoryRepository()
+    service = PaymentService(client=client_with([rate_response("0.37")]),
+                             retry_policy=NO_RETRY,
+                             rate_repository=repository)
+
+    exchange_rate = await service.refresh_rate("GEL", "USD")
+    assert exchange_rate.rate == 0.37
+    assert repository.get_rate(from_currency="GEL",
+                               to_currency="USD") == exchange_rate
+
+
+def test_retry_policy_delay_is_bounded() -> None:
+    policy = RetryPolicy(attempts=5, base_delay=0.1, max_delay=0.3)
+
+    for attempt in range(10):
+        assert 0 <= policy.delay(attempt) <= 0.3
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import time
+from types import TracebackType
+from typing import List, Optional, Type
+
+import httpx
+import pytest
+
+from app.core.services.circuit_breaker import CircuitBreaker
+from app.core.services.payment_service import PaymentService, RetryPolicy
+from app.core.state.breaker_state import OpenBreakerState
+
+
+class StubCurrencyServer:
+    """Local stand-in for the currency API that injects latency."""
+
+    def __init__(self) -> None:
+        self.delays: List[float] = []
+        self.requests = 0
+        self.server: asyncio.Server
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self) -> 'StubCurrencyServer':
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, exc_type: Optional[Type[BaseException]],
+                        exc: Optional[BaseException],
+                        traceback: Optional[TracebackType]) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        delay = self.delays[self.requests] if self.requests < len(self.delays) else 0
+        self.requests += 1
+        await asyncio.sleep(delay)
+
+        body = json.dumps({"GELUSD": {"ask": "0.5"}}).encode()
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: application/json\r\n"
+                     b"Connection: close\r\n"
+                     + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                     + body)
+        try:
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_on_slow_upstream() -> None:
+    async with StubCurrencyServer() as stub, httpx.AsyncClient() as client:
+        stub.delays = [0.2, 0.2]
+        service = PaymentService(
+            client=client,
+            retry_policy=RetryPolicy(attempts=1),
+            base_url=stub.base_url,
+            breaker=CircuitBreaker(name="stub", failure_threshold=2,
+                                   slow_call_threshold=0.1,
+                                   reset_timeout=60.0))
+
+        assert await service.pay("GEL", "USD", 10) == 5.0
+        assert await service.pay("GEL", "USD", 10) == 5.0
+        assert isinstance(service.breaker.state, OpenBreakerState)
+
+        started = time.monotonic()
+        result = await service._calculate_exchange_rate("GEL", "USD")
+
+    assert result == {"error": "API is unavailable"}
+    assert time.monotonic() - started < 0.1
+    assert stub.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_beats_slow_first_request() -> None:
+    async with StubCurrencyServer() as stub, httpx.AsyncClient() as client:
+        stub.delays = [1.0, 0.0]
+        service = PaymentService(
+            client=client,
+            retry_policy=RetryPolicy(attempts=1),
+            base_url=stub.base_url,
+            hedge_requests=True,
+            hedge_min_samples=5)
+        for _ in range(5):
+            service.latencies.record(0.05)
+
+        started = time.monotonic()
+        result = await service.pay("GEL", "USD", 10)
+
+    assert result == 5.0
+    assert time.monotonic() - started < 0.9
+    assert stub.requests == 2
@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+from typing import AsyncIterator, List
+
+from app.infra.product_import import ImportFormat, ProductRowParser, read_lines
+
+
+class TestProductRowParser(unittest.TestCase):
+
+    def test_csv_rows_keep_their_line_numbers(self) -> None:
+        parser = ProductRowParser(format=ImportFormat.CSV)
+
+        first = list(parser.parse(["barcode,name,price", "1,Milk,2.5"]))
+        second = list(parser.parse(["", "2,Bread,abc", "3,,1"]))
+
+        self.assertEqual(first[0].line, 2)
+        assert first[0].product is not None
+        self.assertEqual(first[0].product.name, "Milk")
+        self.assertEqual(first[0].product.price, 2.5)
+        self.assertEqual([row.line for row in second], [4, 5])
+        self.assertIsNone(second[0].product)
+        self.assertIn("abc", second[0].error or "")
+        self.assertEqual(second[1].error,
+                         "Invalid row: empty name or barcode")
+
+    def test_ndjson_rows(self) -> None:
+        parser = ProductRowParser(format=ImportFormat.NDJSON)
+
+        rows = list(parser.parse([
+            '{"name": "Milk", "barcode": "1", "price": 2.5}',
+            '[1, 2]',
+            '{"name": "Bread"}',
+        ]))
+
+        self.assertIsNotNone(rows[0].product)
+        self.assertEqual(rows[1].error,
+                         "Invalid row: expected a JSON object")
+        self.assertEqual(rows[2].error, "Invalid row: missing barcode, price")
+
+
+class TestReadLines(unittest.TestCase):
+
+    def test_lines_split_across_chunks(self) -> None:
+        async def stream() -> AsyncIterator[bytes]:
+            for chunk in [b"a,b\nc", "é\nd".encode()[:2],
+                          "é\nd".encode()[2:], b"\n"]:
+                yield chunk
+
+        async def collect() -> List[List[str]]:
+            return [lines async for lines in read_lines(stream(),
+                                                        batch_size=2)]
+
+        batches = asyncio.run(collect())
+
+        self.assertEqual([line for batch in batches for line in batch],
+                         ["a,b", "cé", "d"])
+        self.assertEqual(len(batches[0]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
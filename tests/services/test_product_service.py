@@ -2,10 +2,12 @@ import unittest
 from unittest.mock import MagicMock
 
 from app.core.exceptions.products_exceptions import (
+    GetProductByBarcodeError,
     GetProductError,
     ProductCreationError,
 )
 from app.core.models.product import Product
+from app.core.models.product_import import ProductImportRow
 from app.core.repositories.product_repository import IProductRepository
 from app.core.services.product_service import ProductService
 
@@ -68,6 +70,28 @@ class TestProductService(unittest.TestCase):
 
         product_repository.get_one.assert_called_once_with(product_id="prod-1")
 
+    def test_get_product_by_barcode(self) -> None:
+        product_repository = MagicMock(spec=IProductRepository)
+        service = ProductService(product_repository=product_repository)
+
+        mock_product = Product(id="prod-1", name="Test Product",
+                               barcode="12345", price=10.0)
+        product_repository.get_by_barcode.return_value = mock_product
+
+        result = service.get_product_by_barcode("12345")
+
+        product_repository.get_by_barcode.assert_called_once_with(barcode="12345")
+        self.assertEqual(result, mock_product)
+
+    def test_get_product_by_barcode_not_found(self) -> None:
+        product_repository = MagicMock(spec=IProductRepository)
+        service = ProductService(product_repository=product_repository)
+
+        product_repository.get_by_barcode.return_value = None
+
+        with self.assertRaises(GetProductByBarcodeError):
+            service.get_product_by_barcode("12345")
+
     def test_get_all_products(self) -> None:
         product_repository = MagicMock(spec=IProductRepository)
         service = ProductService(product_repository=product_repository)
@@ -98,6 +122,59 @@ class TestProductService(unittest.TestCase):
         product_repository.update.assert_called_once_with(product_id="prod-1",
                                                           price=20.0)
 
+    def test_create_products(self) -> None:
+        product_repository = MagicMock(spec=IProductRepository)
+        product_repository.create_many.side_effect = (
+            lambda products: [product for product in products
+                              if product.barcode != "taken"])
+        service = ProductService(product_repository=product_repository)
+        rows = [
+            ProductImportRow(line=2, product=Product(
+                id="a", name="A", barcode="1", price=1.0)),
+            ProductImportRow(line=3, error="Invalid row: bad price"),
+            ProductImportRow(line=4, product=Product(
+                id="b", name="B", barcode="1", price=2.0)),
+            ProductImportRow(line=5, product=Product(
+                id="c", name="C", barcode="taken", price=3.0)),
+        ]
+
+        report = service.create_products(rows)
+
+        product_repository.create_many.assert_called_once()
+        self.assertEqual(report.created, 1)
+        self.assertEqual([failure.line for failure in report.failed],
+                         [3, 4, 5])
+        self.assertEqual(report.failed[0].error, "Invalid row: bad price")
+        self.assertEqual(report.failed[2].barcode, "taken")
+        self.assertEqual(service.catalog_version.version, 1)
+
+    def test_update_prices_bumps_version_once(self) -> None:
+        product_repository = MagicMock(spec=IProductRepository)
+        product_repository.update_prices.return_value = ["a", "b"]
+        service = ProductService(product_repository=product_repository)
+
+        updated = service.update_prices({"a": 1.0, "b": 2.0})
+
+        product_repository.update_prices.assert_called_once_with(
+            prices={"a": 1.0, "b": 2.0})
+        self.assertEqual(updated, ["a", "b"])
+        self.assertEqual(service.catalog_version.version, 1)
+
+    def test_writes_bump_catalog_version(self) -> None:
+        product_repository = MagicMock(spec=IProductRepository)
+        product_repository.has_barcode.return_value = False
+        service = ProductService(product_repository=product_repository)
+        before, _ = service.catalog_version.current()
+
+        product = Product(id="prod-1", name="Test Product",
+                          barcode="12345", price=10.0)
+        service.create_product(product)
+        service.update_product(product, 20.0)
+
+        after, _ = service.catalog_version.current()
+        self.assertNotEqual(before, after)
+        self.assertEqual(service.catalog_version.version, 2)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
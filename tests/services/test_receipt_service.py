@@ -82,6 +82,25 @@ class TestReceiptService(unittest.TestCase):
         receipt_repository.add_product.assert_called_once()
         self.assertEqual(result, mock_receipt)
 
+    def test_add_items(self) -> None:
+        receipt_repository = MagicMock(spec=IReceiptRepository)
+        service = ReceiptService(receipt_repository=receipt_repository)
+
+        product = Product(id="prod-1", name="Test Product",
+                          barcode="12345", price=10.0)
+        combo = ComboCampaign(id="combo-1", campaign_type=CampaignType.COMBO,
+                              products=[], discount=5.0)
+        receipt = Receipt(id="receipt-1", shift_id="shift-1", items=[], total=0.0)
+        receipt_repository.add_product.return_value = receipt
+
+        result = service.add_items(receipt, [(product, 2), (combo, 1), (product, 1)])
+
+        receipt_repository.add_product.assert_called_once_with(receipt=receipt)
+        self.assertEqual([item.id for item in result.items], ["prod-1", "combo-1"])
+        assert isinstance(result.items[0], ProductForReceipt)
+        self.assertEqual(result.items[0].quantity, 3)
+        self.assertEqual(result.total, 30.0)
+
     def test_add_combo_product(self) -> None:
         receipt_repository = MagicMock(spec=IReceiptRepository)
         service = ReceiptService(receipt_repository=receipt_repository)
@@ -120,13 +139,27 @@ class TestReceiptService(unittest.TestCase):
         service = ReceiptService(receipt_repository=receipt_repository)
         mock_receipt = MagicMock(spec=Receipt)
         mock_receipt.id = "receipt-1"
+        mock_receipt.version = 3
         mock_state = MagicMock()
         mock_receipt.get_state.return_value = mock_state
 
         service.update_status(mock_receipt, False)
         mock_state.close_receipt.assert_called_once_with(receipt=mock_receipt)
         receipt_repository.update.assert_called_once_with(receipt_id="receipt-1",
-                                                          status=False)
+                                                          status=False,
+                                                          expected_version=3)
+
+    def test_close_receipts(self) -> None:
+        receipt_repository = MagicMock(spec=IReceiptRepository)
+        service = ReceiptService(receipt_repository=receipt_repository)
+        receipts = [Receipt(id=f"receipt-{i}", shift_id="shift-1",
+                            items=[], total=0.0) for i in range(2)]
+
+        service.close_receipts(receipts)
+        self.assertTrue(all(not receipt.status for receipt in receipts))
+        receipt_repository.close_many.assert_called_once_with(
+            receipt_ids=["receipt-0", "receipt-1"],
+            expected_versions={"receipt-0": 0, "receipt-1": 0})
 
     def test_add_product_zero_quantity(self) -> None:
         receipt_repository = MagicMock(spec=IReceiptRepository)
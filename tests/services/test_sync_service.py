@@ -0,0 +1,54 @@
+import unittest
+
+from app.core.models.catalog_change import ChangeEntity, ChangeOp
+from app.core.services.sync_service import SyncService
+from app.infra.data.in_memory import CatalogChangeInMemoryRepository
+
+
+class TestSyncService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repository = CatalogChangeInMemoryRepository()
+        self.service = SyncService(change_repository=self.repository,
+                                   retention=3, compact_every=5)
+
+    def test_record_and_get_changes(self) -> None:
+        self.service.record(ChangeEntity.PRODUCT, "p1")
+        self.service.record(ChangeEntity.CAMPAIGN, "c1", ChangeOp.DELETE)
+        self.service.record(ChangeEntity.PRODUCT, "p2")
+
+        changes, has_more = self.service.get_changes(since=0, limit=2)
+
+        self.assertEqual([change.entity_id for change in changes],
+                         ["p1", "c1"])
+        self.assertEqual(changes[1].op, ChangeOp.DELETE)
+        self.assertTrue(has_more)
+
+    def test_compaction_keeps_retention(self) -> None:
+        for index in range(5):
+            self.service.record(ChangeEntity.PRODUCT, f"p{index}")
+
+        self.assertEqual(self.repository.bounds(), (3, 5))
+
+    def test_needs_snapshot_when_behind_compaction(self) -> None:
+        for index in range(5):
+            self.service.record(ChangeEntity.PRODUCT, f"p{index}")
+
+        self.assertTrue(self.service.needs_snapshot(since=0))
+        self.assertTrue(self.service.needs_snapshot(since=1))
+        self.assertFalse(self.service.needs_snapshot(since=2))
+        self.assertFalse(self.service.needs_snapshot(since=5))
+
+    def test_needs_snapshot_when_ahead_of_log(self) -> None:
+        self.assertTrue(self.service.needs_snapshot(since=7))
+
+    def test_new_terminal_always_gets_a_snapshot(self) -> None:
+        self.assertTrue(self.service.needs_snapshot(since=0))
+
+        self.service.record(ChangeEntity.PRODUCT, "p1")
+
+        self.assertTrue(self.service.needs_snapshot(since=0))
+        self.assertFalse(self.service.needs_snapshot(since=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
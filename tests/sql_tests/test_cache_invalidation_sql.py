@@ -0,0 +1,161 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest.mock import MagicMock
+
+from app.core.models.campaign import CampaignType, DiscountCampaign
+from app.core.models.product import Product
+from app.core.models.receipt import Receipt
+from app.core.models.shift import Shift
+from app.core.services.catalog_version import CatalogVersion
+from app.infra.data.cached import CachedRepoFactory
+from app.infra.data.invalidation import CacheInvalidator
+from app.infra.data.sqlite import SqliteRepoFactory
+from app.infra.snapshot import CatalogSnapshot, SnapshotPublisher
+
+
+class TestCacheInvalidator(unittest.TestCase):
+    def setUp(self) -> None:
+        # two connections to one file stand in for two worker processes
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "oop.db")
+        self.ours = sqlite3.connect(self.path)
+        self.theirs = sqlite3.connect(self.path)
+        self.our_database = SqliteRepoFactory(connection=self.ours)
+        self.their_database = SqliteRepoFactory(connection=self.theirs)
+        self.invalidator = CacheInvalidator(connection=self.ours)
+
+    def tearDown(self) -> None:
+        self.ours.close()
+        self.theirs.close()
+        self.directory.cleanup()
+
+    def _product(self, barcode: str) -> Product:
+        return Product(id="", name="Milk", barcode=barcode, price=2.5)
+
+    def test_nothing_changed(self) -> None:
+        self.assertEqual(self.invalidator.poll(), [])
+
+    def test_own_writes_do_not_invalidate(self) -> None:
+        self.our_database.products().create(self._product("1"))
+
+        self.assertEqual(self.invalidator.poll(), [])
+
+    def test_other_process_write_invalidates_entity(self) -> None:
+        on_products = MagicMock()
+        on_campaigns = MagicMock()
+        self.invalidator.subscribe("products", on_products)
+        self.invalidator.subscribe("campaigns", on_campaigns)
+
+        self.their_database.products().create(self._product("1"))
+
+        self.assertEqual(self.invalidator.poll(), ["products"])
+        on_products.assert_called_once()
+        on_campaigns.assert_not_called()
+        self.assertEqual(self.invalidator.poll(), [])
+
+    def test_campaign_tables_share_one_entity(self) -> None:
+        self.their_database.discount_campaign().create(DiscountCampaign(
+            id="", campaign_type=CampaignType.DISCOUNT,
+            discount=10, products=[]))
+
+        self.assertEqual(self.invalidator.poll(), ["campaigns"])
+
+    def test_cached_products_are_dropped(self) -> None:
+        database = CachedRepoFactory(inner=self.our_database,
+                                     invalidator=self.invalidator)
+        product = database.products().create(self._product("1"))
+
+        self.their_database.products().update(product_id=product.id,
+                                              price=3.0)
+        self.invalidator.poll()
+
+        found = database.products().get_one(product.id)
+        assert found is not None
+        self.assertEqual(found.price, 3.0)
+
+    def test_snapshot_is_passed_over_after_another_process_write(
+            self) -> None:
+        snapshot = CatalogSnapshot(
+            path=os.path.join(self.directory.name, "catalog.snapshot"),
+            check_interval=60.0)
+        database = CachedRepoFactory(inner=self.our_database,
+                                     snapshot=snapshot,
+                                     invalidator=self.invalidator)
+        product = self.our_database.products().create(self._product("1"))
+        SnapshotPublisher(snapshot=snapshot,
+                          products=self.our_database.products(),
+                          discounts=self.our_database.discount_campaign(),
+                          catalog_version=CatalogVersion()).publish()
+        self.assertIsNotNone(snapshot.current())
+
+        self.their_database.products().update(product_id=product.id,
+                                              price=3.0)
+        self.invalidator.poll()
+
+        self.assertIsNone(snapshot.current())
+        found = database.products().get_one(product.id)
+        assert found is not None
+        self.assertEqual(found.price, 3.0)
+        found = database.products().get_by_barcode("1")
+        assert found is not None
+        self.assertEqual(found.price, 3.0)
+
+    def test_only_receipts_written_elsewhere_are_dropped(self) -> None:
+        database = CachedRepoFactory(inner=self.our_database,
+                                     invalidator=self.invalidator)
+        shift = self.our_database.shifts().create(Shift(id="", receipts=[]))
+        kept, changed = (database.receipts().create(
+            Receipt(id="", shift_id=shift.id, items=[], total=0))
+            for _ in range(2))
+        forgotten: List[List[str]] = []
+        self.invalidator.subscribe_receipts(forgotten.append)
+
+        self.their_database.receipts().update(receipt_id=changed.id,
+                                              status=False)
+
+        self.assertEqual(self.invalidator.poll(), ["receipts"])
+        self.assertEqual(forgotten, [[changed.id]])
+        found = database.receipts().get_one(changed.id)
+        assert found is not None
+        self.assertFalse(found.status)
+        self.assertEqual(self.invalidator.poll(), [])
+
+    def test_run_polls_off_the_event_loop(self) -> None:
+        executor = ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix="invalidation")
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        invalidator = CacheInvalidator(connection=connection,
+                                       poll_interval=0.01,
+                                       executor=executor)
+        polled = threading.Event()
+        threads: List[str] = []
+
+        def on_products() -> None:
+            threads.append(threading.current_thread().name)
+            polled.set()
+
+        invalidator.subscribe("products", on_products)
+
+        async def poll_in_background() -> None:
+            task = asyncio.create_task(invalidator.run())
+            self.their_database.products().create(self._product("1"))
+            while not polled.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(poll_in_background(), timeout=5))
+        executor.shutdown(wait=True)
+        connection.close()
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("invalidation"))
+
+
+if __name__ == '__main__':
+    unittest.main()
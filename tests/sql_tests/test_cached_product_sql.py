@@ -0,0 +1,71 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from app.core.models.product import Product
+from app.infra.data.cached import CachedProductRepository
+from app.infra.data.sqlite import ProductSqliteRepository
+
+
+class TestCachedProductRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('''CREATE TABLE products (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            barcode TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL,
+            discount REAL
+        )''')
+        self.inner = ProductSqliteRepository(self.connection)
+        self.repository = CachedProductRepository(inner=self.inner,
+                                                  cache_size=2)
+        self.product = self.repository.create(
+            Product(id="", name="Milk", barcode="4860001", price=2.5))
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_scan_hits_cache(self) -> None:
+        with patch.object(self.inner, "get_by_barcode") as get_by_barcode, \
+                patch.object(self.inner, "get_one") as get_one:
+            found = self.repository.get_by_barcode("4860001")
+
+        get_by_barcode.assert_not_called()
+        get_one.assert_not_called()
+        self.assertIsNotNone(found)
+        if found:
+            self.assertEqual(found.id, self.product.id)
+
+    def test_returned_products_are_copies(self) -> None:
+        found = self.repository.get_one(self.product.id)
+        if found:
+            found.discount = 1.0
+
+        again = self.repository.get_one(self.product.id)
+        self.assertIsNotNone(again)
+        if again:
+            self.assertIsNone(again.discount)
+
+    def test_update_invalidates_cached_product(self) -> None:
+        self.repository.update(self.product.id, 3.0)
+
+        found = self.repository.get_by_barcode("4860001")
+        self.assertIsNotNone(found)
+        if found:
+            self.assertEqual(found.price, 3.0)
+
+    def test_evicted_products_are_reloaded(self) -> None:
+        for barcode in ("A", "B"):
+            self.repository.create(
+                Product(id="", name=barcode, barcode=barcode, price=1.0))
+
+        found = self.repository.get_by_barcode("4860001")
+        self.assertIsNotNone(found)
+        if found:
+            self.assertEqual(found.name, "Milk")
+        self.assertIsNone(self.repository.get_by_barcode("missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from app.core.models.receipt import ProductForReceipt, Receipt
+from app.infra.data.cached import CachedReceiptRepository
+from app.infra.data.sqlite import ReceiptSqliteRepository
+
+
+class TestCachedReceiptRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute("""
+        CREATE TABLE receipts (
+            id TEXT PRIMARY KEY,
+            shift_id TEXT,
+            total REAL,
+            discount_total REAL,
+            status BOOLEAN,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.connection.execute("""
+        CREATE TABLE receipt_items (
+            item_id TEXT,
+            receipt_id TEXT,
+            item_type TEXT,
+            quantity INTEGER,
+            price REAL,
+            total REAL,
+            discount_price REAL,
+            discount_total REAL,
+            item_data TEXT,
+            PRIMARY KEY (item_id, receipt_id)
+        )
+        """)
+        self.inner = ReceiptSqliteRepository(self.connection)
+        self.repository = CachedReceiptRepository(inner=self.inner)
+        self.receipt = self.repository.create(
+            Receipt(id="", shift_id="shift_1", items=[], total=0.0))
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def _add_line(self, receipt: Receipt) -> Receipt:
+        receipt.items.append(ProductForReceipt(id="p1", quantity=1,
+                                               price=2.0, total=2.0))
+        receipt.total = 2.0
+        return self.repository.add_product(receipt)
+
+    def test_open_receipt_is_not_reloaded(self) -> None:
+        self._add_line(self.receipt)
+
+        with patch.object(self.inner, "get_one") as get_one:
+            receipt = self.repository.get_one(self.receipt.id)
+
+        get_one.assert_not_called()
+        self.assertIsNotNone(receipt)
+        if receipt:
+            self.assertEqual(len(receipt.items), 1)
+            self.assertEqual(receipt.total, 2.0)
+
+    def test_writes_go_through_to_the_database(self) -> None:
+        self._add_line(self.receipt)
+
+        stored = self.inner.get_one(self.receipt.id)
+        self.assertIsNotNone(stored)
+        if stored:
+            self.assertEqual(len(stored.items), 1)
+
+    def test_returned_receipts_are_copies(self) -> None:
+        receipt = self.repository.get_one(self.receipt.id)
+        if receipt:
+            receipt.discount_total = 1.0
+
+        again = self.repository.get_one(self.receipt.id)
+        self.assertIsNotNone(again)
+        if again:
+            self.assertIsNone(again.discount_total)
+
+    def test_closed_and_deleted_receipts_are_evicted(self) -> None:
+        other = self.repository.create(
+            Receipt(id="", shift_id="shift_1", items=[], total=0.0))
+
+        self.repository.update(self.receipt.id, False)
+        self.repository.delete(other.id)
+
+        with patch.object(self.inner, "get_one",
+                          wraps=self.inner.get_one) as get_one:
+            closed = self.repository.get_one(self.receipt.id)
+            deleted = self.repository.get_one(other.id)
+
+        self.assertEqual(get_one.call_count, 2)
+        self.assertIsNotNone(closed)
+        if closed:
+            self.assertFalse(closed.status)
+        self.assertIsNone(deleted)
+
+
+if __name__ == '__main__':
+    unittest.main()
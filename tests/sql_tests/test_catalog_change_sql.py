@@ -0,0 +1,72 @@
+import sqlite3
+import unittest
+
+from app.core.facade import POSCore
+from app.core.models.catalog_change import ChangeEntity, ChangeOp
+from app.infra.data.sqlite import CatalogChangeSqliteRepository, SqliteRepoFactory
+
+
+class TestCatalogChangeSqliteRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('''CREATE TABLE catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at REAL NOT NULL
+        )''')
+        self.repository = CatalogChangeSqliteRepository(self.connection)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_empty_log(self) -> None:
+        self.assertEqual(self.repository.bounds(), (0, 0))
+        self.assertEqual(self.repository.get_since(seq=0, limit=10), [])
+
+    def test_append_and_get_since(self) -> None:
+        first = self.repository.append(ChangeEntity.PRODUCT, "p1",
+                                       ChangeOp.UPSERT, changed_at=1.0)
+        second = self.repository.append(ChangeEntity.CAMPAIGN, "c1",
+                                        ChangeOp.DELETE, changed_at=2.0)
+
+        self.assertLess(first.seq, second.seq)
+        self.assertEqual(self.repository.get_since(seq=0, limit=10),
+                         [first, second])
+        self.assertEqual(self.repository.get_since(seq=first.seq, limit=10),
+                         [second])
+        self.assertEqual(self.repository.get_since(seq=0, limit=1), [first])
+
+    def test_seq_keeps_growing_after_compaction(self) -> None:
+        for index in range(3):
+            self.repository.append(ChangeEntity.PRODUCT, f"p{index}",
+                                   ChangeOp.UPSERT, changed_at=1.0)
+
+        self.assertEqual(self.repository.delete_through(seq=3), 3)
+        self.assertEqual(self.repository.bounds(), (0, 3))
+
+        change = self.repository.append(ChangeEntity.PRODUCT, "p3",
+                                        ChangeOp.UPSERT, changed_at=2.0)
+        self.assertEqual(change.seq, 4)
+        self.assertEqual(self.repository.bounds(), (4, 4))
+
+    def test_new_terminal_gets_products_that_were_never_logged(self) -> None:
+        connection = sqlite3.connect(':memory:')
+        core = POSCore.create(SqliteRepoFactory(connection=connection))
+        # seeded straight into the table, so the log knows nothing of it
+        connection.execute("INSERT INTO products (id, name, barcode, price)"
+                           " VALUES ('p1', 'Milk', '111', 2.5)")
+        connection.commit()
+
+        response = core.get_catalog_changes(since=0)
+
+        assert response.snapshot is not None
+        self.assertEqual([product.id for product in response.snapshot.products],
+                         ["p1"])
+        self.assertEqual(response.next_since, 0)
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.core.models.campaign import CampaignType, DiscountCampaign
+from app.core.models.product import Product
+from app.core.services.catalog_version import CatalogVersion
+from app.infra.data.cached import (
+    SnapshotDiscountCampaignRepository,
+    SnapshotProductRepository,
+)
+from app.infra.data.sqlite import (
+    ProductDiscountCampaignSqliteRepository,
+    ProductSqliteRepository,
+)
+from app.infra.snapshot import CatalogSnapshot, SnapshotPublisher
+
+
+class TestCatalogSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('''CREATE TABLE products (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            barcode TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL,
+            discount REAL
+        )''')
+        self.connection.execute('''CREATE TABLE discount_campaigns (
+            id TEXT PRIMARY KEY,
+            campaign_type TEXT,
+            discount REAL
+        )''')
+        self.connection.execute('''CREATE TABLE discount_campaign_products (
+            campaign_id TEXT,
+            product_id TEXT,
+            PRIMARY KEY (campaign_id, product_id)
+        )''')
+        self.products = ProductSqliteRepository(self.connection)
+        self.discounts = ProductDiscountCampaignSqliteRepository(
+            self.connection)
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot = CatalogSnapshot(
+            path=os.path.join(self.directory.name, "catalog.snapshot"),
+            check_interval=0.0)
+        self.publisher = SnapshotPublisher(snapshot=self.snapshot,
+                                           products=self.products,
+                                           discounts=self.discounts,
+                                           catalog_version=CatalogVersion())
+
+        self.milk = self.products.create(
+            Product(id="", name="Milk", barcode="4860001", price=2.5))
+        self.bread = self.products.create(
+            Product(id="", name="Bread", barcode="4860002", price=1.0))
+        campaign = self.discounts.create(DiscountCampaign(
+            id="", campaign_type=CampaignType.DISCOUNT,
+            discount=10, products=[]))
+        self.discounts.add_product(product_id=self.milk.id,
+                                   campaign_id=campaign.id)
+        self.campaign_id = campaign.id
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_no_snapshot_until_published(self) -> None:
+        self.assertIsNone(self.snapshot.current())
+
+    def test_lookups_through_published_snapshot(self) -> None:
+        self.assertEqual(self.publisher.publish(), 1)
+
+        mapped = self.snapshot.current()
+        assert mapped is not None
+        self.assertEqual(mapped.generation, 1)
+        milk = mapped.get(self.milk.id)
+        assert milk is not None
+        self.assertEqual(milk.product, self.milk)
+        self.assertEqual(milk.discount, 10)
+        self.assertEqual(milk.campaign_id, self.campaign_id)
+
+        bread = mapped.get_by_barcode("4860002")
+        assert bread is not None
+        self.assertEqual(bread.product, self.bread)
+        self.assertIsNone(bread.discount)
+        self.assertIsNone(mapped.get("missing"))
+        self.assertIsNone(mapped.get_by_barcode("missing"))
+
+    def test_new_generation_replaces_old(self) -> None:
+        self.publisher.publish()
+        self.products.update(product_id=self.milk.id, price=3.0)
+        self.assertEqual(self.publisher.publish(), 2)
+
+        mapped = self.snapshot.current()
+        assert mapped is not None
+        milk = mapped.get(self.milk.id)
+        assert milk is not None
+        self.assertEqual(mapped.generation, 2)
+        self.assertEqual(milk.product.price, 3.0)
+
+    def test_local_write_bypasses_older_snapshot(self) -> None:
+        self.publisher.publish()
+        repository = SnapshotProductRepository(inner=self.products,
+                                               snapshot=self.snapshot)
+
+        repository.update(product_id=self.milk.id, price=4.0)
+
+        self.assertIsNone(self.snapshot.current())
+        found = repository.get_one(self.milk.id)
+        assert found is not None
+        self.assertEqual(found.price, 4.0)
+
+        self.publisher.publish()
+        self.assertIsNotNone(self.snapshot.current())
+
+    def test_repositories_read_through_snapshot(self) -> None:
+        self.publisher.publish()
+        products = SnapshotProductRepository(inner=self.products,
+                                             snapshot=self.snapshot)
+        discounts = SnapshotDiscountCampaignRepository(
+            inner=self.discounts, snapshot=self.snapshot)
+
+        with patch.object(self.products, "get_by_barcode") as get_by_barcode, \
+                patch.object(self.discounts,
+                             "get_campaigns_with_products") as get_campaigns:
+            found = products.get_by_barcode("4860001")
+            campaigns = discounts.get_campaigns_with_products(
+                [self.milk.id, self.bread.id])
+
+        get_by_barcode.assert_not_called()
+        get_campaigns.assert_not_called()
+        self.assertEqual(found, self.milk)
+        self.assertEqual(list(campaigns), [self.milk.id])
+        self.assertEqual(campaigns[self.milk.id].discount, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
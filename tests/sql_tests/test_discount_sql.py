@@ -113,6 +113,46 @@ class TestDiscountCampaignSqliteRepository(unittest.TestCase):
         campaign = repo.get_campaign_with_product("non_existent_product")
         self.assertIsNone(campaign)
 
+    def test_get_campaigns_with_products(self) -> None:
+        repo = ProductDiscountCampaignSqliteRepository(self.connection)
+        better = repo.create(DiscountCampaign(
+            id=str(uuid.uuid4()),
+            campaign_type=CampaignType.DISCOUNT,
+            discount=25,
+            products=["product2", "product3"]
+        ))
+
+        campaigns = repo.get_campaigns_with_products(
+            ["product1", "product2", "product3", "product4"])
+
+        self.assertEqual(campaigns["product1"].id, self.discount_campaign.id)
+        self.assertEqual(campaigns["product2"].id, better.id)
+        self.assertEqual(campaigns["product3"].id, better.id)
+        self.assertNotIn("product4", campaigns)
+        self.assertCountEqual(campaigns["product2"].products,
+                              ["product2", "product3"])
+        self.assertEqual(repo.get_campaigns_with_products([]), {})
+
+    def test_get_campaigns_with_products_past_the_variable_limit(self) -> None:
+        repo = ProductDiscountCampaignSqliteRepository(self.connection)
+        # the default limit differs between builds; pin an old, low one
+        limit = self.connection.setlimit(
+            sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        self.addCleanup(self.connection.setlimit,
+                        sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+        product_ids = [f"bulk-{index}" for index in range(1200)]
+        campaign = repo.create(DiscountCampaign(
+            id=str(uuid.uuid4()),
+            campaign_type=CampaignType.DISCOUNT,
+            discount=5,
+            products=[product_ids[0], product_ids[-1]]
+        ))
+
+        campaigns = repo.get_campaigns_with_products(product_ids)
+
+        self.assertEqual(set(campaigns), {product_ids[0], product_ids[-1]})
+        self.assertEqual(campaigns[product_ids[-1]].id, campaign.id)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
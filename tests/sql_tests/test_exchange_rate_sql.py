@@ -0,0 +1,49 @@
+import sqlite3
+import unittest
+
+from app.core.models.exchange_rate import ExchangeRate
+from app.infra.data.sqlite import ExchangeRateSqliteRepository
+
+
+class TestExchangeRateSqliteRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('''CREATE TABLE exchange_rates (
+            from_currency TEXT NOT NULL,
+            to_currency TEXT NOT NULL,
+            rate REAL NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (from_currency, to_currency)
+        )''')
+        self.repository = ExchangeRateSqliteRepository(self.connection)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_get_missing_rate(self) -> None:
+        self.assertIsNone(self.repository.get_rate("GEL", "USD"))
+
+    def test_save_and_get_rate(self) -> None:
+        rate = ExchangeRate(from_currency="GEL", to_currency="USD",
+                            rate=0.37, fetched_at=100.0)
+
+        self.repository.save_rate(rate)
+
+        self.assertEqual(self.repository.get_rate("GEL", "USD"), rate)
+
+    def test_save_rate_overwrites_pair(self) -> None:
+        self.repository.save_rate(ExchangeRate(from_currency="GEL",
+                                               to_currency="USD",
+                                               rate=0.37, fetched_at=100.0))
+        self.repository.save_rate(ExchangeRate(from_currency="GEL",
+                                               to_currency="USD",
+                                               rate=0.38, fetched_at=200.0))
+
+        stored = self.repository.get_rate("GEL", "USD")
+        assert stored is not None
+        self.assertEqual(stored.rate, 0.38)
+        self.assertEqual(stored.fetched_at, 200.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
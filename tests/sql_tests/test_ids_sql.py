@@ -0,0 +1,76 @@
+import sqlite3
+import time
+import unittest
+import uuid
+
+from app.core.models.product import Product
+from app.infra.data.ids import (
+    Uuid7Generator,
+    id_generator,
+    id_timestamp,
+    uuid4_id,
+)
+from app.infra.data.sqlite import SqliteRepoFactory
+
+
+class TestUuid7Generator(unittest.TestCase):
+    def test_ids_are_version_7_and_ordered(self) -> None:
+        new_id = Uuid7Generator()
+
+        ids = [new_id() for _ in range(10_000)]
+
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        parsed = uuid.UUID(ids[0])
+        self.assertEqual(parsed.version, 7)
+        self.assertEqual(parsed.variant, uuid.RFC_4122)
+
+    def test_timestamp_is_creation_time(self) -> None:
+        created = id_timestamp(Uuid7Generator()())
+
+        assert created is not None
+        self.assertAlmostEqual(created, time.time(), delta=1.0)
+        self.assertIsNone(id_timestamp(uuid4_id()))
+        self.assertIsNone(id_timestamp("not-an-id"))
+
+    def test_unknown_generator(self) -> None:
+        with self.assertRaises(ValueError):
+            id_generator("ulid")
+
+
+class TestIdGeneratorSql(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_existing_uuid4_rows_stay_readable(self) -> None:
+        old = SqliteRepoFactory(connection=self.connection,
+                                id_generator=id_generator("uuid4"))
+        legacy = old.products().create(
+            Product(id="", name="Milk", barcode="1", price=2.5))
+
+        new = SqliteRepoFactory(connection=self.connection)
+        product = new.products().create(
+            Product(id="", name="Bread", barcode="2", price=1.0))
+
+        self.assertEqual(uuid.UUID(legacy.id).version, 4)
+        self.assertEqual(uuid.UUID(product.id).version, 7)
+        self.assertEqual(new.products().get_one(legacy.id), legacy)
+        self.assertEqual(new.products().get_one(product.id), product)
+
+    def test_id_order_is_creation_order(self) -> None:
+        products = SqliteRepoFactory(connection=self.connection).products()
+        created = [products.create(Product(id="", name=f"Product {number}",
+                                           barcode=str(number), price=1.0))
+                   for number in range(5)]
+
+        page = products.get_page(after=None, limit=5)
+
+        self.assertEqual([product.id for product in page],
+                         [product.id for product in created])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import sqlite3
+import unittest
+from typing import List
+
+from app.core.models.product import Product
+from app.infra.data.in_memory import ProductInMemoryRepository
+from app.infra.data.sqlite import ProductSqliteRepository, SqliteRepoFactory
+
+
+class TestProductSearchSql(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.products = SqliteRepoFactory(connection=self.connection).products()
+        for name, barcode in [("Milk Chocolate", "4860001"),
+                              ("Milk", "4860002"),
+                              ("Dark Chocolate", "4860003"),
+                              ("Bread", "5901234")]:
+            self.products.create(
+                Product(id="", name=name, barcode=barcode, price=1.0))
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def _names(self, query: str, limit: int = 10) -> List[str]:
+        return [product.name
+                for product in self.products.search(query, limit)]
+
+    def test_prefix_match(self) -> None:
+        self.assertEqual(sorted(self._names("choc")),
+                         ["Dark Chocolate", "Milk Chocolate"])
+        self.assertEqual(self._names("brea"), ["Bread"])
+
+    def test_all_terms_must_match(self) -> None:
+        self.assertEqual(self._names("mil cho"), ["Milk Chocolate"])
+        self.assertEqual(self._names("milk bread"), [])
+
+    def test_exact_name_ranks_first(self) -> None:
+        self.assertEqual(self._names("milk"), ["Milk", "Milk Chocolate"])
+
+    def test_barcode_prefix_and_limit(self) -> None:
+        self.assertEqual(len(self._names("486", limit=2)), 2)
+        self.assertEqual(self._names("5901"), ["Bread"])
+
+    def test_query_syntax_is_not_interpreted(self) -> None:
+        # quotes and operators are not FTS syntax here, just words
+        self.assertEqual(self._names('milk" OR "bread'), [])
+        self.assertEqual(self._names("dark*)"), ["Dark Chocolate"])
+        self.assertEqual(self._names("*"), [])
+
+    def test_index_follows_product_table(self) -> None:
+        self.connection.execute(
+            "UPDATE products SET name = 'Rye Bread' WHERE barcode = '5901234'")
+        self.connection.execute(
+            "DELETE FROM products WHERE barcode = '4860003'")
+
+        self.assertEqual(self._names("rye"), ["Rye Bread"])
+        self.assertEqual(self._names("dark"), [])
+
+    def test_existing_rows_indexed_on_first_start(self) -> None:
+        connection = sqlite3.connect(':memory:')
+        connection.execute('''CREATE TABLE products (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            barcode TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL,
+            discount REAL
+        )''')
+        connection.execute("INSERT INTO products VALUES "
+                           "('1', 'Sparkling Water', '111', 1.0, NULL)")
+
+        products = SqliteRepoFactory(connection=connection).products()
+
+        self.assertEqual([product.id for product in products.search("spark", 5)],
+                         ["1"])
+        connection.close()
+
+    def test_falls_back_to_like_without_index(self) -> None:
+        connection = sqlite3.connect(':memory:')
+        connection.execute('''CREATE TABLE products (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            barcode TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL,
+            discount REAL
+        )''')
+        products = ProductSqliteRepository(connection)
+        products.create(Product(id="", name="Milk_Shake", barcode="1",
+                                price=1.0))
+        products.create(Product(id="", name="Milky", barcode="2", price=1.0))
+
+        self.assertEqual([product.name
+                          for product in products.search("shake", 5)],
+                         ["Milk_Shake"])
+        self.assertEqual(len(products.search("milk", 5)), 2)
+        self.assertFalse(products.full_text_search)
+        connection.close()
+
+    def test_search_errors_are_not_hidden_by_the_fallback(self) -> None:
+        products = ProductSqliteRepository(self.connection)
+        self.assertTrue(products.full_text_search)
+        self.connection.execute("DROP TABLE products_fts")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            products.search("milk", 5)
+
+
+class TestProductInMemorySearch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.products = ProductInMemoryRepository()
+        for name, barcode in [("Milk Chocolate", "4860001"),
+                              ("Milk", "4860002"),
+                              ("Dark Chocolate", "4860003")]:
+            self.products.create(
+                Product(id="", name=name, barcode=barcode, price=1.0))
+
+    def _names(self, query: str, limit: int = 10) -> List[str]:
+        return [product.name
+                for product in self.products.search(query, limit)]
+
+    def test_prefix_and_ranking(self) -> None:
+        self.assertEqual(self._names("milk"), ["Milk", "Milk Chocolate"])
+        self.assertEqual(self._names("mil cho"), ["Milk Chocolate"])
+        self.assertEqual(self._names("486", limit=1), ["Dark Chocolate"])
+        self.assertEqual(self._names("tea"), [])
+        self.assertEqual(self._names(""), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -157,6 +157,65 @@ class TestProductSqliteRepository(unittest.TestCase):
         # Verify exists
         self.assertTrue(self.product_repo.has_barcode(barcode))
 
+    def test_get_page(self) -> None:
+        for index in range(5):
+            self.product_repo.create(Product(id="", name=f"P{index}",
+                                             barcode=f"PAGE{index}", price=1.0))
+
+        first = self.product_repo.get_page(after=None, limit=3)
+        second = self.product_repo.get_page(after=first[-1].id, limit=3)
+
+        ids = [product.id for product in first + second]
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertEqual(ids, sorted(ids))
+
+    def test_get_product_by_barcode(self) -> None:
+        self.assertIsNone(self.product_repo.get_by_barcode("SCAN123"))
+
+        product = self.product_repo.create(Product(
+            id=str(uuid4()),
+            name="Scanned",
+            barcode="SCAN123",
+            price=3.5
+        ))
+
+        found = self.product_repo.get_by_barcode("SCAN123")
+        self.assertIsNotNone(found)
+        if found:
+            self.assertEqual(found.id, product.id)
+            self.assertEqual(found.price, 3.5)
+
+    def test_create_many_skips_existing_barcodes(self) -> None:
+        existing = self.product_repo.create(Product(
+            id="", name="Existing", barcode="BULK1", price=1.0))
+
+        created = self.product_repo.create_many([
+            Product(id="", name="Duplicate", barcode="BULK1", price=2.0),
+            Product(id="", name="New", barcode="BULK2", price=3.0),
+        ])
+
+        self.assertEqual([product.barcode for product in created], ["BULK2"])
+        found = self.product_repo.get_by_barcode("BULK1")
+        self.assertEqual(found, existing)
+        self.assertEqual(self.product_repo.get_by_barcode("BULK2"),
+                         created[0])
+
+    def test_update_prices(self) -> None:
+        first = self.product_repo.create(Product(
+            id="", name="First", barcode="PRICE1", price=1.0))
+        second = self.product_repo.create(Product(
+            id="", name="Second", barcode="PRICE2", price=2.0))
+
+        updated = self.product_repo.update_prices(
+            {first.id: 10.0, "missing": 5.0, second.id: 20.0})
+
+        self.assertEqual(updated, [first.id, second.id])
+        found = self.product_repo.get_one(first.id)
+        self.assertEqual(found.price if found else None, 10.0)
+        found = self.product_repo.get_one(second.id)
+        self.assertEqual(found.price if found else None, 20.0)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
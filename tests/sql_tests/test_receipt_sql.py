@@ -30,7 +30,8 @@ class TestReceiptSqliteRepository(unittest.TestCase):
             shift_id TEXT,
             total REAL,
             discount_total REAL,
-            status BOOLEAN
+            status BOOLEAN,
+            version INTEGER NOT NULL DEFAULT 0
         )
         """)
         cursor.execute("""
@@ -130,6 +131,20 @@ class TestReceiptSqliteRepository(unittest.TestCase):
         else:
             self.fail("Receipt should not be None")
 
+    def test_close_many_receipts(self) -> None:
+        receipts = [
+            self.repository.create(Receipt(id=str(uuid.uuid4()),
+                                           shift_id="shift_1", total=0.0,
+                                           status=True, items=[]))
+            for _ in range(3)
+        ]
+
+        self.repository.close_many([receipt.id for receipt in receipts[:2]])
+
+        statuses = [self.repository.get_one(receipt.id).status  # type: ignore
+                    for receipt in receipts]
+        self.assertEqual(statuses, [False, False, True])
+
     def test_delete_receipt(self) -> None:
         # Create a receipt
         receipt = Receipt(
@@ -153,6 +168,28 @@ class TestReceiptSqliteRepository(unittest.TestCase):
         receipt_exists_after = self.repository.get_one(created_receipt.id)
         self.assertIsNone(receipt_exists_after)
 
+    def test_get_page_with_filters(self) -> None:
+        for shift_id, status in [("shift_1", True), ("shift_1", False),
+                                 ("shift_1", True), ("shift_2", True)]:
+            receipt = self.repository.create(Receipt(
+                id="", shift_id=shift_id, total=1.0, status=status,
+                items=[ProductForReceipt(id="p1", quantity=1, price=1.0,
+                                         total=1.0)]))
+            self.repository.update(receipt.id, status)
+
+        first = self.repository.get_page(after=None, limit=1,
+                                         shift_id="shift_1", status=True)
+        rest = self.repository.get_page(after=first[0].id, limit=10,
+                                        shift_id="shift_1", status=True)
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(rest), 1)
+        self.assertLess(first[0].id, rest[0].id)
+        self.assertEqual(len(rest[0].items), 1)
+        self.assertEqual(len(self.repository.get_page(after=None, limit=10,
+                                                      status=False)), 1)
+        self.assertEqual(len(self.repository.get_page(after=None, limit=10)), 4)
+
     def test_get_all_receipts(self) -> None:
         # Create a few receipts
         receipt_1 = Receipt(
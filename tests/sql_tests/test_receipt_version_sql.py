@@ -0,0 +1,112 @@
+import sqlite3
+import unittest
+
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
+from app.core.models.receipt import ProductForReceipt, Receipt
+from app.core.models.shift import Shift
+from app.infra.data.sqlite import SqliteRepoFactory
+
+
+class TestReceiptVersionSql(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:')
+        self.database = SqliteRepoFactory(connection=self.connection)
+        self.repository = self.database.receipts()
+        shift = self.database.shifts().create(Shift(id="", receipts=[]))
+        self.receipt_id = self.repository.create(
+            Receipt(id="", shift_id=shift.id, items=[], total=0)).id
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def _read(self) -> Receipt:
+        receipt = self.repository.get_one(self.receipt_id)
+        assert receipt is not None
+        return receipt
+
+    def _scan(self, receipt: Receipt, product_id: str) -> Receipt:
+        receipt.items.append(
+            ProductForReceipt(id=product_id, quantity=1, price=2.0))
+        return self.repository.add_product(receipt)
+
+    def test_each_write_bumps_the_version(self) -> None:
+        self.assertEqual(self._read().version, 0)
+
+        written = self._scan(self._read(), "milk")
+
+        self.assertEqual(written.version, 1)
+        self.assertEqual(self._read().version, 1)
+
+    def test_stale_write_is_rejected(self) -> None:
+        first, second = self._read(), self._read()
+        self._scan(first, "milk")
+
+        with self.assertRaises(ReceiptConflictError):
+            self._scan(second, "bread")
+
+        stored = self._read()
+        self.assertEqual([item.id for item in stored.items], ["milk"])
+        self.assertEqual(stored.version, 1)
+
+    def test_closing_conflicts_with_a_scan_in_flight(self) -> None:
+        scanning = self._read()
+
+        self.repository.update(receipt_id=self.receipt_id, status=False)
+
+        with self.assertRaises(ReceiptConflictError):
+            self._scan(scanning, "milk")
+        self.assertEqual(self._read().items, [])
+
+    def test_closing_a_stale_receipt_is_rejected(self) -> None:
+        paying = self._read()
+        self._scan(self._read(), "milk")
+
+        with self.assertRaises(ReceiptConflictError):
+            self.repository.update(receipt_id=self.receipt_id, status=False,
+                                   expected_version=paying.version)
+
+        stored = self._read()
+        self.assertTrue(stored.status)
+        self.assertEqual(stored.version, 1)
+
+    def test_batch_close_is_all_or_none(self) -> None:
+        other_id = self.repository.create(
+            Receipt(id="", shift_id=self._read().shift_id, items=[],
+                    total=0)).id
+        versions = {self.receipt_id: 0, other_id: 0}
+        self._scan(self._read(), "milk")
+
+        with self.assertRaises(ReceiptConflictError) as raised:
+            self.repository.close_many(receipt_ids=[other_id, self.receipt_id],
+                                       expected_versions=versions)
+
+        self.assertEqual(raised.exception.receipt_id, self.receipt_id)
+        other = self.repository.get_one(other_id)
+        assert other is not None
+        self.assertTrue(other.status)
+        self.assertEqual(other.version, 0)
+
+        self.repository.close_many(receipt_ids=[other_id, self.receipt_id],
+                                   expected_versions={self.receipt_id: 1,
+                                                      other_id: 0})
+        self.assertFalse(self._read().status)
+        self.assertEqual(self._read().version, 2)
+
+    def test_old_database_gets_the_version_column(self) -> None:
+        connection = sqlite3.connect(':memory:')
+        connection.execute("CREATE TABLE receipts (id TEXT PRIMARY KEY,"
+                           " shift_id TEXT NOT NULL, total REAL NOT NULL,"
+                           " discount_total REAL, status INTEGER NOT NULL)")
+        connection.execute("INSERT INTO receipts VALUES"
+                           " ('old', 'shift', 0, NULL, 1)")
+
+        receipt = SqliteRepoFactory(connection=connection).receipts() \
+            .get_one("old")
+
+        assert receipt is not None
+        self.assertEqual(receipt.version, 0)
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
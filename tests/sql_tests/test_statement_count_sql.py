@@ -0,0 +1,48 @@
+import sqlite3
+import unittest
+
+from app.core.models.product import Product
+from app.core.timing import LAYER_SECONDS, REPOSITORY
+from app.infra.data.sqlite import (
+    DB_STATEMENTS,
+    CountingConnection,
+    SqliteRepoFactory,
+)
+
+
+class TestStatementCountSql(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(':memory:',
+                                          factory=CountingConnection)
+        self.products = SqliteRepoFactory(
+            connection=self.connection).products()
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_statements_are_put_down_to_the_repository_call(self) -> None:
+        call = "ProductSqliteRepository.get_by_barcode"
+        statements = DB_STATEMENTS.value(call=call)
+        timed = LAYER_SECONDS.count(layer=REPOSITORY, call=call)
+        self.products.create(
+            Product(id="", name="Milk", barcode="111", price=2.5))
+
+        found = self.products.get_by_barcode("111")
+
+        assert found is not None
+        self.assertEqual(found.name, "Milk")
+        self.assertEqual(DB_STATEMENTS.value(call=call) - statements, 1)
+        self.assertEqual(
+            LAYER_SECONDS.count(layer=REPOSITORY, call=call) - timed, 1)
+
+    def test_statements_outside_repositories_are_counted_apart(self) -> None:
+        statements = DB_STATEMENTS.value(call="other")
+
+        self.connection.execute("SELECT 1").fetchone()
+        self.connection.cursor().execute("SELECT 2").fetchone()
+
+        self.assertEqual(DB_STATEMENTS.value(call="other") - statements, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
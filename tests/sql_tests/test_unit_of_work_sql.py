@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import List
+
+from app.core.models.campaign import CampaignType, DiscountCampaign
+from app.core.models.product import Product
+from app.core.services.catalog_version import CatalogVersion
+from app.core.services.product_service import ProductService
+from app.core.services.sync_service import SyncService
+from app.infra.data.sqlite import SqliteRepoFactory
+from app.infra.data.unit_of_work import DB_COMMITS
+
+
+class TestSqliteUnitOfWork(unittest.TestCase):
+    def setUp(self) -> None:
+        # a second connection shows what other processes can see
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "oop.db")
+        self.connection = sqlite3.connect(path)
+        self.other = sqlite3.connect(path)
+        self.database = SqliteRepoFactory(connection=self.connection)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        self.other.close()
+        self.directory.cleanup()
+
+    def _product(self, barcode: str) -> Product:
+        return Product(id="", name="Milk", barcode=barcode, price=2.5)
+
+    def _visible_products(self) -> int:
+        return int(self.other.execute(
+            "SELECT COUNT(*) FROM products").fetchone()[0])
+
+    def test_writes_commit_once_at_the_end(self) -> None:
+        commits = DB_COMMITS.value()
+
+        with self.database.unit_of_work():
+            self.database.products().create(self._product("1"))
+            self.database.products().update_prices({"missing": 1.0})
+            self.database.products().create(self._product("2"))
+            self.assertEqual(self._visible_products(), 0)
+
+        self.assertEqual(DB_COMMITS.value() - commits, 1)
+        self.assertEqual(self._visible_products(), 2)
+
+    def test_error_rolls_back_every_write(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with self.database.unit_of_work():
+                self.database.products().create(self._product("1"))
+                self.database.discount_campaign().create(DiscountCampaign(
+                    id="", campaign_type=CampaignType.DISCOUNT,
+                    discount=10, products=[]))
+                raise RuntimeError("payment declined")
+
+        self.assertEqual(self._visible_products(), 0)
+        self.assertEqual(self.database.discount_campaign().get_all(), [])
+        self.assertFalse(self.connection.in_transaction)
+
+    def test_failed_write_inside_keeps_the_rest(self) -> None:
+        with self.database.unit_of_work():
+            self.database.products().create(self._product("1"))
+            with self.assertRaises(sqlite3.IntegrityError):
+                self.database.products().create(self._product("1"))
+            self.database.products().create(self._product("2"))
+
+        self.assertEqual(self._visible_products(), 2)
+
+    def test_campaign_with_products_is_one_commit(self) -> None:
+        product = self.database.products().create(self._product("1"))
+        commits = DB_COMMITS.value()
+
+        self.database.discount_campaign().create(DiscountCampaign(
+            id="", campaign_type=CampaignType.DISCOUNT,
+            discount=10, products=[product.id]))
+
+        self.assertEqual(DB_COMMITS.value() - commits, 1)
+
+    def test_after_commit_waits_for_the_outermost_commit(self) -> None:
+        seen: List[int] = []
+
+        def count() -> None:
+            seen.append(self._visible_products())
+
+        with self.database.unit_of_work():
+            self.database.products().create(self._product("1"))
+            with self.database.unit_of_work():
+                self.database.after_commit(count)
+            self.assertEqual(seen, [])
+
+        self.assertEqual(seen, [1])
+        self.database.after_commit(count)
+        self.assertEqual(seen, [1, 1])
+
+    def test_after_commit_is_dropped_on_rollback(self) -> None:
+        seen: List[str] = []
+
+        with self.assertRaises(RuntimeError):
+            with self.database.unit_of_work():
+                self.database.after_commit(lambda: seen.append("commit"))
+                raise RuntimeError("payment declined")
+        with self.database.unit_of_work():
+            pass
+
+        self.assertEqual(seen, [])
+
+    def test_catalog_version_is_shared_and_moves_after_commit(self) -> None:
+        ours = CatalogVersion(
+            change_repository=self.database.catalog_changes(),
+            after_commit=self.database.after_commit)
+        service = ProductService(
+            product_repository=self.database.products(),
+            catalog_version=ours,
+            sync_service=SyncService(self.database.catalog_changes()))
+
+        with self.database.unit_of_work():
+            service.create_product(self._product("1"))
+            self.assertEqual(ours.current()[0], "0")
+
+        # another worker, or this one after a restart, tags it alike
+        theirs = CatalogVersion(
+            change_repository=SqliteRepoFactory(
+                connection=self.other).catalog_changes())
+        self.assertEqual(ours.current()[0], "1")
+        self.assertEqual(theirs.current(), ours.current())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.core.exceptions.receipt_exceptions import ReceiptConflictError
+from app.core.models.receipt import ProductForReceipt, Receipt
+from app.core.models.shift import Shift
+from app.infra.data.sqlite import SqliteRepoFactory
+from app.infra.data.write_behind import (
+    WRITE_BEHIND_CONFLICTS,
+    WRITE_BEHIND_WRITES,
+    WriteBehindReceiptRepository,
+)
+
+
+class TestWriteBehindReceiptRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        # a second connection shows what is really in the database
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "oop.db")
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.other = sqlite3.connect(path)
+        database = SqliteRepoFactory(connection=self.connection)
+        self.repository = WriteBehindReceiptRepository(
+            inner=database.receipts(), unit_of_work=database.unit_of_work,
+            flush_interval=0.001)
+        shift = database.shifts().create(Shift(id="", receipts=[]))
+        self.receipt = self.repository.create(
+            Receipt(id="", shift_id=shift.id, items=[], total=0))
+
+    def tearDown(self) -> None:
+        self.repository.close()
+        self.connection.close()
+        self.other.close()
+        self.directory.cleanup()
+
+    def _scan(self, product_id: str) -> None:
+        self.receipt.items.append(
+            ProductForReceipt(id=product_id, quantity=1, price=2.0))
+        self.repository.add_product(self.receipt)
+
+    def _stored_items(self) -> int:
+        return int(self.other.execute(
+            "SELECT COUNT(*) FROM receipt_items WHERE receipt_id = ?",
+            (self.receipt.id,)).fetchone()[0])
+
+    def test_scans_are_queued_and_read_back(self) -> None:
+        self._scan("milk")
+        self._scan("bread")
+
+        self.assertEqual(self._stored_items(), 0)
+        found = self.repository.get_one(self.receipt.id)
+        assert found is not None
+        self.assertEqual([item.id for item in found.items],
+                         ["milk", "bread"])
+        self.assertEqual(self.repository.get_page(after=None, limit=5)[0],
+                         found)
+
+    def test_flush_writes_latest_state_once(self) -> None:
+        writes = WRITE_BEHIND_WRITES.value()
+        for product_id in ("milk", "bread", "eggs"):
+            self._scan(product_id)
+
+        self.repository.flush_all()
+
+        self.assertEqual(WRITE_BEHIND_WRITES.value() - writes, 1)
+        self.assertEqual(self._stored_items(), 3)
+
+    def test_closing_receipt_flushes_it_first(self) -> None:
+        self._scan("milk")
+
+        self.repository.update(receipt_id=self.receipt.id, status=False)
+
+        self.assertEqual(self._stored_items(), 1)
+        status = self.other.execute(
+            "SELECT status FROM receipts WHERE id = ?",
+            (self.receipt.id,)).fetchone()[0]
+        self.assertFalse(status)
+
+    def test_background_writer_flushes(self) -> None:
+        self.repository.start()
+        self._scan("milk")
+
+        deadline = time.monotonic() + 5
+        while self._stored_items() == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        self.assertEqual(self._stored_items(), 1)
+
+    def test_stale_change_is_refused_when_queued(self) -> None:
+        stale = self.repository.get_one(self.receipt.id)
+        assert stale is not None
+        self._scan("milk")
+
+        stale.items.append(ProductForReceipt(id="bread", quantity=1,
+                                             price=2.0))
+        with self.assertRaises(ReceiptConflictError):
+            self.repository.add_product(stale)
+
+        self.repository.flush_all()
+        self.assertEqual(self._stored_items(), 1)
+        found = self.repository.get_one(self.receipt.id)
+        assert found is not None
+        self.assertEqual(found.version, self.receipt.version)
+
+    def test_change_made_elsewhere_is_dropped_at_flush(self) -> None:
+        conflicts = WRITE_BEHIND_CONFLICTS.value()
+        self._scan("milk")
+        self.other.execute("UPDATE receipts SET version = version + 5")
+        self.other.commit()
+
+        self.repository.flush_all()
+
+        self.assertEqual(WRITE_BEHIND_CONFLICTS.value() - conflicts, 1)
+        self.assertEqual(self._stored_items(), 0)
+        found = self.repository.get_one(self.receipt.id)
+        assert found is not None
+        self.assertEqual(found.items, [])
+
+    def test_failed_flush_stays_queued(self) -> None:
+        inner = MagicMock()
+        inner.add_product.side_effect = [sqlite3.OperationalError("locked"),
+                                         self.receipt]
+        repository = WriteBehindReceiptRepository(
+            inner=inner, unit_of_work=MagicMock())
+        repository.add_product(self.receipt)
+
+        with self.assertRaises(sqlite3.OperationalError):
+            repository.flush_all()
+        self.assertEqual(repository.get_one(self.receipt.id), self.receipt)
+        inner.get_one.assert_not_called()
+        repository.flush_all()
+
+        self.assertEqual(inner.add_product.call_count, 2)
+        repository.flush_all()
+        self.assertEqual(inner.add_product.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()